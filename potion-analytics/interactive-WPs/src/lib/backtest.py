@@ -7,6 +7,7 @@ import lib.kelly as kelly
 import lib.random_path_generation as rpg
 import lib.black_scholes as bs
 import lib.convolution as convolution
+from lib.compute_cache import shared_cache
 
 
 def run_backtest(
@@ -32,33 +33,52 @@ def run_backtest(
     """
 
     # calculate payoffs at the option expiration
-    if option_type == "put":
-        payoff_cycles_df = random_return_paths_cycles_df.applymap(
-            kelly.put_option_payout, strike=strike, premium=0
-        )
-    elif "call" in option_type:
-        payoff_cycles_df = random_return_paths_cycles_df.applymap(
-            kelly.call_option_payout, strike=strike, premium=0
-        )
-    else:
-        raise ValueError(
-            f'Wrong option_type: {option_type}. Should be "put" or "call".'
-        )
+    payoff_cycles = kelly.option_payout_array(
+        np.asarray(random_return_paths_cycles_df, dtype="float64"),
+        strike,
+        0,
+        option_type=option_type,
+    )
+
+    payoff_days = _cycles_to_days(payoff_cycles, duration, len(utils))
+    payoff_days += np.asarray(premiums, dtype="float64")[:, np.newaxis]
+    payoff_days *= np.asarray(utils, dtype="float64")[:, np.newaxis]
+    payoff_days += 1
+
+    bankroll = np.cumprod(payoff_days, axis=0)
 
-    # add zeros to the payoffs to account for the days before the expiration
-    payoff_cycles_df.index = range(
-        duration - 1, duration * len(payoff_cycles_df) + duration - 1, duration
+    return pd.DataFrame(
+        bankroll.astype("float16"), columns=_path_columns(random_return_paths_cycles_df)
     )
-    payoff_days_df = payoff_cycles_df.reindex(index=range(len(utils)))
-    payoff_days_df.fillna(0, inplace=True)
 
-    payoff_days_df = (payoff_days_df.add(premiums, axis=0)).multiply(utils, axis=0) + 1
 
-    bankroll_df = payoff_days_df.cumprod(axis=0)
+def _path_columns(paths):
+    """Keep the path labels of the DataFrame inputs"""
+    if isinstance(paths, pd.DataFrame):
+        return paths.columns
+    return None
 
-    bankroll_df = bankroll_df.astype('float16')
 
-    return bankroll_df
+def _cycles_to_days(payoff_cycles, duration, n_days):
+    """Switch from options expiration cycles to days
+    add zeros to the payoffs to account for the days before the expiration
+    Args:
+        payoff_cycles (np.array):
+            2d arr, rows are cycles, columns are paths
+        duration (int):
+            Duration of the option
+        n_days (int):
+            Number of days in the output
+
+    Returns:
+        payoff_days (np.array):
+            2d arr, rows are days, columns are paths
+    """
+    payoff_days = np.zeros((n_days, payoff_cycles.shape[1]))
+    expiration_days = np.arange(duration - 1, n_days, duration)[: len(payoff_cycles)]
+    payoff_days[expiration_days] = payoff_cycles[: len(expiration_days)]
+
+    return payoff_days
 
 
 def run_black_scholes_backtest(
@@ -92,86 +112,44 @@ def run_black_scholes_backtest(
         banroll_df (pd.DataFrame):
             bankroll evolution for each price path (each bankroll is column)
     """
-    # create returns paths
-    random_returns_paths_daily_df = rpg.generate_returns_paths_from_returns(
-        returns_sequence, number_of_paths, len(utils), output_as_df=True
-    )
-    random_returns_paths_daily_df += 1
+    # create returns paths, rows are days, columns are paths
+    random_returns_paths_daily = rpg.generate_returns_paths_from_returns(
+        returns_sequence, number_of_paths, len(utils)
+    ).T + 1
 
     # duration cycles and volatility of returns
-    yearly_volatility_df = pd.DataFrame(columns=random_returns_paths_daily_df.columns)
-    random_returns_paths_cycles_df = pd.DataFrame(
-        columns=random_returns_paths_daily_df.columns
+    n_cycles = max(0, -(-len(utils) // duration) - 1)
+    cycles = random_returns_paths_daily[: n_cycles * duration].reshape(
+        n_cycles, duration, number_of_paths
     )
-
-    # calculate volatility/returns for cycles
-    i = 0
-    while i + duration < len(utils):
-        yearly_volatility_df = yearly_volatility_df.append(
-            random_returns_paths_daily_df[i : i + duration].std() * np.sqrt(365),
-            ignore_index=True,
-        )
-        random_returns_paths_cycles_df = random_returns_paths_cycles_df.append(
-            random_returns_paths_daily_df[i : i + duration].cumprod().tail(1),
-            ignore_index=True,
-        )
-        i += duration
+    yearly_volatility = cycles.std(axis=1, ddof=1) * np.sqrt(365)
+    random_returns_paths_cycles = cycles.prod(axis=1) - 1
 
     # calculate premiums
-    if option_type == "put":
-        cycles_premiums_df = yearly_volatility_df.applymap(
-            bs.calculate_bs_put_premium,
-            spot_price=1,
-            strike_price=strike,
-            years_to_expiry=duration / 365,
-            risk_free_interest_rate=0.01,
-        )
-    elif "call" in option_type:
-        cycles_premiums_df = yearly_volatility_df.applymap(
-            bs.calculate_bs_call_premium,
-            spot_price=1,
-            strike_price=strike,
-            years_to_expiry=duration / 365,
-            risk_free_interest_rate=0.01,
-        )
-    else:
-        raise ValueError(
-            f'Wrong option_type: {option_type}. Should be "put" or "call".'
-        )
-    cycles_premiums_df *= 1 + premium_offset
-
-    random_returns_paths_cycles_df -= 1
-    random_returns_paths_daily_df -= 1
-
-    # calculate payoff
-    if option_type == "put":
-        payoff_cycles_df = random_returns_paths_cycles_df.applymap(
-            kelly.put_option_payout, strike=strike, premium=0
-        )
-    elif 'call' in option_type:
-        payoff_cycles_df = random_returns_paths_cycles_df.applymap(
-            kelly.call_option_payout, strike=strike, premium=0
-        )
-    else:
-        raise ValueError(
-            f'Wrong option_type: {option_type}. Should be "put" or "call".'
-        )
-
-    payoff_cycles_df += cycles_premiums_df
+    cycles_premiums = bs.calculate_bs_premium_array(
+        yearly_volatility,
+        duration / 365,
+        strike,
+        spot_price=1,
+        risk_free_interest_rate=0.01,
+        option_type=option_type,
+    )
+    cycles_premiums *= 1 + premium_offset
 
-    # switch to daily payoffs
-    # add zeros to the payoffs to account for the days before the expiration
-    payoff_cycles_df.index = range(
-        duration - 1, duration * len(payoff_cycles_df) + duration - 1, duration
+    # calculate payoff, the premium is added after the loss is capped at -100%
+    payoff_cycles = kelly.option_payout_array(
+        random_returns_paths_cycles, strike, 0, option_type=option_type
     )
-    payoff_days_df = payoff_cycles_df.reindex(index=range(len(utils)))
-    payoff_days_df.fillna(0, inplace=True)
+    payoff_cycles += cycles_premiums
 
-    payoff_days_df = payoff_days_df.multiply(utils, axis=0) + 1
+    # switch to daily payoffs
+    payoff_days = _cycles_to_days(payoff_cycles, duration, len(utils))
+    payoff_days *= np.asarray(utils, dtype="float64")[:, np.newaxis]
+    payoff_days += 1
 
-    bankroll_df = payoff_days_df.cumprod(axis=0)
+    bankroll_df = pd.DataFrame(np.cumprod(payoff_days, axis=0))
 
-    return bankroll_df, cycles_premiums_df
+    return bankroll_df, pd.DataFrame(cycles_premiums)
 
 
 def backtest_asset_dict(
@@ -185,10 +163,12 @@ def backtest_asset_dict(
     engine="kelly",
     risk_free_rate=0,
     randomize_util=False,
-    util_std=0
+    util_std=0,
+    seed=None,
 ):
     """Real Monstrosity to wrap all the calculations for the asset_dict
     TODO Restucture"""
+    rng = np.random.default_rng(seed)
     # Create Utils list
     ##########################################################################
     utils = rpg.generate_utils_list(
@@ -196,7 +176,8 @@ def backtest_asset_dict(
         initial_util=asset_dict["util"],
         duration=asset_dict["duration"],
         randomize=randomize_util,
-        util_std=util_std
+        util_std=util_std,
+        rng=rng,
     )
     # Fill basic info
     ##########################################################################
@@ -219,7 +200,7 @@ def backtest_asset_dict(
 
     # Returns Paths
     ##########################################################################
-    underlying_n_daily_returns = convolution.daily_returns_to_n_day_returns(
+    underlying_n_daily_returns = convolution.analytic_n_day_returns(
         asset_dict["price_series"].pct_change()[1:],
         number_of_paths=monte_carlo_paths,
         n_days=asset_dict["duration"],
@@ -229,6 +210,7 @@ def backtest_asset_dict(
         number_of_paths,
         simulation_length_days // asset_dict["duration"],
         output_as_df=True,
+        rng=rng,
     )
 
     ##########################################################################
@@ -324,18 +306,17 @@ def backtest_asset_dict(
 ###################################################################################################
 
 
+@shared_cache()
 def create_kde_df(bankroll_df):
     """bankroll_df => kde_df"""
-    kde_df = pd.DataFrame()
-
-    for col in bankroll_df:
-        max_drawdown = calculate_max_drawdown(bankroll_df[col])
-        cagr = calculate_cagr(bankroll_df[col])
-        kde_df = kde_df.append(
-            {"cagr": cagr, "max_drawdown": max_drawdown}, ignore_index=True
-        )
+    bankroll = np.asarray(bankroll_df, dtype="float64")
 
-    return kde_df
+    return pd.DataFrame(
+        {
+            "cagr": calculate_cagr_array(bankroll),
+            "max_drawdown": calculate_max_drawdown_array(bankroll),
+        }
+    )
 
 
 # pnl_list functions
@@ -460,24 +441,64 @@ def calculate_percentiles(
         percentile_values (tuple):
             number of the cagrs
     """
-    bankroll_specific_values = []
-    for bankroll_col in bankroll_df:
-        bankroll_specific_values.append(metric_function(bankroll_df[bankroll_col]))
+    if metric_function in VECTORIZED_METRICS:
+        bankroll_specific_values = VECTORIZED_METRICS[metric_function](
+            np.asarray(bankroll_df, dtype="float64")
+        )
+    else:
+        bankroll_specific_values = [
+            metric_function(bankroll_df[bankroll_col]) for bankroll_col in bankroll_df
+        ]
 
     with np.errstate(invalid="ignore"):
         res = np.percentile(bankroll_specific_values, percentiles)
     return res
 
+
 def convert_bankroll_paths_to_cagr_paths(bankroll_df):
     '''bankroll_df => cagr_paths_df'''
-    cagr_paths = []
-    for path_col in bankroll_df:
-        cagrs = [
-            (b_last / 1) ** (365 / (periods + 1)) - 1
-            for periods, b_last in enumerate(bankroll_df[path_col])
-        ]
-        cagr_paths.append(cagrs)
+    bankroll = np.asarray(bankroll_df, dtype="float64")
+    periods = np.arange(1, len(bankroll) + 1)[:, np.newaxis]
+
+    return pd.DataFrame(bankroll ** (365 / periods) - 1)
+
+
+# bankroll array functions, rows are days, columns are paths
+###################################################################################################
+def calculate_max_drawdown_array(bankroll):
+    """Vectorized calculate_max_drawdown for every column of the 2d arr"""
+    highest_val_seen = np.maximum.accumulate(np.maximum(bankroll, 0), axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drawdown = (bankroll - highest_val_seen) / highest_val_seen
+
+    return -np.minimum(np.nanmin(drawdown, axis=0), 0)
+
+
+def calculate_max_initial_capital_loss_array(bankroll):
+    """Vectorized calculate_max_initial_capital_loss for every column of the 2d arr"""
+    return -(bankroll.min(axis=0) / bankroll[0] - 1)
+
+
+def calculate_cagr_array(bankroll):
+    """Vectorized calculate_cagr for every column of the 2d arr"""
+    return (bankroll[-1] / bankroll[0]) ** (365 / len(bankroll)) - 1
+
+
+def calculate_sharpe_array(bankroll, benchmark_daily_return=0):
+    """Vectorized calculate_sharpe for every column of the 2d arr"""
+    # same precision as the pd.Series version
+    bankroll = bankroll.astype("float32")
+    daily_returns = bankroll[1:] / bankroll[:-1] - 1
+    std = daily_returns.std(axis=0, ddof=1)
+    mean = (daily_returns - benchmark_daily_return).mean(axis=0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(std != 0, mean / std, np.inf)
 
-    cagr_paths_df = pd.DataFrame(cagr_paths).T
 
-    return cagr_paths_df
+VECTORIZED_METRICS = {
+    calculate_max_drawdown: calculate_max_drawdown_array,
+    calculate_max_initial_capital_loss: calculate_max_initial_capital_loss_array,
+    calculate_cagr: calculate_cagr_array,
+    calculate_sharpe: calculate_sharpe_array,
+}
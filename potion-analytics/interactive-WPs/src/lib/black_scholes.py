@@ -3,6 +3,7 @@
 https://en.wikipedia.org/wiki/Black%E2%80%93Scholes_model"""
 
 import math
+import numpy as np
 import scipy.stats
 
 
@@ -156,3 +157,55 @@ def calculate_bs_put_premium(
             risk_free_interest_rate
         )
     )
+
+
+def calculate_bs_premium_array(
+    yearly_returns_std,
+    years_to_expiry,
+    strike_price,
+    spot_price=1,
+    risk_free_interest_rate=0.01,
+    option_type="put",
+):
+    """Vectorized calculate_bs_put_premium/calculate_bs_call_premium
+    Args:
+        yearly_returns_std (np.array):
+            The volatility of the underlying asset, Annualized. Any shape
+        years_to_expiry (int):
+            The time in years from now until the option expiration
+        strike_price (float):
+            The strike price of the option
+        spot_price (float):
+            The current price of the underlying asset
+        risk_free_interest_rate (float):
+            The interest rate (annualized) in the currency which the option was struck
+        option_type (str):
+            "put" or "call"
+
+    Returns:
+        payout (np.array):
+            Expressed as pct from current price, same shape as yearly_returns_std
+    """
+    # questionable way to fix the cases when std of returns sometimes is zero
+    yearly_returns_std = np.asarray(yearly_returns_std, dtype="float64")
+    yearly_returns_std = np.where(yearly_returns_std > 0, yearly_returns_std, 1e-10)
+
+    sigma_sqrt_t = yearly_returns_std * math.sqrt(years_to_expiry)
+    d_1 = (
+        math.log(spot_price / strike_price)
+        + (risk_free_interest_rate + yearly_returns_std ** 2 / 2.0) * years_to_expiry
+    ) / sigma_sqrt_t
+    d_2 = d_1 - sigma_sqrt_t
+    discounted_strike = strike_price * math.exp(-risk_free_interest_rate * years_to_expiry)
+
+    call_premium = spot_price * scipy.stats.norm.cdf(
+        d_1
+    ) - discounted_strike * scipy.stats.norm.cdf(d_2)
+
+    if option_type == "put":
+        return discounted_strike - spot_price + call_premium
+    if "call" in option_type:
+        return call_premium
+    raise ValueError(
+        f'Wrong option_type: {option_type}. Should be "put" or "call".'
+    )
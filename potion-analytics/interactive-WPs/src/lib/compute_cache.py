@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""Process level compute cache shared between sessions and apps
+
+Keys are cheap content fingerprints of the arguments (raw bytes of arrays/DataFrames,
+repr of scalars), values live in a memory bounded LRU with an optional on-disk tier.
+The on-disk tier is enabled with the KELLY_WP_CACHE_DIR environment variable.
+Stochastic functions are cached with the seed in their arguments, or with a ttl."""
+import copy
+import functools
+import hashlib
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict
+import numpy as np
+import pandas as pd
+
+CACHE_MAX_BYTES = int(os.environ.get("KELLY_WP_CACHE_MAX_BYTES", 512 * 1024 ** 2))
+CACHE_DISK_DIR = os.environ.get("KELLY_WP_CACHE_DIR")
+# lifetime of the results of stochastic functions called without a seed, as the st.cache ttl
+STOCHASTIC_TTL = int(os.environ.get("KELLY_WP_CACHE_STOCHASTIC_TTL", 3600))
+
+
+###################################################################################################
+# Fingerprints
+###################################################################################################
+def _update_fingerprint(digest, value):
+    """Feed value into the digest, recursing into containers"""
+    if isinstance(value, np.ndarray) and value.dtype == object:
+        # tobytes of object arrays gives pointers, use the elements instead
+        _update_fingerprint(digest, value.tolist())
+    elif isinstance(value, np.ndarray):
+        digest.update(f"nd{value.dtype}{value.shape}".encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, pd.DataFrame):
+        digest.update(b"df")
+        _update_fingerprint(digest, value.columns.values)
+        _update_fingerprint(digest, value.index.values)
+        for _, column in value.items():
+            _update_fingerprint(digest, column.values)
+    elif isinstance(value, (pd.Series, pd.Index)):
+        digest.update(b"sr")
+        if isinstance(value, pd.Series):
+            _update_fingerprint(digest, value.index.values)
+        _update_fingerprint(digest, value.values)
+    elif isinstance(value, dict):
+        digest.update(b"dict")
+        for key in sorted(value, key=repr):
+            _update_fingerprint(digest, key)
+            _update_fingerprint(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__}{len(value)}".encode())
+        for item in value:
+            _update_fingerprint(digest, item)
+    elif isinstance(value, np.generic):
+        digest.update(repr(value.item()).encode())
+    elif callable(value):
+        digest.update(
+            f"{getattr(value, '__module__', '')}.{getattr(value, '__qualname__', '')}".encode()
+        )
+    else:
+        digest.update(f"{type(value).__name__}:{value!r}".encode())
+
+
+def fingerprint(*args, **kwargs):
+    """Content fingerprint of the arguments"""
+    digest = hashlib.blake2b(digest_size=16)
+    _update_fingerprint(digest, args)
+    _update_fingerprint(digest, kwargs)
+    return digest.hexdigest()
+
+
+def estimate_size(value):
+    """Approximate memory footprint of the cached value in bytes"""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        memory_usage = value.memory_usage(index=True)
+        return int(np.sum(memory_usage))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+###################################################################################################
+# Cache
+###################################################################################################
+class ComputeCache:
+    """Thread safe LRU cache bounded by the estimated size of the values
+    Args:
+        max_bytes (int):
+            Memory budget, the least recently used entries are evicted above it
+        disk_dir (str):
+            Optional directory for the pickled second tier
+    """
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, disk_dir=CACHE_DISK_DIR):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._expiry = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: defaultdict(float))
+
+        if self.disk_dir is not None:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.pkl")
+
+    def get(self, key, ttl=None):
+        """Lookup in memory, then on disk
+        Args:
+            ttl (float):
+                Optional age in seconds after which the entry is stale and not returned
+        Returns:
+            found (bool), value
+        """
+        with self._lock:
+            if key in self._entries and self._expiry.get(key, np.inf) < time.time():
+                self._remove(key)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return True, self._entries[key]
+
+        if self.disk_dir is not None and os.path.exists(self._disk_path(key)):
+            try:
+                if ttl is not None and os.path.getmtime(self._disk_path(key)) + ttl < time.time():
+                    return False, None
+                with open(self._disk_path(key), "rb") as cache_file:
+                    value = pickle.load(cache_file)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                return False, None
+            self._put_in_memory(key, value, ttl=ttl)
+            return True, value
+
+        return False, None
+
+    def put(self, key, value, to_disk=True, ttl=None):
+        """Store the value in memory and optionally on disk"""
+        self._put_in_memory(key, value, ttl=ttl)
+
+        if to_disk and self.disk_dir is not None:
+            tmp_path = f"{self._disk_path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, "wb") as cache_file:
+                    pickle.dump(value, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, self._disk_path(key))
+            except (OSError, pickle.PicklingError, TypeError, AttributeError):
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    def _remove(self, key):
+        """Drop the entry from the memory tier, the lock must be held"""
+        del self._entries[key]
+        self._total_bytes -= self._sizes.pop(key)
+        self._expiry.pop(key, None)
+
+    def _put_in_memory(self, key, value, ttl=None):
+        size = estimate_size(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = value
+            self._sizes[key] = size
+            self._total_bytes += size
+            if ttl is not None:
+                self._expiry[key] = time.time() + ttl
+
+            # keep at least the newest entry even if it is over the budget
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                self._remove(next(iter(self._entries)))
+                self._stats["_all"]["evictions"] += 1
+
+    def clear(self):
+        """Drop the memory tier and the stats"""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._expiry.clear()
+            self._total_bytes = 0
+            self._stats.clear()
+
+    def record(self, name, event, latency):
+        """Update hit/miss counters and latency of the function"""
+        with self._lock:
+            self._stats[name][event] += 1
+            self._stats[name][f"{event}_seconds"] += latency
+
+    def stats(self):
+        """Cache metrics
+        Returns:
+            stats_df (pd.DataFrame):
+                One row per cached function with hits, misses, hit_rate and mean latencies
+        """
+        with self._lock:
+            rows = {
+                name: dict(values) for name, values in self._stats.items() if name != "_all"
+            }
+            evictions = self._stats["_all"]["evictions"] if "_all" in self._stats else 0
+            n_entries, total_bytes = len(self._entries), self._total_bytes
+
+        stats_df = pd.DataFrame.from_dict(rows, orient="index")
+        for column in ["hit", "miss", "hit_seconds", "miss_seconds"]:
+            if column not in stats_df:
+                stats_df[column] = 0.0
+        stats_df = stats_df.fillna(0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            stats_df["hit_rate"] = stats_df["hit"] / (stats_df["hit"] + stats_df["miss"])
+            stats_df["mean_hit_ms"] = 1000 * stats_df["hit_seconds"] / stats_df["hit"]
+            stats_df["mean_miss_ms"] = 1000 * stats_df["miss_seconds"] / stats_df["miss"]
+        stats_df.attrs.update(
+            {"entries": n_entries, "bytes": total_bytes, "evictions": evictions}
+        )
+
+        return stats_df
+
+    def cached(self, key_func=None, copy_output=False, to_disk=True, ttl=None):
+        """Decorator to share the results of the function
+        Args:
+            key_func (func):
+                Optional function with the same signature returning cheap key parts
+                (e.g. asset, date window, parameters, seed) instead of the full arguments
+            copy_output (bool):
+                Return a deep copy, for callers mutating the results
+            to_disk (bool):
+                Also store the results in the on-disk tier if enabled
+            ttl (float):
+                Optional lifetime of the results in seconds, for stochastic functions
+                called without a seed
+        """
+
+        def decorator(func):
+            module = func.__module__
+            if module == "__main__":
+                # every streamlit app runs as __main__
+                module = os.path.basename(func.__code__.co_filename)
+            name = f"{module}.{func.__qualname__}"
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                if key_func is None:
+                    key = fingerprint(name, args, kwargs)
+                else:
+                    key = fingerprint(name, key_func(*args, **kwargs))
+
+                found, value = self.get(key, ttl=ttl)
+                if found:
+                    self.record(name, "hit", time.perf_counter() - start)
+                    return copy.deepcopy(value) if copy_output else value
+
+                value = func(*args, **kwargs)
+                self.put(key, value, to_disk=to_disk, ttl=ttl)
+                self.record(name, "miss", time.perf_counter() - start)
+
+                return copy.deepcopy(value) if copy_output else value
+
+            wrapper.cache = self
+            return wrapper
+
+        return decorator
+
+
+SHARED_CACHE = ComputeCache()
+
+
+def shared_cache(key_func=None, copy_output=False, to_disk=True, ttl=None):
+    """Decorator to use the process level SHARED_CACHE"""
+    return SHARED_CACHE.cached(
+        key_func=key_func, copy_output=copy_output, to_disk=to_disk, ttl=ttl
+    )
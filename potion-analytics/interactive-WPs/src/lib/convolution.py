@@ -1,9 +1,11 @@
 #!/usr/bin/env python3
 """Module with all convolution methods"""
 
+import numpy as np
 import pandas as pd
 import lib.distributions as dst
 import lib.random_path_generation as rpg
+from lib.compute_cache import shared_cache
 
 def monte_carlo_convolution(
     returns_sequence, n_bins=100, number_of_paths=10, n_convolutions=5
@@ -80,3 +82,141 @@ def daily_returns_to_n_day_returns(returns_sequence, number_of_paths=10, n_days=
         sum_returns = (random_return_paths + 1).prod().values - 1
 
     return sum_returns
+
+
+###################################################################################################
+# Histogram Convolution
+###################################################################################################
+LOG_RETURN_BINS = 512
+
+
+def _returns_and_weights(returns_sequence):
+    """Split the input into return values and their weights
+    returns_histogram_df is weighted by freq, any other sequence is equally weighted"""
+    if isinstance(returns_sequence, pd.DataFrame):
+        returns_array = returns_sequence["return"].values.astype("float64")
+        weights = returns_sequence["freq"].values.astype("float64")
+    else:
+        returns_array = np.asarray(returns_sequence, dtype="float64")
+        weights = np.ones_like(returns_array)
+
+    valid = np.isfinite(returns_array) & np.isfinite(weights)
+    return returns_array[valid], weights[valid]
+
+
+@shared_cache()
+def get_n_day_log_returns_histogram(returns_sequence, n_days=5, n_bins=LOG_RETURN_BINS):
+    """Exact n-fold convolution of the empirical log returns histogram
+    Sum of n iid log returns has the n-th convolution power of the daily pmf,
+    calculated with a single FFT over the zero padded histogram.
+    Results are shared through the compute cache per (returns content, n_days, n_bins).
+    Args:
+        returns_sequence (list):
+            Could be any convertable to np.array type.
+            Could pass the returns_histogram_df as well
+        n_days (int):
+            Number of returns to aggregate
+        n_bins (int):
+            Number of bins of the daily log returns histogram
+
+    Returns:
+        log_returns (np.array), probabilities (np.array):
+            n-day log returns grid (bin centers) and probability of each bin
+    """
+    returns_array, weights = _returns_and_weights(returns_sequence)
+
+    # it's not possible to loose more than 100%
+    log_returns_array = np.log1p(np.clip(returns_array, -1 + 1e-12, None))
+    low, high = log_returns_array.min(), log_returns_array.max()
+    if high <= low:
+        high = low + 1e-12
+
+    daily_pmf, edges = np.histogram(
+        log_returns_array, bins=n_bins, range=(low, high), weights=weights
+    )
+    daily_pmf = daily_pmf / daily_pmf.sum()
+    bin_size = edges[1] - edges[0]
+
+    # sum of n_days bins spans n_days * (n_bins - 1) + 1 bins, no circular wrap around
+    n_points = int(n_days) * (n_bins - 1) + 1
+    fft_size = 1 << int(np.ceil(np.log2(n_points)))
+    n_day_pmf = np.fft.irfft(np.fft.rfft(daily_pmf, fft_size) ** int(n_days), fft_size)
+    n_day_pmf = np.clip(n_day_pmf[:n_points], 0, None)
+    n_day_pmf /= n_day_pmf.sum()
+
+    first_center = int(n_days) * (low + bin_size / 2)
+    n_day_log_returns = first_center + bin_size * np.arange(n_points)
+
+    return n_day_log_returns, n_day_pmf
+
+
+def analytic_n_day_returns(
+    returns_sequence, number_of_paths=10, n_days=5, n_bins=LOG_RETURN_BINS
+):
+    """Deterministic drop-in for daily_returns_to_n_day_returns
+    Convolve log returns histogram => map back to simple returns =>
+    take number_of_paths equally spaced quantiles of the n-day distribution
+    Args:
+        returns_sequence (list):
+            Could be any convertable to np.array type.
+            Could pass the returns_histogram_df as well
+        number_of_paths (int):
+            Number of equally weighted n-day returns to output
+        n_days (int):
+            Number of returns in each path
+        n_bins (int):
+            Number of bins of the daily log returns histogram
+
+    Returns:
+        n_day_returns (np.array):
+            Sorted n-day simple returns, each one has 1 / number_of_paths probability
+    """
+    if n_days == 1 and not isinstance(returns_sequence, pd.DataFrame):
+        return returns_sequence
+
+    n_day_log_returns, n_day_pmf = get_n_day_log_returns_histogram(
+        returns_sequence, n_days=n_days, n_bins=n_bins
+    )
+
+    # piecewise linear CDF over the bin edges
+    bin_size = n_day_log_returns[1] - n_day_log_returns[0]
+    edges = np.append(n_day_log_returns - bin_size / 2, n_day_log_returns[-1] + bin_size / 2)
+    cdf = np.append(0, np.cumsum(n_day_pmf))
+    cdf /= cdf[-1]
+
+    quantiles = (np.arange(number_of_paths) + 0.5) / number_of_paths
+    return np.expm1(np.interp(quantiles, cdf, edges))
+
+
+def analytic_convolution(
+    returns_sequence, n_bins=100, number_of_paths=10, n_convolutions=5
+):
+    """Deterministic drop-in for monte_carlo_convolution
+    Args:
+        returns_sequence (list):
+            Could be any convertable to np.array type.
+            Could pass the returns_histogram_df as well
+        n_bins (int):
+            Number of bins. Could be also string (e.g. 'auto') or list of bin edges
+            Whatever complies with np.histogram
+        number_of_paths (int):
+            Number of quantiles used to build the output histogram
+        n_convolutions (int):
+            Number of returns in each path
+
+    Returns:
+        histogram_df (pd.DataFrame):
+            Returns Histogram after the Convolution
+    """
+    if n_convolutions == 1 and not isinstance(returns_sequence, pd.DataFrame):
+        return dst.get_returns_histogram_from_returns_sequence(
+            returns_sequence, n_bins=n_bins
+        )
+
+    n_day_returns = analytic_n_day_returns(
+        returns_sequence,
+        number_of_paths=number_of_paths,
+        n_days=n_convolutions + 1,
+    )
+
+    return dst.get_returns_histogram_from_returns_sequence(n_day_returns, n_bins=n_bins)
@@ -4,6 +4,7 @@ import datetime as dt
 import os
 import numpy as np
 import pandas as pd
+from lib.compute_cache import shared_cache
 
 HELPERS_DIR = os.path.realpath(__file__)
 LIB_DIR = os.path.dirname(HELPERS_DIR)
@@ -33,6 +34,7 @@ def convert_bankroll_to_cagr(final_bankroll, years, begin_bankroll=1):
     """get cagr"""
     return (final_bankroll / begin_bankroll) ** (1 / years) - 1
 
+@shared_cache(to_disk=False)
 def get_historical_prices_df():
     """read/prepare historical_source csv file"""
     # using pd.DataFrame over here only to calm down linter
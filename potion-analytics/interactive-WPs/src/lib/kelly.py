@@ -4,10 +4,8 @@ https://en.wikipedia.org/wiki/Kelly_criterion"""
 import warnings
 import numpy as np
 import pandas as pd
-from scipy.optimize import curve_fit, fminbound
-
-convert_zero_to_very_small_value = lambda x: 0.1 ** 100 if x == 0 else x
-convert_zero_to_very_small_value = np.vectorize(convert_zero_to_very_small_value)
+from scipy.optimize import curve_fit
+from lib.compute_cache import shared_cache
 
 def put_option_payout(expiration_price, strike, premium):
     """Function to calculate payout for the put option
@@ -65,6 +63,82 @@ def call_option_payout(expiration_price, strike, premium):
     return res
 
 
+def put_option_payout_array(expiration_returns, strike, premium):
+    """Vectorized put_option_payout
+    Args:
+        expiration_returns (np.array):
+            Returns at the put expiration date. Expressed as pct from current price.
+        strike (float):
+            Strike price. Expressed as pct from current price.
+        premium (float or np.array):
+            Option Premium. Broadcastable against expiration_returns
+    Returns:
+        payout (np.array):
+            1 is 100%
+    """
+    loss = np.minimum(expiration_returns - (strike - 1), 0) / strike
+    # it's not possible to loose more than 100%
+    return np.maximum(loss + premium, -1)
+
+
+def call_option_payout_array(expiration_returns, strike, premium):
+    """Vectorized call_option_payout
+    Args:
+        expiration_returns (np.array):
+            Returns at the call expiration date. Expressed as pct from current price.
+        strike (float):
+            Strike price. Expressed as pct from current price.
+        premium (float or np.array):
+            Option Premium. Broadcastable against expiration_returns
+    Returns:
+        payout (np.array):
+            1 is 100%
+    """
+    loss = -np.maximum(expiration_returns - (strike - 1), 0) / strike
+    # it's not possible to loose more than 100%
+    return np.maximum(loss + premium, -1)
+
+
+def option_payout_array(expiration_returns, strike, premium, option_type="put"):
+    """Dispatch to put/call vectorized payout"""
+    if option_type == "put":
+        return put_option_payout_array(expiration_returns, strike, premium)
+    if "call" in option_type:
+        return call_option_payout_array(expiration_returns, strike, premium)
+    raise ValueError(
+        f'Wrong option_type: {option_type}. Should be "put" or "call".'
+    )
+
+
+def get_returns_and_weights(underlying_returns, n_bins=None, weights=None):
+    """Prepare returns sample for the Kelly calculations
+    Args:
+        underlying_returns (np.array or list or pd.Series):
+            sequence of returns
+        n_bins (int):
+            If set, collapse the returns to n_bins histogram bins weighted by count
+        weights (np.array):
+            Optional probability of each return. Equal weights by default
+
+    Returns:
+        returns_array (np.array), weights (np.array):
+            weights are normalized to sum to 1
+    """
+    returns_array = np.asarray(underlying_returns, dtype="float64")
+
+    if weights is None:
+        weights = np.ones_like(returns_array)
+    else:
+        weights = np.asarray(weights, dtype="float64")
+
+    if n_bins is not None and len(returns_array) > n_bins:
+        counts, edges = np.histogram(returns_array, bins=n_bins, weights=weights)
+        centers = (edges[:-1] + edges[1:]) / 2
+        returns_array, weights = centers[counts > 0], counts[counts > 0]
+
+    return returns_array, weights / weights.sum()
+
+
 def get_curve_df(coef_a, coef_b, coef_c, coef_d, n_samples):
     """Function to calculate y(x) = a*x*cosh(b*x**c) + d
     y - premium, x - utilization (util)
@@ -118,7 +192,7 @@ def fit_curve_parameters(utils, raw_premiums):
 
 
 def get_kelly_log_expected_payout(
-    underlying_returns, strike, premium, util, option_type="put"
+    underlying_returns, strike, premium, util, option_type="put", weights=None
 ):
     """Function to calculate expected payout with the help of Kelly Criteria
     Args:
@@ -132,50 +206,37 @@ def get_kelly_log_expected_payout(
             e.g. 0.1 stands for 10% above current
         util (float):
             From 0 to 1. Utilization
+        weights (np.array):
+            Optional probability of each return. Equal weights by default
 
     Returns:
         log_expected_payout (float):
             How much do we get
     """
-    if isinstance(underlying_returns, pd.Series):
-        underlying_returns_array = underlying_returns.values
-    else:
-        underlying_returns_array = underlying_returns
-
-    if option_type == "put":
-        payoff_array = np.array(
-            [
-                put_option_payout(tmp_return, strike, premium)
-                for tmp_return in underlying_returns_array
-            ]
-        )
-    elif "call" in option_type:
-        payoff_array = np.array(
-            [
-                call_option_payout(tmp_return, strike, premium)
-                for tmp_return in underlying_returns_array
-            ]
-        )
-    else:
-        raise ValueError(
-            f'Wrong option_type: {option_type}. Should be "put" or "call".'
-        )
+    returns_array, weights = get_returns_and_weights(underlying_returns, weights=weights)
+    payoff_array = option_payout_array(returns_array, strike, premium, option_type)
 
     # workaround to deal with zeros
     bankroll_array = util * payoff_array + 1
-    bankroll_array = convert_zero_to_very_small_value(bankroll_array)
+    bankroll_array = np.where(bankroll_array == 0, 0.1 ** 100, bankroll_array)
 
     log_bankroll_array = np.log(bankroll_array)
 
-    return np.sum(log_bankroll_array) / len(underlying_returns_array)
+    return np.dot(weights, log_bankroll_array)
 
 
 def get_kelly_derivative(
-    premium, underlying_returns, strike, util, option_type="put", return_abs_value=False
+    premium,
+    underlying_returns,
+    strike,
+    util,
+    option_type="put",
+    return_abs_value=False,
+    weights=None,
 ):
     """Function to calculate derivative  of the expected payout with the help of Kelly Criteria
     Args:
-        premium (float):
+        premium (float or np.array):
             Option Premium. Expressed as pct from current price.
             Set as the first arg to pass to scipy.brentq later on
             e.g. 0.1 stands for 10% above current
@@ -184,50 +245,93 @@ def get_kelly_derivative(
         strike (float):
             Strike price. Expressed as pct from current price.
             e.g. 1.1 stands for 10% above current
-        util (float):
-            From 0 to 1. Utilization
+        util (float or np.array):
+            From 0 to 1. Utilization. Arrays of premiums and utils of the same
+            shape are evaluated elementwise
+        weights (np.array):
+            Optional probability of each return. Equal weights by default
 
     Returns:
-        dk_du (float):
+        dk_du (float or np.array):
             first derivative of the log_expected_payout by util
     """
-    if isinstance(underlying_returns, pd.Series):
-        underlying_returns_array = underlying_returns.values
-    else:
-        underlying_returns_array = underlying_returns
-    if option_type == "put":
-        payoff_array = np.array(
-            [
-                put_option_payout(tmp_return, strike, premium)
-                for tmp_return in underlying_returns_array
-            ]
-        )
-    elif "call" in option_type:
-        payoff_array = np.array(
-            [
-                call_option_payout(tmp_return, strike, premium)
-                for tmp_return in underlying_returns_array
-            ]
-        )
-    else:
-        raise ValueError(
-            f'Wrong option_type: {option_type}. Should be "put" or "call".'
-        )
+    returns_array, weights = get_returns_and_weights(underlying_returns, weights=weights)
+    dk_du = _kelly_derivative(premium, returns_array, weights, strike, util, option_type)
+    if return_abs_value:
+        dk_du = np.abs(dk_du)
+
+    return dk_du
 
-    # workaround to deal with zeros
-    bankroll_array = util * payoff_array + 1
-    # bankroll_array = convert_zero_to_very_small_value(bankroll_array)
+
+def _kelly_derivative(premium, returns_array, weights, strike, util, option_type):
+    """Weighted derivative for the (possibly arrays of) premium and util"""
+    premium = np.asarray(premium, dtype="float64")
+    util = np.asarray(util, dtype="float64")
+    payoff_array = option_payout_array(
+        returns_array, strike, premium[..., np.newaxis], option_type
+    )
+    bankroll_array = util[..., np.newaxis] * payoff_array + 1
 
     # produces warning: invalid value in double_scalars
-    with np.errstate(divide='ignore'):
-        dk_du = np.sum(payoff_array / bankroll_array) / len(payoff_array)
-    if return_abs_value:
-        dk_du = abs(dk_du)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dk_du = (payoff_array / bankroll_array) @ weights
+
+    return dk_du[()] if dk_du.ndim == 0 else dk_du
 
-    return dk_du
 
+def solve_kelly_premiums(
+    underlying_returns,
+    strike,
+    utils,
+    option_type="put",
+    n_bins=None,
+    weights=None,
+    xtol=1e-6,
+):
+    """Kelly optimal premium for all utils at once
+    Derivative of the log expected payout by util grows with premium,
+    so a vectorized bisection on [0, 1] finds the zero for every util simultaneously.
+    Args:
+        underlying_returns (np.array or list or pd.Series):
+            sequence of returns
+        strike (float):
+            Strike price. Expressed as pct from current price.
+        utils (np.array):
+            Utils to solve for
+        n_bins (int):
+            If set, collapse the returns to weighted histogram bins first
+        weights (np.array):
+            Optional probability of each return. Equal weights by default
+        xtol (float):
+            Absolute premium tolerance
+
+    Returns:
+        premiums (np.array):
+            Optimal premium for each util, clipped to the [0, 1] segment
+    """
+    returns_array, weights = get_returns_and_weights(
+        underlying_returns, n_bins=n_bins, weights=weights
+    )
+    utils = np.asarray(utils, dtype="float64")
+    lower = np.zeros_like(utils)
+    upper = np.ones_like(utils)
 
-def get_kelly_curve(underlying_returns, strike, number_of_utils=100, option_type="put"):
+    n_iterations = int(np.ceil(np.log2(1 / xtol)))
+    for _ in range(n_iterations):
+        middle = (lower + upper) / 2
+        dk_du = _kelly_derivative(middle, returns_array, weights, strike, utils, option_type)
+        # nan derivative means ruin => premium has to be higher
+        too_cheap = ~(dk_du > 0)
+        lower = np.where(too_cheap, middle, lower)
+        upper = np.where(too_cheap, upper, middle)
+
+    return (lower + upper) / 2
+
+
+@shared_cache(copy_output=True)
+def get_kelly_curve(
+    underlying_returns, strike, number_of_utils=100, option_type="put", n_bins=None
+):
     """Rename to get_kelly_curve_df
         Function to find kelly optimal curve for all utils
     Args:
@@ -238,6 +342,8 @@ def get_kelly_curve(underlying_returns, strike, number_of_utils=100, option_type
             e.g. 1.1 stands for 10% above current
         number_of_utils (int):
             Number of utils on the [0, 1] segment
+        n_bins (int):
+            If set, collapse large returns samples to weighted histogram bins
 
     Returns:
         kelly_curve_df (pd.DataFrame):
@@ -245,24 +351,12 @@ def get_kelly_curve(underlying_returns, strike, number_of_utils=100, option_type
     """
 
     utils = np.linspace(0, 1, number_of_utils)
-    premiums = []
-    with warnings.catch_warnings():
-        warnings.filterwarnings("ignore",
-            message="invalid value encountered in double_scalars")
-        for util in utils:
-
-            optimal_premium = fminbound(
-                get_kelly_derivative,
-                0.0,
-                1.0,
-                args=(underlying_returns, strike, util, option_type, True),
-            )
-
-            premiums.append(optimal_premium)
+    premiums = solve_kelly_premiums(
+        underlying_returns, strike, utils, option_type=option_type, n_bins=n_bins
+    )
     kelly_curve_df = pd.DataFrame()
     kelly_curve_df["util"] = utils
     kelly_curve_df["premium"] = premiums
-    kelly_curve_df.set_index("util").head()
 
     return kelly_curve_df
 
@@ -1,5 +1,10 @@
 #!/usr/bin/env python3
-"""Module with all random path generation methods"""
+"""Module with all random path generation methods
+
+Every function draws from the numpy Generator passed as rng, or from a fresh
+Generator seeded with rng if it is an int or None, never from the global numpy
+random state. Passing the same seed reproduces the paths.
+"""
 
 import numpy as np
 import pandas as pd
@@ -7,7 +12,8 @@ import lib.helpers as hlp
 
 
 def generate_utils_list(
-    list_length, initial_util=0.5, duration=1, randomize=True, util_std=0.1
+    list_length, initial_util=0.5, duration=1, randomize=True, util_std=0.1,
+    rng=None
 ):
     """Function to utils list
     Utils Sequence imitate Brownian motion (not really) inside [0, 1] bounds
@@ -21,21 +27,24 @@ def generate_utils_list(
             duration of the option
         randomize (bool):
             If we want
+        rng (numpy.random.Generator or int):
+            Generator to draw from, or seed of a new Generator
 
     Returns:
         utils (np.array):
             1d arr
     """
     if randomize:
+        rng = np.random.default_rng(rng)
         utils = []
 
         # use Uniform distribution if std < 0
         if util_std < 0:
-            utils = np.random.uniform(0, 1, size=(list_length // duration,))
+            utils = rng.uniform(0, 1, size=(list_length // duration,))
         else:
             for i in range(list_length // duration):
                 del i
-                new_util = np.random.normal(loc=initial_util, scale=util_std)
+                new_util = rng.normal(loc=initial_util, scale=util_std)
                 if new_util > 1:
                     new_util = 1
                 elif new_util < 0:
@@ -51,7 +60,7 @@ def generate_utils_list(
 
 
 def generate_returns_paths_from_returns(
-    returns_sequence, number_of_paths, path_length, output_as_df=False
+    returns_sequence, number_of_paths, path_length, output_as_df=False, rng=None
 ):
     """Function to generate price paths based on given price_sequence
 
@@ -64,6 +73,8 @@ def generate_returns_paths_from_returns(
             number of returns in each path
         output_as_df (bool):
             each df the columns is returns path or each returns path is list inside list
+        rng (numpy.random.Generator or int):
+            Generator to draw from, or seed of a new Generator
 
     Returns:
         list_of_paths (list):
@@ -73,7 +84,7 @@ def generate_returns_paths_from_returns(
         returns_list = returns_sequence.values
     else:
         returns_list = returns_sequence
-    returns_paths = np.random.choice(
+    returns_paths = np.random.default_rng(rng).choice(
         returns_list, size=(number_of_paths, path_length), replace=True
     )
 
@@ -91,6 +102,7 @@ def generate_price_paths_from_returns(
     path_length,
     current_price=1.0,
     output_as_df=False,
+    rng=None,
 ):
     """Function to generate price paths based on given price_sequence
 
@@ -105,11 +117,13 @@ def generate_price_paths_from_returns(
             Starting point of the calculations
         output_as_df (bool):
             each df the columns is price path or each price path is list inside list
+        rng (numpy.random.Generator or int):
+            Generator to draw from, or seed of a new Generator
     Returns:
         list_of_paths (list):
             2d array with price paths
     """
-    returns_paths = np.random.choice(
+    returns_paths = np.random.default_rng(rng).choice(
         returns_sequence, size=(number_of_paths, path_length - 1), replace=True
     )
     cum_deltas = np.cumprod(1 + returns_paths, axis=1)
@@ -122,7 +136,7 @@ def generate_price_paths_from_returns(
 
 
 def generate_returns_paths_from_returns_histogram(
-    returns_histogram_df, number_of_paths, path_length, output_as_df=False
+    returns_histogram_df, number_of_paths, path_length, output_as_df=False, rng=None
 ):
     """Function to generate price paths based on given price_sequence
 
@@ -135,11 +149,13 @@ def generate_returns_paths_from_returns_histogram(
             number of returns in each path
         current_price (float):
             Starting point of the calculations
+        rng (numpy.random.Generator or int):
+            Generator to draw from, or seed of a new Generator
     Returns:
         list_of_paths (list):
             2d array with price paths
     """
-    returns_paths = np.random.choice(
+    returns_paths = np.random.default_rng(rng).choice(
         returns_histogram_df["return"],
         size=(number_of_paths, path_length),
         p=returns_histogram_df["freq"] / returns_histogram_df["freq"].sum(),
@@ -52,6 +52,12 @@ SLIDER_MAX_PREMIUM_OFFSET = 100
 SLIDER_DEFAULT_PREMIUM_OFFSET = 0
 
 CONVOLUTION_N_PATHS = 1000
+
+DEFAULT_SEED = 0
+SEED_HELP_TEXT = (
+    "Chooses the seed of the random paths and utilizations. Running again with the same seed "
+    "and settings gives the same results, change the seed to simulate a different set of paths."
+)
 ###################################################################################################
 
 def button_with_link(link, button_name, button_holder, new_tab=False):
@@ -143,6 +149,21 @@ def setup_page_config(page_name):
     set_max_container_width()
 
 
+def add_seed_input_to_sidebar(sidebar):
+    """Random seed shared by all the simulations of the app"""
+    seed = sidebar.number_input(
+        "Random seed",
+        min_value=0,
+        max_value=2 ** 31 - 1,
+        value=DEFAULT_SEED,
+        step=1,
+        help=SEED_HELP_TEXT,
+    )
+    st.session_state["seed"] = int(seed)
+
+    return st.session_state["seed"]
+
+
 def add_style_settings_to_sidebar(sidebar):
     "Allows to change graphs"
     sidebar.title("Style")
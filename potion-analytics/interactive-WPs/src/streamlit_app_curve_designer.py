@@ -18,6 +18,7 @@ import lib.random_path_generation as rpg
 import lib.distributions as dst
 import lib.plotting as plotting
 import lib.steamlit_components as sc
+from lib.compute_cache import STOCHASTIC_TTL, shared_cache
 
 
 # DEFAULT SIDEBAR SETTINGS
@@ -35,13 +36,12 @@ MOODS = ["full", "bear", "bull"]
 mood_color_map = {"full": "#cab414", "bear": "red", "bull": "green"}
 
 
-@st.cache(**sc.CACHE_KWARGS)
 def get_historical_prices_df():
     """Caching wrapper"""
     return hlp.get_historical_prices_df()
 
 
-@st.cache(**sc.CACHE_KWARGS)
+@shared_cache(ttl=STOCHASTIC_TTL)
 def calculate_price_segments(price_sequence, mood_window, monte_carlo_paths, duration):
     "Calculate Bonding Curves for each mood in a loop"
     instrument_info_dicts = []
@@ -91,7 +91,7 @@ def calculate_price_segments(price_sequence, mood_window, monte_carlo_paths, dur
     return instrument_info_dicts
 
 
-@st.cache(**sc.CACHE_KWARGS)
+@shared_cache(ttl=STOCHASTIC_TTL)
 def calculate_bonding_curves(
     price_sequence, mood_window, monte_carlo_paths, duration, strike, option_type="put"
 ):
@@ -313,8 +313,10 @@ def plot_backtest(
     param_b=0,
     param_c=0,
     param_d=0,
+    seed=None,
 ):
     """Backtest and plot instruments"""
+    rng = np.random.default_rng(seed)
     bull_max = []
     bull_min = []
     bear_max = []
@@ -336,6 +338,7 @@ def plot_backtest(
             monte_carlo_paths,
             simulation_length_days // duration,
             output_as_df=True,
+            rng=rng,
         )
         for util in instrument_dict["kelly_curve_df"]["util"]:
 
@@ -349,6 +352,7 @@ def plot_backtest(
                 duration=duration,
                 randomize=randomize_util,
                 util_std=util_std,
+                rng=rng,
             )
 
             bankroll_df = backtest.run_backtest(
@@ -484,6 +488,7 @@ st.sidebar.write(
     "If random util is used, then util at the all"
     " X Axes is initial Util used at the backtest"
 )
+sc.add_seed_input_to_sidebar(st.sidebar)
 plotting.graph_settings = sc.add_style_settings_to_sidebar(st.sidebar)
 instrument_info_dicts_outer = []
 instrument_info_dicts1 = []
@@ -679,6 +684,7 @@ if st.checkbox("Run Montecarlo") and len(instrument_info_dicts_outer) != 0:
                 param_b=curve_param_b,
                 param_c=curve_param_c,
                 param_d=curve_param_d,
+                seed=st.session_state["seed"],
             )
             col2.plotly_chart(fig_envelope_backtest_outer)
             col2.plotly_chart(fig_drawdown_envelope_backtest_outer)
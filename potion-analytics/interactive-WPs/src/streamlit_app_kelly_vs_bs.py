@@ -18,18 +18,12 @@ import lib.convolution as convolution
 import lib.black_scholes as bs
 import lib.backtest as backtest
 import lib.steamlit_components as sc
+from lib.compute_cache import STOCHASTIC_TTL, shared_cache
 import lib.distributions as dst
 import lib.random_path_generation as rpg
 import lib.plotting as plotting
 
-# @st.cache(suppress_st_warning=True)
-backtest_asset_dict = st.cache(
-    backtest.backtest_asset_dict,
-    show_spinner=False,
-    suppress_st_warning=True,
-    ttl=3600,
-    max_entries=725,
-)
+backtest_asset_dict = shared_cache()(backtest.backtest_asset_dict)
 
 
 def transform_x_axis_name(axis_name):
@@ -39,7 +33,6 @@ def transform_x_axis_name(axis_name):
     else:
         return axis_name
 
-@st.cache(**sc.CACHE_KWARGS)
 def get_historical_prices_df():
     """Caching wrapper"""
     return hlp.get_historical_prices_df()
@@ -79,8 +72,10 @@ def create_bsm_drawback_figures(
     randomize_util=False,
     option_type="put",
     util_std=0.1,
+    seed=None,
 ):
     """create graphs which illustrate bsm difference in perfrormance"""
+    rng = np.random.default_rng(seed)
     n_bins = np.linspace(-1, 5, 1000)
     underlying_price_sequence = historical_df[asset].dropna()
     original_daily_returns_sequence = underlying_price_sequence.pct_change()[1:]
@@ -235,6 +230,7 @@ def create_bsm_drawback_figures(
         duration=duration,
         randomize=randomize_util,
         util_std=util_std,
+        rng=rng,
     )
 
     for shift_sign in [-1, 0, 1]:
@@ -244,6 +240,7 @@ def create_bsm_drawback_figures(
             number_of_paths,
             simulation_length_days // duration,
             output_as_df=True,
+            rng=rng,
         )
 
         bankroll_df = backtest.run_backtest(
@@ -293,7 +290,7 @@ def create_bsm_drawback_figures(
     return fig_shifted_histograms, fig_backtest
 
 
-@st.cache(**sc.CACHE_KWARGS)
+@shared_cache()
 def caclulate_single_premium(
     underlying_n_daily_returns,
     util,
@@ -314,7 +311,7 @@ def caclulate_single_premium(
     return kelly_curve_df[kelly_curve_df["util"] == util]["premium"].values[0]
 
 
-@st.cache(**sc.CACHE_KWARGS)
+@shared_cache(ttl=STOCHASTIC_TTL)
 def calculate_premiums_for_strikes(
     underlying_returns_sequence,
     strike_price_linspace,
@@ -388,7 +385,7 @@ def calculate_premiums_for_strikes(
     )
 
 
-@st.cache(**sc.CACHE_KWARGS)
+@shared_cache(ttl=STOCHASTIC_TTL)
 def calculate_premiums_for_durations(
     underlying_returns_sequence,
     yearly_returns_std,
@@ -466,7 +463,7 @@ def calculate_premiums_for_durations(
     )
 
 
-@st.cache(**sc.CACHE_KWARGS)
+@shared_cache(ttl=STOCHASTIC_TTL)
 def calculate_premium_surface(
     returns_sequence,
     underlying_yearly_returns_std,
@@ -605,6 +602,7 @@ def kelly_vs_bs_comparison():
         "If random util is used, then util at the all"
         " X Axes is initial Util used at the backtest"
     )
+    sc.add_seed_input_to_sidebar(st.sidebar)
     plotting.graph_settings = sc.add_style_settings_to_sidebar(st.sidebar)
     # SETTINGS
     ###############################################################################################
@@ -730,6 +728,7 @@ def kelly_vs_bs_comparison():
                 randomize_util=st.session_state["randomize_util"],
                 option_type=bsm_drawbacks_params["option_type"],
                 util_std=st.session_state["util_std"],
+                seed=st.session_state["seed"],
             )
             col2_drawbacks.plotly_chart(fig_shifted_histograms_outer)
             col2_drawbacks.plotly_chart(fig_shifted_backtest)
@@ -1161,6 +1160,7 @@ def kelly_vs_bs_comparison():
                     0,
                     st.session_state["randomize_util"],
                     st.session_state["util_std"],
+                    st.session_state["seed"],
                 ]
                 multiproc_args_bs = [
                     asset_dict.copy(),
@@ -1174,6 +1174,7 @@ def kelly_vs_bs_comparison():
                     0,
                     st.session_state["randomize_util"],
                     st.session_state["util_std"],
+                    st.session_state["seed"],
                 ]
 
                 multiproc_args_kelly_list.append(multiproc_args_kelly)
@@ -16,6 +16,7 @@ import lib.plotting as plotting
 import lib.kelly as kelly
 import lib.random_path_generation as rpg
 import lib.steamlit_components as sc
+from lib.compute_cache import shared_cache
 
 # DEFAULT SIDEBAR SETTINGS
 DEFAULT_CLUSTERIZATION_PREMIUM_RELATIVE_THRESHOLD = 80
@@ -38,12 +39,12 @@ flow2_plot = st.cache(plotting.flow2_plot, **sc.CACHE_KWARGS)
 
 rgb_int = lambda: random.randint(0, 255)
 
-@st.cache(show_spinner=False, suppress_st_warning=True, ttl=3600, max_entries=725)
+@shared_cache()
 def backtest_asset_dict(*args, **kwargs):
     '''Caching wrapper'''
     return backtest.backtest_asset_dict(*args, **kwargs)
 
-@st.cache(**sc.CACHE_KWARGS)
+@shared_cache()
 def create_kde_df(*args, **kwargs):
     '''Caching wrapper'''
     return backtest.create_kde_df(*args, **kwargs)
@@ -53,7 +54,6 @@ def plot_kdes(*args, **kwargs):
     '''Caching wrapper'''
     return plotting.plot_kdes(*args, **kwargs)
 
-@st.cache(**sc.CACHE_KWARGS)
 def get_historical_prices_df():
     '''Caching wrapper'''
     return hlp.get_historical_prices_df()
@@ -106,7 +106,7 @@ def create_introduction():
         )
 
 
-@st.cache(**sc.CACHE_KWARGS)
+@shared_cache()
 def calculate_bonding_curves(
     historical_df, picked_instruments, clusterization_premium_relative_threshold
 ):
@@ -293,15 +293,17 @@ def get_cluster_info(picked_instruments):
     return cluster_info_df.sort_values(by="number of curves", ascending=False)
 
 
-@st.cache(show_spinner=False, suppress_st_warning=True, ttl=3600, max_entries=1000)
+@shared_cache()
 def calculate_bankrolls(
     clustered_instruments,
     simulation_length_days,
     number_of_paths,
     portfolio_util=0.5,
     returns_abs_shift=0,
+    seed=None,
 ):
     """calculate bankrolls_df"""
+    rng = np.random.default_rng(seed)
     clustered_instruments_inner = clustered_instruments.copy()
     # random index sampling
     ###########################################################################################
@@ -326,7 +328,7 @@ def calculate_bankrolls(
     )
     random_returns_indexes_path_dict = {}
     for i in range(number_of_paths):
-        random_returns_indexes_path_dict[i] = np.random.randint(
+        random_returns_indexes_path_dict[i] = rng.integers(
             0, len(returns_df), simulation_length_days
         )
 
@@ -352,6 +354,7 @@ def calculate_bankrolls(
             initial_util=util_dict[index],
             duration=row["duration"],
             randomize=False,
+            rng=rng,
         )
         ##########################################################################
         # Premiums Calculation
@@ -443,7 +446,7 @@ def calculate_bankrolls(
     return bankroll_df, clustered_instruments_inner, fig_bankrolls
 
 
-@st.cache(**sc.CACHE_KWARGS)
+@shared_cache()
 def calculate_bankroll_df_stats(bankroll_df):
     """bankroll_df => tuple of medians"""
     # Check the final bankroll stats and compare with the original cluster
@@ -555,7 +558,7 @@ def create_comparison_df(clustered_instruments, bankroll_df):
 
 @st.cache(**sc.CACHE_KWARGS)
 def plot_cagr_percentiles_envelope(
-    clustered_instruments, simulation_length_days, number_of_paths
+    clustered_instruments, simulation_length_days, number_of_paths, seed=None
 ):
     """cagr envelope"""
     cagrs = []
@@ -569,6 +572,7 @@ def plot_cagr_percentiles_envelope(
             simulation_length_days,
             number_of_paths,
             portfolio_util=tmp_util,
+            seed=seed,
         )
 
         tmp_cagr_percentiles = backtest.calculate_percentiles(
@@ -620,7 +624,7 @@ def plot_cagr_percentiles_envelope(
 
     return envelope_cagr_fig
 
-@st.cache(**sc.CACHE_KWARGS)
+@shared_cache()
 def calculate_robustness_tests(
     clustered_instruments,
     simulation_length_days,
@@ -628,6 +632,7 @@ def calculate_robustness_tests(
     utils_list,
     returns_abs_shifts,
     percentiles=(0, 25, 50, 75, 100),
+    seed=None,
 ):
     """calculate cagrs_percentiles_df and max_drawdown_percentiles_df"""
 
@@ -644,6 +649,7 @@ def calculate_robustness_tests(
                 number_of_paths,
                 portfolio_util=tmp_util,
                 returns_abs_shift=shift,
+                seed=seed,
             )
             tmp_cagr_percentiles = backtest.calculate_percentiles(
                 backtest.calculate_cagr, tmp_bankroll_df, percentiles=percentiles
@@ -676,6 +682,7 @@ def portfolio():
     # Initialize settings/texts
     #############################################################################################
     sc.add_cross_app_links_to_sidebar(st.sidebar)
+    sc.add_seed_input_to_sidebar(st.sidebar)
     plotting.graph_settings = sc.add_style_settings_to_sidebar(st.sidebar)
     historical_df = get_historical_prices_df()
     create_introduction()
@@ -928,6 +935,7 @@ def portfolio():
             st.session_state["simulation_length_days"],
             st.session_state["number_of_paths"],
             portfolio_util=st.session_state["portfolio_util"],
+            seed=st.session_state["seed"],
         )
         (
             median_bankroll,
@@ -1052,6 +1060,7 @@ def portfolio():
                 premium_offset=0,
                 engine="kelly",
                 risk_free_rate=0,
+                seed=st.session_state["seed"],
             )
 
             best_instrument_kde_df = create_kde_df(best_instrument_dict["bankroll_df"])
@@ -1088,6 +1097,7 @@ def portfolio():
                 st.session_state["clustered_instruments"],
                 st.session_state["simulation_length_days"],
                 st.session_state["number_of_paths"],
+                seed=st.session_state["seed"],
             )
             st.plotly_chart(envelope_cagr_fig)
 
@@ -1122,6 +1132,7 @@ def portfolio():
             utils_list,
             returns_abs_shifts,
             percentiles=(0, 25, 50, 75, 100),
+            seed=st.session_state["seed"],
         )
 
         robustness_expander = st.expander(label="Robustness Heatmaps", expanded=True)
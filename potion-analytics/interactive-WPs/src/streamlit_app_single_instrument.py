@@ -22,6 +22,7 @@ import lib.random_path_generation as rpg
 import lib.convolution as convolution
 import lib.plotting as plotting
 import lib.steamlit_components as sc
+from lib.compute_cache import STOCHASTIC_TTL, shared_cache
 
 
 @st.cache(**sc.CACHE_KWARGS, allow_output_mutation=True)
@@ -30,33 +31,30 @@ def plot_all_kelly_curves_with_optimal_bet_annualized(*args, **kwargs):
     return plotting.plot_all_kelly_curves_with_optimal_bet_annualized(*args, **kwargs)
 
 
-@st.cache(**sc.CACHE_KWARGS)
+@shared_cache()
 def create_kde_df(*args, **kwargs):
     """Caching wrapper"""
     return backtest.create_kde_df(*args, **kwargs)
 
 
-@st.cache(**sc.CACHE_KWARGS)
 def get_historical_prices_df():
     """Caching wrapper"""
     return hlp.get_historical_prices_df()
 
 
-@st.cache(**sc.CACHE_KWARGS)
+@shared_cache(ttl=STOCHASTIC_TTL)
 def generate_returns_paths_from_returns(*args, **kwargs):
     """Caching wrapper"""
     return rpg.generate_returns_paths_from_returns(*args, **kwargs)
 
 
-@st.cache(**sc.CACHE_KWARGS)
+@shared_cache(ttl=STOCHASTIC_TTL)
 def daily_returns_to_n_day_returns(*args, **kwargs):
     """Caching wrapper"""
-    return convolution.daily_returns_to_n_day_returns(*args, **kwargs)
-
-
-st.cache(**sc.CACHE_KWARGS)
+    return convolution.analytic_n_day_returns(*args, **kwargs)
 
 
+@shared_cache(ttl=STOCHASTIC_TTL)
 def calculate_kdes(
     historical_df,
     asset,
@@ -192,7 +190,7 @@ def plot_raw_vs_fitted_bonding_curve(
     """Plot two bonding curves, which are supposed to converge"""
     price_sequence = historical_df[asset].dropna()
     returns_sequence = price_sequence.pct_change()[1:]
-    underlying_n_daily_returns = convolution.daily_returns_to_n_day_returns(
+    underlying_n_daily_returns = convolution.analytic_n_day_returns(
         returns_sequence,
         number_of_paths=convolution_n_paths,
         n_days=duration,
@@ -596,7 +594,7 @@ def plot_metric_histogram(
     return fig_sharpe, sharpe_results
 
 
-@st.cache(**sc.CACHE_KWARGS, allow_output_mutation=True)
+@shared_cache(ttl=STOCHASTIC_TTL)
 def calculate_strike_joy_df(
     strikes_joy,
     duration,
@@ -615,7 +613,7 @@ def calculate_strike_joy_df(
     """Calculate cagrs and drawdowns distributions for different strikes"""
     price_sequence_sens = historical_df[asset].dropna()
     returns_sequence_sens = price_sequence_sens.pct_change()[1:]
-    underlying_n_daily_returns = convolution.daily_returns_to_n_day_returns(
+    underlying_n_daily_returns = convolution.analytic_n_day_returns(
         returns_sequence_sens,
         number_of_paths=convolution_n_paths,
         n_days=duration,
@@ -685,7 +683,7 @@ def calculate_strike_joy_df(
     return strike_joy_df
 
 
-@st.cache(**sc.CACHE_KWARGS, allow_output_mutation=True)
+@shared_cache(ttl=STOCHASTIC_TTL)
 def calculate_duration_joy_df(
     durations_joy,
     strike,
@@ -721,7 +719,7 @@ def calculate_duration_joy_df(
             util_std=util_std,
         )
 
-        tmp_underlying_n_daily_returns = convolution.daily_returns_to_n_day_returns(
+        tmp_underlying_n_daily_returns = convolution.analytic_n_day_returns(
             returns_sequence,
             number_of_paths=convolution_n_paths,
             n_days=duration_joy,
@@ -774,7 +772,7 @@ def calculate_duration_joy_df(
     return duration_joy_df
 
 
-@st.cache(**sc.CACHE_KWARGS, allow_output_mutation=True)
+@shared_cache(ttl=STOCHASTIC_TTL)
 def calculate_mean_err_joy_df(
     mean_errs_joy_yr,
     strike,
@@ -804,7 +802,7 @@ def calculate_mean_err_joy_df(
 
     price_sequence = historical_df[asset]
     returns_sequence = price_sequence.pct_change()[1:]
-    underlying_n_daily_returns = convolution.daily_returns_to_n_day_returns(
+    underlying_n_daily_returns = convolution.analytic_n_day_returns(
         returns_sequence,
         number_of_paths=convolution_n_paths,
         n_days=duration,
@@ -821,7 +819,7 @@ def calculate_mean_err_joy_df(
         )
         shifted_returns = returns_sequence + mean_err_joy
 
-        tmp_underlying_n_daily_returns = convolution.daily_returns_to_n_day_returns(
+        tmp_underlying_n_daily_returns = convolution.analytic_n_day_returns(
             shifted_returns,
             number_of_paths=convolution_n_paths,
             n_days=duration,
@@ -945,7 +943,7 @@ def analytical_vs_backtest_match_test(
     # Find historical return histogram for the underlying asset at selected duration
     price_sequence = historical_df[asset].dropna()
     returns_sequence = price_sequence.pct_change()[1:]
-    underlying_n_daily_returns = convolution.daily_returns_to_n_day_returns(
+    underlying_n_daily_returns = convolution.analytic_n_day_returns(
         returns_sequence,
         number_of_paths=convolution_n_paths,
         n_days=duration,
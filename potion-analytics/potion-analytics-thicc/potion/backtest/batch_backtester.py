@@ -6,18 +6,29 @@ Currently, the backtesting code only supports simulating short put options.
 Results are efficiently stored in a binary log file ending in *.hdf5 using the Vaex library.
 Conversion utilities exist within the tool for the user's convenience that will convert these
 output files into CSV.
+
+The evaluation is checkpointed next to the log file, see potion.backtest.checkpoint, so a long
+backtest which is interrupted can be resumed from its last complete chunk of paths.
 """
+import os
 import pandas as pd
 import numpy as np
 import logging
-import time
 import vaex
 
-from multiprocessing import Pool, cpu_count
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import cpu_count
 from enum import Enum
 
-from potion.backtest.path_gen import path_sampling, t_path_sampling
+from potion.backtest.path_gen import (path_sampling, t_path_sampling, chunked_path_sampling,
+                                      Sampler)
 from potion.backtest.expiration_evaluator import ExpirationEvaluator, create_eval_config
+from potion.backtest.checkpoint import (EvaluationCheckpoint, evaluation_chunks,
+                                        DEFAULT_MAX_RETRIES)
+from potion.backtest.path_store import PathStore, path_key
+from potion.instrumentation import timer
+from potion.rng import RandomStreams, resolve_seed, PATH_CHUNK_SIZE, RNG_RECORD_SUFFIX
 
 log = logging.getLogger(__name__)
 
@@ -46,6 +57,9 @@ INIT_BANK_KEY = 'initial_bankroll'
 SIM_TYPE_KEY = 'simulation_type'
 PAYOFF_TYPE_KEY = 'payoff_type'
 PAYOFF_PARAMS = 'payoff_params'
+SEED_KEY = 'seed'
+PATH_STORE_KEY = 'path_store_directory'
+SAMPLER_KEY = 'sampler'
 
 
 def _safe_multi_dict_store(mapping: dict, key, duration, strike_pct, value):
@@ -390,6 +404,26 @@ def _initialize_vaex_logging_df(log_file_name: str, total_rows: int):
         'User_Absolute_Return'
     ]].export(log_file_name + '.hdf5')
 
+    return _open_vaex_logging_df(log_file_name, total_rows)
+
+
+def _open_vaex_logging_df(log_file_name: str, total_rows: int):
+    """
+    Opens a logging df created by _initialize_vaex_logging_df in write mode, either right after
+    it is created or to resume a checkpointed backtest
+
+    Parameters
+    ----------
+    log_file_name : str
+        A string specifying the name of the log file which will be opened for writing
+    total_rows : int
+        The total number of rows in the log file
+
+    Returns
+    -------
+    log_df : vaex.dataframe.DataFrame
+        The logging df which will have backtesting results recorded
+    """
     # Open the HDF5 file for writing our log data
     df = vaex.open(log_file_name + '.hdf5', write=True)
 
@@ -403,9 +437,124 @@ def _initialize_vaex_logging_df(log_file_name: str, total_rows: int):
     return df
 
 
+def _flush_vaex_logging_df(log_df):
+    """
+    Flushes the rows written to a logging df to the disk, before they are recorded as complete
+    in the checkpoint. The rows written by the worker processes share the pages of the same
+    file, so they are flushed as well
+
+    Parameters
+    ----------
+    log_df : vaex.dataframe.DataFrame
+        The logging df opened for writing
+
+    Returns
+    -------
+    None
+    """
+    for mapping in getattr(log_df.dataset, 'mapping_map', {}).values():
+        mapping.flush()
+
+
+def _is_successful(future):
+    """
+    Checks whether an evaluation task finished without an error
+
+    Parameters
+    ----------
+    future : concurrent.futures.Future
+        The future of the task
+
+    Returns
+    -------
+    successful : bool
+        True if the task is done and did not raise
+    """
+    return future.done() and not future.cancelled() and future.exception() is None
+
+
+def _iter_completed_chunks(tasks, num_workers: int, max_retries: int):
+    """
+    Runs the evaluation tasks of the chunks of a backtest in a pool of worker processes, and
+    yields each chunk once all of its tasks succeeded, in order.
+
+    A task which raises is launched again. If a worker process dies, e.g. when it is killed by
+    the OS because it ran out of memory, the pool is broken and every task which did not
+    succeed yet is launched again in a new pool
+
+    Parameters
+    ----------
+    tasks : List[List]
+        The arguments of _eval_work for each task of each chunk
+    num_workers : int
+        The number of worker processes
+    max_retries : int
+        The number of times a failing task is launched again, and the number of times in a row
+        the pool is replaced without any task succeeding, before the error is raised
+
+    Raises
+    ------
+    Exception
+        The error of a task which failed more than max_retries times
+    concurrent.futures.process.BrokenProcessPool
+        If the pool broke more than max_retries times in a row
+
+    Yields
+    ------
+    chunk_index : int
+        The index of the complete chunk
+    """
+    executor = ProcessPoolExecutor(num_workers)
+    futures = {}
+    failures = {}
+    broken_pools = 0
+
+    def submit(key):
+        futures[key] = executor.submit(_eval_work, *tasks[key[0]][key[1]])
+
+    try:
+        for chunk_index, task_args in enumerate(tasks):
+            for task_index in range(len(task_args)):
+                submit((chunk_index, task_index))
+
+        for chunk_index, task_args in enumerate(tasks):
+            for task_index, args in enumerate(task_args):
+                key = (chunk_index, task_index)
+                while True:
+                    try:
+                        futures[key].result()
+                        broken_pools = 0
+                        break
+                    except BrokenProcessPool:
+                        broken_pools += 1
+                        if broken_pools > max_retries:
+                            raise
+                        log.warning('A worker process died, launching the unfinished evaluation '
+                                    'tasks in a new pool')
+                        executor.shutdown(wait=True)
+                        executor = ProcessPoolExecutor(num_workers)
+                        for other_key, future in list(futures.items()):
+                            if not _is_successful(future):
+                                submit(other_key)
+                    except Exception:
+                        failures[key] = failures.get(key, 0) + 1
+                        if failures[key] > max_retries:
+                            raise
+                        log.warning('Evaluation task of path {} failed, retrying'.format(args[4]),
+                                    exc_info=True)
+                        submit(key)
+
+            yield chunk_index
+    finally:
+        # The tasks still running write to the log, so they finish before it is closed
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
 def create_backtester_config(num_paths: int, path_length: int,
                              amount_or_util: float, initial_bankroll: float,
-                             path_gen_method=PathGenMethod.SKEWED_T, simulation_type=True):
+                             path_gen_method=PathGenMethod.SKEWED_T, simulation_type=True,
+                             seed=None, path_store_directory=None,
+                             sampler=Sampler.PSEUDO_RANDOM):
     """
     Helper function to easily create a configuration object for the backtester.
 
@@ -426,6 +575,15 @@ def create_backtester_config(num_paths: int, path_length: int,
     simulation_type : bool
         (Optional. Default: True) The type of simulation to run. Constant util or array of
         amounts of otokens traded, True for util
+    seed : int
+        (Optional. Default: None) The seed of the random number streams the paths are generated
+        from, see potion.rng. If None a fresh seed is drawn, which is recorded with the results
+    path_store_directory : str
+        (Optional. Default: None) The directory of the PathStore used to save and reuse the
+        paths. If None the paths are only kept in memory
+    sampler : Sampler
+        (Optional. Default: PSEUDO_RANDOM) How the draws behind the paths are made, see the
+        Sampler enum. The variance reduced samplers need fewer paths for the same accuracy
 
     Returns
     -----------
@@ -438,7 +596,10 @@ def create_backtester_config(num_paths: int, path_length: int,
         PATH_LEN_KEY: path_length,
         AMOUNT_OR_UTIL_KEY: amount_or_util,
         INIT_BANK_KEY: initial_bankroll,
-        SIM_TYPE_KEY: simulation_type
+        SIM_TYPE_KEY: simulation_type,
+        SEED_KEY: seed,
+        PATH_STORE_KEY: path_store_directory,
+        SAMPLER_KEY: sampler
     }
 
     return config
@@ -488,6 +649,13 @@ class BatchBacktester:
         self.num_paths = config[NUM_PATHS_KEY]
         self.path_length = config[PATH_LEN_KEY]
         self.initial_bankroll = config[INIT_BANK_KEY]
+        self.sampler = config.get(SAMPLER_KEY, Sampler.PSEUDO_RANDOM)
+
+        path_store_directory = config.get(PATH_STORE_KEY)
+        self.path_store = None if path_store_directory is None else PathStore(
+            path_store_directory)
+        self.seed = resolve_seed(config.get(SEED_KEY))
+        self.streams = RandomStreams(self.seed)
 
         if config[SIM_TYPE_KEY] is True:
             self.amounts_or_util = config[AMOUNT_OR_UTIL_KEY]
@@ -612,222 +780,371 @@ class BatchBacktester:
 
         self.path_mapping = {}
 
+    def _sample_paths(self, key):
+        """
+        Generates the sample paths of a training data set in chunks from the stream of the
+        training key, see potion.backtest.path_gen.chunked_path_sampling. The paths of a key are
+        shared by all of its curves, so the curves are compared on common random numbers
+
+        Parameters
+        -----------
+        key : str
+            The training key of the paths
+
+        Returns
+        -----------
+        paths : List[List[float]]
+            The paths, num_paths by path_length
+        """
+        def sample_chunk(n_paths, rng):
+            return self._sample_path_chunk(key, n_paths, rng)
+
+        return chunked_path_sampling(sample_chunk, self.num_paths, self.streams, 'paths', key,
+                                     sampler=self.sampler)
+
+    def _sample_path_chunk(self, key, n_paths, rng):
+        """
+        Generates a chunk of the sample paths of a training data set using the process
+        specified by the PathGenMethod passed in the config object
+
+        Parameters
+        -----------
+        key : str
+            The training key of the paths
+        n_paths : int
+            The number of paths in the chunk
+        rng : numpy.random.Generator
+            The generator of the chunk
+
+        Returns
+        -----------
+        paths : List[List[float]]
+            The paths, n_paths by path_length
+        """
+        prices = pd.DataFrame(self.training_data_mapping[key])
+
+        log.debug('Generating paths for {} {} {}'.format(key, n_paths, self.path_length))
+
+        # Set this because we may be training with a section of history
+        # that's not the full history
+        current_price = self.current_price_map[key]
+
+        # Generate the paths, if unknown type paths are 0
+        if self.path_gen_method == PathGenMethod.SKEWED_T:
+            paths = t_path_sampling(t_fit_params=self.dist_params[key], n_paths=n_paths,
+                                    path_length=self.path_length, current_price=current_price,
+                                    sampler=self.sampler, rng=rng)
+        elif self.path_gen_method == PathGenMethod.HISTOGRAM:
+            paths = path_sampling(prices=prices, n_paths=n_paths,
+                                  path_length=self.path_length,
+                                  current_price=current_price, sampler=self.sampler, rng=rng)
+        else:
+            paths = [0] * n_paths
+
+        return _absorb_paths_hitting_zero(paths)
+
+    def _path_params(self, key):
+        """
+        Gets the parameters the paths of a training data set depend on, used to address them in
+        the PathStore
+
+        Parameters
+        -----------
+        key : str
+            The training key of the paths
+
+        Returns
+        -----------
+        params : dict
+            The distribution parameters, or the training prices for histogram paths, the
+            starting price and the sampler
+        """
+        if self.path_gen_method == PathGenMethod.HISTOGRAM:
+            dist = np.asarray(self.training_data_mapping[key], dtype=float)
+        else:
+            dist = self.dist_params[key]
+        return {'dist': dist, 'current_price': self.current_price_map[key],
+                'sampler': self.sampler}
+
+    @timer('path_generation')
     def generate_backtesting_paths(self):
         """
         Iterates over each training data set and generates the sample paths for backtesting. This
         generation uses the process specified by the PathGenMethod passed in the config object
         to the constructor of this class.
 
+        If the config specifies a path store, paths stored by a previous run with the same
+        parameters and seed are reused, and new paths are stored. The paths are then read-only
+        memory-mapped arrays.
+
         Returns
         -----------
         None
         """
         for key in self.keys:
 
-            prices = pd.DataFrame(self.training_data_mapping[key])
-            # gen = Generator(price_series=prices, fit_params=self.dist_params[key])
+            if self.path_store is not None:
+                store_key = path_key(self.path_gen_method, self._path_params(key),
+                                     self.num_paths, self.path_length, self.seed)
+                description = {'key': key, 'method': self.path_gen_method.name,
+                               'sampler': self.sampler.name, 'seed': self.seed}
+                paths = self.path_store.get_or_generate(
+                    store_key, lambda: self._sample_paths(key), description)
+            else:
+                paths = self._sample_paths(key)
 
-            log.debug('Generating paths for {} {} {}'.format(key, self.num_paths, self.path_length))
+            _safe_store_dict(self.path_mapping, key, paths)
 
-            # Set this because we may be training with a section of history
-            # that's not the full history
-            current_price = self.current_price_map[key]
+    def _checkpoint_description(self, chunk_size):
+        """
+        Describes everything the results of the backtest depend on, so a checkpoint is only
+        resumed by the same backtest
 
-            # Generate the paths, if unknown type paths are 0
-            if self.path_gen_method == PathGenMethod.SKEWED_T:
-                paths = t_path_sampling(t_fit_params=self.dist_params[key], n_paths=self.num_paths,
-                                        path_length=self.path_length, current_price=current_price)
-            elif self.path_gen_method == PathGenMethod.HISTOGRAM:
-                paths = path_sampling(prices=prices, n_paths=self.num_paths,
-                                      path_length=self.path_length,
-                                      current_price=current_price)
+        Parameters
+        -----------
+        chunk_size : int
+            The number of paths in each chunk of the checkpoint
+
+        Returns
+        -----------
+        description : dict
+            The JSON serializable description of the backtest
+        """
+        curves = [[key, int(duration), float(strike_pct),
+                   np.asarray(self.fit_params[key][duration][strike_pct], dtype=float).tolist()]
+                  for key in self.keys for duration in self.exp_days
+                  for strike_pct in self.strike_pcts]
+
+        return {
+            'keys': list(self.keys),
+            'curves': curves,
+            'path_gen_method': self.path_gen_method.name,
+            'sampler': self.sampler.name,
+            'seed': self.seed,
+            'num_paths': self.num_paths,
+            'path_length': self.path_length,
+            'initial_bankroll': float(self.initial_bankroll),
+            'amounts_or_util': np.asarray(self.amounts_or_util, dtype=float).tolist(),
+            'chunk_size': chunk_size
+        }
+
+    def _open_checkpointed_log(self, log_file_name, resume, chunk_size):
+        """
+        Opens the log of the backtest and its checkpoint. If resume is True and the log and a
+        checkpoint of the same backtest exist, the log is opened to write the missing chunks,
+        otherwise a new log is created
+
+        Parameters
+        -----------
+        log_file_name : str
+            The name of the log file, without the .hdf5 extension
+        resume : bool
+            Whether to resume the backtest from its checkpoint
+        chunk_size : int
+            The number of paths in each chunk of the checkpoint
+
+        Returns
+        -----------
+        df : vaex.dataframe.DataFrame
+            The log opened for writing
+        checkpoint : EvaluationCheckpoint
+            The checkpoint of the backtest
+        chunks : List[EvaluationChunk]
+            The chunks of the evaluation tasks of the backtest
+        """
+        total_rows = len(self.keys) * len(self.exp_days) * len(
+            self.strike_pcts) * self.num_paths * self.path_length
+
+        checkpoint = EvaluationCheckpoint(log_file_name, self._checkpoint_description(chunk_size))
+        chunks = evaluation_chunks(self.keys, self.exp_days, self.strike_pcts, self.num_paths,
+                                   chunk_size)
+
+        with timer('logging'):
+            if resume and os.path.isfile(log_file_name + '.hdf5') and checkpoint.resume():
+                df = _open_vaex_logging_df(log_file_name, total_rows)
+                log.debug('Resuming {} with {} of {} chunks complete'.format(
+                    log_file_name, len(checkpoint.completed), len(chunks)))
             else:
-                paths = [0] * self.num_paths
+                df = _initialize_vaex_logging_df(log_file_name, total_rows)
+                checkpoint.start()
+            self.streams.write_record(log_file_name + RNG_RECORD_SUFFIX)
 
-            paths = _absorb_paths_hitting_zero(paths)
+        return df, checkpoint, chunks
 
-            _safe_store_dict(self.path_mapping, key, paths)
+    def _chunk_task_args(self, chunk, df, row_slices):
+        """
+        Builds the arguments of _eval_work for each evaluation task of a chunk
+
+        Parameters
+        -----------
+        chunk : EvaluationChunk
+            The chunk of evaluation tasks
+        df : vaex.dataframe.DataFrame
+            The log opened for writing
+        row_slices : dict
+            The row slices of the log of each evaluation task
 
-    def evaluate_backtest_sequentially(self, log_file_name, progress_bar=None):
+        Returns
+        -----------
+        task_args : List[List]
+            The arguments of each task of the chunk
+        """
+        # Get all of the parameters we need for this combo of key, duration, and strike
+        fit_params = self.fit_params[chunk.key][chunk.duration][chunk.strike_pct]
+        bf = self.bf_dict[chunk.key][chunk.duration][chunk.strike_pct]
+        ocp = self.ocp_dict[chunk.key][chunk.duration][chunk.strike_pct]
+        current_price = self.current_price_map[chunk.key]
+        paths = self.path_mapping[chunk.key]
+
+        return [[chunk.key_index, chunk.duration, chunk.strike_pct, paths[path_index],
+                 path_index, self.amounts_or_util, fit_params, self.initial_bankroll,
+                 current_price, bf, ocp, df, row_slices[task_id]]
+                for path_index, task_id in zip(chunk.paths, chunk.task_ids())]
+
+    @timer('evaluation')
+    def evaluate_backtest_sequentially(self, log_file_name, progress_bar=None, resume=False,
+                                       chunk_size=PATH_CHUNK_SIZE):
         """
         This function iterates over each path/strike/expiration/asset specified and calculates
         the bankroll and cagr along each simulated path in the backtest. Writes the results to
         a dataframe which is a log file for later analysis
 
+        The evaluation is checkpointed in chunks of paths, see potion.backtest.checkpoint, so an
+        interrupted backtest can be resumed with resume=True and the same seed
+
         Parameters
         -----------
         log_file_name : str
-            A string specifying the name of the log file which will be opened for writing
+            A string specifying the name of the log file which will be opened for writing. The
+            seed and the random number streams of the paths are recorded next to it in
+            log_file_name + RNG_RECORD_SUFFIX, see potion.rng
         progress_bar: optional
             The progress bar object used to update a UI on backtest progress. If None, there are
             no updates
+        resume : bool
+            (Optional. Default: False) Whether to skip the chunks completed by a previous run of
+            the same backtest, recorded in log_file_name + CHECKPOINT_SUFFIX
+        chunk_size : int
+            (Optional. Default: 1024) The number of paths in each chunk of the checkpoint
 
         Returns
         -----------
-        dfr : vaex.dataframe.DataFrame
-            The logging df opened read-only which has the backtesting results recorded
         row_slices : dict
             A dict of {int: List[int]} mapping the id number of the evaluation task to a List
             of ints containing the log df row numbers. These row numbers correspond to the
             relevant rows for that task
         """
+        df, checkpoint, chunks = self._open_checkpointed_log(log_file_name, resume, chunk_size)
 
-        # Define the total number of tasks so we can pre-allocate the logging dataframe
-        total_num_tasks = len(self.keys) * len(self.exp_days) * len(
-            self.strike_pcts) * self.num_paths
-        total_rows = total_num_tasks * self.path_length
-
-        df = _initialize_vaex_logging_df(log_file_name, total_rows)
-        log_length = len(df)
-
-        # Calculate the row index slices for each async task
+        # Calculate the row index slices for each task
         row_slices = _calculate_log_df_slices(self.path_length, self.keys, self.exp_days,
-                                              self.strike_pcts,
-                                              self.num_paths, log_length)
-
-        evaluator_id = 0
-        for key_index, key in enumerate(self.keys):
-            logging.debug('Running Backtest for {}'.format(key))
-
-            current_price = self.current_price_map[key]
-
-            # Loop over durations
-            for duration_index, duration in enumerate(self.exp_days):
-
-                # Loop over strikes
-                for strike_index, strike_pct in enumerate(self.strike_pcts):
-
-                    # Loop over all paths
-                    for path_index, path in enumerate(self.path_mapping[key]):
-                        # print('Evaluating Key: {} ({}) Duration: {} ({}) Strike: {} ({}) Path: {}'
-                        #       .format(key, key_index, duration, duration_index, strike_pct,
-                        #               strike_index, path_index))
+                                              self.strike_pcts, self.num_paths, len(df))
+        total_num_tasks = len(row_slices)
 
-                        if progress_bar is not None:
-                            val = evaluator_id / float(total_num_tasks)
-                            progress_bar.progress(val)
+        try:
+            for chunk in chunks:
+                if checkpoint.is_complete(chunk.chunk_id):
+                    continue
 
-                        # Get all of the parameters we need for this combo of key, duration,
-                        # strike, and path
-                        fit_params = self.fit_params[key][duration][strike_pct]
-                        bf = self.bf_dict[key][duration][strike_pct]
-                        ocp = self.ocp_dict[key][duration][strike_pct]
-                        row_slice = row_slices[evaluator_id]
+                logging.debug('Running Backtest for {} {} {} paths {}-{}'.format(
+                    chunk.key, chunk.duration, chunk.strike_pct, chunk.paths.start,
+                    chunk.paths.stop))
 
-                        # Build the argument list of parameters
-                        args = [key_index, duration, strike_pct, path, path_index,
-                                self.amounts_or_util, fit_params,
-                                self.initial_bankroll, current_price, bf, ocp, df, row_slice]
+                task_args = self._chunk_task_args(chunk, df, row_slices)
+                for task_id, args in zip(chunk.task_ids(), task_args):
+                    if progress_bar is not None:
+                        progress_bar.progress(task_id / float(total_num_tasks))
 
-                        # Run the ExpirationEvaluator for the path
-                        _eval_work(*args)
-                        evaluator_id += 1
+                    # Run the ExpirationEvaluator for the path
+                    _eval_work(*args)
 
-        logging.debug('All results ready, simulation complete.')
+                _flush_vaex_logging_df(df)
+                checkpoint.mark_complete(chunk.chunk_id)
 
-        if progress_bar is not None:
-            progress_bar.progress(1.0)
+            logging.debug('All results ready, simulation complete.')
 
-        # Clean up the memory map we were writing to
-        df.close()
-        del df
+            if progress_bar is not None:
+                progress_bar.progress(1.0)
+        finally:
+            # Clean up the memory map we were writing to
+            df.close()
+            del df
 
         return row_slices
 
-    def evaluate_backtest_parallel(self, log_file_name, progress_bar=None):
+    @timer('evaluation')
+    def evaluate_backtest_parallel(self, log_file_name, progress_bar=None, resume=False,
+                                   chunk_size=PATH_CHUNK_SIZE, max_retries=DEFAULT_MAX_RETRIES):
         """
         This function iterates over each path/strike/expiration/asset specified and launches
         parallel processes that calculate the bankroll and cagr along each simulated path in
         the backtest. Writes the results to a dataframe which is a log file for later analysis
 
+        The evaluation is checkpointed in chunks of paths, see potion.backtest.checkpoint, so an
+        interrupted backtest can be resumed with resume=True and the same seed. The tasks which
+        fail in a worker process, or whose worker process dies, are retried, and a chunk is only
+        recorded as complete once all of its tasks succeeded, see _iter_completed_chunks
+
         Parameters
         -----------
         log_file_name : str
-            A string specifying the name of the log file which will be opened for writing
+            A string specifying the name of the log file which will be opened for writing. The
+            seed and the random number streams of the paths are recorded next to it in
+            log_file_name + RNG_RECORD_SUFFIX, see potion.rng
         progress_bar: optional
             The progress bar object used to update a UI on backtest progress. If None, there
             are no updates
+        resume : bool
+            (Optional. Default: False) Whether to skip the chunks completed by a previous run of
+            the same backtest, recorded in log_file_name + CHECKPOINT_SUFFIX
+        chunk_size : int
+            (Optional. Default: 1024) The number of paths in each chunk of the checkpoint
+        max_retries : int
+            (Optional. Default: 2) The number of times a failed task is retried before the
+            backtest is stopped
+
+        Raises
+        ------
+        Exception
+            The error of a task which failed more than max_retries times. The chunks completed
+            before are kept in the checkpoint
 
         Returns
         -----------
-        dfr : vaex.dataframe.DataFrame
-            The logging df opened read-only which has the backtesting results recorded
         row_slices : dict
             A dict of {int: List[int]} mapping the id number of the evaluation task to a List
             of ints containing the log df row numbers. These row numbers correspond to the
             relevant rows for that task
         """
-        # One core less so the user's computer doesn't freeze up running the program
-        p = Pool(cpu_count() - 1)
-
-        # Define the total number of tasks so we can pre-allocate the logging dataframe
-        total_num_tasks = len(self.keys) * len(self.exp_days) * len(
-            self.strike_pcts) * self.num_paths
-        total_rows = total_num_tasks * self.path_length
-
-        df = _initialize_vaex_logging_df(log_file_name, total_rows)
-        log_length = len(df)
+        df, checkpoint, chunks = self._open_checkpointed_log(log_file_name, resume, chunk_size)
 
         # Calculate the row index slices for each async task
         row_slices = _calculate_log_df_slices(self.path_length, self.keys, self.exp_days,
-                                              self.strike_pcts,
-                                              self.num_paths, log_length)
-
-        results = []
-        evaluator_id = 0
-        for key_index, key in enumerate(self.keys):
-
-            current_price = self.current_price_map[key]
+                                              self.strike_pcts, self.num_paths, len(df))
 
-            # Loop over durations
-            for duration_index, duration in enumerate(self.exp_days):
+        # The tasks of the chunks which are not complete yet
+        pending = [chunk for chunk in chunks if not checkpoint.is_complete(chunk.chunk_id)]
+        tasks = [self._chunk_task_args(chunk, df, row_slices) for chunk in pending]
 
-                # Loop over strikes
-                for strike_index, strike_pct in enumerate(self.strike_pcts):
-
-                    # Loop over all paths
-                    for path_index, path in enumerate(self.path_mapping[key]):
-
-                        # Get all of the parameters we need for this combo of key,
-                        # duration, strike, and path
-                        fit_params = self.fit_params[key][duration][strike_pct]
-                        bf = self.bf_dict[key][duration][strike_pct]
-                        ocp = self.ocp_dict[key][duration][strike_pct]
-                        row_slice = row_slices[evaluator_id]
-
-                        # Build the argument list of parameters
-                        args = [key_index, duration, strike_pct, path, path_index,
-                                self.amounts_or_util, fit_params,
-                                self.initial_bankroll, current_price, bf, ocp, df, row_slice]
-
-                        # Launch each async task and store the AsyncResult object used
-                        # to query the status of the parallel processes
-                        result = p.apply_async(_eval_work, args)
-                        results.append(result)
-                        evaluator_id += 1
-
-        logging.debug('Waiting for path evaluations to complete')
-
-        # Check all of the paths have been evaluated
-        async_complete_count = 0
-        while async_complete_count < total_num_tasks:
-
-            time.sleep(0.1)
+        # One core less so the user's computer doesn't freeze up running the program
+        completed_chunks = _iter_completed_chunks(tasks, max(1, cpu_count() - 1), max_retries)
+        try:
+            logging.debug('Waiting for path evaluations to complete')
 
-            # Count the
-            async_complete_count = 0
-            for result in results:
-                if result.get():
-                    async_complete_count = async_complete_count + 1
+            for chunk_index in completed_chunks:
+                _flush_vaex_logging_df(df)
+                checkpoint.mark_complete(pending[chunk_index].chunk_id)
 
-        logging.debug('All results ready, simulation complete.')
+                if progress_bar is not None:
+                    progress_bar.progress((chunk_index + 1) / float(len(pending)))
 
-        # Clean up the memory map we were writing to
-        df.close()
-        del df
+            logging.debug('All results ready, simulation complete.')
+        finally:
+            # Stop the pool before the memory map its tasks write to is closed
+            completed_chunks.close()
 
-        # Close the pool
-        p.close()
-        p.join()
+            # Clean up the memory map we were writing to
+            df.close()
+            del df
 
         return row_slices
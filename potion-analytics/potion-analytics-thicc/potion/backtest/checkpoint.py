@@ -0,0 +1,197 @@
+"""
+This module checkpoints the evaluation of a batch backtest, so a backtest which is interrupted,
+e.g. by a restart of the machine it runs on, can be resumed instead of started over.
+
+The evaluation tasks of a backtest, one per key, duration, strike and path, are grouped into
+chunks of the paths of one key, duration and strike. Once every task of a chunk has written its
+rows of the log, the log is flushed to disk and the chunk is recorded as complete in a manifest
+next to the log:
+
+    <log>.hdf5
+        'The log of the backtest, as written by BatchBacktester'
+    <log>.checkpoint.json
+        'The description of the backtest and the ID numbers of its complete chunks'
+
+The manifest is replaced atomically, so it never lists a chunk whose rows were not written.
+A resumed backtest only evaluates the chunks missing from the manifest, which requires the same
+paths, so the backtest has to be run again with the same seed, see potion.rng. If the
+description of the backtest does not match the manifest, the backtest starts over.
+"""
+import json
+import logging
+import os
+from typing import NamedTuple
+
+from potion.rng import PATH_CHUNK_SIZE
+
+CHECKPOINT_SUFFIX = '.checkpoint.json'
+DEFAULT_MAX_RETRIES = 2
+
+log = logging.getLogger(__name__)
+
+
+class EvaluationChunk(NamedTuple):
+    """
+    The evaluation tasks of a chunk of the paths of one key, duration and strike
+    """
+    chunk_id: int
+    key_index: int
+    key: str
+    duration: int
+    strike_pct: float
+    paths: range
+    """The indices of the paths of the chunk"""
+    first_task_id: int
+    """The ID number of the evaluation task of the first path, see task_ids"""
+
+    def task_ids(self):
+        """
+        Gets the ID numbers of the evaluation tasks of the chunk, the keys of the row slices of
+        the log
+
+        Returns
+        -------
+        task_ids : range
+            The ID number of the task of each path of the chunk
+        """
+        return range(self.first_task_id, self.first_task_id + len(self.paths))
+
+
+def evaluation_chunks(keys, exp_days, strike_pcts, num_paths: int, chunk_size=PATH_CHUNK_SIZE):
+    """
+    Groups the evaluation tasks of a backtest into chunks, in the order the tasks are numbered
+    by potion.backtest.batch_backtester._calculate_log_df_slices
+
+    Parameters
+    ----------
+    keys : List[str]
+        The training keys of the backtest
+    exp_days : List[int]
+        The durations of the backtest in days
+    strike_pcts : List[float]
+        The strike percentages of the backtest
+    num_paths : int
+        The number of paths of each key
+    chunk_size : int
+        (Optional. Default: 1024) The number of paths in each chunk
+
+    Returns
+    -------
+    chunks : List[EvaluationChunk]
+        The chunks of the backtest
+    """
+    chunks = []
+    task_id = 0
+    for key_index, key in enumerate(keys):
+        for duration in exp_days:
+            for strike_pct in strike_pcts:
+                for start in range(0, num_paths, chunk_size):
+                    paths = range(start, min(start + chunk_size, num_paths))
+                    chunks.append(EvaluationChunk(len(chunks), key_index, key, duration,
+                                                  strike_pct, paths, task_id))
+                    task_id += len(paths)
+
+    return chunks
+
+
+class EvaluationCheckpoint:
+    """
+    This class reads and writes the manifest of the complete chunks of a backtest
+    """
+
+    def __init__(self, log_file_name: str, description: dict):
+        """
+        Constructs the checkpoint of a log
+
+        Parameters
+        ----------
+        log_file_name : str
+            The name of the log, without the .hdf5 extension
+        description : dict
+            A JSON serializable description of everything the results of the backtest depend
+            on, e.g. its keys, curves, seed and chunk size
+        """
+        self.filename = log_file_name + CHECKPOINT_SUFFIX
+        self.description = json.loads(json.dumps(description, default=str))
+        self.completed = set()
+
+    def resume(self):
+        """
+        Reads the complete chunks of a previous run of the backtest
+
+        Returns
+        -------
+        resumed : bool
+            True if the manifest exists and describes the same backtest, otherwise the
+            backtest has to start over
+        """
+        if not os.path.isfile(self.filename):
+            return False
+
+        with open(self.filename) as f:
+            manifest = json.load(f)
+
+        if manifest['description'] != self.description:
+            log.warning('The checkpoint {} was written by a different backtest, starting '
+                        'over'.format(self.filename))
+            return False
+
+        self.completed = set(manifest['completed'])
+        return True
+
+    def start(self):
+        """
+        Writes an empty manifest for a backtest which starts over
+
+        Returns
+        -------
+        None
+        """
+        self.completed = set()
+        self._write()
+
+    def is_complete(self, chunk_id: int):
+        """
+        Checks if a chunk is complete
+
+        Parameters
+        ----------
+        chunk_id : int
+            The ID number of the chunk
+
+        Returns
+        -------
+        complete : bool
+            True if the rows of every task of the chunk were written
+        """
+        return chunk_id in self.completed
+
+    def mark_complete(self, chunk_id: int):
+        """
+        Records a chunk as complete. The rows of the chunk must have been flushed to disk
+
+        Parameters
+        ----------
+        chunk_id : int
+            The ID number of the chunk
+
+        Returns
+        -------
+        None
+        """
+        self.completed.add(chunk_id)
+        self._write()
+
+    def _write(self):
+        """
+        Replaces the manifest atomically, so a reader never sees a partial manifest
+
+        Returns
+        -------
+        None
+        """
+        tmp_filename = self.filename + '.tmp'
+        with open(tmp_filename, 'w') as f:
+            json.dump({'description': self.description, 'completed': sorted(self.completed)},
+                      f, indent=2)
+        os.replace(tmp_filename, self.filename)
@@ -0,0 +1,92 @@
+"""
+This module provides the convergence diagnostic of a backtest, the standard errors of the
+statistics the backtesting tools report, e.g. the median and 5th percentile CAGR over the paths.
+
+The standard errors are estimated by bootstrapping the independent units of the paths. With
+antithetic sampling a path and its mirror are one unit, so they are resampled together. The
+bootstrap treats the points of the quasi-random samplers as independent, which ignores how evenly
+they fill the space, so for those samplers the standard errors are an upper bound.
+"""
+import numpy as np
+
+from potion.backtest.path_gen import Sampler
+
+DEFAULT_PERCENTILES = (50, 5)
+DEFAULT_NUM_RESAMPLES = 200
+
+
+def sampler_groups(num_paths: int, sampler=Sampler.PSEUDO_RANDOM):
+    """
+    Gets the independent unit each path belongs to
+
+    Parameters
+    ----------
+    num_paths : int
+        The number of paths
+    sampler : Sampler
+        (Optional. Default: PSEUDO_RANDOM) The sampler which generated the paths
+
+    Returns
+    -------
+    groups : numpy.ndarray
+        The id of the unit of each path. The antithetic pairs share an id, the paths of the other
+        samplers each have their own
+    """
+    if sampler == Sampler.ANTITHETIC:
+        return np.arange(num_paths) % ((num_paths + 1) // 2)
+    return np.arange(num_paths)
+
+
+def percentile_standard_errors(values, percentiles=DEFAULT_PERCENTILES, groups=None,
+                               num_resamples=DEFAULT_NUM_RESAMPLES, random_state=0):
+    """
+    Estimates percentiles of the values of the paths and their standard errors
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        The value of each path, e.g. its final CAGR
+    percentiles : List[float]
+        (Optional. Default: (50, 5)) The percentiles between 0 and 100 to estimate
+    groups : numpy.ndarray
+        (Optional. Default: None) The independent unit of each path, see sampler_groups. If None
+        every path is independent
+    num_resamples : int
+        (Optional. Default: 200) The number of bootstrap resamples
+    random_state : Union[int, numpy.random.RandomState]
+        (Optional. Default: 0) The seed of the bootstrap, independent of the global random state
+
+    Returns
+    -------
+    estimates : dict
+        Maps each percentile to a tuple of its estimate and its standard error. The standard
+        error is NaN if there are fewer than 2 units
+    """
+    values = np.asarray(values, dtype=float)
+    if values.size == 0:
+        return {percentile: (np.nan, np.nan) for percentile in percentiles}
+
+    groups = np.arange(values.size) if groups is None else np.asarray(groups)
+    group_ids, groups = np.unique(groups, return_inverse=True)
+    num_groups = group_ids.size
+
+    # Each resample weights the paths by how many times their unit was drawn, so the weighted
+    # percentiles of all the resamples are read from one sort of the values
+    order = np.argsort(values)
+    sorted_values = values[order]
+    rng = np.random.RandomState(random_state)
+    counts = rng.multinomial(num_groups, np.full(num_groups, 1.0 / num_groups), num_resamples)
+    cum_weights = np.cumsum(counts[:, groups[order]], axis=1)
+
+    estimates = {}
+    for percentile in percentiles:
+        estimate = np.percentile(values, percentile)
+        if num_groups < 2:
+            estimates[percentile] = (estimate, np.nan)
+            continue
+
+        thresholds = percentile / 100.0 * cum_weights[:, -1:]
+        indices = np.minimum(np.sum(cum_weights < thresholds, axis=1), values.size - 1)
+        estimates[percentile] = (estimate, np.std(sorted_values[indices], ddof=1))
+
+    return estimates
@@ -4,8 +4,10 @@ path in the simulation and calculating the profit, loss, and performance statist
 configured payoff. This object can be run in sequence or in parallel
 """
 import numpy as np
+import time
 
 from typing import Union
+from potion.instrumentation import record_time, count as profile_count
 from potion.curve_gen.payoff.builder import PayoffConfigBuilder
 from potion.curve_gen.payoff.helpers import expiration_only
 from potion.curve_gen.payoff.payoff import (configure_payoff, get_position_max_loss)
@@ -570,6 +572,7 @@ class ExpirationEvaluator:
         # Enter into the initial trade
         trade_dict = self._enter_into_new_trade(current_price)
         count = 0
+        logging_time = 0.0
         for path_index, path_price in enumerate(self.path):
 
             # If the index along the path is one with an expiration
@@ -577,8 +580,13 @@ class ExpirationEvaluator:
 
                 results_dict = self._determine_trade_results(path_index, path_price, trade_dict)
 
+                start = time.perf_counter()
                 self._log_expiration_info(log_df, training_key, path_id, path_index, path_price,
                                           trade_dict, results_dict, row_slice[count])
+                logging_time += time.perf_counter() - start
 
                 trade_dict = self._enter_into_new_trade(path_price)
                 count += 1
+
+        record_time('logging', logging_time, calls=count)
+        profile_count('rows_written', count)
@@ -18,9 +18,13 @@ from enum import Enum
 from potion.backtest.path_gen import (prices_to_sample_covariance_matrix,
                                       prices_to_t_covariance_matrix,
                                       multivariate_normal_path_sampling,
-                                      multivariate_t_path_sampling)
+                                      multivariate_t_path_sampling, chunked_path_sampling,
+                                      Sampler)
 from potion.backtest.multi_asset_expiration_evaluator import (
     MultiAssetExpirationEvaluator, create_eval_config)
+from potion.backtest.path_store import PathStore, path_key
+from potion.instrumentation import timer
+from potion.rng import RandomStreams, resolve_seed, RNG_RECORD_SUFFIX
 
 log = logging.getLogger(__name__)
 
@@ -49,10 +53,14 @@ INIT_BANK_KEY = 'initial_bankroll'
 SIM_TYPE_KEY = 'simulation_type'
 PAYOFF_TYPE_KEY = 'payoff_type'
 PAYOFF_PARAMS = 'payoff_params'
+SEED_KEY = 'seed'
+PATH_STORE_KEY = 'path_store_directory'
+SAMPLER_KEY = 'sampler'
 
 
 def create_ma_backtester_config(path_gen_method: PathGenMethod, num_paths: int, path_length: int,
-                                util_map, initial_bankroll: float):
+                                util_map, initial_bankroll: float, seed=None,
+                                path_store_directory=None, sampler=Sampler.PSEUDO_RANDOM):
     """
     Helper function to easily create a configuration object for the backtester
 
@@ -68,6 +76,15 @@ def create_ma_backtester_config(path_gen_method: PathGenMethod, num_paths: int,
         Constant util for each asset
     initial_bankroll : float
         The starting capital at the beginning of the simulation
+    seed : int
+        (Optional. Default: None) The seed of the random number streams the paths are generated
+        from, see potion.rng. If None a fresh seed is drawn, which is recorded with the results
+    path_store_directory : str
+        (Optional. Default: None) The directory of the PathStore used to save and reuse the
+        paths. If None the paths are only kept in memory
+    sampler : Sampler
+        (Optional. Default: PSEUDO_RANDOM) How the draws behind the paths are made, see the
+        Sampler enum. The variance reduced samplers need fewer paths for the same accuracy
 
     Returns
     -------
@@ -79,7 +96,10 @@ def create_ma_backtester_config(path_gen_method: PathGenMethod, num_paths: int,
         NUM_PATHS_KEY: num_paths,
         PATH_LEN_KEY: path_length,
         UTIL_KEY: util_map,
-        INIT_BANK_KEY: initial_bankroll
+        INIT_BANK_KEY: initial_bankroll,
+        SEED_KEY: seed,
+        PATH_STORE_KEY: path_store_directory,
+        SAMPLER_KEY: sampler
     }
 
     return config
@@ -466,6 +486,13 @@ class MultiAssetBacktester:
         self.path_length = config[PATH_LEN_KEY]
         self.initial_bankroll = config[INIT_BANK_KEY]
         self.util_map = config[UTIL_KEY]
+        self.sampler = config.get(SAMPLER_KEY, Sampler.PSEUDO_RANDOM)
+
+        path_store_directory = config.get(PATH_STORE_KEY)
+        self.path_store = None if path_store_directory is None else PathStore(
+            path_store_directory)
+        self.seed = resolve_seed(config.get(SEED_KEY))
+        self.streams = RandomStreams(self.seed)
 
         self.asset_keys = None
         self.fit_params = None
@@ -481,9 +508,139 @@ class MultiAssetBacktester:
         self.asset_params = None
         self.user_alpha = user_alpha
 
+        self.nu = None
+        self.asset_path_mapping = {}
+        self.log_delta_list = []
         self.path_mapping = {}
         self.log_delta_mapping = {}
 
+    def _sample_path_chunk(self, nu, n_paths, rng):
+        """
+        Generates a chunk of the sample paths of every asset using the process specified by the
+        PathGenMethod passed to the constructor of this class
+
+        Parameters
+        ----------
+        nu : float
+            The degrees of freedom of the multivariate Student's T
+        n_paths : int
+            The number of paths in the chunk
+        rng : numpy.random.Generator
+            The generator of the chunk
+
+        Returns
+        -------
+        path_dict : dict
+            A dict containing each path value for each asset
+        log_delta_list : List
+            List containing log returns for each path
+        """
+        if self.path_gen_method == PathGenMethod.MV_NORMAL:
+            return multivariate_normal_path_sampling(n_paths, self.path_length,
+                                                     self.covariance_matrix,
+                                                     self.current_price_map, self.sampler, rng)
+        return multivariate_t_path_sampling(n_paths, self.path_length, self.covariance_matrix,
+                                            nu, self.current_price_map, self.sampler, rng)
+
+    def _sample_paths(self, nu):
+        """
+        Generates the sample paths of every asset in chunks from the stream of the assets, see
+        potion.backtest.path_gen.chunked_path_sampling. Every pool on the same assets draws the
+        same paths from the seed, so the pools are compared on common random numbers
+
+        Parameters
+        ----------
+        nu : float
+            The degrees of freedom of the multivariate Student's T
+
+        Returns
+        -------
+        path_dict : dict
+            A dict containing each path value for each asset
+        log_delta_list : List
+            List containing log returns for each path
+        """
+        # Generate the paths, if unknown type paths are 0
+        if self.path_gen_method in (PathGenMethod.MV_NORMAL, PathGenMethod.MV_STUDENT_T):
+            def sample_chunk(n_paths, rng):
+                return self._sample_path_chunk(nu, n_paths, rng)
+
+            path_dict, log_delta_list = chunked_path_sampling(
+                sample_chunk, self.num_paths, self.streams, 'paths', *self.asset_keys,
+                sampler=self.sampler)
+        else:
+            path_dict = {}
+            log_delta_list = []
+            for asset_key in self.asset_keys:
+
+                path_dict[asset_key] = []
+                log_delta_list.append(0.0)
+
+                for i in range(self.num_paths):
+                    path_dict[asset_key].append([0.0] * self.path_length)
+
+        return path_dict, log_delta_list
+
+    def _path_key(self, nu):
+        """
+        Calculates the PathStore key of the paths, from the covariance matrix, the degrees of
+        freedom, the starting price of each asset and the sampler
+
+        Parameters
+        ----------
+        nu : float
+            The degrees of freedom of the multivariate Student's T
+
+        Returns
+        -------
+        key : str
+            The hex digest identifying the paths
+        """
+        params = {
+            'cov': self.covariance_matrix,
+            'nu': nu,
+            'current_prices': [self.current_price_map[asset] for asset in self.asset_keys],
+            'sampler': self.sampler
+        }
+        return path_key(self.path_gen_method, params, self.num_paths, self.path_length,
+                        self.seed)
+
+    def _load_or_sample_paths(self, nu):
+        """
+        Opens the paths stored by a previous run with the same parameters and seed, or
+        generates and stores them. The paths of the assets are stored in one array, num_assets
+        by num_paths by path_length
+
+        Parameters
+        ----------
+        nu : float
+            The degrees of freedom of the multivariate Student's T
+
+        Returns
+        -------
+        path_dict : dict
+            A dict mapping each asset to its paths, a read-only memory-mapped array
+        log_delta_list : List[numpy.ndarray]
+            The log returns of each path, num_assets by path_length - 1
+        """
+        assets = list(self.asset_keys)
+
+        def generate():
+            path_dict, _ = self._sample_paths(nu)
+            return np.stack([np.asarray(path_dict[asset], dtype=float) for asset in assets])
+
+        description = {'assets': [str(asset) for asset in assets],
+                       'method': self.path_gen_method.name, 'sampler': self.sampler.name,
+                       'seed': self.seed}
+        paths = self.path_store.get_or_generate(self._path_key(nu), generate, description)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            log_deltas = np.diff(np.log(paths), axis=-1)
+
+        path_dict = {asset: paths[i] for i, asset in enumerate(assets)}
+        return path_dict, list(log_deltas.transpose(1, 0, 2))
+
+    @timer('path_generation')
     def generate_backtesting_paths(self):
         """
         Iterates over each ticker and sentiment combination and generates the sample paths
@@ -534,33 +691,36 @@ class MultiAssetBacktester:
                 nu = -1  # Unused for MV_NORMAL. Here to clear uninitialized warning
             else:
                 self.covariance_matrix, self.asset_params, nu = prices_to_t_covariance_matrix(
-                    price_history_dict)
+                    price_history_dict, estimate_nu=True)
         else:
             self.asset_keys = self.covariance_matrix.columns
             nu = self.user_alpha
 
-        # Generate the paths, if unknown type paths are 0
-        if self.path_gen_method == PathGenMethod.MV_NORMAL:
-            path_dict, log_delta_list = multivariate_normal_path_sampling(self.num_paths,
-                                                                          self.path_length,
-                                                                          self.covariance_matrix,
-                                                                          self.current_price_map)
-        elif self.path_gen_method == PathGenMethod.MV_STUDENT_T:
-            path_dict, log_delta_list = multivariate_t_path_sampling(self.num_paths,
-                                                                     self.path_length,
-                                                                     self.covariance_matrix,
-                                                                     nu,
-                                                                     self.current_price_map)
+        self.nu = nu
+        if self.path_store is not None:
+            path_dict, log_delta_list = self._load_or_sample_paths(nu)
         else:
-            path_dict = {}
-            log_delta_list = []
-            for asset_key in self.asset_keys:
+            path_dict, log_delta_list = self._sample_paths(nu)
 
-                path_dict[asset_key] = []
-                log_delta_list.append(0.0)
+        self._assign_paths(path_dict, log_delta_list)
 
-                for i in range(self.num_paths):
-                    path_dict[asset_key].append([0.0] * self.path_length)
+    def _assign_paths(self, path_dict, log_delta_list):
+        """
+        Maps the paths of each asset to the curves on the asset
+
+        Parameters
+        ----------
+        path_dict : dict
+            A dict mapping each asset to its paths
+        log_delta_list : List
+            List containing log returns for each path
+
+        Returns
+        -------
+        None
+        """
+        self.asset_path_mapping = path_dict
+        self.log_delta_list = log_delta_list
 
         for index, row in self.curve_df.iterrows():
             curve_id = row.Curve_ID
@@ -571,6 +731,48 @@ class MultiAssetBacktester:
             self.path_mapping[curve_id] = path_dict[asset]
             self.log_delta_mapping[curve_id] = log_delta_list
 
+    def share_paths(self, source):
+        """
+        Reuses the fitted distribution and the paths of another backtester instead of generating
+        them again. The pools simulated by the two backtesters must be on the same assets, with
+        the same path parameters, and may differ in their curves and utils
+
+        Parameters
+        ----------
+        source : MultiAssetBacktester
+            The backtester which already generated its paths
+
+        Raises
+        ------
+        ValueError
+            If the source has no paths for an asset of this backtester, or if its paths were
+            generated differently
+
+        Returns
+        -------
+        None
+        """
+        if (source.path_gen_method, source.num_paths, source.path_length, source.sampler) != (
+                self.path_gen_method, self.num_paths, self.path_length, self.sampler):
+            raise ValueError('Paths can only be shared by backtesters with the same path '
+                             'generation method, number of paths, path length and sampler')
+
+        missing_assets = set(self.curve_df.Asset) - set(source.asset_path_mapping)
+        if missing_assets:
+            raise ValueError('The source backtester has no paths for {}'.format(
+                sorted(missing_assets)))
+
+        self.current_price_map = source.current_price_map
+        self.covariance_matrix = source.covariance_matrix
+        self.asset_params = source.asset_params
+        self.asset_keys = source.asset_keys
+        self.nu = source.nu
+        self.seed = source.seed
+        self.streams = source.streams
+
+        self._assign_paths(source.asset_path_mapping, source.log_delta_list)
+
+    @timer('evaluation')
     def evaluate_backtest_sequentially(self, log_file_name, backtest_id, num_ma_backtests,
                                        progress_bar=None):
         """
@@ -581,7 +783,9 @@ class MultiAssetBacktester:
         Parameters
         ----------
         log_file_name : str
-            The name of the log file to use in the backtest
+            The name of the log file to use in the backtest. The seed and the random number
+            streams of the paths are recorded next to it in log_file_name + RNG_RECORD_SUFFIX,
+            see potion.rng
         backtest_id : int
             The id number identifying this backtesting
         num_ma_backtests : int
@@ -599,7 +803,9 @@ class MultiAssetBacktester:
         total_rows = self.num_paths * self.path_length
         total_num_tasks = self.num_paths * num_ma_backtests
 
-        df = initialize_logging_df(log_file_name, total_rows, curve_ids)
+        with timer('logging'):
+            df = initialize_logging_df(log_file_name, total_rows, curve_ids)
+            self.streams.write_record(log_file_name + RNG_RECORD_SUFFIX)
         log_length = len(df)
 
         # Calculate the row index slices for each task
@@ -651,6 +857,7 @@ class MultiAssetBacktester:
 
         logging.debug('All results ready, simulation complete.')
 
+    @timer('evaluation')
     def evaluate_backtest_parallel(self, log_file_name):
         """
         This function iterates over each ticker and sentiment and launches parallel processes
@@ -659,7 +866,9 @@ class MultiAssetBacktester:
         Parameters
         ----------
         log_file_name : str
-            The name of the log file to use in the backtest
+            The name of the log file to use in the backtest. The seed and the random number
+            streams of the paths are recorded next to it in log_file_name + RNG_RECORD_SUFFIX,
+            see potion.rng
 
         Returns
         -------
@@ -675,7 +884,9 @@ class MultiAssetBacktester:
         curve_ids = self.curve_df.Curve_ID.values
         # print('Curve IDs: {}'.format(curve_ids))
 
-        df = initialize_logging_df(log_file_name, total_rows, curve_ids)
+        with timer('logging'):
+            df = initialize_logging_df(log_file_name, total_rows, curve_ids)
+            self.streams.write_record(log_file_name + RNG_RECORD_SUFFIX)
         log_length = len(df)
 
         # Calculate the row index slices for each async task
@@ -4,7 +4,9 @@ path in the simulation and calculating the profit, loss, and performance statist
 configured payoff. This object can be run in sequence or in parallel
 """
 import numpy as np
+import time
 
+from potion.instrumentation import record_time, count
 from potion.curve_gen.payoff.builder import PayoffConfigBuilder
 from potion.curve_gen.payoff.payoff import (configure_payoff, get_position_max_loss)
 from potion.curve_gen.curve_conversion import (convert_fully_normalized_value_to_strike_normalized,
@@ -637,6 +639,8 @@ class MultiAssetExpirationEvaluator:
         opt_absolute_return = 1.0
         user_cagr = 0.0
         opt_cagr = 0.0
+        logging_time = 0.0
+        rows_written = 0
         for path_index in range(self.path_length):
 
             # Build map of curve_id to price
@@ -655,6 +659,7 @@ class MultiAssetExpirationEvaluator:
                         curve_id)
                     row_index = row_slice[path_index]
 
+                    start = time.perf_counter()
                     log_expiration_info(
                         log_df, curve_ids, curve_id, path_id, self.fit_params, path_index,
                         path_dict_at_index, self.duration_dict, self.strike_dict,
@@ -663,6 +668,8 @@ class MultiAssetExpirationEvaluator:
                         self.user_util_state, self.opt_util_state,
                         self.user_amt_state, self.opt_amt_state,
                         last_trade_map[curve_id], results_dict, row_index)
+                    logging_time += time.perf_counter() - start
+                    rows_written += 1
 
                     trade_dict = self.enter_into_new_trade(path_dict_at_index, curve_id)
                     last_trade_map[curve_id] = trade_dict
@@ -672,3 +679,6 @@ class MultiAssetExpirationEvaluator:
                 self.user_current_bankroll, path_index)
             opt_cagr, opt_absolute_return = self.calculate_current_cagr(
                 self.opt_current_bankroll, path_index)
+
+        record_time('logging', logging_time, calls=rows_written)
+        count('rows_written', rows_written)
@@ -6,21 +6,135 @@ price histories.
 
 For both single and multi asset paths, there are functions which generate according to different
 probability distributions.
+
+Each of the path samplers also takes a Sampler which chooses how the uniform draws behind the
+paths are made. Besides plain pseudo-random draws, the variance reduced samplers transform
+antithetic, stratified or quasi-random (Sobol, Halton) uniforms through the inverse CDF of the
+return distribution, so the statistics of a backtest converge with fewer paths.
+
+The samplers draw from the generator passed as rng, or from a generator seeded from the global
+numpy random state if it is None. The backtesters pass the generators of their
+potion.rng.RandomStreams, and chunked_path_sampling draws large sets of paths in chunks, each from
+its own stream.
 """
+import warnings
+from enum import Enum
+from functools import lru_cache
+
 import numpy as np
 import pandas as pd
 import scipy.interpolate as interpolate
-from scipy.stats import norm
+from scipy.stats import norm, chi2, qmc
 from scipy.linalg import cholesky
 from potion.curve_gen.training.fit.helpers import calc_simple_returns, calc_log_returns
 from potion.curve_gen.training.fit.tail_fit import fit_samples
 from potion.curve_gen.training.distributions.skewed_students_t import SkewedT
 from potion.curve_gen.domain_transformation import log_to_price_sample_points
 from potion.curve_gen.training.distributions.multivariate_students_t import (
-    mle_multi_var_t, MultiVarStudentT)
+    mle_multi_var_t, fit_multi_var_t, MultiVarStudentT)
+from potion.rng import PATH_CHUNK_SIZE, resolve_generator, random_integer
+
+# Keeps the uniforms away from 0 and 1, where the inverse CDFs of the returns are infinite
+_UNIFORM_EPS = 1e-12
+
+
+class Sampler(Enum):
+    """
+    An Enum specifying how the uniform draws behind the backtesting paths are made
+    """
+    PSEUDO_RANDOM = 0
+    """Independent pseudo-random draws"""
+    ANTITHETIC = 1
+    """The second half of the paths mirror the draws u of the first half as 1 - u"""
+    STRATIFIED = 2
+    """The first return of the paths is stratified so each path draws from its own quantile"""
+    SOBOL = 3
+    """Scrambled Sobol sequence with one dimension per return along the path"""
+    HALTON = 4
+    """Scrambled Halton sequence with one dimension per return along the path"""
+
+
+def uniform_samples(n_paths, dimensions, sampler=Sampler.PSEUDO_RANDOM, rng=None):
+    """
+    Draws the uniforms for a set of paths. The generator also seeds the scrambling of the
+    quasi-random sequences, so the same generator state reproduces them
+
+    Parameters
+    ----------
+    n_paths : int
+        The number of paths
+    dimensions : int
+        The number of uniforms each path needs
+    sampler : Sampler
+        (Optional. Default: PSEUDO_RANDOM) How the uniforms are drawn
+    rng : Union[numpy.random.Generator, numpy.random.RandomState]
+        (Optional. Default: None) The generator to draw from. If None a generator is seeded
+        from the global numpy random state, see potion.rng.resolve_generator
+
+    Raises
+    ------
+    ValueError
+        If the sampler is unknown
+
+    Returns
+    -------
+    uniforms : numpy.ndarray
+        The uniforms n_paths by dimensions, in the open interval (0, 1)
+    """
+    rng = resolve_generator(rng)
+
+    if sampler == Sampler.PSEUDO_RANDOM:
+        uniforms = rng.random((n_paths, dimensions))
+    elif sampler == Sampler.ANTITHETIC:
+        half = rng.random(((n_paths + 1) // 2, dimensions))
+        uniforms = np.concatenate([half, 1.0 - half])[:n_paths]
+    elif sampler == Sampler.STRATIFIED:
+        uniforms = rng.random((n_paths, dimensions))
+        uniforms[:, 0] = (rng.permutation(n_paths) + uniforms[:, 0]) / n_paths
+    elif sampler in (Sampler.SOBOL, Sampler.HALTON):
+        qmc_seed = random_integer(rng, 2 ** 31)
+        if sampler == Sampler.SOBOL:
+            engine = qmc.Sobol(dimensions, scramble=True, seed=qmc_seed)
+        else:
+            engine = qmc.Halton(dimensions, scramble=True, seed=qmc_seed)
+
+        # Sobol points are only balanced for powers of 2, other numbers of paths still converge
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', UserWarning)
+            uniforms = engine.random(n_paths)
+    else:
+        raise ValueError('Unknown sampler {}'.format(sampler))
+
+    return np.clip(uniforms, _UNIFORM_EPS, 1.0 - _UNIFORM_EPS)
+
+
+def _log_deltas_to_paths(log_deltas, current_price):
+    """
+    Converts the log returns of a set of paths to prices
+
+    Parameters
+    ----------
+    log_deltas : numpy.ndarray
+        The log returns, with the steps along the last axis
+    current_price : Union[float, numpy.ndarray]
+        The price at which the paths start, broadcast against the paths
+
+    Returns
+    -------
+    paths : numpy.ndarray
+        The paths, one longer than the log returns along the last axis
+    """
+    zeros = np.zeros(log_deltas.shape[:-1] + (1,))
+    cum_log_deltas = np.concatenate([zeros, np.cumsum(log_deltas, axis=-1)], axis=-1)
+    return log_to_price_sample_points(cum_log_deltas, np.asarray(current_price)[..., None])
 
 
-def prices_to_t_covariance_matrix(price_history_dict, log=True):
+# The number of return histories whose t covariance estimates are kept, so repeated multi-asset
+# runs over the same histories skip the estimation
+_T_COVARIANCE_CACHE_SIZE = 16
+
+
+def prices_to_t_covariance_matrix(price_history_dict, log=True, estimate_nu=False):
     """
     Takes a list of price histories and assets and uses MLE to fit a multi variable student t
     distribution to the returns, and calculates the covariance matrix which will be used to
@@ -32,6 +146,9 @@ def prices_to_t_covariance_matrix(price_history_dict, log=True):
         The dict mapping price history for each asset
     log : bool
         Boolean flag indicating whether to use log returns (default True)
+    estimate_nu : bool
+        Boolean flag indicating whether to estimate nu jointly with the covariance matrix
+        (default False). Otherwise nu is fixed to the median tail exponent of the pooled returns
 
     Returns
     -----------
@@ -61,8 +178,83 @@ def prices_to_t_covariance_matrix(price_history_dict, log=True):
     all_ret_data = pd.concat(return_dfs, axis=1)
     all_ret_data.dropna(inplace=True)
 
+    returns = np.ascontiguousarray(all_ret_data.to_numpy(dtype=float))
+    mu_est, cov_est, tail = _cached_t_parameters(tuple(all_ret_data.columns), returns.shape,
+                                                 returns.tobytes(), estimate_nu)
+
+    asset_params, columns = list(map(list,
+                                     zip(*[[{
+                                         'key': asset,
+                                         'loc': mu_est[i],
+                                         'scale': cov_est[i, i],
+                                     }, asset]
+                                         for i, asset in enumerate(price_history_dict)])))
+
+    return pd.DataFrame(np.array(cov_est), columns=columns, index=columns), asset_params, tail
+
+
+@lru_cache(maxsize=_T_COVARIANCE_CACHE_SIZE)
+def _cached_t_parameters(columns, shape, returns_bytes, estimate_nu):
+    """
+    Estimates the parameters of the multivariate t distribution of the returns, cached on the
+    exact values of the returns so that only identical histories share an estimate
+
+    Parameters
+    -----------
+    columns : Tuple[str]
+        The names of the assets
+    shape : Tuple[int]
+        The shape of the returns, one column per asset
+    returns_bytes : bytes
+        The float64 returns in C order
+    estimate_nu : bool
+        Boolean flag indicating whether to estimate nu jointly with the covariance matrix
+
+    Returns
+    -----------
+    mu_est : numpy.ndarray
+        Estimated means of each asset, read-only since it is shared by the callers
+    cov_est : numpy.ndarray
+        Estimated covariance matrix, read-only since it is shared by the callers
+    tail : float
+        Estimate of the tail parameter nu
+    """
+    returns = np.frombuffer(returns_bytes, dtype=float).reshape(shape).copy()
+    mu_est, cov_est, tail = _estimate_t_parameters(pd.DataFrame(returns, columns=list(columns)),
+                                                   estimate_nu)
+
+    mu_est, cov_est = np.array(mu_est), np.array(cov_est)
+    mu_est.setflags(write=False)
+    cov_est.setflags(write=False)
+    return mu_est, cov_est, tail
+
+
+def _estimate_t_parameters(all_ret_data, estimate_nu):
+    """
+    Estimates the parameters of the multivariate t distribution of the returns
+
+    Parameters
+    -----------
+    all_ret_data : DataFrame
+        The returns of each asset, one column per asset
+    estimate_nu : bool
+        Boolean flag indicating whether to estimate nu jointly with the covariance matrix
+
+    Returns
+    -----------
+    mu_est : numpy.ndarray
+        Estimated means of each asset
+    cov_est : numpy.ndarray
+        Estimated covariance matrix
+    tail : float
+        Estimate of the tail parameter nu
+    """
+    if estimate_nu:
+        estimate = fit_multi_var_t(all_ret_data)
+        return estimate.mu, estimate.cov, estimate.nu
+
     samples = []
-    for (column_name, column_data) in all_ret_data.iteritems():
+    for (column_name, column_data) in all_ret_data.items():
         samples.extend(column_data.values)
 
     dist_params, _ = fit_samples(
@@ -73,26 +265,11 @@ def prices_to_t_covariance_matrix(price_history_dict, log=True):
     left_m = dist_params[-2]
     right_m = dist_params[-1]
 
-    # print('nu: {} left: {} right: {}'.format(nu, left_m, right_m))
     tail = np.median(np.asarray([nu, left_m, right_m]))
-    # tail = np.max(np.asarray([nu, left_m, right_m]))
-
-    # print(tail)
 
     estimates = mle_multi_var_t(all_ret_data, tail)
 
-    mu_est = estimates[0]
-    cov_est = estimates[1]
-
-    asset_params, columns = list(map(list,
-                                     zip(*[[{
-                                         'key': asset,
-                                         'loc': mu_est[i],
-                                         'scale': cov_est[i, i],
-                                     }, asset]
-                                         for i, asset in enumerate(price_history_dict)])))
-
-    return pd.DataFrame(cov_est, columns=columns, index=columns), asset_params, tail
+    return estimates[0], estimates[1], tail
 
 
 def prices_to_sample_covariance_matrix(price_history_dict, log=True):
@@ -145,7 +322,8 @@ def prices_to_sample_covariance_matrix(price_history_dict, log=True):
     return covariance_matrix, asset_params
 
 
-def t_path_sampling(t_fit_params, n_paths=1, path_length=2, current_price=1.0):
+def t_path_sampling(t_fit_params, n_paths=1, path_length=2, current_price=1.0,
+                    sampler=Sampler.PSEUDO_RANDOM, rng=None):
     """
     This function generates a set of backtesting paths according to a student's t distribution
 
@@ -159,6 +337,12 @@ def t_path_sampling(t_fit_params, n_paths=1, path_length=2, current_price=1.0):
         The length of each path
     current_price : float
         The price at which the paths should start
+    sampler : Sampler
+        (Optional. Default: PSEUDO_RANDOM) How the draws behind the paths are made. Except for
+        PSEUDO_RANDOM the uniforms are transformed by the inverse CDF of the distribution
+    rng : Union[numpy.random.Generator, numpy.random.RandomState]
+        (Optional. Default: None) The generator to draw from. If None a generator is seeded
+        from the global numpy random state, see potion.rng.resolve_generator
 
     Returns
     -------
@@ -174,10 +358,16 @@ def t_path_sampling(t_fit_params, n_paths=1, path_length=2, current_price=1.0):
     # because current_price at start of path
     path_length -= 1
 
+    if sampler != Sampler.PSEUDO_RANDOM:
+        uniforms = uniform_samples(n_paths, path_length, sampler, rng)
+        log_deltas = skewed_t.ppf(uniforms, skew, nu, loc=location, scale=scale)
+        return list(_log_deltas_to_paths(log_deltas, current_price))
+
     path_list = []
     for i in range(n_paths):
         # print('l: {} s: {} sk: {} nu: {} pl: {}'.format(location, scale, skew, nu, path_length))
-        log_deltas = skewed_t.rvs(skew, nu, loc=location, scale=scale, size=path_length)
+        log_deltas = skewed_t.rvs(skew, nu, loc=location, scale=scale, size=path_length,
+                                  random_state=rng)
 
         path = [current_price]
         last_price = current_price
@@ -191,7 +381,8 @@ def t_path_sampling(t_fit_params, n_paths=1, path_length=2, current_price=1.0):
     return path_list
 
 
-def multivariate_normal_path_sampling(n_paths, path_length, covariance_matrix, current_prices=None):
+def multivariate_normal_path_sampling(n_paths, path_length, covariance_matrix, current_prices=None,
+                                      sampler=Sampler.PSEUDO_RANDOM, rng=None):
     """
     Generates sample paths for backtesting according to a multi variable normal distribution.
 
@@ -205,6 +396,12 @@ def multivariate_normal_path_sampling(n_paths, path_length, covariance_matrix, c
         The covariance matrix of the log return distribution estimated from the price histories
     current_prices : dict
         A dict mapping each asset to the price at which the paths should start
+    sampler : Sampler
+        (Optional. Default: PSEUDO_RANDOM) How the draws behind the paths are made. Except for
+        PSEUDO_RANDOM the uniforms are transformed by the inverse CDF of the distribution
+    rng : Union[numpy.random.Generator, numpy.random.RandomState]
+        (Optional. Default: None) The generator to draw from. If None a generator is seeded
+        from the global numpy random state, see potion.rng.resolve_generator
 
     Returns
     ----------
@@ -231,13 +428,25 @@ def multivariate_normal_path_sampling(n_paths, path_length, covariance_matrix, c
     for asset_index, asset in enumerate(assets):
         path_dict[asset] = []
 
+    if sampler != Sampler.PSEUDO_RANDOM:
+        uniforms = uniform_samples(n_paths, cov_size * (path_length - 1), sampler, rng)
+        uncorrelated_samples = norm.ppf(uniforms).reshape(n_paths, cov_size, path_length - 1)
+        correlated_samples = np.einsum('ij,njk->nik', cho_decomp, uncorrelated_samples)
+
+        paths = _log_deltas_to_paths(correlated_samples,
+                                     [current_prices[asset] for asset in assets])
+        for asset_index, asset in enumerate(assets):
+            path_dict[asset] = list(paths[:, asset_index])
+        return path_dict, list(correlated_samples)
+
     log_delta_list = []
     for i in range(n_paths):
 
         # Generate uncorrelated random samples
         uncorrelated_sample_list = []
         for asset in assets:
-            uncorrelated_samples = norm.rvs(loc=0.0, scale=1.0, size=path_length - 1)
+            uncorrelated_samples = norm.rvs(loc=0.0, scale=1.0, size=path_length - 1,
+                                            random_state=rng)
             uncorrelated_sample_list.append(uncorrelated_samples)
 
         # Convert them to correlated random samples which are log deltas for each asset
@@ -261,7 +470,8 @@ def multivariate_normal_path_sampling(n_paths, path_length, covariance_matrix, c
     return path_dict, log_delta_list
 
 
-def multivariate_t_path_sampling(n_paths, path_length, covariance_matrix, nu, current_prices=None):
+def multivariate_t_path_sampling(n_paths, path_length, covariance_matrix, nu, current_prices=None,
+                                 sampler=Sampler.PSEUDO_RANDOM, rng=None):
     """
     Generates sample paths for backtesting according to a multi variable student t distribution.
 
@@ -277,6 +487,12 @@ def multivariate_t_path_sampling(n_paths, path_length, covariance_matrix, nu, cu
         The degrees of freedom parameter which controls the tails of the distribution
     current_prices : dict
         A dict mapping each asset to the price at which the paths should start
+    sampler : Sampler
+        (Optional. Default: PSEUDO_RANDOM) How the draws behind the paths are made. Except for
+        PSEUDO_RANDOM the uniforms are transformed by the inverse CDF of the distribution
+    rng : Union[numpy.random.Generator, numpy.random.RandomState]
+        (Optional. Default: None) The generator to draw from. If None a generator is seeded
+        from the global numpy random state, see potion.rng.resolve_generator
 
     Returns
     ----------
@@ -301,11 +517,28 @@ def multivariate_t_path_sampling(n_paths, path_length, covariance_matrix, nu, cu
     for asset_index, asset in enumerate(assets):
         path_dict[asset] = []
 
+    if sampler != Sampler.PSEUDO_RANDOM:
+        # Each return needs a uniform for every asset and one for the chi-squared mixing variable
+        uniforms = uniform_samples(n_paths, (cov_size + 1) * (path_length - 1), sampler,
+                                   rng)
+        uniforms = uniforms.reshape(n_paths, path_length - 1, cov_size + 1)
+
+        cho_decomp = np.linalg.cholesky(np.asarray(covariance_matrix, dtype=float))
+        normal_samples = norm.ppf(uniforms[..., :cov_size]) @ cho_decomp.T
+        mixing = chi2.ppf(uniforms[..., cov_size], nu) / nu
+        log_deltas = normal_samples / np.sqrt(mixing)[..., None]
+
+        paths = _log_deltas_to_paths(np.swapaxes(log_deltas, 1, 2),
+                                     [current_prices[asset] for asset in assets])
+        for asset_index, asset in enumerate(assets):
+            path_dict[asset] = list(paths[:, asset_index])
+        return path_dict, [pd.DataFrame(deltas, columns=assets) for deltas in log_deltas]
+
     multi_var_t = MultiVarStudentT([0.0] * cov_size, covariance_matrix, nu)
     log_delta_list = []
     for i in range(n_paths):
 
-        log_deltas = multi_var_t.rvs(path_length - 1)
+        log_deltas = multi_var_t.rvs(path_length - 1, random_state=rng)
         log_delta_list.append(log_deltas)
         # print(log_deltas)
 
@@ -325,7 +558,8 @@ def multivariate_t_path_sampling(n_paths, path_length, covariance_matrix, nu, cu
     return path_dict, log_delta_list
 
 
-def path_sampling(prices, n_paths=1, path_length=2, n_hist_bins='auto', current_price=1.0):
+def path_sampling(prices, n_paths=1, path_length=2, n_hist_bins='auto', current_price=1.0,
+                  sampler=Sampler.PSEUDO_RANDOM, rng=None):
     """
     Generates price paths from a histogram
 
@@ -341,6 +575,12 @@ def path_sampling(prices, n_paths=1, path_length=2, n_hist_bins='auto', current_
         The number of bins to use in the histogram
     current_price : float
         The price at which the paths should start
+    sampler : Sampler
+        (Optional. Default: PSEUDO_RANDOM) How the uniforms transformed by the inverse of the
+        histogram CDF are drawn
+    rng : Union[numpy.random.Generator, numpy.random.RandomState]
+        (Optional. Default: None) The generator to draw from. If None a generator is seeded
+        from the global numpy random state, see potion.rng.resolve_generator
 
     Returns
     -------
@@ -359,13 +599,69 @@ def path_sampling(prices, n_paths=1, path_length=2, n_hist_bins='auto', current_
     cum_values[1:] = np.cumsum(hist * np.diff(bin_edges))
     inv_cdf = interpolate.interp1d(cum_values, bin_edges)
 
+    if sampler != Sampler.PSEUDO_RANDOM:
+        deltas = inv_cdf(uniform_samples(n_paths, path_length, sampler, rng))
+        cum_deltas = np.cumprod(1 + deltas, axis=1)
+        return list(np.insert(current_price * cum_deltas, 0, current_price, axis=1))
+
+    rng = resolve_generator(rng)
     path_list = []
     for i in range(n_paths):
         # interpret deltas as percent returns, cumulate and apply them to produce path
-        r = np.random.rand(path_length)
+        r = rng.random(path_length)
         deltas = inv_cdf(r)
         cum_deltas = np.cumprod(1 + deltas)
         path = np.insert(current_price * cum_deltas, 0, current_price)
         path_list.append(path)
 
     return path_list
+
+
+def chunked_path_sampling(sample, n_paths, streams, *names, sampler=Sampler.PSEUDO_RANDOM,
+                          chunk_size=PATH_CHUNK_SIZE):
+    """
+    Generates a set of paths in chunks, each drawn from its own stream spawned from the stream of
+    the set, see potion.rng.RandomStreams.chunk_generators. A chunk can be drawn again on its own
+    with RandomStreams.chunk_generator.
+
+    The variance reduced samplers balance their draws across all of the paths, so they draw the
+    whole set from the stream of the set in a single chunk.
+
+    Parameters
+    ----------
+    sample : Callable
+        Called with the number of paths of a chunk and its generator, and returns the paths of
+        the chunk as one of the path samplers above, either a List of paths or a dict of the
+        paths of each asset and a List of their log returns
+    n_paths : int
+        The number of paths to generate
+    streams : potion.rng.RandomStreams
+        The random number streams of the run
+    names : object
+        The names addressing the stream of the set of paths
+    sampler : Sampler
+        (Optional. Default: PSEUDO_RANDOM) How the draws behind the paths are made
+    chunk_size : int
+        (Optional. Default: 1024) The number of paths in each chunk
+
+    Returns
+    -------
+    paths : Union[List, Tuple[dict, List]]
+        The paths of all of the chunks in order, in the form returned by sample
+    """
+    if sampler != Sampler.PSEUDO_RANDOM:
+        return sample(n_paths, streams.generator(*names))
+
+    chunks = [sample(chunk.stop - chunk.start, rng)
+              for chunk, rng in streams.chunk_generators(n_paths, *names, chunk_size=chunk_size)]
+    if not isinstance(chunks[0], tuple):
+        return [path for paths in chunks for path in paths]
+
+    path_dict = {asset: [] for asset in chunks[0][0]}
+    log_delta_list = []
+    for chunk_path_dict, chunk_log_deltas in chunks:
+        for asset, paths in chunk_path_dict.items():
+            path_dict[asset].extend(paths)
+        log_delta_list.extend(chunk_log_deltas)
+
+    return path_dict, log_delta_list
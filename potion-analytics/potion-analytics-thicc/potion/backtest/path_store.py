@@ -0,0 +1,237 @@
+"""
+This module stores generated backtesting paths on disk so the curve backtester, the pool
+backtester, the plots and later sessions can reuse them instead of generating them again.
+
+The paths are content-addressed. The key of a set of paths is a digest of everything the paths
+depend on: the generation method, the distribution parameters (or the covariance matrix), the
+starting prices, the number of paths, the path length and the random seed. Backtests of the same
+curves with a different util, and reruns with the same seed, find the paths of the first run.
+
+Each set of paths is stored as a float32 numpy array and opened as a read-only memory map, so
+the evaluators and the plots read the same pages without copying the paths into the session.
+The store uses the following layout:
+
+    <key>.npy
+        'The paths, num_paths by path_length, or num_assets by num_paths by path_length'
+    <key>.json
+        'A description of the paths, e.g. the method, shape and seed, for inspection'
+
+The backtesters generate a set of paths from its own stream of the seed, see potion.rng, so the
+paths of an asset only depend on its own parameters and the seed, not on the order the assets
+are generated in.
+"""
+import hashlib
+import json
+import os
+from enum import Enum
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from potion.instrumentation import count as profile_count
+
+PATH_STORE_DIRNAME = 'paths'
+PATH_DTYPE = np.float32
+# Changed whenever the same parameters and seed generate different paths, so the paths stored by
+# earlier versions are not reused. Version 2 draws the paths from the streams of potion.rng
+PATH_KEY_VERSION = 2
+
+
+def _update_hash(digest, value):
+    """
+    Adds a value to a digest in a canonical form, so equal parameters always give the same key
+
+    Parameters
+    ----------
+    digest : hashlib._Hash
+        The digest being built
+    value : object
+        The value to add. Enums, strings, numbers, dicts, DataFrames, arrays and nested Lists
+        are supported
+
+    Returns
+    -------
+    None
+    """
+    if isinstance(value, Enum):
+        digest.update(b'enum:' + value.name.encode())
+    elif isinstance(value, pd.DataFrame):
+        digest.update(b'frame:')
+        _update_hash(digest, [str(column) for column in value.columns])
+        _update_hash(digest, value.to_numpy(dtype=float))
+    elif isinstance(value, dict):
+        digest.update(b'dict:%d:' % len(value))
+        for item_key in sorted(value, key=str):
+            _update_hash(digest, str(item_key))
+            _update_hash(digest, value[item_key])
+    elif isinstance(value, (str, bytes)) or value is None:
+        digest.update(b'str:' + repr(value).encode())
+    else:
+        try:
+            array = np.asarray(value, dtype=np.float64)
+        except (TypeError, ValueError):
+            array = None
+
+        if array is not None:
+            digest.update(b'array:' + repr(array.shape).encode())
+            digest.update(np.ascontiguousarray(array).tobytes())
+        else:
+            digest.update(b'list:%d:' % len(value))
+            for item in value:
+                _update_hash(digest, item)
+
+
+def path_key(method, params, num_paths: int, path_length: int, seed: int):
+    """
+    Calculates the content address of a set of paths
+
+    Parameters
+    ----------
+    method : PathGenMethod
+        The method used to generate the paths
+    params : object
+        The parameters the paths depend on, e.g. the distribution parameters and starting price
+    num_paths : int
+        The number of paths
+    path_length : int
+        The length of each path
+    seed : int
+        The seed of the random number generator
+
+    Returns
+    -------
+    key : str
+        The hex digest identifying the paths
+    """
+    digest = hashlib.sha256()
+    for value in [PATH_KEY_VERSION, method, params, int(num_paths), int(path_length), int(seed)]:
+        _update_hash(digest, value)
+    return digest.hexdigest()
+
+
+class PathStore:
+    """
+    This class reads and writes the content-addressed paths of a results directory
+    """
+
+    def __init__(self, directory: str):
+        """
+        Constructs the store for a directory
+
+        Parameters
+        ----------
+        directory : str
+            The directory the paths are stored in. Created when the first paths are written
+        """
+        self.directory = directory
+
+    def filename(self, key: str):
+        """
+        Gets the name of the file storing a set of paths
+
+        Parameters
+        ----------
+        key : str
+            The key of the paths
+
+        Returns
+        -------
+        filename : str
+            The name of the .npy file
+        """
+        return os.path.join(self.directory, key + '.npy')
+
+    def contains(self, key: str):
+        """
+        Checks whether a set of paths is stored
+
+        Parameters
+        ----------
+        key : str
+            The key of the paths
+
+        Returns
+        -------
+        contains : bool
+            True if the paths are stored, False otherwise
+        """
+        return os.path.isfile(self.filename(key))
+
+    def load(self, key: str):
+        """
+        Opens a set of stored paths as a read-only memory map
+
+        Parameters
+        ----------
+        key : str
+            The key of the paths
+
+        Returns
+        -------
+        paths : numpy.memmap
+            The paths
+        """
+        return np.load(self.filename(key), mmap_mode='r')
+
+    def save(self, key: str, paths, description=None):
+        """
+        Stores a set of paths. The file is written under a temporary name and renamed, so an
+        interrupted write never leaves a partial set of paths in the store
+
+        Parameters
+        ----------
+        key : str
+            The key of the paths
+        paths : Union[numpy.ndarray, List]
+            The paths to store
+        description : dict
+            (Optional. Default: None) A JSON serializable description of the paths
+
+        Returns
+        -------
+        paths : numpy.memmap
+            The stored paths opened as a read-only memory map
+        """
+        Path(self.directory).mkdir(parents=True, exist_ok=True)
+
+        paths = np.asarray(paths, dtype=PATH_DTYPE)
+        filename = self.filename(key)
+        tmp_filename = filename + '.tmp'
+        with open(tmp_filename, 'wb') as f:
+            np.save(f, paths)
+        os.replace(tmp_filename, filename)
+
+        description = dict(description or {})
+        description['shape'] = list(paths.shape)
+        with open(os.path.join(self.directory, key + '.json'), 'w') as f:
+            json.dump(description, f, indent=2, default=str)
+
+        return self.load(key)
+
+    def get_or_generate(self, key: str, generate: Callable, description=None):
+        """
+        Opens a set of stored paths, or generates and stores them if they are not stored yet
+
+        Parameters
+        ----------
+        key : str
+            The key of the paths
+        generate : Callable
+            The function generating the paths, called with no arguments. It draws from the
+            stream of the seed of the paths, see potion.rng
+        description : dict
+            (Optional. Default: None) A JSON serializable description of the paths
+
+        Returns
+        -------
+        paths : numpy.memmap
+            The paths opened as a read-only memory map
+        """
+        if self.contains(key):
+            profile_count('path_store_hits')
+            return self.load(key)
+
+        profile_count('path_store_misses')
+        return self.save(key, generate(), description)
@@ -0,0 +1,250 @@
+"""
+This module runs many pool backtests as one set of scenarios. The pools of a run often share
+their assets and only differ in their curves and util maps, so instead of fitting the
+distribution and generating correlated paths for every pool, the runner groups the pools by
+their set of assets. The distribution of each group is fitted once and its correlated paths are
+generated once, then every pool of the group is evaluated against the shared paths, in parallel
+processes if requested.
+
+The results of the pools land in one PoolResultStore, a directory partitioned by pool:
+
+    ma_backtest_pool_<backtest_id>.hdf5
+        'The log of the pool backtest, as written by MultiAssetBacktester'
+    pools.csv
+        'The manifest of the pools, one row per pool with its log, assets, path group and utils'
+
+The pools of a path group are simulated on the same paths, so the differences between their
+results come from their curves and utils alone.
+"""
+import json
+import logging
+import os
+from multiprocessing import Pool
+from pathlib import Path
+
+import pandas as pd
+import vaex
+
+from potion.backtest.multi_asset_backtester import MultiAssetBacktester, UTIL_KEY
+from potion.instrumentation import count as profile_count
+
+POOL_MANIFEST_FILENAME = 'pools.csv'
+POOL_LOG_PREFIX = 'ma_backtest_pool_'
+
+
+class PoolResultStore:
+    """
+    This class names the partitions of the pool backtest results and reads and writes their
+    manifest
+    """
+
+    def __init__(self, directory: str):
+        """
+        Constructs the store for a directory
+
+        Parameters
+        ----------
+        directory : str
+            The directory the results are stored in. Created when the manifest is written
+        """
+        self.directory = directory
+
+    def log_file_name(self, backtest_id: int):
+        """
+        Gets the name of the log of a pool, without the .hdf5 extension added by the backtester
+
+        Parameters
+        ----------
+        backtest_id : int
+            The ID number of the pool backtest
+
+        Returns
+        -------
+        log_file_name : str
+            The name of the log
+        """
+        return os.path.join(self.directory, POOL_LOG_PREFIX + str(backtest_id))
+
+    def open(self, backtest_id: int):
+        """
+        Opens the log of a pool as a memory mapped Vaex DataFrame
+
+        Parameters
+        ----------
+        backtest_id : int
+            The ID number of the pool backtest
+
+        Returns
+        -------
+        df : vaex.dataframe.DataFrame
+            The log of the pool
+        """
+        return vaex.open(self.log_file_name(backtest_id) + '.hdf5')
+
+    def write_manifest(self, manifest_df: pd.DataFrame):
+        """
+        Writes the manifest of the pools
+
+        Parameters
+        ----------
+        manifest_df : pandas.DataFrame
+            One row per pool, see run_pool_scenarios
+
+        Returns
+        -------
+        None
+        """
+        Path(self.directory).mkdir(parents=True, exist_ok=True)
+        manifest_df.to_csv(os.path.join(self.directory, POOL_MANIFEST_FILENAME), index=False)
+
+    def read_manifest(self):
+        """
+        Reads the manifest of the pools
+
+        Returns
+        -------
+        manifest_df : pandas.DataFrame
+            One row per pool, see run_pool_scenarios
+        """
+        return pd.read_csv(os.path.join(self.directory, POOL_MANIFEST_FILENAME))
+
+
+def _path_group_key(pool_curve_df: pd.DataFrame, user_alpha, cov_df):
+    """
+    Gets the key of the paths a pool is simulated on
+
+    Parameters
+    ----------
+    pool_curve_df : pandas.DataFrame
+        The curves of the pool
+    user_alpha : float
+        The custom tail alpha of the pool, only used with a custom covariance
+    cov_df : pandas.DataFrame
+        The custom covariance, or None if the covariance is fitted to the training data
+
+    Returns
+    -------
+    key : tuple
+        The sorted assets of the pool, and the tail alpha if the covariance is custom
+    """
+    assets = tuple(sorted(str(asset) for asset in pool_curve_df.Asset.unique()))
+    if cov_df is None:
+        return assets
+    return assets, user_alpha
+
+
+def _evaluate_pool(backtester, log_file_name, backtest_id, num_backtests):
+    """
+    Evaluates one pool backtest, in a worker process of a parallel run
+
+    Parameters
+    ----------
+    backtester : MultiAssetBacktester
+        The backtester of the pool, with its paths
+    log_file_name : str
+        The name of the log of the pool
+    backtest_id : int
+        The ID number of the pool backtest
+    num_backtests : int
+        The number of pool backtests in the run
+
+    Returns
+    -------
+    backtest_id : int
+        The ID number of the evaluated pool backtest
+    """
+    backtester.evaluate_backtest_sequentially(log_file_name, backtest_id, num_backtests)
+    return backtest_id
+
+
+def run_pool_scenarios(config, curve_df, training_df, backtest_util_list, result_store,
+                       tail_alpha_list=None, cov_df=None, progress_bar=None, num_workers=1):
+    """
+    Runs the backtests of a set of pools, generating the paths once for each set of assets
+
+    Parameters
+    ----------
+    config : dict
+        The configuration of the backtests, see create_ma_backtester_config. The util map of
+        each pool replaces the util map of the config
+    curve_df : pandas.DataFrame
+        The curves of all of the pools, the pool of a curve is given by its Backtest_ID
+    training_df : pandas.DataFrame
+        The asset training window info
+    backtest_util_list : List[dict]
+        The util map of each pool, the index in the List is the Backtest_ID of the pool
+    result_store : PoolResultStore
+        The store the logs and the manifest of the pools are written to
+    tail_alpha_list : List[float]
+        (Optional. Default: None) The custom tail alpha of each pool
+    cov_df : pandas.DataFrame
+        (Optional. Default: None) A custom covariance used instead of fitting the covariance
+        of each set of assets to its training data
+    progress_bar : streamlit.progress
+        (Optional. Default: None) The progress bar updated as the pools are evaluated
+    num_workers : int
+        (Optional. Default: 1) The number of processes evaluating the pools. With 1 the pools
+        are evaluated in this process
+
+    Returns
+    -------
+    backtester_map : dict
+        Maps the Backtest_ID of each pool to the backtester which simulated it
+    """
+    num_backtests = len(backtest_util_list)
+    if tail_alpha_list is None:
+        tail_alpha_list = [None] * num_backtests
+
+    Path(result_store.directory).mkdir(parents=True, exist_ok=True)
+
+    # Generate the paths of the first pool of each group and share them with the others
+    backtester_map = {}
+    group_sources = {}
+    group_ids = {}
+    manifest_rows = []
+    for backtest_id, util_map in enumerate(backtest_util_list):
+
+        pool_curve_df = curve_df.query('Backtest_ID == {}'.format(backtest_id))
+        backtester = MultiAssetBacktester(config=dict(config, **{UTIL_KEY: util_map}),
+                                          curve_df=pool_curve_df, training_df=training_df,
+                                          cov_matrix=cov_df,
+                                          user_alpha=tail_alpha_list[backtest_id])
+
+        group_key = _path_group_key(pool_curve_df, tail_alpha_list[backtest_id], cov_df)
+        if group_key in group_sources:
+            logging.debug('Sharing the paths of pool {} with pool {}'.format(
+                group_sources[group_key], backtest_id))
+            backtester.share_paths(backtester_map[group_sources[group_key]])
+            profile_count('pool_path_reuses')
+        else:
+            logging.debug('Generating paths for pool {}'.format(backtest_id))
+            backtester.generate_backtesting_paths()
+            group_sources[group_key] = backtest_id
+            group_ids[group_key] = len(group_ids)
+
+        backtester_map[backtest_id] = backtester
+        manifest_rows.append({
+            'Backtest_ID': backtest_id,
+            'Log_File': os.path.basename(result_store.log_file_name(backtest_id)) + '.hdf5',
+            'Assets': json.dumps(list(_path_group_key(pool_curve_df, None, None))),
+            'Path_Group': group_ids[group_key],
+            'Seed': backtester.seed,
+            'Util_Map': json.dumps({str(k): float(v) for k, v in util_map.items()})
+        })
+
+    if num_workers > 1 and num_backtests > 1:
+        tasks = [(backtester, result_store.log_file_name(backtest_id), backtest_id, num_backtests)
+                 for backtest_id, backtester in backtester_map.items()]
+        with Pool(min(num_workers, num_backtests)) as pool:
+            for done, _ in enumerate(pool.starmap(_evaluate_pool, tasks)):
+                if progress_bar is not None:
+                    progress_bar.progress((done + 1) / float(num_backtests))
+    else:
+        for backtest_id, backtester in backtester_map.items():
+            backtester.evaluate_backtest_sequentially(result_store.log_file_name(backtest_id),
+                                                      backtest_id, num_backtests,
+                                                      progress_bar=progress_bar)
+
+    result_store.write_manifest(pd.DataFrame(manifest_rows))
+
+    return backtester_map
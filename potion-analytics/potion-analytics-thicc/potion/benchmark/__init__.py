@@ -0,0 +1,11 @@
+"""
+A module containing the benchmark suite of the curve generation and backtesting pipeline.
+
+Run it from the root of the repository with:
+
+    python -m potion.benchmark --size small --output results.json
+
+and compare a later run against the stored results with:
+
+    python -m potion.benchmark --size small --baseline results.json
+"""
@@ -0,0 +1,106 @@
+"""
+Command line interface of the benchmark suite. Runs the micro-benchmarks and end-to-end
+scenarios at the requested problem sizes, writes the results to a JSON file and optionally
+compares them against a baseline file. The exit code is 1 if any regression was found.
+"""
+import argparse
+import sys
+import tempfile
+
+from potion.benchmark.harness import (run_benchmarks, write_results, read_results,
+                                      compare_results, DEFAULT_THRESHOLD)
+from potion.benchmark.scenarios import scenario_benchmarks
+from potion.benchmark.stages import PipelineFixture, SIZES, stage_benchmarks
+from potion.testing.synthetic import DEFAULT_SEED
+
+
+def run_suite(sizes, suites=('micro', 'e2e'), names=None, seed=DEFAULT_SEED, log=print):
+    """
+    Runs the benchmark suite
+
+    Parameters
+    ----------
+    sizes : List[str]
+        The names of the problem sizes in SIZES to run
+    suites : List[str]
+        (Optional. Default: ('micro', 'e2e')) The groups of benchmarks to run
+    names : List[str]
+        (Optional. Default: None) Only run the benchmarks with a name containing one of these
+        strings. None runs every benchmark
+    seed : int
+        (Optional. Default: 1234) The seed used for every random value
+    log : Callable
+        (Optional. Default: print) Called with the progress messages
+
+    Returns
+    -------
+    results : List[BenchmarkResult]
+        The timing results of every benchmark which ran
+    """
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            fixture = PipelineFixture(size, directory, seed=seed)
+
+            benchmarks = []
+            if 'micro' in suites:
+                benchmarks.extend(stage_benchmarks(fixture))
+            if 'e2e' in suites:
+                benchmarks.extend(scenario_benchmarks(fixture))
+
+            if log is not None:
+                log('Running the {} benchmarks'.format(size))
+            results.extend(run_benchmarks(benchmarks, size, names=names, log=log))
+
+    return results
+
+
+def main(argv=None):
+    """
+    Parses the command line arguments and runs the benchmark suite
+
+    Parameters
+    ----------
+    argv : List[str]
+        (Optional. Default: None) The command line arguments. None uses sys.argv
+
+    Returns
+    -------
+    exit_code : int
+        0 on success, 1 if a regression was found against the baseline
+    """
+    parser = argparse.ArgumentParser(prog='python -m potion.benchmark')
+    parser.add_argument('--size', nargs='+', choices=list(SIZES), default=['small'],
+                        help='The problem sizes to run')
+    parser.add_argument('--suite', nargs='+', choices=['micro', 'e2e'], default=['micro', 'e2e'],
+                        help='The groups of benchmarks to run')
+    parser.add_argument('--filter', nargs='+', default=None,
+                        help='Only run the benchmarks with a name containing one of these')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED,
+                        help='The seed used for every random value')
+    parser.add_argument('--output', default=None, help='The JSON file to write the results to')
+    parser.add_argument('--baseline', default=None,
+                        help='A JSON results file to compare the results against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='The relative growth of the median time flagged as a regression')
+
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.size, suites=args.suite, names=args.filter, seed=args.seed)
+
+    if args.output is not None:
+        write_results(args.output, results)
+
+    if args.baseline is None:
+        return 0
+
+    baseline, metadata = read_results(args.baseline)
+    comparison_df = compare_results(results, baseline, threshold=args.threshold)
+    print('Compared against {} created {}'.format(args.baseline, metadata.get('created')))
+    print(comparison_df.to_string(index=False))
+
+    return int((comparison_df['status'] == 'regression').any())
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,334 @@
+"""
+This module provides the timing harness used by the benchmark suite.
+
+A benchmark is a named callable which is timed over a number of repeats after some warmup calls.
+The results of a run are written to a JSON file together with information about the machine and
+library versions, so runs can be compared later. The comparison flags a benchmark as a
+regression when its median time grows by more than a threshold relative to a stored baseline.
+
+The JSON file has the following layout:
+
+    {
+        "metadata": {"created": ..., "python": ..., "numpy": ..., "scipy": ..., ...},
+        "results": [
+            {"name": ..., "group": ..., "size": ..., "repeats": ..., "times": [...],
+             "min": ..., "median": ..., "mean": ..., "stdev": ..., "info": {...}},
+            ...
+        ]
+    }
+"""
+import datetime
+import json
+import os
+import platform
+import time
+from typing import NamedTuple, Callable
+
+import numpy as np
+import pandas as pd
+import scipy
+
+DEFAULT_REPEATS = 5
+DEFAULT_WARMUP = 1
+DEFAULT_THRESHOLD = 0.25
+"""The relative growth of the median time flagged as a regression"""
+DEFAULT_MIN_TIME = 1e-3
+"""Benchmarks faster than this in seconds are never flagged, their timings are mostly noise"""
+
+
+class Benchmark(NamedTuple):
+    """
+    Immutable description of one benchmark in the suite
+    """
+    name: str
+    """The unique name of the benchmark, used to match results against the baseline"""
+    group: str
+    """The group of the benchmark, e.g. 'micro' or 'e2e'"""
+    func: Callable
+    """The function being timed. Called with the value returned by setup, if any"""
+    setup: Callable = None
+    """(Optional) Called once before timing. Its return value is passed to func"""
+    repeats: int = DEFAULT_REPEATS
+    """The number of timed calls"""
+    warmup: int = DEFAULT_WARMUP
+    """The number of untimed calls made before timing"""
+    requires_cpus: int = 1
+    """The number of CPUs the benchmark needs. It is skipped on machines with fewer"""
+
+
+class BenchmarkResult(NamedTuple):
+    """
+    Immutable timing results of one benchmark
+    """
+    name: str
+    """The name of the benchmark"""
+    group: str
+    """The group of the benchmark"""
+    size: str
+    """The problem size the benchmark was run at"""
+    times: list
+    """The time in seconds of each timed call"""
+    info: dict = None
+    """(Optional) Extra information recorded by the benchmark, e.g. problem dimensions"""
+
+    @property
+    def median(self):
+        """
+        The median time of the timed calls in seconds
+        """
+        return float(np.median(self.times)) if self.times else np.nan
+
+    def to_dict(self):
+        """
+        Converts the result to the dict stored in the JSON results file
+
+        Returns
+        -------
+        result_dict : dict
+            The dict containing the raw times and summary statistics
+        """
+        times = np.asarray(self.times, dtype=float)
+        return {
+            'name': self.name,
+            'group': self.group,
+            'size': self.size,
+            'repeats': int(times.size),
+            'times': times.tolist(),
+            'min': float(np.min(times)) if times.size else None,
+            'median': float(np.median(times)) if times.size else None,
+            'mean': float(np.mean(times)) if times.size else None,
+            'stdev': float(np.std(times)) if times.size else None,
+            'info': self.info or {}
+        }
+
+
+def time_callable(func: Callable, *args, repeats=DEFAULT_REPEATS, warmup=DEFAULT_WARMUP):
+    """
+    Times the calls of a function with the highest resolution clock available
+
+    Parameters
+    ----------
+    func : Callable
+        The function to time
+    args : arglist
+        The arguments passed to func
+    repeats : int
+        (Optional. Default: 5) The number of timed calls
+    warmup : int
+        (Optional. Default: 1) The number of untimed calls made first
+
+    Returns
+    -------
+    times : List[float]
+        The time in seconds of each timed call
+    value : Any
+        The value returned by the last call
+    """
+    value = None
+    for _ in range(warmup):
+        value = func(*args)
+
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        value = func(*args)
+        times.append(time.perf_counter() - start)
+
+    return times, value
+
+
+def run_benchmark(benchmark: Benchmark, size: str):
+    """
+    Runs the setup of a benchmark and times it. The function being timed may return a dict,
+    which is stored as the extra information of the result.
+
+    Parameters
+    ----------
+    benchmark : Benchmark
+        The benchmark to run
+    size : str
+        The problem size label recorded in the result
+
+    Returns
+    -------
+    result : BenchmarkResult
+        The timing results
+    """
+    args = () if benchmark.setup is None else (benchmark.setup(),)
+    times, value = time_callable(benchmark.func, *args, repeats=benchmark.repeats,
+                                 warmup=benchmark.warmup)
+    info = value if isinstance(value, dict) else {}
+
+    return BenchmarkResult(benchmark.name, benchmark.group, size, times, info)
+
+
+def run_benchmarks(benchmarks, size: str, names=None, log=print):
+    """
+    Runs a list of benchmarks in order. Benchmarks requiring more CPUs than the current machine
+    has are skipped.
+
+    Parameters
+    ----------
+    benchmarks : List[Benchmark]
+        The benchmarks to run
+    size : str
+        The problem size label recorded in the results
+    names : List[str]
+        (Optional. Default: None) Only run the benchmarks with a name containing one of these
+        strings. None runs every benchmark
+    log : Callable
+        (Optional. Default: print) Called with a progress message for each benchmark. None
+        disables the messages
+
+    Returns
+    -------
+    results : List[BenchmarkResult]
+        The timing results of each benchmark which ran
+    """
+    results = []
+    for benchmark in benchmarks:
+        if names and not any(name in benchmark.name for name in names):
+            continue
+
+        cpus = os.cpu_count() or 1
+        if cpus < benchmark.requires_cpus:
+            if log is not None:
+                log('{:<40} skipped: needs {} CPUs, {} available'.format(
+                    benchmark.name, benchmark.requires_cpus, cpus))
+            continue
+
+        result = run_benchmark(benchmark, size)
+        if log is not None:
+            log('{:<40} median {:.4f} s over {} runs'.format(benchmark.name, result.median,
+                                                               len(result.times)))
+        results.append(result)
+
+    return results
+
+
+def environment_metadata():
+    """
+    Collects information about the machine and the library versions used for a run
+
+    Returns
+    -------
+    metadata : dict
+        The dict stored with the results
+    """
+    return {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+        'pandas': pd.__version__
+    }
+
+
+def write_results(filename: str, results, metadata=None):
+    """
+    Writes benchmark results to a JSON file
+
+    Parameters
+    ----------
+    filename : str
+        The name of the file to write
+    results : List[BenchmarkResult]
+        The timing results
+    metadata : dict
+        (Optional. Default: None) The information about the run. By default, the output of
+        environment_metadata
+
+    Returns
+    -------
+    None
+    """
+    output = {
+        'metadata': environment_metadata() if metadata is None else metadata,
+        'results': [result.to_dict() for result in results]
+    }
+    with open(filename, 'w') as f:
+        json.dump(output, f, indent=2)
+
+
+def read_results(filename: str):
+    """
+    Reads benchmark results written by write_results
+
+    Parameters
+    ----------
+    filename : str
+        The name of the file to read
+
+    Returns
+    -------
+    results : List[dict]
+        The dict of each result, see BenchmarkResult.to_dict
+    metadata : dict
+        The information about the run
+    """
+    with open(filename, 'r') as f:
+        data = json.load(f)
+
+    return data['results'], data.get('metadata', {})
+
+
+def compare_results(results, baseline, threshold=DEFAULT_THRESHOLD, min_time=DEFAULT_MIN_TIME):
+    """
+    Compares the median times of a run against a baseline run. Results are matched on their
+    name and size.
+
+    Parameters
+    ----------
+    results : List[Union[BenchmarkResult, dict]]
+        The results of the current run
+    baseline : List[dict]
+        The results of the baseline run, as returned by read_results
+    threshold : float
+        (Optional. Default: 0.25) The relative growth of the median time flagged as a
+        regression
+    min_time : float
+        (Optional. Default: 1e-3) Benchmarks with a baseline median below this time in seconds
+        are never flagged
+
+    Returns
+    -------
+    comparison_df : pandas.DataFrame
+        One row per result with the baseline and current medians, their ratio, and the status
+        of the comparison: 'regression', 'improvement', 'ok' or 'new'
+    """
+    baseline_map = {(result['name'], result['size']): result['median'] for result in baseline}
+
+    rows = []
+    for result in results:
+        if isinstance(result, BenchmarkResult):
+            result = result.to_dict()
+
+        current = result['median']
+        reference = baseline_map.get((result['name'], result['size']))
+        if reference is None or current is None:
+            ratio = np.nan
+            status = 'new'
+        else:
+            ratio = current / reference if reference > 0.0 else np.inf
+            if reference < min_time:
+                status = 'ok'
+            elif ratio > 1.0 + threshold:
+                status = 'regression'
+            elif ratio < 1.0 / (1.0 + threshold):
+                status = 'improvement'
+            else:
+                status = 'ok'
+
+        rows.append({
+            'name': result['name'],
+            'size': result['size'],
+            'baseline': reference,
+            'current': current,
+            'ratio': ratio,
+            'status': status
+        })
+
+    return pd.DataFrame(rows, columns=['name', 'size', 'baseline', 'current', 'ratio', 'status'])
@@ -0,0 +1,68 @@
+"""
+This module defines the end-to-end benchmarks, which generate the curves for the synthetic inputs
+of a problem size and then backtest them, the same way the examples and the streamlit apps use
+the library.
+"""
+from potion.benchmark.harness import Benchmark
+from potion.benchmark.stages import PipelineFixture, INITIAL_GUESS
+from potion.backtest.batch_backtester import create_backtester_config, BatchBacktester
+from potion.curve_gen.gen import Generator
+
+
+def _generate_then_backtest(fixture: PipelineFixture, parallel=False):
+    """
+    Runs the curve generator and the backtester on the inputs of the fixture
+
+    Parameters
+    ----------
+    fixture : PipelineFixture
+        The fixture supplying the inputs
+    parallel : bool
+        (Optional. Default: False) Evaluate the backtest in parallel
+
+    Returns
+    -------
+    info : dict
+        The dimensions of the scenario
+    """
+    generator = Generator()
+    generator.configure_curve_gen(fixture.config)
+    curve_df, pdf_df, training_df = generator.generate_curves(
+        initial_guess=INITIAL_GUESS, bet_fractions=fixture.bet_fractions)
+
+    config = create_backtester_config(fixture.params['num_paths'], fixture.params['path_length'],
+                                      0.3, 1000.0, seed=fixture.seed)
+    backtester = BatchBacktester(config=config, curve_df=curve_df, training_df=training_df)
+    backtester.generate_backtesting_paths()
+
+    if parallel:
+        backtester.evaluate_backtest_parallel(fixture.log_file_name('e2e_parallel'))
+    else:
+        backtester.evaluate_backtest_sequentially(fixture.log_file_name('e2e_sequential'))
+
+    return {'curves': len(curve_df), 'paths': fixture.params['num_paths'],
+            'path_length': fixture.params['path_length']}
+
+
+def scenario_benchmarks(fixture: PipelineFixture):
+    """
+    Creates the end-to-end generate-then-backtest benchmarks
+
+    Parameters
+    ----------
+    fixture : PipelineFixture
+        The fixture supplying the inputs
+
+    Returns
+    -------
+    benchmarks : List[Benchmark]
+        The benchmark objects
+    """
+    repeats = fixture.params['repeats']
+    return [
+        Benchmark('e2e_generate_backtest_sequential', 'e2e', _generate_then_backtest,
+                  setup=lambda: fixture, repeats=repeats, warmup=0),
+        Benchmark('e2e_generate_backtest_parallel', 'e2e',
+                  lambda f: _generate_then_backtest(f, parallel=True), setup=lambda: fixture,
+                  repeats=repeats, warmup=0, requires_cpus=2)
+    ]
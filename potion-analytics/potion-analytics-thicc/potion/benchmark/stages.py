@@ -0,0 +1,529 @@
+"""
+This module defines the micro-benchmarks of the individual stages of the curve generation and
+backtesting pipeline:
+
+    train
+        'Trainer.train fitting the distributions to the training windows'
+    convolve_self_n
+        'The self convolutions propagating the 1-day PDF to the longest expiration'
+    transform_pdf_using_optimize
+        'The transformation of one PDF from the log return domain to the price domain'
+    generate_premiums
+        'The root finding of the optimal premium at every bet fraction of one curve'
+    fit_kelly_curve
+        'KellyFit.fit_kelly_curve cold and warm started, and the batched fit_kelly_curves'
+    expiration_evaluator
+        'ExpirationEvaluator evaluating the trades along every backtesting path of one curve'
+    batch_backtester
+        'BatchBacktester evaluating every curve sequentially and in parallel'
+
+Every input is generated from synthetic price histories and the inputs/Example*.csv files
+scaled to one of the problem sizes in SIZES, so runs on different machines use identical data.
+"""
+import itertools
+import os
+from multiprocessing import cpu_count
+
+import numpy as np
+
+import potion.curve_gen.gen as gen
+from potion.benchmark.harness import Benchmark
+from potion.testing.synthetic import (DEFAULT_SEED, read_example_input,
+                                      synthetic_curve_gen_input, write_synthetic_inputs)
+from potion.backtest.batch_backtester import (create_backtester_config, BatchBacktester,
+                                              _initialize_vaex_logging_df)
+from potion.backtest.expiration_evaluator import ExpirationEvaluator, create_eval_config
+from potion.backtest.path_gen import t_path_sampling
+from potion.curve_gen.constraints.bounds import configure_bounds
+from potion.curve_gen.convolution.helpers import convolve_self_n
+from potion.curve_gen.domain_transformation import transform_pdf_using_optimize
+from potion.curve_gen.kelly_fit.builder import FitConfigBuilder
+from potion.curve_gen.kelly_fit.kelly_fit import KellyFit, _cosh_model
+from potion.curve_gen.strike_sweep import StrikeSweep
+from potion.curve_gen.training.train import Trainer
+from potion.curve_gen.utils import (build_generator_config, training_output_to_convolution_config,
+                                    training_output_to_payoff_config, make_payoff_cfg,
+                                    make_payoff_dict)
+
+INITIAL_GUESS = (1.0, 3.5)
+"""The initial guess of the training used by the Generator"""
+FIT_LOWER_BOUNDS = (0.0, 0.0, 0.0, -100.0)
+FIT_UPPER_BOUNDS = (100.0, 100.0, 100.0, 100.0)
+
+SIZES = {
+    'small': {
+        'template': 'ExampleCurveGenInputSingle.csv',
+        'num_assets': 1,
+        'strikes': [1.0],
+        'expirations': [1, 7],
+        'points_in_pdf': 2001,
+        'num_bet_fractions': 50,
+        'num_curves': 10,
+        'num_paths': 10,
+        'path_length': 60,
+        'repeats': 5
+    },
+    'medium': {
+        'template': 'ExampleCurveGenInputMulti.csv',
+        'num_assets': 2,
+        'strikes': [0.9, 1.0, 1.1],
+        'expirations': [1, 7, 14],
+        'points_in_pdf': 8001,
+        'num_bet_fractions': 50,
+        'num_curves': 50,
+        'num_paths': 50,
+        'path_length': 120,
+        'repeats': 3
+    },
+    'large': {
+        'template': 'ExampleCurveGenInputMulti.csv',
+        'num_assets': 4,
+        'strikes': [0.8, 0.9, 1.0, 1.1, 1.2],
+        'expirations': [1, 7, 14, 30],
+        'points_in_pdf': 20001,
+        'num_bet_fractions': 100,
+        'num_curves': 200,
+        'num_paths': 200,
+        'path_length': 365,
+        'repeats': 1
+    }
+}
+"""The parameters of each problem size"""
+
+
+class PipelineFixture:
+    """
+    This class writes the synthetic inputs for one problem size and lazily caches the outputs
+    of the pipeline stages, so each micro-benchmark only times its own stage
+    """
+
+    def __init__(self, size: str, directory: str, seed=DEFAULT_SEED):
+        """
+        Writes the synthetic input files for the problem size
+
+        Parameters
+        ----------
+        size : str
+            The name of the problem size in SIZES
+        directory : str
+            The directory the input and log files are written to
+        seed : int
+            (Optional. Default: 1234) The seed used for every random value
+        """
+        self.size = size
+        self.params = SIZES[size]
+        self.directory = directory
+        self.seed = seed
+
+        input_df = synthetic_curve_gen_input(
+            read_example_input(self.params['template']), num_assets=self.params['num_assets'],
+            strikes=self.params['strikes'], expirations=self.params['expirations'])
+        self.input_file, self.history_file = write_synthetic_inputs(directory, input_df,
+                                                                    seed=seed)
+        self.config = build_generator_config(self.input_file, self.history_file)
+        self.bet_fractions = np.linspace(0.0, 0.9999, self.params['num_bet_fractions'])
+
+        self._conv_dfs = None
+        self._curves = None
+        self._log_count = itertools.count()
+
+    def log_file_name(self, prefix: str):
+        """
+        Creates a unique log file name in the fixture directory
+
+        Parameters
+        ----------
+        prefix : str
+            The prefix of the file name
+
+        Returns
+        -------
+        log_file_name : str
+            The name of the log file
+        """
+        return os.path.join(self.directory, '{}_{}'.format(prefix, next(self._log_count)))
+
+    def conv_dfs(self):
+        """
+        Gets the outputs of the training, which are calculated once
+
+        Returns
+        -------
+        conv_dfs : List[pandas.DataFrame]
+            The DataFrames output by Trainer.train
+        """
+        if self._conv_dfs is None:
+            self._conv_dfs = Trainer(self.config.train_config).train(*INITIAL_GUESS)
+        return self._conv_dfs
+
+    def curves(self):
+        """
+        Gets the outputs of the curve generator, which are calculated once
+
+        Returns
+        -------
+        curve_df : pandas.DataFrame
+            The DataFrame containing the generated curves
+        training_df : pandas.DataFrame
+            The DataFrame containing the training data
+        """
+        if self._curves is None:
+            generator = gen.Generator()
+            generator.configure_curve_gen(self.config)
+            curve_df, pdf_df, training_df = generator.generate_curves(
+                initial_guess=INITIAL_GUESS, bet_fractions=self.bet_fractions)
+            self._curves = curve_df, training_df
+        return self._curves
+
+    def backtester(self):
+        """
+        Creates a BatchBacktester for the generated curves with seeded backtesting paths
+
+        Returns
+        -------
+        backtester : BatchBacktester
+            The backtester with the paths generated
+        """
+        curve_df, training_df = self.curves()
+        config = create_backtester_config(self.params['num_paths'], self.params['path_length'],
+                                          0.3, 1000.0, seed=self.seed)
+
+        backtester = BatchBacktester(config=config, curve_df=curve_df, training_df=training_df)
+        backtester.generate_backtesting_paths()
+        return backtester
+
+
+def _train_benchmark(fixture: PipelineFixture):
+    """
+    Benchmarks the training of every convolution group
+
+    Parameters
+    ----------
+    fixture : PipelineFixture
+        The fixture supplying the inputs
+
+    Returns
+    -------
+    benchmark : Benchmark
+        The benchmark object
+    """
+    def setup():
+        return Trainer(fixture.config.train_config)
+
+    def run(trainer):
+        conv_dfs = trainer.train(*INITIAL_GUESS)
+        return {'groups': len(conv_dfs)}
+
+    return Benchmark('train', 'micro', run, setup=setup, repeats=fixture.params['repeats'])
+
+
+def _conv_config(fixture: PipelineFixture):
+    """
+    Creates the convolution config of the first convolution group on a uniform grid with the
+    number of points of the problem size
+
+    Parameters
+    ----------
+    fixture : PipelineFixture
+        The fixture supplying the inputs
+
+    Returns
+    -------
+    config : ConvolutionConfig
+        The convolution config
+    """
+    return training_output_to_convolution_config(
+        fixture.conv_dfs()[:1], pdf_pts=fixture.params['points_in_pdf'], adaptive_grid=False)[0]
+
+
+def _convolve_benchmark(fixture: PipelineFixture):
+    """
+    Benchmarks the self convolutions up to the longest expiration
+
+    Parameters
+    ----------
+    fixture : PipelineFixture
+        The fixture supplying the inputs
+
+    Returns
+    -------
+    benchmark : Benchmark
+        The benchmark object
+    """
+    def setup():
+        return _conv_config(fixture)
+
+    def run(config):
+        convolve_self_n(config.dist, config.log_x, config.num_times_to_conv)
+        return {'points': int(config.log_x.size), 'convolutions': int(config.num_times_to_conv)}
+
+    return Benchmark('convolve_self_n', 'micro', run, setup=setup,
+                     repeats=fixture.params['repeats'])
+
+
+def _transform_benchmark(fixture: PipelineFixture):
+    """
+    Benchmarks the transformation of the 1-day PDF from the log domain to the price domain
+
+    Parameters
+    ----------
+    fixture : PipelineFixture
+        The fixture supplying the inputs
+
+    Returns
+    -------
+    benchmark : Benchmark
+        The benchmark object
+    """
+    def setup():
+        config = _conv_config(fixture)
+        return config.log_x, config.dist(config.log_x), config.x
+
+    def run(args):
+        log_x, log_pdf, x = args
+        transform_pdf_using_optimize(log_x, log_pdf, x)
+        return {'points': int(x.size)}
+
+    return Benchmark('transform_pdf_using_optimize', 'micro', run, setup=setup,
+                     repeats=fixture.params['repeats'])
+
+
+def _generate_premiums_benchmark(fixture: PipelineFixture):
+    """
+    Benchmarks the optimal premium calculation of one curve at the longest expiration
+
+    Parameters
+    ----------
+    fixture : PipelineFixture
+        The fixture supplying the inputs
+
+    Returns
+    -------
+    benchmark : Benchmark
+        The benchmark object
+    """
+    def setup():
+        conv_dfs = fixture.conv_dfs()[:1]
+        conv_configs = training_output_to_convolution_config(conv_dfs)
+        payoff_configs = training_output_to_payoff_config(conv_dfs, conv_configs)
+
+        configure_bounds(fixture.config.bounds_config)
+        exp_days = gen._perform_convolution(conv_configs[0], conv_dfs[0]['Expiration'].values)
+        pdf_x, pdfs_y = gen._conv_get()
+
+        gen._payoff_config(payoff_configs[0][-1])
+        sweep = StrikeSweep(pdf_x, pdfs_y[np.unique(exp_days).size - 1])
+        sweep.set_payoff(payoff_configs[0][-1].total_payoff)
+        return sweep
+
+    def run(sweep):
+        gen._generate_premiums(fixture.bet_fractions, sweep)
+        return {'bet_fractions': int(fixture.bet_fractions.size)}
+
+    return Benchmark('generate_premiums', 'micro', run, setup=setup,
+                     repeats=fixture.params['repeats'])
+
+
+def _strike_ladder_benchmark(fixture: PipelineFixture, num_strikes=50):
+    """
+    Benchmarks the Kelly derivative of every bet fraction for a ladder of short put strikes
+    sharing the PDF of the longest expiration
+
+    Parameters
+    ----------
+    fixture : PipelineFixture
+        The fixture supplying the inputs
+    num_strikes : int
+        (Optional. Default: 50) The number of strikes in the ladder
+
+    Returns
+    -------
+    benchmark : Benchmark
+        The benchmark object
+    """
+    def setup():
+        conv_dfs = fixture.conv_dfs()[:1]
+        conv_configs = training_output_to_convolution_config(conv_dfs)
+        exp_days = gen._perform_convolution(conv_configs[0], conv_dfs[0]['Expiration'].values)
+        pdf_x, pdfs_y = gen._conv_get()
+
+        payoff_dict = make_payoff_dict(call_or_put='put', direction='short')
+        payoffs = [make_payoff_cfg(pdf_x, strike, payoff_dict).total_payoff
+                   for strike in np.linspace(0.5, 1.5, num_strikes)]
+        return pdf_x, pdfs_y[np.unique(exp_days).size - 1], payoffs
+
+    def run(inputs):
+        pdf_x, pdf_y, payoffs = inputs
+        sweep = StrikeSweep(pdf_x, pdf_y)
+        for payoff in payoffs:
+            sweep.set_payoff(payoff)
+            sweep.kelly_derivative(0.05, fixture.bet_fractions, abs(np.min(payoff) + 0.05))
+        return {'strikes': num_strikes, 'points': int(pdf_x.size)}
+
+    return Benchmark('strike_ladder_kelly_derivative', 'micro', run, setup=setup,
+                     repeats=fixture.params['repeats'])
+
+
+def _premium_curves(fixture: PipelineFixture):
+    """
+    Creates a deterministic sweep of premium curves similar to those of neighboring strikes
+
+    Parameters
+    ----------
+    fixture : PipelineFixture
+        The fixture supplying the inputs
+
+    Returns
+    -------
+    premiums_list : List[numpy.ndarray]
+        The premiums of each curve at the bet fractions of the fixture
+    """
+    rng = np.random.default_rng(fixture.seed)
+    num_curves = fixture.params['num_curves']
+    scales = np.linspace(0.5, 2.0, num_curves)
+    noise = rng.normal(0.0, 1e-4, size=(num_curves, fixture.bet_fractions.size))
+    return [_cosh_model(fixture.bet_fractions, 0.02 * k, 2.0 + k, 3.0, 0.005 * k) + n
+            for k, n in zip(scales, noise)]
+
+
+def _fit_benchmarks(fixture: PipelineFixture):
+    """
+    Benchmarks the fits of a sweep of premium curves cold started, warm started and batched
+
+    Parameters
+    ----------
+    fixture : PipelineFixture
+        The fixture supplying the inputs
+
+    Returns
+    -------
+    benchmarks : List[Benchmark]
+        The benchmark objects
+    """
+    def setup():
+        return _premium_curves(fixture)
+
+    def fit_each(warm_start):
+        def run(premiums_list):
+            fit = KellyFit(FitConfigBuilder().set_warm_start(warm_start).build_config())
+            params = None
+            for premiums in premiums_list:
+                params = fit.fit_kelly_curve(fixture.bet_fractions, premiums,
+                                             lower_bounds=FIT_LOWER_BOUNDS,
+                                             upper_bounds=FIT_UPPER_BOUNDS,
+                                             warm_start_params=params)
+            stats = fit.get_fit_stats()
+            return {'curves': len(premiums_list), 'nfev': int(stats['nfev'].sum())}
+        return run
+
+    def fit_batch(premiums_list):
+        fit = KellyFit(FitConfigBuilder().build_config())
+        fit.fit_kelly_curves(fixture.bet_fractions, premiums_list,
+                             lower_bounds=FIT_LOWER_BOUNDS, upper_bounds=FIT_UPPER_BOUNDS)
+        stats = fit.get_fit_stats()
+        return {'curves': len(premiums_list), 'nfev': int(stats['nfev'].sum())}
+
+    repeats = fixture.params['repeats']
+    return [
+        Benchmark('fit_kelly_curve_cold', 'micro', fit_each(False), setup=setup,
+                  repeats=repeats),
+        Benchmark('fit_kelly_curve_warm', 'micro', fit_each(True), setup=setup, repeats=repeats),
+        Benchmark('fit_kelly_curves_batch', 'micro', fit_batch, setup=setup, repeats=repeats)
+    ]
+
+
+def _expiration_evaluator_benchmark(fixture: PipelineFixture):
+    """
+    Benchmarks the ExpirationEvaluator on every backtesting path of one curve
+
+    Parameters
+    ----------
+    fixture : PipelineFixture
+        The fixture supplying the inputs
+
+    Returns
+    -------
+    benchmark : Benchmark
+        The benchmark object
+    """
+    num_paths = fixture.params['num_paths']
+    path_length = fixture.params['path_length']
+
+    def setup():
+        curve_df, training_df = fixture.curves()
+        row = curve_df.iloc[0]
+
+        paths = t_path_sampling(row.t_params, n_paths=num_paths, path_length=path_length,
+                                rng=np.random.default_rng(fixture.seed))
+        log_df = _initialize_vaex_logging_df(fixture.log_file_name('evaluator'),
+                                             num_paths * path_length)
+        return row, paths, log_df
+
+    def run(args):
+        row, paths, log_df = args
+        fit_params = [row.A, row.B, row.C, row.D]
+        for path_id, path in enumerate(paths):
+            config = create_eval_config(path, 0.3, row.Expiration, row.StrikePercent, fit_params,
+                                        1000.0, row.bet_fractions, row.curve_points)
+            row_slice = np.arange(path_id * path_length, (path_id + 1) * path_length)
+            ExpirationEvaluator(config).evaluate_expirations_along_path(log_df, 0, path_id, 1.0,
+                                                                        row_slice)
+        return {'paths': num_paths, 'path_length': path_length}
+
+    return Benchmark('expiration_evaluator', 'micro', run, setup=setup,
+                     repeats=fixture.params['repeats'])
+
+
+def _batch_backtester_benchmarks(fixture: PipelineFixture):
+    """
+    Benchmarks the BatchBacktester evaluating every generated curve sequentially and in parallel
+
+    Parameters
+    ----------
+    fixture : PipelineFixture
+        The fixture supplying the inputs
+
+    Returns
+    -------
+    benchmarks : List[Benchmark]
+        The benchmark objects
+    """
+    def run_sequential(backtester):
+        backtester.evaluate_backtest_sequentially(fixture.log_file_name('sequential'))
+        return {'tasks': len(backtester.keys) * len(backtester.exp_days) * len(
+            backtester.strike_pcts) * backtester.num_paths}
+
+    def run_parallel(backtester):
+        backtester.evaluate_backtest_parallel(fixture.log_file_name('parallel'))
+        return {'tasks': len(backtester.keys) * len(backtester.exp_days) * len(
+            backtester.strike_pcts) * backtester.num_paths, 'processes': cpu_count() - 1}
+
+    repeats = fixture.params['repeats']
+    return [
+        Benchmark('batch_backtester_sequential', 'micro', run_sequential,
+                  setup=fixture.backtester, repeats=repeats),
+        # The backtester keeps one core free, so it needs at least two to run in parallel
+        Benchmark('batch_backtester_parallel', 'micro', run_parallel, setup=fixture.backtester,
+                  repeats=repeats, requires_cpus=2)
+    ]
+
+
+def stage_benchmarks(fixture: PipelineFixture):
+    """
+    Creates the micro-benchmarks of every pipeline stage
+
+    Parameters
+    ----------
+    fixture : PipelineFixture
+        The fixture supplying the inputs
+
+    Returns
+    -------
+    benchmarks : List[Benchmark]
+        The benchmark objects in pipeline order
+    """
+    return ([_train_benchmark(fixture), _convolve_benchmark(fixture),
+             _transform_benchmark(fixture), _generate_premiums_benchmark(fixture),
+             _strike_ladder_benchmark(fixture)] +
+            _fit_benchmarks(fixture) + [_expiration_evaluator_benchmark(fixture)] +
+            _batch_backtester_benchmarks(fixture))
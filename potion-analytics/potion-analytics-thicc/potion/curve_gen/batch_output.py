@@ -0,0 +1,168 @@
+"""
+This module writes the outputs of a streamed curve generation run to a results directory as the
+curves are solved, instead of once the whole batch is done.
+
+The directory uses the same layout as the outputs written by the curve generator tool:
+
+    curves.csv
+        'The generated curves, appended one convolution group at a time'
+    training.csv
+        'The training windows, written when the training is done'
+    pdfs.h5
+        'The binary PDF store, appended one convolution group at a time'
+    progress.json
+        'The number of completed convolution groups and the size of the outputs they wrote'
+
+The progress file is only updated after every output of a convolution group has been written.
+A run which was interrupted can then be resumed from the last completed group, the partial
+outputs of the interrupted group are dropped before it is generated again.
+"""
+import csv
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from potion.curve_gen.pdf_store import (append_pdf_store, truncate_pdf_store,
+                                        PDF_STORE_FILENAME)
+
+CURVES_FILENAME = 'curves.csv'
+TRAINING_FILENAME = 'training.csv'
+PROGRESS_FILENAME = 'progress.json'
+
+
+class CurveOutputWriter:
+    """
+    This class incrementally writes the outputs of Generator.iter_curves to a directory
+    """
+
+    def __init__(self, directory: str):
+        """
+        Constructs the writer for a results directory
+
+        Parameters
+        ----------
+        directory : str
+            The directory the outputs are written to. Created if it does not exist
+        """
+        self.directory = directory
+        self.curves_file = os.path.join(directory, CURVES_FILENAME)
+        self.training_file = os.path.join(directory, TRAINING_FILENAME)
+        self.pdf_file = os.path.join(directory, PDF_STORE_FILENAME)
+        self.progress_file = os.path.join(directory, PROGRESS_FILENAME)
+        self.progress = None
+
+    def read_progress(self):
+        """
+        Reads the progress of the last run written to the directory
+
+        Returns
+        -------
+        progress : dict
+            The keys of the convolution groups of the run, the number of completed groups, the
+            size in bytes of the curves file and the number of PDFs written by the completed
+            groups. None if no run was written to the directory
+        """
+        if not os.path.isfile(self.progress_file):
+            return None
+
+        with open(self.progress_file, 'r') as f:
+            return json.load(f)
+
+    def _write_progress(self):
+        """
+        Writes the progress file, replacing the previous one in a single step so an interrupted
+        write never leaves a partial file
+
+        Returns
+        -------
+        None
+        """
+        tmp_file = self.progress_file + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(self.progress, f, indent=2)
+        os.replace(tmp_file, self.progress_file)
+
+    def start(self, training_df: pd.DataFrame, group_keys, resume=False):
+        """
+        Writes the training output and prepares the curve and PDF outputs of a run
+
+        Parameters
+        ----------
+        training_df : pandas.DataFrame
+            The DataFrame containing the information about the training windows
+        group_keys : List[str]
+            The "asset-label" key of each convolution group of the run, in order
+        resume : bool
+            (Optional. Default: False) Keep the outputs of the groups completed by the last run
+            written to the directory. Otherwise, the previous outputs are removed
+
+        Raises
+        ------
+        ValueError
+            If resuming a run with different convolution groups
+
+        Returns
+        -------
+        completed_groups : int
+            The number of convolution groups which are already complete and can be skipped
+        """
+        Path(self.directory).mkdir(parents=True, exist_ok=True)
+        training_df.to_csv(self.training_file, index=False, quoting=csv.QUOTE_ALL)
+
+        progress = self.read_progress() if resume else None
+        if progress is not None:
+            if progress['groups'] != list(group_keys):
+                raise ValueError('Cannot resume the run in {}, it was started with different '
+                                 'convolution groups'.format(self.directory))
+
+            # Drop whatever the interrupted group wrote after the last completed group
+            if os.path.isfile(self.curves_file):
+                os.truncate(self.curves_file, progress['curves_bytes'])
+            if os.path.isfile(self.pdf_file):
+                truncate_pdf_store(self.pdf_file, progress['num_pdfs'])
+
+            self.progress = progress
+        else:
+            for filename in [self.curves_file, self.pdf_file]:
+                if os.path.isfile(filename):
+                    os.remove(filename)
+
+            self.progress = {
+                'groups': list(group_keys),
+                'completed_groups': 0,
+                'curves_bytes': 0,
+                'num_pdfs': 0
+            }
+            self._write_progress()
+
+        return self.progress['completed_groups']
+
+    def write_group(self, curve_rows, prices, pdfs):
+        """
+        Appends the outputs of a completed convolution group and records its completion
+
+        Parameters
+        ----------
+        curve_rows : List[dict]
+            The rows of the curves output for the group
+        prices : numpy.ndarray
+            The price points of the PDFs
+        pdfs : dict
+            The key of each PDF of the group mapped to its values
+
+        Returns
+        -------
+        None
+        """
+        write_header = not os.path.isfile(self.curves_file) or os.path.getsize(
+            self.curves_file) == 0
+        pd.DataFrame(curve_rows).to_csv(self.curves_file, mode='a', header=write_header,
+                                        index=False, quoting=csv.QUOTE_ALL)
+        num_pdfs = append_pdf_store(self.pdf_file, prices, pdfs)
+
+        self.progress['completed_groups'] += 1
+        self.progress['curves_bytes'] = os.path.getsize(self.curves_file)
+        self.progress['num_pdfs'] = num_pdfs
+        self._write_progress()
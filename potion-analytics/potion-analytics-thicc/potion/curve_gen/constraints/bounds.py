@@ -15,6 +15,8 @@ three duck typed functions:
         'Gets a lower bound for the points of the Kelly curve'
     get_upper_bound(dict)
         'Gets an upper bound for the points of the Kelly curve'
+    get_bounds_vector(dict)
+        'Gets the lower and upper bounds for every point of the Kelly curve at once'
 
 Like many python libraries, this module uses a global object with the methods prebound so that
 the same library can be used by object-oriented and functional programmers alike. Object-oriented
@@ -121,6 +123,81 @@ class BoundaryConstraints:
         return np.amin(upper_bounds)
 
 
+    @staticmethod
+    def _evaluate_bounds(bound_fcns, boundary_dict: dict, num_points=None):
+        """
+        Evaluates the boundary functions for every bet fraction at once and stacks the results
+
+        Parameters
+        ----------
+        bound_fcns : List[Callable]
+            The boundary functions to evaluate
+        boundary_dict : dict
+            A dict supplying the parameters to the boundary functions, with arrays containing
+            one value per bet fraction
+        num_points : int
+            (Optional. Default: None) The number of bet fractions. By default, inferred from
+            the arrays in the boundary_dict
+
+        Returns
+        -------
+        bounds : numpy.ndarray
+            The 2-D array with one row per boundary function and one column per bet fraction
+        """
+        if num_points is None:
+            num_points = max([np.size(value) for value in boundary_dict.values()
+                              if np.ndim(value) > 0], default=1)
+
+        return np.stack([np.broadcast_to(np.asarray(bound_fcn(boundary_dict), dtype=float),
+                                         (num_points,)) for bound_fcn in bound_fcns])
+
+    def get_bounds_vector(self, boundary_dict: dict, num_points=None):
+        """
+        For the Kelly curve being generated, calculates the lower and upper bounds of the premium
+        at every bet fraction in a single call, according to the current configuration. The
+        boundary functions are called once with the arrays in the boundary_dict, so they must
+        support array arguments like the functions in puts_no_arb_constraints.
+
+        Parameters
+        ----------
+        boundary_dict : dict
+            A dict supplying the parameters to the boundary functions, with arrays containing
+            one value per bet fraction
+        num_points : int
+            (Optional. Default: None) The number of bet fractions. By default, inferred from
+            the arrays in the boundary_dict
+
+        Raises
+        ------
+        ValueError
+            If every lower or every upper bound of a bet fraction is NaN, like get_lower_bound
+            and get_upper_bound
+
+        Returns
+        -------
+        lb : numpy.ndarray
+            The lower bound value at each bet fraction
+        ub : numpy.ndarray
+            The upper bound value at each bet fraction
+        """
+        lower_bounds = self._evaluate_bounds(self.config.lower_premium_bounds, boundary_dict,
+                                             num_points=num_points)
+        upper_bounds = self._evaluate_bounds(self.config.upper_premium_bounds, boundary_dict,
+                                             num_points=num_points)
+
+        # Get the highest lower bound and the lowest upper bound, ignoring NaNs
+        lower_bound = np.fmax.reduce(lower_bounds, axis=0)
+        upper_bound = np.fmin.reduce(upper_bounds, axis=0)
+
+        # The reductions are only NaN if every bound is NaN
+        missing = np.flatnonzero(np.isnan(lower_bound) | np.isnan(upper_bound))
+        if missing.size > 0:
+            raise ValueError('No lower or upper bound at the bet fractions {}, every bound is '
+                             'NaN'.format(missing.tolist()))
+
+        return lower_bound, upper_bound
+
+
 # Define a Global object with default values to be configured by the module user
 _bounds = BoundaryConstraints(ConstraintsConfigBuilder().build_config())
 
@@ -129,3 +206,4 @@ _bounds = BoundaryConstraints(ConstraintsConfigBuilder().build_config())
 configure_bounds = _bounds.configure
 get_lower_bound = _bounds.get_lower_bound
 get_upper_bound = _bounds.get_upper_bound
+get_bounds_vector = _bounds.get_bounds_vector
@@ -1,3 +1,8 @@
+"""
+This module supplies the no-arbitrage boundary functions for puts which can be added to the
+ConstraintsConfig. Every value in the dict passed to the functions may be a scalar or a
+numpy.ndarray with one value per bet fraction, in which case the bound is returned as an array.
+"""
 
 import numpy as np
 
@@ -195,8 +200,6 @@ def calendar_ub(bound_dict: dict):
     calendar_bound : float
         The upper bound in premium
     """
-    # print('bd: ', bound_dict)
-
     p_mm = bound_dict['p_mm']
     k_i = bound_dict['k_i']
     s = bound_dict['s']
@@ -204,14 +207,19 @@ def calendar_ub(bound_dict: dict):
     q = bound_dict['q']
     tau = bound_dict['tau']
 
-    if np.isnan(p_mm):
-        return s
+    # Without a next expiration the bound falls back to the price of the underlying
+    if np.all(np.isnan(p_mm)):
+        return s if np.ndim(p_mm) == 0 else np.full(np.shape(p_mm), s, dtype=float)
 
     exp_tau = bound_dict['exp_tau']
 
-    return p_mm * np.exp(r * exp_tau) + s * np.exp(-q * tau) * (
+    calendar_bound = p_mm * np.exp(r * exp_tau) + s * np.exp(-q * tau) * (
             np.exp(r * exp_tau) - 1.0) + k_i * np.exp(-r * tau) * (1.0 - np.exp(r * exp_tau))
 
+    if np.ndim(calendar_bound) == 0:
+        return calendar_bound
+    return np.where(np.isnan(p_mm), s, calendar_bound)
+
 
 def monotonic_lb_cond(bound_dict):
     """
@@ -29,6 +29,9 @@ class ConvolutionConfig(NamedTuple):
     """The domain points of the PDF using possible prices"""
     log_x: np.ndarray
     """The domain points of the PDF using possible log return values"""
+    conv_log_x: np.ndarray = None
+    """The uniform points used to perform the convolution when log_x is non-uniform. None if the
+    convolution is performed directly on log_x"""
 
     def __eq__(self, other):
         """
@@ -49,7 +52,9 @@ class ConvolutionConfig(NamedTuple):
                        self.log_only == other.log_only) and (
                        self.dist_params == other.dist_params) and (
                        self.dist == other.dist) and np.array_equal(
-            self.x, other.x) and np.array_equal(self.log_x, other.log_x)
+            self.x, other.x) and np.array_equal(self.log_x, other.log_x) and (
+                       (self.conv_log_x is None and other.conv_log_x is None) or np.array_equal(
+                   self.conv_log_x, other.conv_log_x))
 
 
 class ConvolutionConfigBuilder:
@@ -69,6 +74,8 @@ class ConvolutionConfigBuilder:
         self.max_x = 5
         self.points_in_pdf = 20001
         self.log_only = False
+        self.log_x = None
+        self.conv_log_x = None
 
     def set_num_times_to_convolve(self, num: int):
         """
@@ -189,6 +196,29 @@ class ConvolutionConfigBuilder:
         self.log_only = log_only
         return self
 
+    def set_grid(self, log_x: np.ndarray, conv_log_x=None):
+        """
+        Sets explicit sample points of the log PDF function, for example a non-uniform grid
+        created with potion.curve_gen.convolution.grid.adaptive_log_grid. This overrides the
+        min x, max x and number of points settings
+
+        Parameters
+        ----------
+        log_x : numpy.ndarray
+            The sample points of the log PDF function
+        conv_log_x : numpy.ndarray
+            (Optional. Default: None) The uniform points, symmetric around zero, used to perform
+            the convolution. Required if log_x is non-uniform
+
+        Returns
+        -------
+        self : ConvolutionConfigBuilder
+            This object following the builder pattern
+        """
+        self.log_x = np.asarray(log_x, dtype=float)
+        self.conv_log_x = None if conv_log_x is None else np.asarray(conv_log_x, dtype=float)
+        return self
+
     def build_config(self):
         """
         Creates an immutable ConvolutionConfig object from the currently configured builder
@@ -198,7 +228,10 @@ class ConvolutionConfigBuilder:
         config : ConvolutionConfig
             The immutable configuration object
         """
-        log_x = np.linspace(self.min_x, self.max_x, self.points_in_pdf)
+        if self.log_x is None:
+            log_x = np.linspace(self.min_x, self.max_x, self.points_in_pdf)
+        else:
+            log_x = self.log_x
         x = log_to_price_sample_points(log_x, 1.0)
-        return ConvolutionConfig(self.num_times_to_conv, self.points_in_pdf, self.log_only,
-                                 self.dist_params, self.dist, x, log_x)
+        return ConvolutionConfig(self.num_times_to_conv, log_x.size, self.log_only,
+                                 self.dist_params, self.dist, x, log_x, self.conv_log_x)
@@ -16,16 +16,32 @@ three duck typed functions:
     get_pdf_arrays(int)
         'Which gets the X and Y arrays of the PDF functions on the specified day'
 
+The convolution is performed on a uniform grid. If the ConvolutionConfig was built with a
+non-uniform grid (see the grid module), the PDFs are convolved on the uniform conv_log_x points
+and then resampled onto log_x. The probability mass lost at the truncation boundaries of the grid
+on each day can be checked with get_truncation_mass(). The PDFs losing more than
+MAX_TRUNCATION_MASS are logged as a warning and counted in the truncated_pdfs profile counter.
+
 Like many python libraries, this module uses a global object with the methods prebound so that
 the same library can be used by object-oriented and functional programmers alike. Object-oriented
 users can use the LogDomainConvolver class, and functional programmers can use the functions
 described above.
 """
+import logging
 from typing import Callable
 
+import numpy as np
+
+from potion.instrumentation import timer, count
 from potion.curve_gen.domain_transformation import transform_pdf_using_optimize
 from potion.curve_gen.convolution.builder import ConvolutionConfig, ConvolutionConfigBuilder
 from potion.curve_gen.convolution.helpers import convolve_self_n
+from potion.curve_gen.convolution.grid import resample_pdf, truncated_mass
+
+log = logging.getLogger(__name__)
+
+# Probability mass a PDF may lose at the truncation boundaries of the grid before it is reported
+MAX_TRUNCATION_MASS = 1e-3
 
 
 class LogDomainConvolver:
@@ -48,6 +64,7 @@ class LogDomainConvolver:
 
         self.log_pdf_list = None
         self.price_pdf_list = None
+        self.truncation_mass_list = None
 
     def configure(self, config: ConvolutionConfig):
         """
@@ -103,6 +120,18 @@ class LogDomainConvolver:
         else:
             return self.config.x, self.price_pdf_list
 
+    def get_truncation_mass(self):
+        """
+        Gets the probability mass lost at the truncation boundaries of the grid for each of the
+        log PDFs calculated by the convolution
+
+        Returns
+        -------
+        mass : numpy.ndarray
+            The probability mass outside of the grid for each convolution PDF
+        """
+        return np.asarray(self.truncation_mass_list)
+
     def _set_pdf_transform_func(self, func: Callable):
         """
         Internal function which sets the python function used to transform the PDF from
@@ -132,8 +161,41 @@ class LogDomainConvolver:
         -------
         None
         """
-        self.log_pdf_list = convolve_self_n(self.config.dist, self.config.log_x,
+        conv_log_x = self.config.conv_log_x
+        if conv_log_x is None:
+            conv_log_x = self.config.log_x
+
+        with timer('convolution'):
+            conv_pdf_list = convolve_self_n(self.config.dist, conv_log_x,
                                             self.config.num_times_to_conv)
+            self.truncation_mass_list = [truncated_mass(conv_log_x, pdf) for pdf in conv_pdf_list]
+            self._check_truncation_mass()
+
+            if self.config.conv_log_x is None:
+                self.log_pdf_list = conv_pdf_list
+            else:
+                self.log_pdf_list = [resample_pdf(conv_log_x, pdf, self.config.log_x)
+                                     for pdf in conv_pdf_list]
+
+    def _check_truncation_mass(self):
+        """
+        Internal function which reports the PDFs losing more than MAX_TRUNCATION_MASS at the
+        truncation boundaries of the grid, with a warning and the truncated_pdfs profile counter
+
+        Returns
+        -------
+        None
+        """
+        mass = self.get_truncation_mass()
+        truncated_days = np.flatnonzero(mass > MAX_TRUNCATION_MASS)
+        if len(truncated_days) == 0:
+            return
+
+        count('truncated_pdfs', len(truncated_days))
+        worst_day = truncated_days[np.argmax(mass[truncated_days])]
+        log.warning('%d convolution PDFs lose more than %g of their probability mass outside of '
+                    'the grid, up to %g on day %d. Widen the grid bounds', len(truncated_days),
+                    MAX_TRUNCATION_MASS, mass[worst_day], worst_day + 1)
 
     def _create_price_pdfs(self, expiration_days=()):
         """
@@ -157,10 +219,11 @@ class LogDomainConvolver:
         if self.config.log_only:
             return
 
-        self.price_pdf_list = [self.transform_pdf_func(self.config.log_x, log_pdf, self.config.x,
-                                                       tol=1e-6)
-                               for index, log_pdf in enumerate(self.log_pdf_list)
-                               if len(expiration_days) == 0 or (index + 1) in expiration_days]
+        with timer('transform'):
+            self.price_pdf_list = [
+                self.transform_pdf_func(self.config.log_x, log_pdf, self.config.x, tol=1e-6)
+                for index, log_pdf in enumerate(self.log_pdf_list)
+                if len(expiration_days) == 0 or (index + 1) in expiration_days]
 
 
 # Define a Global object with default values to be configured by the module user
@@ -171,3 +234,4 @@ _conv = LogDomainConvolver(ConvolutionConfigBuilder().build_config())
 configure_convolution = _conv.configure
 run_convolution = _conv.run_convolution
 get_pdf_arrays = _conv.get_pdf_arrays
+get_truncation_mass = _conv.get_truncation_mass
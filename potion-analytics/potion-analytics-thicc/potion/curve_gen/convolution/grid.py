@@ -0,0 +1,205 @@
+"""
+This module builds adaptive grids for the convolution of return PDFs.
+
+The default ConvolutionConfig samples a uniform grid over [-5, 5] in the log return domain with
+20001 points. For typical daily returns most of those points land where the PDF is effectively
+zero, while every downstream step (domain transformation, probability bins, payoff evaluation)
+pays for all of them. Instead, this module sizes and places the points from the trained
+distribution and the expirations which will be requested:
+
+* The bounds of the domain are set from the quantiles of the 1-day distribution, propagated
+  to the longest expiration. Both the square root of time scaling of the body and the single
+  large jump scaling of heavy tails are considered, and the widest of the two is used.
+* The spacing of the internal convolution grid is set from the interquartile range of the
+  1-day distribution, so the narrowest PDF is still resolved.
+* The output grid is non-uniform. Its points are placed with a density following the
+  approximate PDFs of the expirations, mixed with a uniform floor so the tails still get points.
+
+Two grids are produced. The convolution itself needs a uniform grid symmetric around zero, so
+the PDFs are convolved on conv_log_x and then resampled onto the non-uniform output grid log_x.
+
+The probability mass lost at the truncation boundaries can be calculated with truncated_mass.
+"""
+import numpy as np
+
+DEFAULT_TAIL_MASS = 1e-5
+DEFAULT_POINTS_PER_IQR = 64
+DEFAULT_UNIFORM_FRACTION = 0.2
+DEFAULT_MAX_POINTS = 20001
+
+
+def log_return_bounds(rv, num_days: int, tail_mass=DEFAULT_TAIL_MASS):
+    """
+    Estimates the lower and upper quantiles of the log returns summed over num_days days
+
+    Parameters
+    ----------
+    rv : scipy.stats frozen distribution
+        The 1-day distribution of log returns. Must implement ppf
+    num_days : int
+        The number of days the distribution is propagated forward
+    tail_mass : float
+        (Optional. Default: 1e-5) The probability mass allowed outside of each bound
+
+    Returns
+    -------
+    lower : float
+        The lower bound in the log return domain
+    upper : float
+        The upper bound in the log return domain
+    """
+    num_days = max(int(num_days), 1)
+    median = float(rv.ppf(0.5))
+    lower_q, upper_q = rv.ppf([tail_mass, 1.0 - tail_mass])
+    lower_jump, upper_jump = rv.ppf([tail_mass / num_days, 1.0 - tail_mass / num_days])
+
+    # The body of the distribution scales with the square root of time, heavy tails are
+    # dominated by a single large jump on one of the days
+    root_n = np.sqrt(num_days)
+    lower = min(num_days * median - root_n * (median - lower_q),
+                (num_days - 1) * median + lower_jump)
+    upper = max(num_days * median + root_n * (upper_q - median),
+                (num_days - 1) * median + upper_jump)
+
+    return float(lower), float(upper)
+
+
+def approximate_pdf(rv, num_days: int, x: np.ndarray):
+    """
+    Approximates the PDF of the log returns summed over num_days days by scaling the 1-day PDF
+    with the square root of time around the drifted median. It is only used to place the grid
+    points, the actual PDFs are calculated by the convolution.
+
+    Parameters
+    ----------
+    rv : scipy.stats frozen distribution
+        The 1-day distribution of log returns
+    num_days : int
+        The number of days the distribution is propagated forward
+    x : numpy.ndarray
+        The points in the log return domain
+
+    Returns
+    -------
+    pdf : numpy.ndarray
+        The approximate PDF values at each point of x
+    """
+    num_days = max(int(num_days), 1)
+    median = float(rv.ppf(0.5))
+    root_n = np.sqrt(num_days)
+    return rv.pdf(median + (x - num_days * median) / root_n) / root_n
+
+
+def adaptive_log_grid(dists, expirations, tail_mass=DEFAULT_TAIL_MASS,
+                      points_per_iqr=DEFAULT_POINTS_PER_IQR, points_in_pdf=None,
+                      uniform_fraction=DEFAULT_UNIFORM_FRACTION, min_x=-5.0, max_x=5.0,
+                      max_points=DEFAULT_MAX_POINTS):
+    """
+    Builds the non-uniform output grid and the uniform convolution grid shared by a set of
+    trained distributions
+
+    Parameters
+    ----------
+    dists : List[scipy.stats frozen distribution]
+        The 1-day distributions of log returns. Must implement pdf and ppf
+    expirations : List[List[int]]
+        The expiration days requested for each distribution
+    tail_mass : float
+        (Optional. Default: 1e-5) The probability mass allowed outside of each bound
+    points_per_iqr : int
+        (Optional. Default: 64) The number of convolution grid points across the interquartile
+        range of the narrowest 1-day distribution
+    points_in_pdf : int
+        (Optional. Default: None) The number of points in the output grid. By default a quarter
+        of the points in the convolution grid
+    uniform_fraction : float
+        (Optional. Default: 0.2) The fraction of the output points spread uniformly, the rest
+        are placed following the approximate PDFs of the expirations
+    min_x : float
+        (Optional. Default: -5.0) The hard lower limit of the log return domain
+    max_x : float
+        (Optional. Default: 5.0) The hard upper limit of the log return domain
+    max_points : int
+        (Optional. Default: 20001) The maximum number of points in the convolution grid
+
+    Returns
+    -------
+    log_x : numpy.ndarray
+        The non-uniform output grid in the log return domain
+    conv_log_x : numpy.ndarray
+        The uniform grid, symmetric around zero, used to perform the convolution
+    """
+    half_width = 0.0
+    delta = np.inf
+    for rv, exps in zip(dists, expirations):
+        lower, upper = log_return_bounds(rv, np.max(exps), tail_mass=tail_mass)
+        half_width = max(half_width, -lower, upper)
+
+        lower_quartile, upper_quartile = rv.ppf([0.25, 0.75])
+        delta = min(delta, (upper_quartile - lower_quartile) / points_per_iqr)
+
+    # The convolution uses 'same' mode so the grid must be symmetric with a point at zero
+    half_width = min(half_width, max(-min_x, max_x))
+    half_points = int(np.ceil(half_width / delta))
+    half_points = min(half_points, (max_points - 1) // 2)
+    conv_log_x = np.linspace(-half_width, half_width, 2 * half_points + 1)
+
+    if points_in_pdf is None:
+        points_in_pdf = max(conv_log_x.size // 4, 501) | 1
+    points_in_pdf = min(points_in_pdf, conv_log_x.size)
+
+    # Place the output points following the mixture of the approximate PDFs of every expiration
+    density = np.zeros_like(conv_log_x)
+    for rv, exps in zip(dists, expirations):
+        for num_days in np.unique(exps):
+            pdf = approximate_pdf(rv, num_days, conv_log_x)
+            density += pdf / np.sum(pdf)
+    density = (1.0 - uniform_fraction) * density / np.sum(density) + (
+            uniform_fraction / density.size)
+
+    cdf = np.concatenate(([0.0], np.cumsum(0.5 * (density[1:] + density[:-1]))))
+    log_x = np.interp(np.linspace(0.0, cdf[-1], points_in_pdf), cdf, conv_log_x)
+
+    return log_x, conv_log_x
+
+
+def resample_pdf(x: np.ndarray, pdf: np.ndarray, new_x: np.ndarray):
+    """
+    Resamples a PDF onto different sample points using linear interpolation. The PDF is
+    zero outside of the original points.
+
+    Parameters
+    ----------
+    x : numpy.ndarray
+        The original sample points
+    pdf : numpy.ndarray
+        The PDF values at the original sample points
+    new_x : numpy.ndarray
+        The sample points to resample the PDF onto
+
+    Returns
+    -------
+    new_pdf : numpy.ndarray
+        The PDF values at the new sample points
+    """
+    return np.interp(new_x, x, pdf, left=0.0, right=0.0)
+
+
+def truncated_mass(x: np.ndarray, pdf: np.ndarray):
+    """
+    Calculates the probability mass which is missing from a PDF sampled on a truncated grid,
+    using the trapezoidal rule. Works with non-uniform sample points.
+
+    Parameters
+    ----------
+    x : numpy.ndarray
+        The sample points of the PDF
+    pdf : numpy.ndarray
+        The PDF values at the sample points
+
+    Returns
+    -------
+    mass : float
+        The probability mass outside of the grid
+    """
+    return 1.0 - np.trapz(pdf, x)
@@ -7,38 +7,56 @@ training data.
 import numpy as np
 import pandas as pd
 
+from typing import NamedTuple
 from scipy.optimize import brentq
 
+from potion.instrumentation import timer, count
 from potion.curve_gen.builder import GeneratorConfigBuilder, GeneratorConfig
-from potion.curve_gen.kelly import (probability_from_density, kelly_formula_derivative)
-from potion.curve_gen.utils import (training_output_to_csv, training_output_to_convolution_config,
-                                    training_output_to_payoff_config, add_pdf_csv_columns,
-                                    add_curve_csv_rows)
+from potion.curve_gen.utils import (training_groups_to_csv, training_groups_to_convolution_config,
+                                    training_groups_to_payoff_config, create_key)
+from potion.curve_gen.pipeline import CurveTable, PdfTable, TrainingGroup
+from potion.curve_gen.kelly import kelly_formula_derivative
 
 from potion.curve_gen.training.distributions.skewed_students_t import skewed_t
-from potion.curve_gen.training.train import (configure_training, train)
+from potion.curve_gen.training.train import (configure_training, train, train_groups)
 from potion.curve_gen.convolution.convolution import (configure_convolution, run_convolution,
                                                       get_pdf_arrays)
-from potion.curve_gen.constraints.bounds import (configure_bounds, get_lower_bound, get_upper_bound)
-from potion.curve_gen.kelly_fit.kelly_fit import (configure_fit, fit_kelly_curve)
-from potion.curve_gen.payoff.payoff import (configure_payoff, get_payoff_odds)
+from potion.curve_gen.constraints.bounds import (configure_bounds, get_lower_bound, get_upper_bound,
+                                                 get_bounds_vector)
+from potion.curve_gen.kelly_fit.kelly_fit import (configure_fit, fit_kelly_curve,
+                                                  fit_sampled_kelly_curve)
+from potion.curve_gen.payoff.payoff import (configure_payoff, get_payoff_odds,
+                                            get_position_max_loss)
+from potion.curve_gen.strike_sweep import StrikeSweep
 
 """
 To customize the curve generator behavior, update the function entries in the table below from 
-the caller's code
+the caller's code. The Kelly derivative is evaluated by a StrikeSweep from the max loss of the
+position (_payoff_get_max_loss), a replaced _payoff_get_odds entry is still evaluated over the
+whole price grid. The training runs through _train_groups, a replaced _train_train entry returning
+the DataFrame of each convolution group is still used. The curves are solved and fit through
+_fit_sampled, a replaced _fit_curve entry is still used to fit the premiums solved at every bet
+fraction
 """
 _train_config = configure_training
 _train_train = train
+_train_groups = train_groups
 _conv_config = configure_convolution
 _conv_run = run_convolution
 _conv_get = get_pdf_arrays
 _bounds_config = configure_bounds
 _bounds_get_low = get_lower_bound
 _bounds_get_up = get_upper_bound
+_bounds_get_vec = get_bounds_vector
 _fit_config = configure_fit
 _fit_curve = fit_kelly_curve
+_fit_sampled = fit_sampled_kelly_curve
 _payoff_config = configure_payoff
 _payoff_get_odds = get_payoff_odds
+_payoff_get_max_loss = get_position_max_loss
+
+# get_position_max_loss replaces a max loss of zero with this value, see check_div_zero
+MIN_MAX_LOSS = 1e-10
 
 
 def _perform_training(*args, dist=skewed_t, payoff_dict=None):
@@ -58,18 +76,24 @@ def _perform_training(*args, dist=skewed_t, payoff_dict=None):
 
     Returns
     -------
-    conv_dfs : List[pandas.DataFrame]
-        The DataFrames containing the output info from training
+    groups : List[TrainingGroup]
+        The TrainingGroups containing the output info from training
     conv_configs : List[ConvolutionConfig]
         The ConvolutionConfig objects to use during the convolution process
     payoff_configs : List[PayoffConfig]
         The PayoffConfig objects to use during curve generation
     """
-    conv_dfs = _train_train(*args, dist=dist)
-    conv_configs = training_output_to_convolution_config(conv_dfs, dist=dist)
-    payoff_configs = training_output_to_payoff_config(conv_dfs, conv_configs,
-                                                      payoff_dict=payoff_dict)
-    return conv_dfs, conv_configs, payoff_configs
+    with timer('training'):
+        if _train_train is not train and _train_groups is train_groups:
+            # The caller replaced the DataFrame training function, which gives one per group
+            groups = [TrainingGroup.from_frame(conv_df)
+                      for conv_df in _train_train(*args, dist=dist)]
+        else:
+            groups = _train_groups(*args, dist=dist)
+        conv_configs = training_groups_to_convolution_config(groups, dist=dist)
+        payoff_configs = training_groups_to_payoff_config(groups, conv_configs,
+                                                          payoff_dict=payoff_dict)
+    return groups, conv_configs, payoff_configs
 
 
 def _perform_convolution(conv_cfg, exps):
@@ -95,7 +119,7 @@ def _perform_convolution(conv_cfg, exps):
     return exp_days
 
 
-def _kelly_derivative(premium: float, bet_frac: np.ndarray, prob_bins: np.ndarray):
+def _kelly_derivative(premium: float, bet_frac: np.ndarray, sweep: StrikeSweep):
     """
     Calculates the derivative of the function k so that we can run the optimizer and find
     where the derivative is equal to zero.
@@ -106,18 +130,63 @@ def _kelly_derivative(premium: float, bet_frac: np.ndarray, prob_bins: np.ndarra
         The premium to try as input
     bet_frac : numpy.ndarray
         The ndarray corresponding to the possible bet fractions of the bankroll from 0 to 1
-    prob_bins : numpy.ndarray
-        The bins of probability to use in the calculation
+    sweep : StrikeSweep
+        The probability bins of the expiration, configured with the payoff of the strike
+
+    Raises
+    ------
+    ValueError
+        If the max loss of the position is zero or negative at the premium, so the optimizer
+        falls back to one of the bounds
 
     Returns
     -------
     derivative: numpy.ndarray
         The value of the derivative being scored by the optimizer
     """
-    return kelly_formula_derivative(prob_bins, _payoff_get_odds(premium), bet_frac)
+    if _payoff_get_odds is not get_payoff_odds:
+        # The caller replaced the odds function, which has to be evaluated at every price
+        return kelly_formula_derivative(sweep.prob_bins, _payoff_get_odds(premium), bet_frac)
+
+    max_loss = _payoff_get_max_loss(premium)
+    if max_loss <= MIN_MAX_LOSS:
+        raise ValueError('Max Loss cannot be 0.0 in Payoff Odds calculation')
+
+    return sweep.kelly_derivative(premium, bet_frac, max_loss)
+
+
+def _get_bounds(bounds_dict: dict, num_points: int):
+    """
+    Gets the lower and upper bounds of the premium at every bet fraction. The bounds are
+    evaluated for every bet fraction at once, unless the caller replaced the scalar bound
+    functions but not the vector one, in which case the scalar functions are called at each bet
+    fraction
 
+    Parameters
+    ----------
+    bounds_dict : dict
+        A dict supplying the parameters to the boundary functions, with arrays containing one
+        value per bet fraction
+    num_points : int
+        The number of bet fractions
 
-def _generate_premiums(bet_fractions: np.ndarray, prob_bins: np.ndarray, bounds_dict=None):
+    Returns
+    -------
+    lower_bounds : numpy.ndarray
+        The lower bound at each bet fraction
+    upper_bounds : numpy.ndarray
+        The upper bound at each bet fraction
+    """
+    scalar_replaced = _bounds_get_low is not get_lower_bound or (
+            _bounds_get_up is not get_upper_bound)
+    if scalar_replaced and _bounds_get_vec is get_bounds_vector:
+        return (np.asarray([_bounds_get_low(bounds_dict, i) for i in range(num_points)]),
+                np.asarray([_bounds_get_up(bounds_dict, i) for i in range(num_points)]))
+
+    return _bounds_get_vec(bounds_dict, num_points=num_points)
+
+
+def _generate_premiums(bet_fractions: np.ndarray, sweep: StrikeSweep, bounds_dict=None):
     """
     Helper function to run the optimizer and generate the premium for each curve
 
@@ -125,41 +194,77 @@ def _generate_premiums(bet_fractions: np.ndarray, prob_bins: np.ndarray, bounds_
     ----------
     bet_fractions : numpy.ndarray
         The array containing the X points of the generated curves
-    prob_bins : numpy.ndarray
-        The probability values at each point
+    sweep : StrikeSweep
+        The probability bins of the expiration, configured with the payoff of the strike
 
     Returns
     -------
     opt_premiums : List[float]
         The Y values of the points on the Kelly curve
     """
+    if bounds_dict is None:
+        bounds_dict = {}
+
+    lower_bounds, upper_bounds = _get_bounds(bounds_dict, len(bet_fractions))
+
     opt_premiums = []
-    for bf_i, bf in enumerate(bet_fractions):
+    iterations = 0
+    fallbacks = 0
+    with timer('premium_solving'):
+        for bf, lower_bound, upper_bound in zip(bet_fractions, lower_bounds, upper_bounds):
+
+            try:
+                premium, result = brentq(_kelly_derivative, lower_bound, upper_bound,
+                                         args=(bf, sweep), full_output=True)
+
+                opt_premiums.append(premium)
+                iterations += result.iterations
+            except ValueError:
+                # No root between the bounds, fall back to one of the bounds
+                fallbacks += 1
+                if lower_bound < 0.0:
+                    opt_premiums.append(upper_bound)
+                else:
+                    opt_premiums.append(lower_bound)
+
+    count('premium_solves', len(opt_premiums))
+    count('brentq_iterations', iterations)
+    count('bound_fallbacks', fallbacks)
+
+    return opt_premiums
 
-        if bounds_dict is None:
-            bounds_dict = {}
 
-        lower_bound = _bounds_get_low(bounds_dict, bf_i)
-        upper_bound = _bounds_get_up(bounds_dict, bf_i)
+def _premiums_at(output: dict, bet_fractions: np.ndarray):
+    """
+    Gets the premiums of a solved curve at the bet fractions, used to constrain its neighbours
+
+    Parameters
+    ----------
+    output : dict
+        The output dict of the curve, empty if there is no curve
+    bet_fractions : numpy.ndarray
+        The bet fractions to get the premiums at
 
-        try:
-            premium = brentq(_kelly_derivative, lower_bound, upper_bound,
-                             args=(bf, prob_bins))
+    Returns
+    -------
+    premiums : numpy.ndarray
+        The premiums at the bet fractions, interpolated if the curve was solved at other bet
+        fractions. NaN if the curve has not been solved
+    """
+    if 'prem' not in output:
+        return np.full_like(bet_fractions, np.nan, dtype=float)
 
-            opt_premiums.append(premium)
-        except ValueError:
-            if lower_bound < 0.0:
-                opt_premiums.append(upper_bound)
-            else:
-                opt_premiums.append(lower_bound)
+    if np.array_equal(output['bet_fractions'], bet_fractions):
+        return np.asarray(output['prem'])
 
-    return opt_premiums
+    return np.interp(bet_fractions, output['bet_fractions'], output['prem'])
 
 
-def _generate_curves(payoff_cfg, expiration_days,
-                     bet_fractions=np.linspace(0.0, 0.9999, 50)):
+def _iter_curves(payoff_cfg, expiration_days, bet_fractions=np.linspace(0.0, 0.9999, 50)):
     """
-    Helper function to generate curves for each convolution batch
+    Helper function which generates the curves of a convolution batch one at a time, in the
+    order they are solved. The curves are solved from the last expiration to the first so that
+    each curve is solved after the curves its constraints depend on
 
     Parameters
     ----------
@@ -171,10 +276,10 @@ def _generate_curves(payoff_cfg, expiration_days,
         (Optional. Default: numpy.linspace(0, 1, 50)) The array containing the X points
         of the generated curves
 
-    Returns
-    -------
-    outputs : List[dict]
-        The List of output dicts for each curve
+    Yields
+    ------
+    output : dict
+        The output dict of each curve
     """
     # Gets the output PDFs from the convolution process
     pdf_x, pdfs_y = _conv_get()
@@ -198,17 +303,22 @@ def _generate_curves(payoff_cfg, expiration_days,
     next_exp_map = {current_exp: next_exp for current_exp, next_exp in zip(uexps, shfted_exps)}
 
     outputs = {exp: {strike: {} for strike in strikes} for exp in uexps}
+    sweep = None
+    sweep_index = None
     for day_index, (day_count, strike_payoff_cfg) in enumerate(tuple_list):
 
         strike = strike_payoff_cfg.option_legs[0]['strike']
         last_strike = last_strike_map[strike]
         next_last_strike = next_last_strike_map[strike]
 
-        # Configure the payoff and calculate the probability
+        # Configure the payoff. The probability is only calculated once for all of the strikes
+        # of an expiration
         _payoff_config(strike_payoff_cfg)
         pdf_index = uexps.index(day_count)
-        pdf_y = pdfs_y[pdf_index]
-        prob_bins = probability_from_density(pdf_x, pdf_y)
+        if pdf_index != sweep_index:
+            sweep = StrikeSweep(pdf_x, pdfs_y[pdf_index])
+            sweep_index = pdf_index
+        sweep.set_payoff(strike_payoff_cfg.total_payoff)
 
         if len(strike_payoff_cfg.option_legs) > 0:
             r = strike_payoff_cfg.option_legs[0]['r']
@@ -219,29 +329,11 @@ def _generate_curves(payoff_cfg, expiration_days,
 
         tau = day_count / 365.0
 
-        if not np.isnan(last_strike):
-            last_price_dict = outputs[day_count][last_strike]
-
-            if 'prem' not in last_price_dict:
-                last_price_curve = np.full_like(bet_fractions, np.nan)
-            else:
-                last_price_curve = last_price_dict['prem']
-        else:
-            last_price_curve = np.full_like(bet_fractions, np.nan)
-
-        if not np.isnan(next_last_strike):
-            next_last_price_dict = outputs[day_count][next_last_strike]
-
-            if 'prem' not in next_last_price_dict:
-                next_last_price_curve = np.full_like(bet_fractions, np.nan)
-            else:
-                next_last_price_curve = next_last_price_dict['prem']
-        else:
-            next_last_price_curve = np.full_like(bet_fractions, np.nan)
+        last_price_dict = outputs[day_count][last_strike] if not np.isnan(last_strike) else {}
+        next_last_price_dict = outputs[day_count][next_last_strike] if not np.isnan(
+            next_last_strike) else {}
 
         bounds_dict = {
-            'p_ii': last_price_curve,
-            'p_iii': next_last_price_curve,
             'k_i': strike,
             'k_ii': last_strike,
             'k_iii': next_last_strike,
@@ -253,37 +345,86 @@ def _generate_curves(payoff_cfg, expiration_days,
 
         if not np.isnan(next_exp_map[day_count]):
             bounds_dict['exp_tau'] = (next_exp_map[day_count] - day_count) / 365.0
-
             next_exp_dict = outputs[next_exp_map[day_count]][strike]
-
-            if 'prem' not in next_exp_dict:
-                next_exp_price_curve = np.full_like(bet_fractions, np.nan)
-            else:
-                next_exp_price_curve = next_exp_dict['prem']
-
-            bounds_dict['p_mm'] = next_exp_price_curve
         else:
-            bounds_dict['p_mm'] = np.full_like(bet_fractions, np.nan)
-
-        # Generate the premiums for the current probability and payoff
-        opt_premiums = _generate_premiums(bet_fractions, prob_bins, bounds_dict=bounds_dict)
-
-        # Fit A, B, C, D parameters to the curve
-        fit_params = _fit_curve(bet_fractions, opt_premiums,
-                                lower_bounds=(0.0, 0.0, 0.0, -100.0),
-                                upper_bounds=(100.0, 100.0, 100.0, 100.0))
+            next_exp_dict = {}
+
+        def solve_premiums(points, bounds_dict=bounds_dict, last_price_dict=last_price_dict,
+                           next_last_price_dict=next_last_price_dict,
+                           next_exp_dict=next_exp_dict, sweep=sweep):
+            # The neighbouring curves may have been solved at other bet fractions
+            bounds_dict = dict(bounds_dict, p_ii=_premiums_at(last_price_dict, points),
+                               p_iii=_premiums_at(next_last_price_dict, points),
+                               p_mm=_premiums_at(next_exp_dict, points))
+
+            # Generate the premiums for the current probability and payoff
+            return _generate_premiums(points, sweep, bounds_dict=bounds_dict)
+
+        # Solve the premiums and fit A, B, C, D parameters to the curve, starting from the fit
+        # of the previous strike, or of the same strike at the next expiration for the first
+        # strike of an expiration
+        neighbour_dict = last_price_dict or next_exp_dict
+        if _fit_curve is not fit_kelly_curve and _fit_sampled is fit_sampled_kelly_curve:
+            # The caller replaced the fit function, which fits the premiums of every bet fraction
+            points = bet_fractions
+            opt_premiums = solve_premiums(points)
+            fit_params = _fit_curve(points, opt_premiums, lower_bounds=(0.0, 0.0, 0.0, -100.0),
+                                    upper_bounds=(100.0, 100.0, 100.0, 100.0))
+        else:
+            points, opt_premiums, fit_params = _fit_sampled(
+                bet_fractions, solve_premiums, lower_bounds=(0.0, 0.0, 0.0, -100.0),
+                upper_bounds=(100.0, 100.0, 100.0, 100.0),
+                warm_start_params=neighbour_dict.get('params'))
 
         # Save the outputs
         outputs[day_count][strike] = {
             'payoff': strike_payoff_cfg,
             'exp': day_count,
             'params': fit_params,
-            'prem': opt_premiums
+            'prem': opt_premiums,
+            'bet_fractions': points
         }
 
-    outs = [outputs[exp][strike.option_legs[0]['strike']] for exp in uexps for strike in payoffs]
+        yield outputs[day_count][strike]
 
-    return outs
+
+def _generate_curves(payoff_cfg, expiration_days,
+                     bet_fractions=np.linspace(0.0, 0.9999, 50)):
+    """
+    Helper function to generate curves for each convolution batch
+
+    Parameters
+    ----------
+    payoff_cfg : List[PayoffConfig]
+        The list of PayoffConfig objects for each strike
+    expiration_days : numpy.ndarray
+        The array containing all of the expiration days
+    bet_fractions : numpy.ndarray
+        (Optional. Default: numpy.linspace(0, 1, 50)) The array containing the X points
+        of the generated curves
+
+    Returns
+    -------
+    outputs : List[dict]
+        The List of output dicts for each curve, ordered by expiration then strike
+    """
+    # The sort is stable so the strikes of each expiration keep their order
+    return sorted(_iter_curves(payoff_cfg, expiration_days, bet_fractions=bet_fractions),
+                  key=lambda output: output['exp'])
+
+
+class SolvedCurve(NamedTuple):
+    """
+    Immutable result yielded by Generator.iter_curves for each curve as soon as it is solved
+    """
+    group: int
+    """The index of the convolution group (asset and training window) of the curve"""
+    num_groups: int
+    """The total number of convolution groups in the run"""
+    row: dict
+    """The row of the curve in the curves output, see potion.curve_gen.pipeline.CurveTable"""
+    pdf_key: str
+    """The key of the PDF used to solve the curve, in the "asset-label|expiration" format"""
 
 
 class Generator:
@@ -351,35 +492,101 @@ class Generator:
             other tools
         """
         # Perform the training
-        conv_dfs, conv_configs, payoff_configs = _perform_training(*initial_guess, dist=dist,
-                                                                   payoff_dict=payoff_dict)
+        groups, conv_configs, payoff_configs = _perform_training(*initial_guess, dist=dist,
+                                                                 payoff_dict=payoff_dict)
 
         # Run each convolution batch and save the output
-        curves_df_rows = []
-        column_data = []
-        column_names = []
-        for index, (df, conv_cfg, payoff_cfg) in enumerate(zip(conv_dfs, conv_configs,
-                                                               payoff_configs)):
+        curve_table = CurveTable(bet_fractions)
+        pdf_table = PdfTable()
+        for group, conv_cfg, payoff_cfg in zip(groups, conv_configs, payoff_configs):
             # Perform the convolution process
-            exp_days = _perform_convolution(conv_cfg, df['Expiration'].values)
+            exp_days = _perform_convolution(conv_cfg, group.expirations)
 
             # Generate the Kelly curves
             outputs = _generate_curves(
                 payoff_cfg, exp_days, bet_fractions=bet_fractions)
 
             # Record the values so the output DataFrames can be built later
-            curves_df_rows.extend(add_curve_csv_rows(
-                df, outputs, conv_cfg.dist_params, bet_fractions=bet_fractions))
-            column_names, column_data = add_pdf_csv_columns(
-                exp_days, column_names, column_data, df['Asset'].values[0],
-                df['TrainingLabel'].values[0], get_pdfs_fcn=_conv_get)
+            curve_table.add_group(group, outputs)
+            pdf_table.add_group(group, exp_days, *_conv_get())
 
         # Build the output DataFrames
-        curves_df = pd.DataFrame(curves_df_rows)
-        pdf_df = pd.concat(column_data, axis=1, keys=column_names)
-        training_df = training_output_to_csv(conv_dfs)
+        return curve_table.to_frame(), pdf_table.to_frame(), training_groups_to_csv(groups)
+
+    @staticmethod
+    def iter_curves(initial_guess=(1.0, 3.5), bet_fractions=np.linspace(0.0, 0.9999, 50),
+                    dist=skewed_t, payoff_dict=None, writer=None, resume=False):
+        """
+        Generates the Kelly curves based on the current configuration, yielding each curve as
+        soon as it is solved instead of returning every curve at the end. Only the PDFs of the
+        current convolution group are held in memory.
+
+        When a writer is given, the training output is written once the training is done, and
+        the curves and PDFs of each convolution group are appended once the group is complete.
+        The files then contain the same values as the outputs of generate_curves. The iterator
+        must be consumed completely for the last group to be written.
 
-        return curves_df, pdf_df, training_df
+        Parameters
+        ----------
+        initial_guess : List[float]
+            (Optional. Default: [1.0, 3.5]) The initial guess for the distribution parameters in
+            the optimizer during the training process
+        bet_fractions : numpy.ndarray
+            (Optional. Default: 50 points) The X-values to use as the points for the Kelly curves
+        dist : scipy.stats.rv_continuous
+            (Optional. Default: skewed_t) The probability distribution to use during the training
+            process
+        payoff_dict : dict
+            (Optional. Default: None) The payoff dict specifying the info used to calculate the
+            curves. See generate_curves
+        writer : CurveOutputWriter
+            (Optional. Default: None) Writes the outputs incrementally, see
+            potion.curve_gen.batch_output
+        resume : bool
+            (Optional. Default: False) Skip the convolution groups which the writer already
+            completed in a previous run. Requires a writer
+
+        Yields
+        ------
+        curve : SolvedCurve
+            The solved curve, with the index of its convolution group, its row in the curves
+            output and the key of its PDF
+        """
+        # Perform the training
+        groups, conv_configs, payoff_configs = _perform_training(*initial_guess, dist=dist,
+                                                                 payoff_dict=payoff_dict)
+        group_keys = [create_key(group.asset, group.label) for group in groups]
+
+        completed_groups = 0
+        if writer is not None:
+            completed_groups = writer.start(training_groups_to_csv(groups), group_keys,
+                                            resume=resume)
+
+        for index, (group, conv_cfg, payoff_cfg) in enumerate(zip(groups, conv_configs,
+                                                                  payoff_configs)):
+            if index < completed_groups:
+                continue
+
+            # Perform the convolution process
+            exp_days = _perform_convolution(conv_cfg, group.expirations)
+
+            # Yield each Kelly curve as it is solved
+            outputs = []
+            for output in _iter_curves(payoff_cfg, exp_days, bet_fractions=bet_fractions):
+                outputs.append(output)
+                curve = CurveTable(bet_fractions)
+                curve.add_group(group, [output])
+                yield SolvedCurve(index, len(groups), curve.row(0),
+                                  group_keys[index] + '|' + str(output['exp']))
+
+            if writer is not None:
+                outputs.sort(key=lambda output: output['exp'])
+                curve_table = CurveTable(bet_fractions)
+                curve_table.add_group(group, outputs)
+                pdf_table = PdfTable()
+                pdf_table.add_group(group, exp_days, *_conv_get())
+                writer.write_group(curve_table.to_frame(), pdf_table.prices,
+                                   pdf_table.to_dict())
 
 
 # Define a Global object with default values to be configured by the module user
@@ -389,3 +596,4 @@ _gen = Generator()
 # programmers alike
 configure_curve_gen = _gen.configure_curve_gen
 generate_curves = _gen.generate_curves
+iter_curves = _gen.iter_curves
@@ -67,14 +67,11 @@ def probability_from_density(sample_points: np.ndarray, probability: np.ndarray)
     prob_bins : numpy.ndarray
         The probability in each bin
     """
-    # Iterate over the PDF and calculate the probability in each bin
+    # Trapezoidal rule on every bin at once, the sample points do not need to be uniform
+    sample_points = np.asarray(sample_points)
     prob_bins = np.full_like(probability, 0.0)
-    for i in range(sample_points.size - 1):
-        point = sample_points[i]
-        next_point = sample_points[i + 1]
-        prob = probability[i]
-        next_prob = probability[i + 1]
-        prob_bins[i + 1] = trapezoidal_rule(point, prob, next_point, next_prob)
+    prob_bins[1:] = trapezoidal_rule(sample_points[:-1], probability[:-1], sample_points[1:],
+                                     probability[1:])
 
     return prob_bins
 
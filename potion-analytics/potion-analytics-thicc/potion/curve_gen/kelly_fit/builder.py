@@ -15,6 +15,17 @@ class FitConfig(NamedTuple):
 
     fit_type: str
     """The string identifying which function will be fit to the points of the Kelly curve"""
+    warm_start: bool = True
+    """Whether each fit starts from the parameters of the previous fit (i.e. the previous strike)
+    instead of the default initial guess"""
+    adaptive_sampling: bool = False
+    """Whether the premiums are solved on a coarse subset of the bet fractions which is refined
+    where the fit needs more points, instead of at every bet fraction"""
+    initial_points: int = 9
+    """The number of bet fractions in the coarse subset when sampling adaptively"""
+    sampling_tolerance: float = 5e-3
+    """The error, relative to the largest premium, allowed between the fit and the solved
+    premiums before the subset is refined when sampling adaptively"""
 
     def __eq__(self, other):
         """
@@ -30,7 +41,10 @@ class FitConfig(NamedTuple):
         is_equal : bool
             True if the two objects are equal, False otherwise
         """
-        return self.fit_type == other.fit_type
+        return self.fit_type == other.fit_type and self.warm_start == other.warm_start and (
+                self.adaptive_sampling == other.adaptive_sampling) and (
+                self.initial_points == other.initial_points) and (
+                self.sampling_tolerance == other.sampling_tolerance)
 
 
 class FitConfigBuilder:
@@ -44,6 +58,10 @@ class FitConfigBuilder:
         Constructor initializes the builder with default values
         """
         self.fit_type = 'COSH'
+        self.warm_start = True
+        self.adaptive_sampling = False
+        self.initial_points = 9
+        self.sampling_tolerance = 5e-3
 
     def set_fit_type(self, fit_type: str):
         """
@@ -64,6 +82,53 @@ class FitConfigBuilder:
         self.fit_type = fit_type
         return self
 
+    def set_warm_start(self, warm_start: bool):
+        """
+        Sets whether each fit starts from the parameters of the previous fit. Neighbouring strikes
+        and expirations have nearly identical parameters so this reduces the number of
+        iterations of the optimizer
+
+        Parameters
+        ----------
+        warm_start : bool
+            Whether to warm start the fits
+
+        Returns
+        -------
+        self : FitConfigBuilder
+            This object following the builder pattern
+        """
+        self.warm_start = warm_start
+        return self
+
+    def set_adaptive_sampling(self, adaptive_sampling: bool, initial_points=9,
+                              sampling_tolerance=5e-3):
+        """
+        Sets whether the premiums are solved at a subset of the bet fractions. The premiums are
+        first solved on a coarse subset, then the subset is refined where the curvature of the
+        fit exceeds the tolerance, until the fit stops changing. The bet fractions passed to the
+        generator are the finest points which can be chosen
+
+        Parameters
+        ----------
+        adaptive_sampling : bool
+            Whether to sample the bet fractions adaptively
+        initial_points : int
+            (Optional. Default: 9) The number of bet fractions in the coarse subset
+        sampling_tolerance : float
+            (Optional. Default: 5e-3) The error allowed between the fit and the premiums,
+            relative to the largest premium
+
+        Returns
+        -------
+        self : FitConfigBuilder
+            This object following the builder pattern
+        """
+        self.adaptive_sampling = adaptive_sampling
+        self.initial_points = initial_points
+        self.sampling_tolerance = sampling_tolerance
+        return self
+
     def build_config(self):
         """
         Creates an immutable FitConfig object from the currently configured builder
@@ -73,4 +138,5 @@ class FitConfigBuilder:
         config : FitConfig
             The immutable configuration object
         """
-        return FitConfig(self.fit_type)
+        return FitConfig(self.fit_type, self.warm_start, self.adaptive_sampling,
+                         self.initial_points, self.sampling_tolerance)
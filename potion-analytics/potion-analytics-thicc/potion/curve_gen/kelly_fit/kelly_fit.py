@@ -13,19 +13,213 @@ three duck typed functions:
     fit_kelly_curve(ndarray, ndarray)
         'Fits a function to the X and Y points of the Kelly curve'
 
+The built-in models (EXP, POLY, COSH) are fit with their analytic Jacobians. By default a fit is
+warm started from the parameters of a neighbouring fit given by the caller, e.g. the previous
+strike, since neighbouring strikes and expirations have nearly identical parameters. The fits do
+not depend on the fits made before them. Many curves can also be fit at once with
+fit_kelly_curves, which stacks their least squares problems. The number of evaluations and the
+residuals of the last MAX_FIT_STATS fits are recorded and can be retrieved with get_fit_stats().
+
+The Generator solves and fits each curve with fit_sampled_kelly_curve, which can sample the bet
+fractions adaptively so that fewer premiums are solved where the curve is nearly straight.
+
 Like many python libraries, this module uses a global object with the methods prebound so that
 the same library can be used by object-oriented and functional programmers alike. Object-oriented
 users can use the KellyFit class, and functional programmers can use the functions
 described above.
 """
+from collections import deque
+
 import numpy as np
-from scipy.optimize import curve_fit
+import pandas as pd
+from scipy.optimize import least_squares
 
+from potion.instrumentation import timer, count
 from potion.curve_gen.kelly_fit.builder import FitConfig, FitConfigBuilder
 
+MAX_FIT_STATS = 100000
+
+
+def _exp_model(t, a, b, c):
+    """
+    The exponential model a * exp(b * t) + c
+    """
+    return a * np.exp(b * t) + c
+
+
+def _exp_jacobian(t, a, b, c):
+    """
+    The Jacobian of the exponential model with respect to (a, b, c)
+    """
+    exp_bt = np.exp(b * t)
+    return np.stack((exp_bt, a * t * exp_bt, np.ones_like(t)), axis=-1)
+
+
+def _poly_model(t, a, b, c, d):
+    """
+    The polynomial model a * t^3 + b * t^2 + c * t + d
+    """
+    return a * t ** 3 + b * t ** 2 + c * t + d
+
+
+def _poly_jacobian(t, a, b, c, d):
+    """
+    The Jacobian of the polynomial model with respect to (a, b, c, d)
+    """
+    return np.stack((t ** 3, t ** 2, t, np.ones_like(t)), axis=-1)
+
+
+def _cosh_model(t, a, b, c, d):
+    """
+    The cosh model a * t * cosh(b * t^c) + d
+    """
+    return a * t * np.cosh(b * (t ** c)) + d
+
+
+def _cosh_jacobian(t, a, b, c, d):
+    """
+    The Jacobian of the cosh model with respect to (a, b, c, d)
+    """
+    t_c = t ** c
+    sinh_term = a * t * np.sinh(b * t_c) * t_c
+
+    # t^c * ln(t) goes to zero at t = 0
+    log_t = np.log(np.where(t > 0.0, t, 1.0))
+    return np.stack((t * np.cosh(b * t_c), sinh_term, sinh_term * b * log_t, np.ones_like(t)),
+                    axis=-1)
+
+
+def _initialize_feasible(lower_bounds: np.ndarray, upper_bounds: np.ndarray):
+    """
+    Creates the default initial guess of the optimizer, matching scipy.optimize.curve_fit. The
+    guess is the middle of the bounds, or 1 away from a one sided bound, or 1 if unbounded
+
+    Parameters
+    ----------
+    lower_bounds : numpy.ndarray
+        The lower bounds on each of the parameters
+    upper_bounds : numpy.ndarray
+        The upper bounds on each of the parameters
+
+    Returns
+    -------
+    initial_guess : numpy.ndarray
+        The initial guess of each parameter
+    """
+    initial_guess = np.ones_like(lower_bounds)
+    lower_finite = np.isfinite(lower_bounds)
+    upper_finite = np.isfinite(upper_bounds)
+
+    both = lower_finite & upper_finite
+    initial_guess[both] = 0.5 * (lower_bounds[both] + upper_bounds[both])
+    initial_guess[lower_finite & ~upper_finite] = lower_bounds[lower_finite & ~upper_finite] + 1
+    initial_guess[~lower_finite & upper_finite] = upper_bounds[~lower_finite & upper_finite] - 1
+
+    return initial_guess
+
+
+def _initial_guess(initial_guess, lower_bounds: np.ndarray, upper_bounds: np.ndarray):
+    """
+    Gets the initial guess of the optimizer, clipped inside of the bounds
+
+    Parameters
+    ----------
+    initial_guess : List[float]
+        The initial guess, for example the parameters of the previous fit. None to use the default
+    lower_bounds : numpy.ndarray
+        The lower bounds on each of the parameters
+    upper_bounds : numpy.ndarray
+        The upper bounds on each of the parameters
+
+    Returns
+    -------
+    initial_guess : numpy.ndarray
+        The feasible initial guess
+    """
+    if initial_guess is None or len(initial_guess) != len(lower_bounds):
+        return _initialize_feasible(lower_bounds, upper_bounds)
+
+    return np.clip(np.asarray(initial_guess, dtype=float), lower_bounds, upper_bounds)
+
+
+def _fit_model(model, jacobian, bet_fractions: np.ndarray, premiums: np.ndarray, maxfev,
+               lower_bounds, upper_bounds, initial_guess=None, fit_info=None):
+    """
+    Fits the model to the data points of the Kelly curve by least squares with the analytic
+    Jacobian of the model. This is the same trust region reflective method used by
+    scipy.optimize.curve_fit when bounds are given
+
+    Parameters
+    ----------
+    model : Callable
+        The model function f(t, *params)
+    jacobian : Callable
+        The Jacobian of the model function J(t, *params) with one column per parameter
+    bet_fractions : numpy.ndarray
+        The bet fractions which are the X points on the Kelly curve
+    premiums : numpy.ndarray
+        The premiums which are the Y points on the Kelly curve
+    maxfev : int
+        The max function evaluations of the optimizer
+    lower_bounds : Tuple[float]
+        The lower bounds on each of the parameters in the optimizer
+    upper_bounds : Tuple[float]
+        The upper bounds on each of the parameters in the optimizer
+    initial_guess : List[float]
+        (Optional. Default: None) The initial guess of the optimizer. If the fit does not
+        converge from it, the fit is repeated from the default initial guess
+    fit_info : dict
+        (Optional. Default: None) If provided, it is updated with the number of function and
+        Jacobian evaluations, the cost and the RMS residual of the fit
+
+    Raises
+    ------
+    RuntimeError
+        If the optimizer does not converge
+
+    Returns
+    -------
+    params : numpy.ndarray
+        The list of parameters of the function fit to the Kelly curve
+    """
+    t = np.asarray(bet_fractions, dtype=float)
+    y = np.asarray(premiums, dtype=float)
+    lower_bounds = np.asarray(lower_bounds, dtype=float)
+    upper_bounds = np.asarray(upper_bounds, dtype=float)
+
+    result = least_squares(lambda params: model(t, *params) - y,
+                           _initial_guess(initial_guess, lower_bounds, upper_bounds),
+                           jac=lambda params: jacobian(t, *params),
+                           bounds=(lower_bounds, upper_bounds), method='trf', max_nfev=maxfev)
+    warm_start = initial_guess is not None
+
+    if not result.success and warm_start:
+        result = least_squares(lambda params: model(t, *params) - y,
+                               _initialize_feasible(lower_bounds, upper_bounds),
+                               jac=lambda params: jacobian(t, *params),
+                               bounds=(lower_bounds, upper_bounds), method='trf',
+                               max_nfev=maxfev)
+        warm_start = False
+
+    if fit_info is not None:
+        fit_info.update({
+            'nfev': result.nfev,
+            'njev': result.njev,
+            'cost': result.cost,
+            'rms_residual': np.sqrt(np.mean(result.fun ** 2)),
+            'status': result.status,
+            'warm_start': warm_start
+        })
+
+    if not result.success:
+        raise RuntimeError('Optimal parameters not found: ' + result.message)
+
+    return result.x
+
 
 def _fit_exp(bet_fractions: np.ndarray, premiums: np.ndarray, maxfev=100000,
-             lower_bounds=(0.0, 0.0, 0.0), upper_bounds=(np.inf, np.inf, np.inf)):
+             lower_bounds=(0.0, 0.0, 0.0), upper_bounds=(np.inf, np.inf, np.inf),
+             initial_guess=None, fit_info=None):
     """
     Fits an exponential function to the data points of the Kelly curve
 
@@ -43,20 +237,24 @@ def _fit_exp(bet_fractions: np.ndarray, premiums: np.ndarray, maxfev=100000,
     upper_bounds : Tuple[float]
         (Optional. Default: (inf, inf, inf)) The upper bounds on each of the parameters
         in the optimizer
+    initial_guess : List[float]
+        (Optional. Default: None) The initial guess of the optimizer, e.g. the previous fit
+    fit_info : dict
+        (Optional. Default: None) Updated with the instrumentation of the fit
 
     Returns
     -------
     params : List[float]
         The list of parameters of the function fit to the Kelly curve
     """
-    fit_params, fit_cov = curve_fit(lambda t, a, b, c:
-                                    a * np.exp(b * t) + c, bet_fractions, premiums,
-                                    maxfev=maxfev, bounds=(lower_bounds, upper_bounds))
-    return fit_params
+    return _fit_model(_exp_model, _exp_jacobian, bet_fractions, premiums, maxfev,
+                      lower_bounds[:3], upper_bounds[:3], initial_guess=initial_guess,
+                      fit_info=fit_info)
 
 
 def _fit_poly(bet_fractions: np.ndarray, premiums: np.ndarray, maxfev=100000,
-              lower_bounds=(0.0, 0.0, 0.0, 0.0), upper_bounds=(np.inf, np.inf, np.inf, np.inf)):
+              lower_bounds=(0.0, 0.0, 0.0, 0.0), upper_bounds=(np.inf, np.inf, np.inf, np.inf),
+              initial_guess=None, fit_info=None):
     """
     Fits an polynomial function to the data points of the Kelly curve
 
@@ -74,21 +272,47 @@ def _fit_poly(bet_fractions: np.ndarray, premiums: np.ndarray, maxfev=100000,
     upper_bounds : Tuple[float]
         (Optional. Default: (inf, inf, inf, inf)) The upper bounds on each of the parameters
         in the optimizer
+    initial_guess : List[float]
+        (Optional. Default: None) The initial guess of the optimizer, e.g. the previous fit
+    fit_info : dict
+        (Optional. Default: None) Updated with the instrumentation of the fit
 
     Returns
     -------
     params : List[float]
         The list of parameters of the function fit to the Kelly curve
     """
-    fit_params, fit_cov = curve_fit(lambda t, a, b, c, d:
-                                    a * t ** 3 + b * t ** 2 + c * t + d,
-                                    bet_fractions, premiums, maxfev=maxfev,
-                                    bounds=(lower_bounds, upper_bounds))
-    return fit_params
+    return _fit_model(_poly_model, _poly_jacobian, bet_fractions, premiums, maxfev,
+                      lower_bounds, upper_bounds, initial_guess=initial_guess, fit_info=fit_info)
+
+
+def _cosh_bounds(premiums: np.ndarray, lower_bounds, upper_bounds):
+    """
+    The D parameter of the cosh fit is bounded below by the premium at a bet fraction of zero
+
+    Parameters
+    ----------
+    premiums : numpy.ndarray
+        The premiums which are the Y points on the Kelly curve
+    lower_bounds : Tuple[float]
+        The lower bounds on each of the parameters
+    upper_bounds : Tuple[float]
+        The upper bounds on each of the parameters
+
+    Returns
+    -------
+    lower_bounds : Tuple[float]
+        The lower bounds with the bound on D replaced
+    upper_bounds : Tuple[float]
+        The upper bounds
+    """
+    min_d = premiums[0]
+    return (lower_bounds[0], lower_bounds[1], lower_bounds[2], min_d), upper_bounds
 
 
 def _fit_cosh(bet_fractions: np.ndarray, premiums: np.ndarray, maxfev=100000,
-              lower_bounds=(0.0, 0.0, 0.0, 0.0), upper_bounds=(100.0, 100.0, 100.0, 100.0)):
+              lower_bounds=(0.0, 0.0, 0.0, 0.0), upper_bounds=(100.0, 100.0, 100.0, 100.0),
+              initial_guess=None, fit_info=None):
     """
     Fits a cosh function to the data points of the Kelly curve
 
@@ -106,20 +330,153 @@ def _fit_cosh(bet_fractions: np.ndarray, premiums: np.ndarray, maxfev=100000,
     upper_bounds : Tuple[float]
         (Optional. Default: (100.0, 100.0, 100.0, 100.0)) The upper bounds on each of the parameters
         in the optimizer
+    initial_guess : List[float]
+        (Optional. Default: None) The initial guess of the optimizer, e.g. the previous fit
+    fit_info : dict
+        (Optional. Default: None) Updated with the instrumentation of the fit
 
     Returns
     -------
     params : List[float]
         The list of parameters of the function fit to the Kelly curve
     """
-    min_d = premiums[0]
-    lower_bounds = (lower_bounds[0], lower_bounds[1], lower_bounds[2], min_d)
-    fit_params, fit_cov = curve_fit(lambda t, a, b, c, d:
-                                    a * t * np.cosh(b * (t ** c)) + d,
-                                    bet_fractions, premiums, maxfev=maxfev,
-                                    bounds=(lower_bounds, upper_bounds))
+    lower_bounds, upper_bounds = _cosh_bounds(premiums, lower_bounds, upper_bounds)
+    return _fit_model(_cosh_model, _cosh_jacobian, bet_fractions, premiums, maxfev,
+                      lower_bounds, upper_bounds, initial_guess=initial_guess, fit_info=fit_info)
 
-    return fit_params
+
+def _identity_bounds(premiums: np.ndarray, lower_bounds, upper_bounds):
+    """
+    Returns the bounds unchanged, for the models without data dependent bounds
+    """
+    return lower_bounds, upper_bounds
+
+
+def _fit_batch(model, jacobian, bounds_func, bet_fractions_list, premiums_list, maxfev,
+               lower_bounds, upper_bounds, initial_guesses=None, num_params=4, ftol=1e-8,
+               xtol=1e-8):
+    """
+    Fits the model to many Kelly curves at once. The curves are padded into 2-D arrays and a
+    projected Levenberg-Marquardt iteration is run on all of them in lockstep: each iteration
+    solves the stacked normal equations of every curve with one batched linear solve, and each
+    curve keeps its own damping and stops independently
+
+    Parameters
+    ----------
+    model : Callable
+        The model function f(t, *params), broadcasting over the curves
+    jacobian : Callable
+        The Jacobian of the model function J(t, *params), broadcasting over the curves
+    bounds_func : Callable
+        The function adjusting the bounds for each curve, e.g. _cosh_bounds
+    bet_fractions_list : List[numpy.ndarray]
+        The bet fractions of each curve
+    premiums_list : List[numpy.ndarray]
+        The premiums of each curve
+    maxfev : int
+        The max number of iterations
+    lower_bounds : Tuple[float]
+        The lower bounds on each of the parameters of one curve
+    upper_bounds : Tuple[float]
+        The upper bounds on each of the parameters of one curve
+    initial_guesses : List[List[float]]
+        (Optional. Default: None) The initial guess of each curve
+    num_params : int
+        (Optional. Default: 4) The number of parameters of the model
+    ftol : float
+        (Optional. Default: 1e-8) The relative reduction of the cost at which a curve stops
+    xtol : float
+        (Optional. Default: 1e-8) The relative step size at which a curve stops
+
+    Returns
+    -------
+    params : List[numpy.ndarray]
+        The parameters fit to each curve
+    fit_info : dict
+        The number of iterations, cost, RMS residual and status of each curve, and whether the
+        fit of each curve converged. The caller has to check the success of each curve
+    """
+    num_curves = len(premiums_list)
+    num_points = max(len(y) for y in premiums_list)
+    if initial_guesses is None:
+        initial_guesses = [None] * num_curves
+
+    t = np.zeros((num_curves, num_points))
+    y = np.zeros((num_curves, num_points))
+    weights = np.zeros((num_curves, num_points))
+    lower = np.zeros((num_curves, num_params))
+    upper = np.zeros((num_curves, num_params))
+    params = np.zeros((num_curves, num_params))
+    for i, (bet_fractions, premiums, guess) in enumerate(zip(bet_fractions_list, premiums_list,
+                                                             initial_guesses)):
+        size = len(premiums)
+        t[i, :size] = bet_fractions
+        y[i, :size] = premiums
+        weights[i, :size] = 1.0
+
+        curve_lower, curve_upper = bounds_func(premiums, lower_bounds[:num_params],
+                                               upper_bounds[:num_params])
+        lower[i], upper[i] = curve_lower, curve_upper
+        params[i] = _initial_guess(guess, lower[i], upper[i])
+
+    def residuals(p):
+        return (model(t, *p.T[:, :, np.newaxis]) - y) * weights
+
+    res = residuals(params)
+    cost = 0.5 * np.sum(res ** 2, axis=1)
+    damping = np.full(num_curves, 1e-3)
+    active = np.ones(num_curves, dtype=bool)
+    iterations = np.zeros(num_curves, dtype=int)
+
+    for _ in range(maxfev):
+        if not np.any(active):
+            break
+
+        jac = np.nan_to_num(jacobian(t, *params.T[:, :, np.newaxis]) * weights[:, :, np.newaxis])
+        gradient = np.einsum('kni,kn->ki', jac, res)
+
+        # Parameters on a bound with the gradient pointing out of the bounds are held fixed
+        fixed = ((params <= lower) & (gradient > 0.0)) | ((params >= upper) & (gradient < 0.0))
+        jac = jac * ~fixed[:, np.newaxis, :]
+        gradient = gradient * ~fixed
+        jtj = np.einsum('kni,knj->kij', jac, jac)
+
+        scaling = np.diagonal(jtj, axis1=1, axis2=2) + 1e-12
+        system = jtj + damping[:, np.newaxis, np.newaxis] * (
+                scaling[:, :, np.newaxis] * np.eye(num_params))
+        # Scale the system to a unit diagonal before the pseudo inverse, the columns of the
+        # Jacobian differ by many orders of magnitude far from the optimum
+        inv_sqrt_diag = 1.0 / np.sqrt(np.diagonal(system, axis1=1, axis2=2))
+        scaled_system = system * inv_sqrt_diag[:, :, np.newaxis] * inv_sqrt_diag[:, np.newaxis, :]
+        step = -inv_sqrt_diag * np.einsum('kij,kj->ki', np.linalg.pinv(scaled_system),
+                                          gradient * inv_sqrt_diag)
+
+        new_params = np.clip(params + step, lower, upper)
+        new_res = residuals(new_params)
+        new_cost = 0.5 * np.sum(new_res ** 2, axis=1)
+
+        improved = active & (new_cost < cost)
+        step_size = np.linalg.norm(new_params - params, axis=1)
+        small_step = improved & (step_size <= xtol * (xtol + np.linalg.norm(params, axis=1)))
+        small_reduction = improved & (cost - new_cost <= ftol * cost)
+
+        params[improved] = new_params[improved]
+        res[improved] = new_res[improved]
+        cost[improved] = new_cost[improved]
+        iterations[active] += 1
+
+        damping = np.where(improved, damping / 3.0, damping * 2.0)
+        active &= ~(small_step | small_reduction | (damping > 1e16))
+
+    fit_info = {
+        'nfev': iterations,
+        'cost': cost,
+        'rms_residual': np.sqrt(np.sum(res ** 2, axis=1) / np.sum(weights, axis=1)),
+        'status': np.where(active, 0, 1),
+        'success': ~active & np.isfinite(cost)
+    }
+
+    return list(params), fit_info
 
 
 # Define a lookup table so we can switch functions based on the config
@@ -129,6 +486,14 @@ fit_function_table = {
     'COSH': _fit_cosh
 }
 
+# The models, analytic Jacobians, bound adjustments and parameter counts of the built-in fit
+# functions, used in batched mode
+fit_model_table = {
+    _fit_exp: (_exp_model, _exp_jacobian, _identity_bounds, 3),
+    _fit_poly: (_poly_model, _poly_jacobian, _identity_bounds, 4),
+    _fit_cosh: (_cosh_model, _cosh_jacobian, _cosh_bounds, 4)
+}
+
 
 class KellyFit:
     """
@@ -147,6 +512,7 @@ class KellyFit:
         """
         self.config = config
         self.fit_func = fit_function_table[self.config.fit_type]
+        self.fit_stats = deque(maxlen=MAX_FIT_STATS)
 
     def configure(self, config: FitConfig):
         """
@@ -164,9 +530,50 @@ class KellyFit:
         self.config = config
         self.fit_func = fit_function_table[self.config.fit_type]
 
+    def get_fit_stats(self):
+        """
+        Gets the instrumentation recorded for each fit since the stats were last cleared. Only
+        the last MAX_FIT_STATS fits are kept
+
+        Returns
+        -------
+        stats_df : pandas.DataFrame
+            One row per fit with the number of function and Jacobian evaluations, the cost, the
+            RMS residual, the optimizer status and whether the fit was warm started
+        """
+        return pd.DataFrame(self.fit_stats)
+
+    def clear_fit_stats(self):
+        """
+        Clears the recorded instrumentation
+
+        Returns
+        -------
+        None
+        """
+        self.fit_stats.clear()
+
+    @staticmethod
+    def _get_range_to_use(premiums: np.ndarray):
+        """
+        Gets the index of the last non-zero premium, the points after it are not fit
+
+        Parameters
+        ----------
+        premiums : numpy.ndarray
+            The premiums which are the Y points on the Kelly curve
+
+        Returns
+        -------
+        range_to_use : int
+            The index of the last point to fit
+        """
+        return np.where((np.asarray(premiums) > 1e-10) | (np.asarray(premiums) < -1e-10))[0][-1]
+
     def fit_kelly_curve(self, bet_fractions: np.ndarray, premiums: np.ndarray, maxfev=100000,
                         lower_bounds=(0.0, 0.0, 0.0, 0.0),
-                        upper_bounds=(100.0, 100.0, 100.0, 100.0)):
+                        upper_bounds=(100.0, 100.0, 100.0, 100.0), initial_guess=None,
+                        warm_start_params=None):
         """
         Fits the currently configured function to the data points of the Kelly curve
 
@@ -184,17 +591,308 @@ class KellyFit:
         upper_bounds : Tuple[float]
             (Optional. Default: (100.0, 100.0, 100.0, 100.0)) The upper bounds on each of the
             parameters in the optimizer
+        initial_guess : List[float]
+            (Optional. Default: None) The initial guess of the optimizer
+        warm_start_params : List[float]
+            (Optional. Default: None) The parameters of a neighbouring fit, e.g. the previous
+            strike, used as the initial guess if warm starting is enabled in the config and no
+            initial guess is given
+
+        Raises
+        ------
+        RuntimeError
+            If the optimizer does not converge
+
+        Returns
+        -------
+        params : List[float]
+            The list of parameters of the function fit to the Kelly curve
+        """
+        if initial_guess is None and self.config.warm_start:
+            initial_guess = warm_start_params
+
+        fit_info = {}
+        params = self._fit(bet_fractions, premiums, maxfev, lower_bounds, upper_bounds,
+                           initial_guess, fit_info)
+        self._record_fit(fit_info)
+
+        return params
+
+    def _fit(self, bet_fractions: np.ndarray, premiums: np.ndarray, maxfev, lower_bounds,
+             upper_bounds, initial_guess, fit_info: dict):
+        """
+        Fits the currently configured function to the points of the Kelly curve up to the last
+        non-zero premium, without recording the fit
+
+        Parameters
+        ----------
+        bet_fractions : numpy.ndarray
+            The bet fractions which are the X points on the Kelly curve
+        premiums : numpy.ndarray
+            The premiums which are the Y points on the Kelly curve
+        maxfev : int
+            The max function evaluations of the optimizer
+        lower_bounds : Tuple[float]
+            The lower bounds on each of the parameters in the optimizer
+        upper_bounds : Tuple[float]
+            The upper bounds on each of the parameters in the optimizer
+        initial_guess : List[float]
+            The initial guess of the optimizer, None for the default
+        fit_info : dict
+            Updated with the instrumentation of the fit, see _record_fit
 
         Returns
         -------
         params : List[float]
             The list of parameters of the function fit to the Kelly curve
         """
-        range_to_use = np.where((np.asarray(
-            premiums) > 1e-10) | (np.asarray(premiums) < -1e-10))[0][-1]
+        range_to_use = self._get_range_to_use(premiums)
+
+        with timer('fitting'):
+            params = self.fit_func(bet_fractions[:range_to_use+1], premiums[:range_to_use+1],
+                                   maxfev=maxfev, lower_bounds=lower_bounds,
+                                   upper_bounds=upper_bounds, initial_guess=initial_guess,
+                                   fit_info=fit_info)
+
+        if fit_info:
+            fit_info['points'] = range_to_use + 1
+            count('fit_nfev', fit_info['nfev'])
+
+        return params
 
-        return self.fit_func(bet_fractions[:range_to_use+1], premiums[:range_to_use+1],
-                             maxfev=maxfev, lower_bounds=lower_bounds, upper_bounds=upper_bounds)
+    def _record_fit(self, fit_info: dict):
+        """
+        Records the instrumentation of a fit. Custom fit functions may not provide any
+
+        Parameters
+        ----------
+        fit_info : dict
+            The instrumentation of the fit
+
+        Returns
+        -------
+        None
+        """
+        if fit_info:
+            self.fit_stats.append(fit_info)
+
+    def fit_kelly_curves(self, bet_fractions: np.ndarray, premiums_list, maxfev=100000,
+                         lower_bounds=(0.0, 0.0, 0.0, 0.0),
+                         upper_bounds=(100.0, 100.0, 100.0, 100.0), initial_guesses=None,
+                         warm_start_params=None):
+        """
+        Fits the currently configured function to many Kelly curves at once, solving the stacked
+        least squares problems of every curve in lockstep (see _fit_batch). The curves which do
+        not converge in lockstep are fit again on their own. Custom fit functions without an
+        entry in fit_model_table are fit one curve at a time
+
+        Parameters
+        ----------
+        bet_fractions : numpy.ndarray
+            The bet fractions which are the X points shared by the Kelly curves
+        premiums_list : List[numpy.ndarray]
+            The premiums which are the Y points of each Kelly curve
+        maxfev : int
+            (Optional. Default: 100000) The max function evaluations of the optimizer
+        lower_bounds : Tuple[float]
+            (Optional. Default: (0.0, 0.0, 0.0, 0.0)) The lower bounds on each of the parameters
+            in the optimizer
+        upper_bounds : Tuple[float]
+            (Optional. Default: (100.0, 100.0, 100.0, 100.0)) The upper bounds on each of the
+            parameters in the optimizer
+        initial_guesses : List[List[float]]
+            (Optional. Default: None) The initial guess of each curve. By default every curve
+            starts from warm_start_params if warm starting is enabled in the config, otherwise
+            from a fit of the first curve on its own
+        warm_start_params : List[float]
+            (Optional. Default: None) The parameters of a neighbouring fit to start from, e.g.
+            the previous strike
+
+        Raises
+        ------
+        RuntimeError
+            If the fit of a curve does not converge
+
+        Returns
+        -------
+        params : List[List[float]]
+            The list of parameters of the function fit to each Kelly curve
+        """
+        if self.fit_func not in fit_model_table:
+            # Each curve is warm started from the curve before it
+            params = []
+            for premiums in premiums_list:
+                warm_start_params = self.fit_kelly_curve(
+                    bet_fractions, premiums, maxfev=maxfev, lower_bounds=lower_bounds,
+                    upper_bounds=upper_bounds, warm_start_params=warm_start_params)
+                params.append(warm_start_params)
+            return params
+
+        ranges = [self._get_range_to_use(premiums) + 1 for premiums in premiums_list]
+        if initial_guesses is None:
+            # The lockstep iteration needs a good starting point, fit one curve on its own and
+            # start every curve from it
+            guess = warm_start_params if self.config.warm_start else None
+            if guess is None:
+                guess = self.fit_kelly_curve(bet_fractions, premiums_list[0], maxfev=maxfev,
+                                             lower_bounds=lower_bounds,
+                                             upper_bounds=upper_bounds, initial_guess=None)
+            initial_guesses = [guess] * len(premiums_list)
+
+        model, jacobian, bounds_func, num_params = fit_model_table[self.fit_func]
+        with timer('fitting'):
+            params, fit_info = _fit_batch(
+                model, jacobian, bounds_func,
+                [bet_fractions[:range_to_use] for range_to_use in ranges],
+                [np.asarray(premiums)[:range_to_use]
+                 for premiums, range_to_use in zip(premiums_list, ranges)],
+                maxfev, lower_bounds, upper_bounds, initial_guesses=initial_guesses,
+                num_params=num_params)
+
+        count('fit_nfev', int(np.sum(fit_info['nfev'])))
+
+        for i, range_to_use in enumerate(ranges):
+            if fit_info['success'][i]:
+                self._record_fit({
+                    'nfev': fit_info['nfev'][i],
+                    'cost': fit_info['cost'][i],
+                    'rms_residual': fit_info['rms_residual'][i],
+                    'status': fit_info['status'][i],
+                    'warm_start': True,
+                    'points': range_to_use,
+                    'batch': True
+                })
+            else:
+                # Fit the curve on its own from the default initial guess, which raises if it
+                # does not converge either
+                params[i] = self.fit_kelly_curve(bet_fractions, premiums_list[i], maxfev=maxfev,
+                                                 lower_bounds=lower_bounds,
+                                                 upper_bounds=upper_bounds, initial_guess=None)
+
+        return params
+
+    def predict_kelly_curve(self, bet_fractions: np.ndarray, params):
+        """
+        Evaluates the currently configured function at the bet fractions
+
+        Parameters
+        ----------
+        bet_fractions : numpy.ndarray
+            The bet fractions which are the X points on the Kelly curve
+        params : List[float]
+            The parameters of the function, as returned by fit_kelly_curve
+
+        Raises
+        ------
+        KeyError
+            If the configured function is a custom fit function without a model in
+            fit_model_table
+
+        Returns
+        -------
+        premiums : numpy.ndarray
+            The premiums of the fit at the bet fractions
+        """
+        model = fit_model_table[self.fit_func][0]
+        return model(np.asarray(bet_fractions, dtype=float), *params)
+
+    def fit_sampled_kelly_curve(self, bet_fractions: np.ndarray, solve_premiums, maxfev=100000,
+                                lower_bounds=(0.0, 0.0, 0.0, 0.0),
+                                upper_bounds=(100.0, 100.0, 100.0, 100.0),
+                                warm_start_params=None):
+        """
+        Solves the premiums of a Kelly curve and fits the currently configured function to them.
+        When adaptive sampling is enabled in the config, the premiums are solved on a coarse
+        subset of the bet fractions first. The interval between two solved points is then
+        bisected while the fit bends away from the chord between them by more than the
+        tolerance, which concentrates the points where the curvature is high. The refinement
+        stops once no interval needs bisecting, or once the fit already predicted the premiums
+        solved at the new points within the tolerance. Only the final fit is recorded in the fit
+        stats. Otherwise, or for custom fit functions, the premiums are solved at every bet
+        fraction.
+
+        Parameters
+        ----------
+        bet_fractions : numpy.ndarray
+            The bet fractions which can be sampled, in increasing order
+        solve_premiums : Callable
+            Called with an array of bet fractions, returns the premiums solved at them
+        maxfev : int
+            (Optional. Default: 100000) The max function evaluations of the optimizer
+        lower_bounds : Tuple[float]
+            (Optional. Default: (0.0, 0.0, 0.0, 0.0)) The lower bounds on each of the parameters
+            in the optimizer
+        upper_bounds : Tuple[float]
+            (Optional. Default: (100.0, 100.0, 100.0, 100.0)) The upper bounds on each of the
+            parameters in the optimizer
+        warm_start_params : List[float]
+            (Optional. Default: None) The parameters of a neighbouring fit, e.g. the previous
+            strike, to start from if warm starting is enabled in the config. The refined fits
+            start from the fit before them
+
+        Returns
+        -------
+        bet_fractions : numpy.ndarray
+            The bet fractions the premiums were solved at
+        premiums : numpy.ndarray
+            The premiums solved at the bet fractions
+        params : List[float]
+            The list of parameters of the function fit to the Kelly curve
+        """
+        bet_fractions = np.asarray(bet_fractions, dtype=float)
+
+        def fit(indices, guess):
+            # The intermediate fits are not recorded, only the final fit is
+            fit_info = {}
+            params = self._fit(bet_fractions[indices], premiums[indices], maxfev, lower_bounds,
+                               upper_bounds, guess if self.config.warm_start else None, fit_info)
+            return params, fit_info
+
+        if not self.config.adaptive_sampling or self.fit_func not in fit_model_table or (
+                bet_fractions.size <= self.config.initial_points):
+            premiums = solve_premiums(bet_fractions)
+            return bet_fractions, premiums, self.fit_kelly_curve(
+                bet_fractions, premiums, maxfev=maxfev, lower_bounds=lower_bounds,
+                upper_bounds=upper_bounds, warm_start_params=warm_start_params)
+
+        tolerance = self.config.sampling_tolerance
+        selected = np.unique(np.linspace(0, bet_fractions.size - 1,
+                                         max(self.config.initial_points, 3)).round().astype(int))
+        premiums = np.full(bet_fractions.size, np.nan)
+        premiums[selected] = solve_premiums(bet_fractions[selected])
+        params, fit_info = fit(selected, warm_start_params)
+
+        while True:
+            fitted = self.predict_kelly_curve(bet_fractions, params)
+            scale = max(np.max(np.abs(premiums[selected])), 1e-10)
+
+            # Only the points up to the last non-zero premium are fit, the intervals after it
+            # are only bisected to locate where the premiums drop to zero
+            last_fit = selected[self._get_range_to_use(premiums[selected])]
+            left, right = selected[:-1], selected[1:]
+            middle = (left + right) // 2
+
+            chord = premiums[left] + (premiums[right] - premiums[left]) * (
+                    bet_fractions[middle] - bet_fractions[left]) / (
+                    bet_fractions[right] - bet_fractions[left])
+            curvature = np.where(right <= last_fit, np.abs(fitted[middle] - chord), 0.0)
+            refine = (right - left > 1) & ((curvature > tolerance * scale) | (
+                    (left <= last_fit) & (right > last_fit)))
+
+            if not refine.any():
+                break
+
+            new_points = middle[refine]
+            premiums[new_points] = solve_premiums(bet_fractions[new_points])
+            selected = np.union1d(selected, new_points)
+            params, fit_info = fit(selected, params)
+
+            # The fit is stable once it already predicted the premiums of the new points
+            if np.max(np.abs(fitted[new_points] - premiums[new_points])) <= tolerance * scale:
+                break
+
+        self._record_fit(fit_info)
+        return bet_fractions[selected], premiums[selected], params
 
 
 # Define a Global object with default values to be configured by the module user
@@ -204,3 +902,8 @@ _fit = KellyFit(FitConfigBuilder().build_config())
 # programmers alike
 configure_fit = _fit.configure
 fit_kelly_curve = _fit.fit_kelly_curve
+fit_kelly_curves = _fit.fit_kelly_curves
+get_fit_stats = _fit.get_fit_stats
+clear_fit_stats = _fit.clear_fit_stats
+predict_kelly_curve = _fit.predict_kelly_curve
+fit_sampled_kelly_curve = _fit.fit_sampled_kelly_curve
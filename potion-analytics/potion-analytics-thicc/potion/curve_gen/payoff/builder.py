@@ -4,6 +4,7 @@ users of the library to configure the payoff of an option or spread of options
 following a standard design pattern. This is the same pattern used by the other
 modules of the curve generator.
 """
+import hashlib
 import numpy as np
 from typing import NamedTuple, List, Callable
 
@@ -27,22 +28,32 @@ class PayoffConfig(NamedTuple):
     option_legs: List[dict]
     """The List containing dicts specifying the info about each leg of the option spread"""
 
-    def __key(self):
+    identity: str = None
+    """The structural identity of the config, a digest over the grid, the legs and the payoff
+    function computed once by the builder. Can be used as a key for caching results"""
+
+    def structural_key(self):
         """
-        Implements a key function that is unique which can be provided to the __hash__ function
+        Gets the structural identity of the config. Configs created without the builder do not
+        have one, in that case it is computed from the payoff arrays
 
         Returns
         -------
-        key : tuple
-            The unique key to hash
+        key : str
+            The hex digest identifying the config
         """
-        return (tuple(self.x_points), tuple(self.total_payoff), tuple(self.underlying_payoff),
-                (tuple(pay) for pay in self.option_leg_payoff),
-                (tuple(leg) for leg in self.option_legs))
+        if self.identity is not None:
+            return self.identity
+
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(grid_id(self.x_points).encode())
+        digest.update(grid_id(self.total_payoff).encode())
+        digest.update(repr(_legs_key(self.option_legs)).encode())
+        return digest.hexdigest()
 
     def __eq__(self, other):
         """
-        Checks if this config object is equal to other
+        Checks if this config object is equal to other by comparing the structural identities
 
         Parameters
         ----------
@@ -54,11 +65,27 @@ class PayoffConfig(NamedTuple):
         is_equal : bool
             True if the two objects are equal, False otherwise
         """
-        return np.array_equal(self.x_points, other.x_points) and np.array_equal(
-                self.total_payoff, other.total_payoff) and np.array_equal(
-            self.underlying_payoff, other.underlying_payoff) and np.array_equal(
-            self.option_leg_payoff, other.option_leg_payoff) and (
-                self.option_legs == other.option_legs)
+        if not isinstance(other, PayoffConfig):
+            return False
+
+        return self.structural_key() == other.structural_key()
+
+    def __ne__(self, other):
+        """
+        Checks if this config object is not equal to other. Needed because the tuple base class
+        implements its own element wise comparison
+
+        Parameters
+        ----------
+        other : PayoffConfig
+            The other config object we are testing for inequality
+
+        Returns
+        -------
+        is_not_equal : bool
+            True if the two objects are not equal, False otherwise
+        """
+        return not self == other
 
     def __hash__(self):
         """
@@ -68,9 +95,80 @@ class PayoffConfig(NamedTuple):
         Returns
         -------
         h : int
-            The hash of the key
+            The hash of the structural identity
         """
-        return hash(self.__key())
+        return hash(self.structural_key())
+
+
+def grid_id(x_points: np.ndarray):
+    """
+    Calculates a digest identifying the sample points of a grid
+
+    Parameters
+    ----------
+    x_points : numpy.ndarray
+        The sample points
+
+    Returns
+    -------
+    grid_id : str
+        The hex digest of the sample points
+    """
+    x_points = np.ascontiguousarray(x_points, dtype=float)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(x_points.shape).encode())
+    digest.update(x_points.tobytes())
+    return digest.hexdigest()
+
+
+def _legs_key(legs):
+    """
+    Converts the leg dicts into a hashable key which does not depend on the order of the dict keys
+
+    Parameters
+    ----------
+    legs : List[dict]
+        The leg dicts
+
+    Returns
+    -------
+    key : tuple
+        The sorted items of each leg
+    """
+    return tuple(tuple(sorted((key, repr(value)) for key, value in leg.items())) for leg in legs)
+
+
+def payoff_identity(x_points: np.ndarray, underlying_leg: dict, option_legs: List[dict],
+                    payoff_function: Callable):
+    """
+    Calculates the structural identity of a payoff config. The identity is a digest over the id of
+    the grid, the underlying leg, the option legs and the payoff function. Unlike hash(), it is
+    stable between runs so it can also be used as a key for caches persisted to disk.
+
+    Parameters
+    ----------
+    x_points : numpy.ndarray
+        The X points of the payoff function where the option payoff will be evaluated
+    underlying_leg : dict
+        The dict specifying the price and amount of the underlying
+    option_legs : List[dict]
+        The List containing dicts specifying the info about each leg of the option spread
+    payoff_function : Callable
+        The function used to calculate the payoff of each option leg
+
+    Returns
+    -------
+    identity : str
+        The hex digest identifying the payoff config
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(grid_id(x_points).encode())
+    digest.update(repr(_legs_key([underlying_leg])).encode())
+    digest.update(repr(_legs_key(option_legs)).encode())
+    digest.update('{}.{}'.format(getattr(payoff_function, '__module__', ''),
+                                 getattr(payoff_function, '__qualname__', repr(payoff_function))
+                                 ).encode())
+    return digest.hexdigest()
 
 
 class PayoffConfigBuilder:
@@ -219,5 +317,8 @@ class PayoffConfigBuilder:
         for leg_payoff in leg_payoffs:
             total_payoff = total_payoff + leg_payoff
 
+        identity = payoff_identity(self.x_points, self.underlying_leg, self.option_legs,
+                                   self.payoff_function)
+
         return PayoffConfig(self.x_points, total_payoff, underlying_payoff, leg_payoffs,
-                            self.option_legs)
+                            list(self.option_legs), identity)
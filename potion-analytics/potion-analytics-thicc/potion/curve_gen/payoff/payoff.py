@@ -16,6 +16,10 @@ three duck typed functions:
     get_position_max_loss(float)
         'Which calculates the max loss of the configured position'
 
+The minimum of the total payoff, which sets the max loss of the position, is only calculated once
+for each structural identity of the PayoffConfig (see builder.payoff_identity) so reconfiguring
+the module during strike sweeps does not repeat the work.
+
 The betting odds payoff is used by the Kelly formula and take the form N-to-1 (i.e. 2-to-1 odds
 or 1-to-3 odds).
 
@@ -45,6 +49,27 @@ class Payoff:
             The config object created using the builder module
         """
         self.config = config
+        self._min_payoff_cache = {}
+        self.min_payoff = self._get_min_payoff(config)
+
+    def _get_min_payoff(self, config: PayoffConfig):
+        """
+        Gets the minimum of the total payoff of the config, cached by the structural identity
+
+        Parameters
+        ----------
+        config : PayoffConfig
+            The config object of the position
+
+        Returns
+        -------
+        min_payoff : float
+            The minimum of the total payoff
+        """
+        key = config.structural_key()
+        if key not in self._min_payoff_cache:
+            self._min_payoff_cache[key] = float(np.amin(config.total_payoff))
+        return self._min_payoff_cache[key]
 
     def configure(self, config: PayoffConfig):
         """
@@ -60,6 +85,7 @@ class Payoff:
         None
         """
         self.config = config
+        self.min_payoff = self._get_min_payoff(config)
 
     def get_position_max_loss(self, premium=0.0):
         """
@@ -75,7 +101,7 @@ class Payoff:
         max_loss : float
             The worst case loss of the position
         """
-        return check_div_zero(np.abs(np.amin(self.config.total_payoff + premium)))
+        return check_div_zero(np.abs(self.min_payoff + premium))
 
     def get_payoff_odds(self, premium=0.0):
         """
@@ -91,11 +117,11 @@ class Payoff:
         odds : numpy.ndarray
             The betting odds function calculated from the option legs and the underlying payout
         """
-        ml = np.abs(np.amin(self.config.total_payoff + premium))
+        ml = np.abs(self.min_payoff + premium)
         if ml == 0.0:
             raise ValueError('Max Loss cannot be 0.0 in Payoff Odds calculation')
 
-        return (self.config.total_payoff + premium) / self.get_position_max_loss(premium)
+        return (self.config.total_payoff + premium) / check_div_zero(ml)
 
 
 # Define a Global object with default values to be configured by the module user
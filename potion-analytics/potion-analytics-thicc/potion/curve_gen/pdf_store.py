@@ -0,0 +1,369 @@
+"""
+This module stores the PDFs output by the curve generator in a compact binary HDF5 file instead of
+the wide pdfs.csv text file.
+
+The file contains three datasets:
+
+    Prices
+        'The price points shared by every PDF'
+    pdfs
+        'A 2-D dataset with one row per PDF, chunked by row so each PDF can be read on its own'
+    keys
+        'The key of each row, in the same "asset-label|expiration" format as the CSV columns'
+
+The datasets can be extended, so the PDFs of a streamed curve generation run are appended to the
+file one convolution group at a time (see append_pdf_store).
+
+The PdfStore class reads the file lazily. Only the keys are loaded when it is opened, and each
+PDF is read from disk when it is requested, optionally downsampled for display. It supports the
+subset of the pandas.DataFrame interface used by the plotting and backtesting tools (indexing by
+column name and the columns attribute) so it can be used in place of the DataFrame read from
+pdfs.csv.
+"""
+import h5py
+import numpy as np
+import pandas as pd
+
+PRICES_KEY = 'Prices'
+PDF_STORE_FILENAME = 'pdfs.h5'
+DISPLAY_POINTS = 2001
+"""The number of points the PDFs are downsampled to when they are only displayed"""
+
+
+def _flatten_column_name(name):
+    """
+    Gets the column name of the DataFrame output by the generator, which uses a MultiIndex
+
+    Parameters
+    ----------
+    name : Union[str, tuple]
+        The name of the column
+
+    Returns
+    -------
+    name : str
+        The first level of the column name
+    """
+    if isinstance(name, tuple):
+        return str(name[0])
+    return str(name)
+
+
+def _downsample_step(num_points: int, max_points=None):
+    """
+    Calculates the stride to use so that at most max_points points are read
+
+    Parameters
+    ----------
+    num_points : int
+        The number of points stored
+    max_points : int
+        (Optional. Default: None) The maximum number of points to read. None or 0 reads every
+        point
+
+    Returns
+    -------
+    step : int
+        The stride between the points read
+    """
+    if not max_points or max_points >= num_points:
+        return 1
+    return int(np.ceil(num_points / max_points))
+
+
+def write_pdf_store(filename: str, pdf_df: pd.DataFrame, dtype=np.float32, compression='gzip'):
+    """
+    Writes the PDF DataFrame output by the curve generator to a binary PDF store
+
+    Parameters
+    ----------
+    filename : str
+        The name of the file to write
+    pdf_df : pandas.DataFrame
+        The DataFrame containing the Prices column and one column per PDF
+    dtype : numpy.dtype
+        (Optional. Default: numpy.float32) The data type used to store the PDF values. The prices
+        are always stored as float64
+    compression : str
+        (Optional. Default: 'gzip') The HDF5 compression filter, None to disable compression
+
+    Returns
+    -------
+    None
+    """
+    names = [_flatten_column_name(name) for name in pdf_df.columns]
+    prices_index = names.index(PRICES_KEY)
+    keys = [name for name in names if name != PRICES_KEY]
+
+    values = pdf_df.to_numpy(dtype=np.float64)
+    prices = values[:, prices_index]
+    pdfs = np.delete(values, prices_index, axis=1).T.astype(dtype)
+
+    with h5py.File(filename, 'w') as store:
+        store.create_dataset(PRICES_KEY, data=prices)
+        store.create_dataset('pdfs', data=pdfs, compression=compression,
+                             chunks=(1, max(prices.size, 1)) if pdfs.size else None)
+        store.create_dataset('keys', data=np.array(keys, dtype=object),
+                             dtype=h5py.string_dtype())
+
+
+def append_pdf_store(filename: str, prices: np.ndarray, pdfs, dtype=np.float32,
+                     compression='gzip'):
+    """
+    Appends PDFs to a binary PDF store, creating the file if it does not exist
+
+    Parameters
+    ----------
+    filename : str
+        The name of the file to write
+    prices : numpy.ndarray
+        The price points shared by every PDF
+    pdfs : dict
+        The key of each PDF in the "asset-label|expiration" format mapped to its values
+    dtype : numpy.dtype
+        (Optional. Default: numpy.float32) The data type used to store the PDF values when the
+        file is created
+    compression : str
+        (Optional. Default: 'gzip') The HDF5 compression filter used when the file is created,
+        None to disable compression
+
+    Raises
+    ------
+    ValueError
+        If the prices do not match the prices already in the file
+
+    Returns
+    -------
+    num_pdfs : int
+        The number of PDFs in the file after appending
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    keys = list(pdfs)
+    values = np.array([np.asarray(pdfs[key], dtype=np.float64).ravel() for key in keys]).reshape(
+        len(keys), prices.size)
+
+    with h5py.File(filename, 'a') as store:
+        if PRICES_KEY not in store:
+            store.create_dataset(PRICES_KEY, data=prices)
+            store.create_dataset('pdfs', shape=(0, prices.size), maxshape=(None, prices.size),
+                                 dtype=dtype, compression=compression,
+                                 chunks=(1, max(prices.size, 1)))
+            store.create_dataset('keys', shape=(0,), maxshape=(None,),
+                                 dtype=h5py.string_dtype())
+        elif store[PRICES_KEY].shape != prices.shape or not np.allclose(store[PRICES_KEY][()],
+                                                                       prices):
+            raise ValueError('The prices of the PDFs do not match the prices in ' + filename)
+
+        start = store['pdfs'].shape[0]
+        store['pdfs'].resize(start + len(keys), axis=0)
+        store['pdfs'][start:] = values
+        store['keys'].resize(start + len(keys), axis=0)
+        store['keys'][start:] = np.array(keys, dtype=object)
+
+        return start + len(keys)
+
+
+def truncate_pdf_store(filename: str, num_pdfs: int):
+    """
+    Drops the PDFs appended to a binary PDF store after the first num_pdfs, e.g. the PDFs of a
+    convolution group which was interrupted before it completed
+
+    Parameters
+    ----------
+    filename : str
+        The name of the file written by append_pdf_store
+    num_pdfs : int
+        The number of PDFs to keep
+
+    Returns
+    -------
+    None
+    """
+    with h5py.File(filename, 'a') as store:
+        if store['pdfs'].shape[0] > num_pdfs:
+            store['pdfs'].resize(num_pdfs, axis=0)
+            store['keys'].resize(num_pdfs, axis=0)
+
+
+class PdfStore:
+    """
+    This class lazily reads the PDFs from a binary PDF store written by write_pdf_store
+    """
+
+    def __init__(self, filename: str, max_points=None):
+        """
+        Opens the store and reads the keys of the PDFs
+
+        Parameters
+        ----------
+        filename : str
+            The name of the file to read
+        max_points : int
+            (Optional. Default: None) Downsample every read to at most this number of points,
+            for display. None or 0 reads every point
+        """
+        self.filename = filename
+        self.max_points = max_points
+
+        with h5py.File(self.filename, 'r') as store:
+            keys = [key.decode() if isinstance(key, bytes) else key for key in store['keys'][()]]
+            self.num_points = store[PRICES_KEY].shape[0]
+
+        self._rows = {key: row for row, key in enumerate(keys)}
+
+    @property
+    def columns(self):
+        """
+        The names of the columns in the same order as the pdfs.csv file
+
+        Returns
+        -------
+        columns : List[str]
+            The Prices column followed by the key of each PDF
+        """
+        return [PRICES_KEY] + list(self._rows)
+
+    def keys(self):
+        """
+        Gets the keys of the PDFs in the store
+
+        Returns
+        -------
+        keys : List[str]
+            The keys in the "asset-label|expiration" format
+        """
+        return list(self._rows)
+
+    def __contains__(self, key):
+        return key == PRICES_KEY or key in self._rows
+
+    def __len__(self):
+        return self.num_points
+
+    def _downsample_step(self, max_points=None):
+        """
+        Calculates the stride of a read
+
+        Parameters
+        ----------
+        max_points : int
+            (Optional. Default: None) The maximum number of points to read. None uses the value
+            the store was opened with, 0 reads every point
+
+        Returns
+        -------
+        step : int
+            The stride between the points read
+        """
+        if max_points is None:
+            max_points = self.max_points
+        return _downsample_step(self.num_points, max_points)
+
+    def read_prices(self, max_points=None):
+        """
+        Reads the price points shared by every PDF
+
+        Parameters
+        ----------
+        max_points : int
+            (Optional. Default: None) Downsample to at most this number of points. Defaults to
+            the value the store was opened with, 0 reads every point
+
+        Returns
+        -------
+        prices : numpy.ndarray
+            The price points
+        """
+        step = self._downsample_step(max_points)
+        with h5py.File(self.filename, 'r') as store:
+            return store[PRICES_KEY][::step]
+
+    def read_pdf(self, key: str, max_points=None):
+        """
+        Reads the values of a single PDF from disk
+
+        Parameters
+        ----------
+        key : str
+            The key of the PDF in the "asset-label|expiration" format
+        max_points : int
+            (Optional. Default: None) Downsample to at most this number of points. Defaults to
+            the value the store was opened with, 0 reads every point
+
+        Raises
+        ------
+        KeyError
+            If the key is not in the store
+
+        Returns
+        -------
+        pdf : numpy.ndarray
+            The PDF values as float64 at the price points
+        """
+        if key == PRICES_KEY:
+            return self.read_prices(max_points)
+
+        row = self._rows[key]
+        step = self._downsample_step(max_points)
+        with h5py.File(self.filename, 'r') as store:
+            return store['pdfs'][row, ::step].astype(np.float64)
+
+    def __getitem__(self, key: str):
+        """
+        Reads a column like the DataFrame read from pdfs.csv
+
+        Parameters
+        ----------
+        key : str
+            The Prices column or the key of a PDF
+
+        Returns
+        -------
+        column : pandas.Series
+            The values of the column
+        """
+        return pd.Series(self.read_pdf(key), name=key)
+
+    def to_dataframe(self, keys=None, max_points=None):
+        """
+        Reads the store into a DataFrame with the same layout as pdfs.csv
+
+        Parameters
+        ----------
+        keys : List[str]
+            (Optional. Default: None) The keys of the PDFs to read. None reads every PDF
+        max_points : int
+            (Optional. Default: None) Downsample to at most this number of points. Defaults to
+            the value the store was opened with, 0 reads every point
+
+        Returns
+        -------
+        pdf_df : pandas.DataFrame
+            The DataFrame with the Prices column and one column per PDF
+        """
+        if keys is None:
+            keys = self.keys()
+
+        columns = {PRICES_KEY: self.read_prices(max_points)}
+        columns.update({key: self.read_pdf(key, max_points) for key in keys})
+        return pd.DataFrame(columns)
+
+
+def read_pdf_store(filename: str, max_points=None):
+    """
+    Opens a binary PDF store for lazy reads
+
+    Parameters
+    ----------
+    filename : str
+        The name of the file to read
+    max_points : int
+        (Optional. Default: None) Downsample every read to at most this number of points. None
+        or 0 reads every point
+
+    Returns
+    -------
+    store : PdfStore
+        The store object
+    """
+    return PdfStore(filename, max_points=max_points)
@@ -0,0 +1,322 @@
+"""
+This module provides the in-memory representation of a curve generation run, used by the
+Generator to pass the data between the training, convolution and curve stages without building
+a DataFrame at every stage.
+
+The run is represented by the following objects:
+
+    TrainingGroup
+        'One convolution group: an asset and training window, its fit parameters, its training
+        prices and the strikes and expirations of its curves. The training prices are held once
+        per group instead of once per strike and expiration'
+    CurveTable
+        'The solved curves of the run, with the numeric columns held in arrays and an index from
+        each group to its rows'
+    PdfTable
+        'The convolution PDFs of the run, keyed by the group and expiration of each PDF'
+
+The DataFrames read by the other tools are only built when the run is exported, see
+CurveTable.to_frame, PdfTable.to_frame and potion.curve_gen.utils.training_groups_to_csv.
+"""
+from dataclasses import dataclass
+from datetime import date
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+CURVE_PARAM_COLUMNS = ['A', 'B', 'C', 'D']
+
+
+@dataclass
+class TrainingGroup:
+    """
+    The training output of one convolution group, the rows of the input CSV which share an
+    Asset, TrainingLabel, TrainingStart and TrainingEnd
+    """
+    __slots__ = ('asset', 'label', 'start', 'end', 'current_price', 'dist_params',
+                 'training_prices', 'strike_pcts', 'expirations')
+
+    asset: str
+    """The name of the asset"""
+    label: str
+    """The label of the training window"""
+    start: date
+    """The first date of the training window"""
+    end: date
+    """The last date of the training window"""
+    current_price: float
+    """The current price of the asset"""
+    dist_params: List[float]
+    """The fit parameters of the distribution, location and scale first"""
+    training_prices: np.ndarray
+    """The prices of the training window"""
+    strike_pcts: np.ndarray
+    """The strike of each curve of the group, as a fraction of the current price"""
+    expirations: np.ndarray
+    """The expiration in days of each curve of the group"""
+
+    def to_frame(self):
+        """
+        Builds the DataFrame format of the training output, with one row per curve of the group
+
+        Returns
+        -------
+        conv_df : pandas.DataFrame
+            The DataFrame with the Asset, TrainingLabel, TrainingStart, TrainingEnd, StrikePct,
+            Expiration, DistParams, CurrentPrice and TrainingPrices columns
+        """
+        training_prices = self.training_prices.tolist()
+        return pd.DataFrame([{
+            'Asset': self.asset,
+            'TrainingLabel': self.label,
+            'TrainingStart': self.start,
+            'TrainingEnd': self.end,
+            'StrikePct': strike_pct,
+            'Expiration': expiration,
+            'DistParams': self.dist_params,
+            'CurrentPrice': self.current_price,
+            'TrainingPrices': training_prices
+        } for strike_pct, expiration in zip(self.strike_pcts, self.expirations)])
+
+    @classmethod
+    def from_frame(cls, conv_df: pd.DataFrame):
+        """
+        Creates the group from the DataFrame format of the training output, see to_frame
+
+        Parameters
+        ----------
+        conv_df : pandas.DataFrame
+            The training output of one convolution group
+
+        Returns
+        -------
+        group : TrainingGroup
+            The group
+        """
+        return cls(asset=conv_df['Asset'].values[0], label=conv_df['TrainingLabel'].values[0],
+                   start=conv_df['TrainingStart'].values[0],
+                   end=conv_df['TrainingEnd'].values[0],
+                   current_price=conv_df['CurrentPrice'].values[0],
+                   dist_params=conv_df['DistParams'].values[0],
+                   training_prices=np.asarray(conv_df['TrainingPrices'].values[0]),
+                   strike_pcts=conv_df['StrikePct'].to_numpy(),
+                   expirations=conv_df['Expiration'].to_numpy())
+
+
+def _curve_strike(output: dict):
+    """
+    Gets the strike of a solved curve
+
+    Parameters
+    ----------
+    output : dict
+        The output dict of the curve
+
+    Returns
+    -------
+    strike : float
+        The strike of the first leg of the payoff, or 1.0 if the payoff has no legs
+    """
+    if len(output['payoff'].option_legs) > 0:
+        return output['payoff'].option_legs[0]['strike']
+    return 1.0
+
+
+class CurveTable:
+    """
+    This class holds the solved curves of a run. The expirations, strikes and fit parameters are
+    held in arrays, and the rows of each group are contiguous so the group index maps each group
+    to a slice of the rows
+    """
+    __slots__ = ('bet_fractions', 'groups', 'group_slices', 'expirations', 'strikes', 'params',
+                 'curve_bet_fractions', 'curve_points')
+
+    def __init__(self, bet_fractions=np.linspace(0.0, 0.9999, 50)):
+        """
+        Constructs an empty table
+
+        Parameters
+        ----------
+        bet_fractions : numpy.ndarray
+            (Optional. Default: 50 points) The X axis points of the curves, used when the output
+            dict of a curve does not record the bet fractions it was solved at
+        """
+        self.bet_fractions = bet_fractions
+        self.groups = []
+        self.group_slices = []
+        self.expirations = np.empty(0, dtype=np.int64)
+        self.strikes = np.empty(0, dtype=np.float64)
+        self.params = np.empty((0, len(CURVE_PARAM_COLUMNS)), dtype=np.float64)
+        self.curve_bet_fractions = []
+        self.curve_points = []
+
+    def __len__(self):
+        """
+        Gets the number of curves in the table
+
+        Returns
+        -------
+        num_curves : int
+            The number of rows of the curves output
+        """
+        return self.expirations.size
+
+    def add_group(self, group: TrainingGroup, outputs):
+        """
+        Adds the solved curves of a group. The rows are added in the reverse order of the outputs,
+        the order the curves were solved in
+
+        Parameters
+        ----------
+        group : TrainingGroup
+            The group the curves were solved for
+        outputs : List[dict]
+            The output dicts of the curves, ordered by expiration then strike
+
+        Returns
+        -------
+        group_index : int
+            The index of the group in the table
+        """
+        outputs = list(reversed(outputs))
+        start = len(self)
+
+        self.expirations = np.concatenate([self.expirations, np.asarray(
+            [output['exp'] for output in outputs], dtype=np.int64)])
+        self.strikes = np.concatenate([self.strikes, np.asarray(
+            [_curve_strike(output) for output in outputs], dtype=np.float64)])
+        self.params = np.concatenate([self.params, np.asarray(
+            [output['params'][:len(CURVE_PARAM_COLUMNS)] for output in outputs],
+            dtype=np.float64).reshape(-1, len(CURVE_PARAM_COLUMNS))])
+        self.curve_bet_fractions.extend([output.get('bet_fractions', self.bet_fractions)
+                                         for output in outputs])
+        self.curve_points.extend([output['prem'] for output in outputs])
+
+        self.groups.append(group)
+        self.group_slices.append(slice(start, len(self)))
+
+        return len(self.groups) - 1
+
+    def row(self, index: int):
+        """
+        Gets one row of the curves output
+
+        Parameters
+        ----------
+        index : int
+            The index of the row
+
+        Returns
+        -------
+        row : dict
+            The row in the format of the curves output, see to_frame
+        """
+        group_index = np.searchsorted([rows.stop for rows in self.group_slices], index,
+                                      side='right')
+        group = self.groups[group_index]
+        row = {
+            'Ticker': group.asset,
+            'Label': group.label,
+            'Expiration': int(self.expirations[index]),
+            'StrikePercent': float(self.strikes[index])
+        }
+        row.update(zip(CURVE_PARAM_COLUMNS, self.params[index].tolist()))
+        row.update({
+            't_params': group.dist_params,
+            'bet_fractions': self.curve_bet_fractions[index],
+            'curve_points': self.curve_points[index]
+        })
+        return row
+
+    def to_frame(self):
+        """
+        Builds the curves output
+
+        Returns
+        -------
+        curves_df : pandas.DataFrame
+            The DataFrame with one row per curve and the Ticker, Label, Expiration, StrikePercent,
+            A, B, C, D, t_params, bet_fractions and curve_points columns
+        """
+        group_sizes = [rows.stop - rows.start for rows in self.group_slices]
+        group_ids = np.repeat(np.arange(len(self.groups)), group_sizes)
+
+        columns = {
+            'Ticker': [self.groups[i].asset for i in group_ids],
+            'Label': [self.groups[i].label for i in group_ids],
+            'Expiration': self.expirations,
+            'StrikePercent': self.strikes
+        }
+        columns.update(zip(CURVE_PARAM_COLUMNS, self.params.T))
+        columns.update({
+            't_params': [self.groups[i].dist_params for i in group_ids],
+            'bet_fractions': self.curve_bet_fractions,
+            'curve_points': self.curve_points
+        })
+        return pd.DataFrame(columns)
+
+
+class PdfTable:
+    """
+    This class holds the convolution PDFs of a run. The PDFs of every group share the price
+    points of the first group
+    """
+    __slots__ = ('prices', 'keys', 'pdfs')
+
+    def __init__(self):
+        """
+        Constructs an empty table
+        """
+        self.prices = None
+        self.keys = []
+        self.pdfs = []
+
+    def add_group(self, group: TrainingGroup, exp_days: np.ndarray, pdf_x: np.ndarray, pdfs_y):
+        """
+        Adds the PDFs of a group
+
+        Parameters
+        ----------
+        group : TrainingGroup
+            The group the PDFs were calculated for
+        exp_days : numpy.ndarray
+            The expirations of the group
+        pdf_x : numpy.ndarray
+            The price points of the PDFs
+        pdfs_y : List[numpy.ndarray]
+            The PDF of each unique expiration, in ascending order of expiration
+
+        Returns
+        -------
+        None
+        """
+        if self.prices is None:
+            self.prices = pdf_x
+
+        for exp_idx, exp_day in enumerate(np.unique(exp_days)):
+            self.keys.append(group.asset + '-' + group.label + '|' + str(exp_day))
+            self.pdfs.append(pdfs_y[exp_idx])
+
+    def to_dict(self):
+        """
+        Gets the PDFs keyed by the group and expiration of each PDF
+
+        Returns
+        -------
+        pdfs : dict
+            The "asset-label|expiration" key of each PDF mapped to its values
+        """
+        return {key: np.asarray(pdf).ravel() for key, pdf in zip(self.keys, self.pdfs)}
+
+    def to_frame(self):
+        """
+        Builds the PDF output
+
+        Returns
+        -------
+        pdf_df : pandas.DataFrame
+            The DataFrame with the Prices column followed by one column per PDF
+        """
+        column_data = [pd.Series(self.prices)] + [pd.DataFrame(pdf) for pdf in self.pdfs]
+        return pd.concat(column_data, axis=1, keys=['Prices'] + self.keys)
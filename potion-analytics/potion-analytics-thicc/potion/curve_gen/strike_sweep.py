@@ -0,0 +1,112 @@
+"""
+This module evaluates the derivative of the Kelly formula for many strikes of the same expiration
+without repeating the work shared between them.
+
+The probability bins of an expiration are calculated once, together with their cumulative sums.
+The payoff of an option at expiration is flat over part of the price grid, e.g. a short put pays
+nothing at every price above its strike. Every point of a flat region has the same betting odds,
+so the terms of the derivative over the region collapse into a single term weighted by the
+probability mass of the region, which is read from the cumulative sums. Only the points where
+the payoff varies, e.g. below the strike of a put, are evaluated one by one:
+
+    d/dx sum[p_i * ln(1 + b_i * x)] = P_low * b_low / (1 + b_low * x)
+                                      + sum_varying[p_i * b_i / (1 + b_i * x)]
+                                      + P_high * b_high / (1 + b_high * x)
+
+The flat regions are found from the payoff values, so payoffs which are never flat (e.g. before
+expiration) are still evaluated correctly, over the whole grid.
+"""
+import numpy as np
+
+from potion.curve_gen.kelly import probability_from_density
+
+
+class StrikeSweep:
+    """
+    This class evaluates the Kelly formula derivative of each strike of an expiration from the
+    probability bins shared by the strikes
+    """
+
+    def __init__(self, sample_points: np.ndarray, probability: np.ndarray):
+        """
+        Calculates the probability bins of the PDF of the expiration and their cumulative sums
+
+        Parameters
+        ----------
+        sample_points : numpy.ndarray
+            The X points of the PDF function
+        probability : numpy.ndarray
+            The Y points of the PDF function representing the density values
+        """
+        self.prob_bins = probability_from_density(sample_points, probability)
+        self.cumulative_prob = np.concatenate(([0.0], np.cumsum(self.prob_bins)))
+
+        self.low_payoff = 0.0
+        self.high_payoff = 0.0
+        self.low_mass = 0.0
+        self.high_mass = 0.0
+        self.varying_payoff = np.empty(0)
+        self.varying_prob = np.empty(0)
+
+    def set_payoff(self, total_payoff: np.ndarray):
+        """
+        Sets the payoff of the strike being evaluated and finds its flat regions at either end
+        of the price grid
+
+        Parameters
+        ----------
+        total_payoff : numpy.ndarray
+            The payoff of the position at each sample point, without the premium
+
+        Returns
+        -------
+        None
+        """
+        payoff = np.asarray(total_payoff, dtype=float)
+
+        # The payoff is flat below the first point which differs from the lowest price payoff,
+        # and above the last point which differs from the highest price payoff
+        varies_low = np.flatnonzero(payoff != payoff[0])
+        varies_high = np.flatnonzero(payoff != payoff[-1])
+        if varies_low.size == 0:
+            start = stop = payoff.size
+        else:
+            start, stop = varies_low[0], varies_high[-1] + 1
+
+        self.low_payoff = payoff[0]
+        self.high_payoff = payoff[-1]
+        self.low_mass = self.cumulative_prob[start]
+        self.high_mass = self.cumulative_prob[-1] - self.cumulative_prob[stop]
+        self.varying_payoff = payoff[start:stop]
+        self.varying_prob = self.prob_bins[start:stop]
+
+    def kelly_derivative(self, premium: float, bet_fraction, max_loss: float):
+        """
+        Calculates the derivative of the Kelly formula for the configured payoff, equal to
+        potion.curve_gen.kelly.kelly_formula_derivative with the odds of the payoff
+
+        Parameters
+        ----------
+        premium : float
+            The premium collected for the position
+        bet_fraction : Union[float, numpy.ndarray]
+            The fraction of the bankroll bet
+        max_loss : float
+            The worst case loss of the position at the premium, used to normalize the odds
+
+        Returns
+        -------
+        d_kelly_out : Union[float, numpy.ndarray]
+            The derivative of the Kelly formula at each bet fraction
+        """
+        bet_fraction = np.asarray(bet_fraction, dtype=float)
+
+        low_odds = (self.low_payoff + premium) / max_loss
+        high_odds = (self.high_payoff + premium) / max_loss
+        varying_odds = (self.varying_payoff + premium) / max_loss
+
+        varying_sum = np.sum(self.varying_prob * varying_odds / (
+                1.0 + varying_odds * bet_fraction[..., np.newaxis]), axis=-1)
+
+        return self.low_mass * low_odds / (1.0 + low_odds * bet_fraction) + varying_sum + (
+                self.high_mass * high_odds / (1.0 + high_odds * bet_fraction))
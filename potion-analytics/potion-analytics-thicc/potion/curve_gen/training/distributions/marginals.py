@@ -0,0 +1,135 @@
+"""
+This module calculates the 1-D marginal distributions of the multivariate distributions used by
+the multi-asset backtester without building the full N-dimensional grid of the joint PDF.
+
+Three methods are supported:
+
+* Analytic marginals, when a closed form exists. The marginals of a multivariate normal are
+  univariate normals, the marginals of a multivariate Student's t with nu degrees of freedom are
+  univariate Student's t with the same nu, location mu_i and scale sqrt(cov_ii).
+* Kernel density estimates of random samples from the joint distribution, for distributions
+  without a closed form.
+* Vectorized summation over the other axes, when a grid of the joint PDF has already been
+  calculated.
+"""
+import numpy as np
+from scipy.stats import norm, gaussian_kde, multivariate_normal
+
+from potion.curve_gen.training.distributions.multivariate_students_t import MultiVarStudentT
+
+# scipy does not export the class of the frozen multivariate normal
+MultivariateNormalFrozen = type(multivariate_normal([0.0], [[1.0]]))
+
+
+def analytic_marginal(rv, axis_index):
+    """
+    Returns the frozen scipy distribution of the marginal along the axis if a closed form exists
+
+    Parameters
+    ----------
+    rv : MultiVarStudentT or scipy.stats multivariate_normal frozen distribution
+        The joint distribution
+    axis_index : int
+        The index of the variable to calculate the marginal for
+
+    Returns
+    -------
+    marginal : scipy.stats frozen distribution or None
+        The 1-D marginal distribution, None if no closed form is known for the distribution
+    """
+    if isinstance(rv, MultiVarStudentT):
+        return rv.marginal(axis_index)
+
+    if isinstance(rv, MultivariateNormalFrozen):
+        mean = np.atleast_1d(rv.mean)
+        cov = np.atleast_2d(rv.cov)
+        return norm(loc=mean[axis_index], scale=np.sqrt(cov[axis_index, axis_index]))
+
+    return None
+
+
+def sample_marginal_pdf(rv, axis_index, x, num_samples=20000, random_state=None):
+    """
+    Estimates the marginal PDF along the axis using a kernel density estimate of random samples
+    of the joint distribution
+
+    Parameters
+    ----------
+    rv : object
+        The joint distribution, must implement rvs(num_samples, random_state)
+    axis_index : int
+        The index of the variable to calculate the marginal for
+    x : numpy.ndarray
+        The points along the axis to evaluate the marginal PDF
+    num_samples : int
+        The number of random samples to draw from the joint distribution
+    random_state : {None, int, numpy.random.Generator, numpy.random.RandomState}
+        (Optional. Default: None) The random state to draw the samples from, see
+        rv_continuous.rvs
+
+    Returns
+    -------
+    marginal_values : numpy.ndarray
+        The marginal PDF values at each point of x
+    """
+    samples = np.asarray(rv.rvs(num_samples, random_state=random_state))
+    return gaussian_kde(samples[:, axis_index])(x)
+
+
+def grid_marginal_pdf(deltas, axes, marginal_axis_index, probs):
+    """
+    Takes an N-dimensional PDF evaluated on a grid and integrates out every other axis
+
+    Parameters
+    ----------
+    deltas : List[float]
+        A list of the deltas along each axis (dx, dy, etc.) length N
+    axes : List[numpy.ndarray]
+        A list of axes length N, where each axis is an array of points delta apart
+    marginal_axis_index : int
+        The index of the axis we want to calculate the marginal PDF. Must be between 0 and N
+    probs : numpy.ndarray
+        The N-dimensional array containing the N-dimensional PDF values
+
+    Returns
+    -------
+    marginal_values : numpy.ndarray
+        The marginal PDF values along the specified axis
+    """
+    probs_reshaped = np.reshape(probs, tuple(len(axis) for axis in axes))
+    other_axes = tuple(i for i in range(len(axes)) if i != marginal_axis_index)
+
+    area_of_row = np.prod([deltas[i] for i in other_axes])
+    return np.sum(probs_reshaped, axis=other_axes) * area_of_row
+
+
+def marginal_pdf(rv, axis_index, x, num_samples=20000, random_state=None):
+    """
+    Calculates the marginal PDF along the axis with the analytic marginal if one is available,
+    otherwise with a kernel density estimate of random samples
+
+    Parameters
+    ----------
+    rv : object
+        The joint distribution
+    axis_index : int
+        The index of the variable to calculate the marginal for
+    x : numpy.ndarray
+        The points along the axis to evaluate the marginal PDF
+    num_samples : int
+        The number of random samples used when there is no analytic marginal
+    random_state : {None, int, numpy.random.Generator, numpy.random.RandomState}
+        (Optional. Default: None) The random state to draw the samples from, see
+        rv_continuous.rvs
+
+    Returns
+    -------
+    marginal_values : numpy.ndarray
+        The marginal PDF values at each point of x
+    """
+    marginal = analytic_marginal(rv, axis_index)
+    if marginal is not None:
+        return marginal.pdf(x)
+
+    return sample_marginal_pdf(rv, axis_index, x, num_samples=num_samples,
+                              random_state=random_state)
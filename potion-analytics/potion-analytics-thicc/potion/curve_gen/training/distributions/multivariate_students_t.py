@@ -6,17 +6,199 @@ with the scipy stats rv_continuous interface.
 rv_continuous seems to only support single variable random variables, so it cannot be directly
 subclassed like the others. The function calls however mimic the same interface so that it is
 consistent throughout the tool.
+
+The parameters are estimated with the ECME algorithm of Liu & Rubin (1995). Each iteration
+factors the covariance matrix once with a Cholesky decomposition, the Mahalanobis distances
+of the samples and the log determinant are both taken from the factor. The mean and covariance
+are updated with the EM step, then the degrees of freedom are updated by maximizing the actual
+log-likelihood with the mean and covariance held fixed, which converges much faster than
+updating the degrees of freedom from the EM weights.
+
+The samples may be weighted, e.g. to decay older returns, and an estimate may be started from a
+previous one. RollingMultiVarT uses both to refit a rolling window of returns incrementally.
 """
+from typing import NamedTuple
+
+from scipy import linalg, optimize, special
 from scipy.stats import multivariate_t
+from scipy.stats import t as students_t
 import pandas as pd
 import numpy as np
 
-from lib.t import t
+from potion.instrumentation import count as profile_count
+
+# The range the degrees of freedom are estimated in. The lower bound keeps the covariance finite
+NU_BOUNDS = (2.05, 200.0)
+
+
+class MultiVarTEstimate(NamedTuple):
+    """
+    The parameters of a multivariate t distribution estimated from samples
+    """
+    mu: np.ndarray
+    cov: np.ndarray
+    nu: float
+    log_likelihoods: list
+    iterations: int
+
+
+def _mahalanobis(centered, cov):
+    """
+    Calculates the squared Mahalanobis distance of each sample using a Cholesky decomposition of
+    the covariance matrix
+
+    Parameters
+    ----------
+    centered : numpy.ndarray
+        The samples minus the mean, one row per sample
+    cov : numpy.ndarray
+        The covariance matrix
+
+    Returns
+    -------
+    delta : numpy.ndarray
+        The squared Mahalanobis distance of each sample
+    log_det : float
+        The log determinant of the covariance matrix
+    """
+    chol = linalg.cholesky(cov, lower=True)
+    whitened = linalg.solve_triangular(chol, centered.T, lower=True)
+    return np.einsum('ij,ij->j', whitened, whitened), 2.0 * np.sum(np.log(np.diag(chol)))
+
+
+def _log_likelihood(delta, log_det, nu, weights, num_dims):
+    """
+    Calculates the weighted log-likelihood of the samples under the multivariate t
+
+    Parameters
+    ----------
+    delta : numpy.ndarray
+        The squared Mahalanobis distance of each sample
+    log_det : float
+        The log determinant of the covariance matrix
+    nu : float
+        The degrees of freedom
+    weights : numpy.ndarray
+        The weight of each sample
+    num_dims : int
+        The number of variables
+
+    Returns
+    -------
+    log_likelihood : float
+        The weighted log-likelihood
+    """
+    constant = special.gammaln((nu + num_dims) / 2.0) - special.gammaln(nu / 2.0) - (
+            num_dims / 2.0) * np.log(nu * np.pi) - log_det / 2.0
+    return np.sum(weights * (constant - (nu + num_dims) / 2.0 * np.log1p(delta / nu)))
+
+
+def _update_nu(delta, log_det, nu, weights, num_dims):
+    """
+    Finds the degrees of freedom maximizing the log-likelihood for fixed Mahalanobis distances
+
+    Parameters
+    ----------
+    delta : numpy.ndarray
+        The squared Mahalanobis distance of each sample
+    log_det : float
+        The log determinant of the covariance matrix
+    nu : float
+        The current degrees of freedom, returned if the search fails
+    weights : numpy.ndarray
+        The weight of each sample
+    num_dims : int
+        The number of variables
+
+    Returns
+    -------
+    nu : float
+        The updated degrees of freedom
+    """
+    # Search over log(nu), the likelihood is much closer to quadratic there
+    result = optimize.minimize_scalar(
+        lambda log_nu: -_log_likelihood(delta, log_det, np.exp(log_nu), weights, num_dims),
+        bounds=np.log(NU_BOUNDS), method='bounded', options={'xatol': 1e-4})
+    return float(np.exp(result.x)) if result.success else nu
+
+
+def fit_multi_var_t(samples, nu=None, weights=None, initial: MultiVarTEstimate = None,
+                    max_iter=200, tol=1e-8):
+    """
+    Estimates the mean, covariance and degrees of freedom of a multivariate t distribution from
+    samples with the ECME algorithm
+
+    Parameters
+    ----------
+    samples : Union[pandas.DataFrame, numpy.ndarray]
+        The samples, one row per sample and one column per variable
+    nu : float
+        (Optional. Default: None) Fixes the degrees of freedom. If None they are estimated
+        jointly with the mean and covariance
+    weights : numpy.ndarray
+        (Optional. Default: None) The weight of each sample, e.g. to decay older samples.
+        Equal weights if None
+    initial : MultiVarTEstimate
+        (Optional. Default: None) A previous estimate to start from, e.g. of an overlapping
+        window. The sample mean and covariance are used if None
+    max_iter : int
+        (Optional. Default: 200) The maximum number of iterations
+    tol : float
+        (Optional. Default: 1e-8) The convergence tolerance on the change of the mean
+        log-likelihood per sample between iterations
+
+    Returns
+    -------
+    estimate : MultiVarTEstimate
+        The estimated parameters, the log-likelihood at each iteration and the number of
+        iterations
+    """
+    x = np.asarray(samples, dtype=float)
+    num_samples, num_dims = x.shape
+
+    weights = np.ones(num_samples) if weights is None else np.asarray(weights, dtype=float)
+    weights = weights * (num_samples / np.sum(weights))
+
+    if initial is not None:
+        mu = np.asarray(initial.mu, dtype=float)
+        cov = np.asarray(initial.cov, dtype=float)
+        est_nu = initial.nu if nu is None else nu
+    else:
+        mu = np.average(x, axis=0, weights=weights)
+        cov = np.cov(x, rowvar=False, aweights=weights).reshape(num_dims, num_dims)
+        est_nu = 10.0 if nu is None else nu
+
+    delta, log_det = _mahalanobis(x - mu, cov)
+    log_likelihoods = [_log_likelihood(delta, log_det, est_nu, weights, num_dims)]
+
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        # E step, the expected precision of each sample
+        z = weights * (est_nu + num_dims) / (est_nu + delta)
+
+        # CM step for the mean and covariance
+        mu = z @ x / np.sum(z)
+        centered = x - mu
+        cov = (centered * z[:, np.newaxis]).T @ centered / num_samples
+
+        delta, log_det = _mahalanobis(centered, cov)
+
+        # CM step for the degrees of freedom on the actual likelihood
+        if nu is None:
+            est_nu = _update_nu(delta, log_det, est_nu, weights, num_dims)
+
+        log_likelihoods.append(_log_likelihood(delta, log_det, est_nu, weights, num_dims))
+        if abs(log_likelihoods[-1] - log_likelihoods[-2]) < tol * num_samples:
+            break
+
+    profile_count('ecme_iterations', iterations)
+
+    return MultiVarTEstimate(mu, cov, est_nu, log_likelihoods, iterations)
 
 
 def mle_multi_var_t(samples, nu):
     """
-    Calls the MLE library to calibrate the distributions based on the sample data and
+    Calibrates the distribution based on the sample data with the degrees of freedom fixed and
     unpacks the results
 
     Parameters
@@ -35,13 +217,76 @@ def mle_multi_var_t(samples, nu):
     fitness_scores : numpy.ndarray
         The fitness scores at each iteration of the optimization
     """
-    estimates = t(samples.to_numpy(), dof=nu)
+    estimate = fit_multi_var_t(samples, nu=nu)
+
+    return estimate.mu, estimate.cov, estimate.log_likelihoods
+
+
+class RollingMultiVarT:
+    """
+    This class refits a multivariate t to a rolling window of samples as new samples arrive.
+    Each fit starts from the previous estimate, so a window which moved by a few samples only
+    takes a few iterations to converge
+    """
+
+    def __init__(self, window: int, halflife=None, nu=None):
+        """
+        Constructs the object with no samples
+
+        Parameters
+        ----------
+        window : int
+            The maximum number of the most recent samples used in a fit
+        halflife : float
+            (Optional. Default: None) The age in samples at which the weight of a sample is
+            halved. Equal weights if None
+        nu : float
+            (Optional. Default: None) Fixes the degrees of freedom. If None they are estimated
+        """
+        self.window = window
+        self.halflife = halflife
+        self.nu = nu
+        self.samples = None
+        self.estimate = None
 
-    mu_est = estimates[1]
-    cov_est = estimates[0]
-    fitness_scores = estimates[2]
+    def weights(self):
+        """
+        Gets the weight of each sample in the window
 
-    return mu_est, cov_est, fitness_scores
+        Returns
+        -------
+        weights : numpy.ndarray
+            The weights, oldest sample first. None for equal weights
+        """
+        if self.halflife is None:
+            return None
+
+        ages = np.arange(self.samples.shape[0] - 1, -1, -1)
+        return 0.5 ** (ages / self.halflife)
+
+    def update(self, samples):
+        """
+        Adds new samples to the window, drops the samples which fall out of it and refits
+
+        Parameters
+        ----------
+        samples : Union[pandas.DataFrame, numpy.ndarray]
+            The new samples, oldest first, one column per variable
+
+        Returns
+        -------
+        estimate : MultiVarTEstimate
+            The estimate of the updated window
+        """
+        samples = np.asarray(samples, dtype=float)
+        if self.samples is None:
+            self.samples = samples[-self.window:]
+        else:
+            self.samples = np.concatenate((self.samples, samples))[-self.window:]
+
+        self.estimate = fit_multi_var_t(self.samples, nu=self.nu, weights=self.weights(),
+                                        initial=self.estimate)
+        return self.estimate
 
 
 class MultiVarStudentT:
@@ -84,9 +329,14 @@ class MultiVarStudentT:
         Returns
         -------
         positions : numpy.ndarray
-            The ndarray containing the grid positions output from dstack
+            The ndarray containing the grid positions, the last axis holds the N coordinates
         grid : numpy.ndarray
             The mesh-grid input for the positions
+
+        Notes
+        -----
+        The grid has exponentially many points in the number of dimensions. When only the 1-D
+        marginals are needed use marginal() instead.
         """
         num_dimensions = len(self.mu)
 
@@ -99,7 +349,25 @@ class MultiVarStudentT:
 
         # Create the grid and return the stacked positions
         grid = np.mgrid[mgrid_index]
-        return np.dstack(grid), grid
+        return np.stack(grid, axis=-1), grid
+
+    def marginal(self, axis_index):
+        """
+        The marginals of the multivariate t are univariate Student's t distributions with the
+        same degrees of freedom, location mu_i and scale sqrt(cov_ii)
+
+        Parameters
+        ----------
+        axis_index : int
+            The index of the random variable
+
+        Returns
+        -------
+        marginal : scipy.stats frozen distribution
+            The frozen univariate Student's t of the variable
+        """
+        scale = np.sqrt(self.cov.iloc[axis_index, axis_index])
+        return students_t(self.nu, loc=self.mu[axis_index], scale=scale)
 
     def pdf(self, positions):
         """
@@ -119,7 +387,7 @@ class MultiVarStudentT:
         """
         return self.t.pdf(positions)
 
-    def rvs(self, num_samples):
+    def rvs(self, num_samples, random_state=None):
         """
         This function mimics rv_continuous's rvs and generates num_samples random samples
         from the distribution
@@ -128,10 +396,13 @@ class MultiVarStudentT:
         ----------
         num_samples : int
             The number of samples to generate
+        random_state : {None, int, numpy.random.Generator, numpy.random.RandomState}
+            (Optional. Default: None) The random state to draw from, see rv_continuous.rvs
 
         Returns
         -------
         rand_vars : pandas.DataFrame
             A DataFrame num_samples rows by N columns
         """
-        return pd.DataFrame(self.t.rvs(num_samples), columns=self.cov.columns)
+        return pd.DataFrame(self.t.rvs(num_samples, random_state=random_state),
+                            columns=self.cov.columns)
@@ -10,6 +10,7 @@ from scipy.optimize import brentq
 
 from potion.curve_gen.training.distributions.skewed_students_t import skewed_t
 from potion.curve_gen.training.fit.tail_fit import fit_samples
+from potion.rng import resolve_generator
 
 
 def find_nearest(array, value):
@@ -353,7 +354,7 @@ class PiecewiseDistribution(rv_continuous):
         output_samples : numpy.ndarray
             The random samples as an array of num_samples length
         """
-        samples = np.random.uniform(low=0.0, high=1.0, size=size)
+        samples = resolve_generator(random_state).uniform(low=0.0, high=1.0, size=size)
 
         uniform, random_samples = self._calculate_inverse_cdf(
             np.linspace(-10.0, 10.0, 30000), *args)
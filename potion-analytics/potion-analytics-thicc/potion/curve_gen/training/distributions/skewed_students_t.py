@@ -7,6 +7,7 @@
 # https://www.gnu.org/licenses/old-licenses/lgpl-2.1.en.html
 # which makes this file also LGPLv2.
 # Last modifications by Mike Johnson on 5/5/2021
+# Modified to add the analytic quantile function _ppf
 # **************************************************************
 
 # This file is free software; you can redistribute it and/or
@@ -216,6 +217,57 @@ class SkewedT(rv_continuous):
 
         return cdf_values
 
+    def _ppf(self, q, *args):
+        """
+        Overrides the _ppf function so the quantiles are calculated by inverting the two halves
+        of the cumulative density function analytically instead of by numerical root finding.
+        This allows the distribution to be sampled by inverse transform of given uniforms
+
+        Parameters
+        ----------
+        q : numpy.ndarray
+            The probabilities to calculate the quantiles of
+        args : List[float]
+            The array of input parameters - in this case args[0] is skew and args[1] is nu
+
+        Returns
+        -------
+        ppf : numpy.ndarray
+            The quantiles x for which the cumulative density function equals q
+        """
+        skew = args[0]
+        nu = args[1]
+
+        # For some reason scipy.stats sometimes passes this in as an array of the parameter
+        if type(skew) is np.ndarray:
+            if skew.ndim > 0:
+                skew = skew[0]
+        if type(nu) is np.ndarray:
+            if nu.ndim > 0:
+                nu = nu[0]
+
+        # Calculate mu
+        skew_inv = 1.0 / skew
+        m1 = 2.0 * np.sqrt(nu - 2.0) / (nu - 1.0) / beta(0.5, nu / 2.0)
+        mu = m1 * (skew - skew_inv)
+
+        # Calculate sigma for scaling inputs and outputs
+        skew_sq = skew ** 2.0
+        m1_sq = m1 ** 2.0
+        arg = (1.0 - m1_sq) * (skew_sq + (1.0 / skew_sq)) + (2 * m1_sq) - 1.0
+        sig = np.sqrt(arg)
+
+        # The probability below z = 0 splits the two halves of the cdf
+        k = 2.0 / (skew + skew_inv)
+        q = np.asarray(q, dtype=float)
+        below = q < 1.0 / (1.0 + skew_sq)
+        z = np.where(below,
+                     t.ppf(np.where(below, q * skew / k, 0.5), nu) / skew,
+                     -skew * t.ppf(np.where(below, 0.5, (1.0 - q) / (k * skew)), nu))
+
+        # Transform the output by location/scale
+        return (z - mu) / sig
+
     def _rvs(self, *args, size=None, random_state=None):
         """
         Overrides the _rvs function so we can generate random variable samples for an
@@ -252,9 +304,10 @@ class SkewedT(rv_continuous):
         # Generate the random samples
         skew_inv = 1.0 / skew
         weighting = skew / (skew + skew_inv)
-        z = uniform.rvs(loc=-weighting, scale=1.0, size=size)
+        z = uniform.rvs(loc=-weighting, scale=1.0, size=size, random_state=random_state)
         skew_values = skew ** np.sign(z)
-        random_samples = -np.abs(t.rvs(nu, size=size)) / skew_values * np.sign(z)
+        random_samples = -np.abs(t.rvs(nu, size=size, random_state=random_state)) / \
+            skew_values * np.sign(z)
 
         # Calculate the location parameter
         m1 = 2.0 * np.sqrt(nu - 2.0) / (nu - 1.0) / beta(0.5, nu / 2.0)
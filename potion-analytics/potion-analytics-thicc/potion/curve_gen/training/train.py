@@ -16,6 +16,9 @@ three duck typed functions:
         on TrainingConfig'
     train(*args)
         'Which performs the training using the specified CSV files'
+    train_groups(*args)
+        'Which performs the same training, returning a TrainingGroup for each convolution group
+        instead of a DataFrame. Used by the Generator, see potion.curve_gen.pipeline'
 
 Like many python libraries, this module uses a global object with the methods prebound so that
 the same library can be used by object-oriented and functional programmers alike. Object-oriented
@@ -26,6 +29,7 @@ import pandas as pd
 import datetime
 from typing import List
 
+from potion.curve_gen.pipeline import TrainingGroup
 from potion.curve_gen.training.fit.helpers import calc_log_returns
 from potion.curve_gen.training.distributions.skewed_students_t import skewed_t
 from potion.curve_gen.training.builder import TrainingConfig, TrainingConfigBuilder
@@ -272,8 +276,8 @@ class Trainer:
         """
         self.config = config
 
-    def _create_convolution_group(self, row, training_dates,
-                                  *args, dist=skewed_t, calc_returns=calc_log_returns):
+    def _create_training_group(self, row, training_dates,
+                               *args, dist=skewed_t, calc_returns=calc_log_returns):
         """
         For all rows in the input CSV which have the same Asset, TrainingLabel, TrainingStart,
         and TrainingEnd, they will have the same results when the convolution is performed during
@@ -285,7 +289,7 @@ class Trainer:
         This function filters the input DataFrame into one group based on the
         same convolution results, collects the training data for the filtered group,
         performs MLE to fit a probability distribution to the training data, and finally returns
-        a DataFrame containing the resulting parameters and all of the info needed for the
+        a TrainingGroup containing the resulting parameters and all of the info needed for the
         convolution module to perform its functions.
 
         Parameters
@@ -304,8 +308,8 @@ class Trainer:
 
         Returns
         -------
-        conv_df : pandas.DataFrame
-            The DataFrame containing all of the information needed to run the convolution
+        group : TrainingGroup
+            The group containing all of the information needed to run the convolution
             module during curve generation
         """
         # Filter the input into the subset we are interested in
@@ -320,24 +324,43 @@ class Trainer:
         dist_params = _fit_params_from_prices(price_path, *args, dist=dist,
                                               calc_returns=calc_returns)
 
-        # Create the output DataFrame and return it
-        rows = [{
-            'Asset': row.Asset,
-            'TrainingLabel': row.TrainingLabel,
-            'TrainingStart': start_date,
-            'TrainingEnd': end_date,
-            'StrikePct': f_row.StrikePct,
-            'Expiration': f_row.Expiration,
-            'DistParams': dist_params,
-            'CurrentPrice': row.CurrentPrice,
-            'TrainingPrices': price_path.tolist()
-        } for f_i, f_row in filtered_df.iterrows()]
+        # The training prices are held once for all of the strikes and expirations of the group
+        return TrainingGroup(asset=row.Asset, label=row.TrainingLabel, start=start_date,
+                             end=end_date, current_price=row.CurrentPrice,
+                             dist_params=dist_params, training_prices=price_path,
+                             strike_pcts=filtered_df['StrikePct'].to_numpy(),
+                             expirations=filtered_df['Expiration'].to_numpy())
 
-        conv_df = pd.DataFrame(rows)
+    def _create_convolution_group(self, row, training_dates,
+                                  *args, dist=skewed_t, calc_returns=calc_log_returns):
+        """
+        Creates the training output of a convolution group in the DataFrame format, see
+        _create_training_group
 
-        return conv_df
+        Parameters
+        ----------
+        row : pandas.DataFrame
+            The row of the input DataFrame whose convolution group will be created
+        training_dates : numpy.ndarray
+            The ndarray containing the dates of the training data when prices were collected
+        args : List[float]
+            The argument list containing float values as initial guesses for each of the parameters
+            in the probability distribution being fit
+        dist : scipy.stats.rv_continuous
+            The probability distribution which is being fit to the training data returns
+        calc_returns : Callable
+            The function being used to calculate the financial returns of the training data
 
-    def train(self, *args, dist=skewed_t, calc_returns=calc_log_returns):
+        Returns
+        -------
+        conv_df : pandas.DataFrame
+            The DataFrame containing all of the information needed to run the convolution
+            module during curve generation
+        """
+        return self._create_training_group(row, training_dates, *args, dist=dist,
+                                           calc_returns=calc_returns).to_frame()
+
+    def train_groups(self, *args, dist=skewed_t, calc_returns=calc_log_returns):
         """
         Performs the training by fitting a probability distribution to the financial
         returns of the training data specified in the configuration.
@@ -363,9 +386,9 @@ class Trainer:
 
         Returns
         -------
-        conv_dfs : List[pandas.DataFrame]
-            A List containing the DataFrames to be used during each convolution run for
-            each training set we are generating Kelly curves for
+        groups : List[TrainingGroup]
+            A List containing the training output of each convolution group we are generating
+            Kelly curves for
         """
 
         # Get the unique sets we will generate convolution groups for
@@ -375,11 +398,35 @@ class Trainer:
         # Extract the training dates from the file so it isn't repeated in the loop
         training_dates = get_training_dates(self.config.training_df)
 
-        conv_dfs = [self._create_convolution_group(row, training_dates, *args, dist=dist,
-                                                   calc_returns=calc_returns)
-                    for u_i, row in unique_sets.iterrows()]
+        return [self._create_training_group(row, training_dates, *args, dist=dist,
+                                            calc_returns=calc_returns)
+                for row in unique_sets.itertuples(index=False)]
+
+    def train(self, *args, dist=skewed_t, calc_returns=calc_log_returns):
+        """
+        Performs the training like train_groups, returning the training output of each
+        convolution group as a DataFrame with one row per curve
+
+        Parameters
+        ----------
+        args : List[float]
+            The argument list containing float values as initial guesses for each of the parameters
+            in the probability distribution being fit
+        dist : scipy.stats.rv_continuous
+            (Optional. Default: skewed_t) The probability distribution which is being fit to
+            the training data returns
+        calc_returns : Callable
+            (Optional. Default: calc_log_returns) The function being used to calculate the
+            financial returns of the training data
 
-        return conv_dfs
+        Returns
+        -------
+        conv_dfs : List[pandas.DataFrame]
+            A List containing the DataFrames to be used during each convolution run for
+            each training set we are generating Kelly curves for
+        """
+        return [group.to_frame() for group in self.train_groups(*args, dist=dist,
+                                                                calc_returns=calc_returns)]
 
 
 # Define a Global object with default values to be configured by the module user
@@ -389,3 +436,4 @@ _train = Trainer(TrainingConfigBuilder().build_config())
 # programmers alike
 configure_training = _train.configure
 train = _train.train
+train_groups = _train.train_groups
@@ -11,6 +11,8 @@ from potion.curve_gen.payoff.helpers import black_scholes_payoff
 from potion.curve_gen.payoff.builder import PayoffConfigBuilder
 from potion.curve_gen.convolution.builder import ConvolutionConfigBuilder
 from potion.curve_gen.convolution.convolution import get_pdf_arrays
+from potion.curve_gen.convolution.grid import adaptive_log_grid, DEFAULT_TAIL_MASS
+from potion.curve_gen.pipeline import TrainingGroup
 from potion.curve_gen.training.distributions.skewed_students_t import skewed_t
 from potion.curve_gen.training.builder import TrainingConfigBuilder
 from potion.curve_gen.constraints.builder import ConstraintsConfigBuilder
@@ -151,7 +153,8 @@ def make_payoff_cfg(x_pts, strike_pct: float, payoff_dict, payoff_fcn=black_scho
 
 
 def build_generator_config(input_file: str, training_history_file: str, payoff_dict=None,
-                           lower_bounds_fcns=None, upper_bounds_fcns=None):
+                           lower_bounds_fcns=None, upper_bounds_fcns=None,
+                           adaptive_sampling=False):
     """
     Creates a configuration object for the curve generation process from the two
     input file names
@@ -170,6 +173,9 @@ def build_generator_config(input_file: str, training_history_file: str, payoff_d
     upper_bounds_fcns : List[Callable]
         A List containing the callable upper bound functions for the premiums when
         running the optimizer
+    adaptive_sampling : bool
+        (Optional. Default: False) Solve the premiums of each curve at an adaptively chosen
+        subset of the bet fractions, see FitConfigBuilder.set_adaptive_sampling
 
     Returns
     -------
@@ -199,18 +205,19 @@ def build_generator_config(input_file: str, training_history_file: str, payoff_d
         [bounds_cfg.add_upper_bound(func) for func in upper_bounds_fcns]
 
     return GeneratorConfigBuilder().set_training_builder(training_config).set_bounds_builder(
-        bounds_cfg).set_fit_builder(FitConfigBuilder()).build_config()
+        bounds_cfg).set_fit_builder(FitConfigBuilder().set_adaptive_sampling(
+            adaptive_sampling)).build_config()
 
 
-def training_output_to_csv(dfs: List[pd.DataFrame]):
+def training_groups_to_csv(groups: List[TrainingGroup]):
     """
-    Takes the DataFrames output from the training process and repackages the output
+    Takes the TrainingGroups output from the training process and repackages the output
     into the CSV format expected by the backtester and other areas of the tool
 
     Parameters
     ----------
-    dfs : List[pandas.DataFrame]
-        The List of DataFrames output by the training process which needs repackaging
+    groups : List[TrainingGroup]
+        The List of TrainingGroups output by the training process which needs repackaging
 
     Returns
     -------
@@ -218,29 +225,52 @@ def training_output_to_csv(dfs: List[pd.DataFrame]):
         The DataFrame containing all of the information obtained from the training process
     """
     rows = [{
-        'Ticker': row.Asset,
-        'Label': row.TrainingLabel,
-        'CurrentPrice': row.CurrentPrice,
-        'StartDate': datetime.strftime(row.TrainingStart, '%d/%m/%Y'),
-        'EndDate': datetime.strftime(row.TrainingEnd, '%d/%m/%Y'),
-        'TrainingPrices': row.TrainingPrices
-    } for df in dfs for index, row in df.iterrows()]
+        'Ticker': group.asset,
+        'Label': group.label,
+        'CurrentPrice': group.current_price,
+        'StartDate': datetime.strftime(group.start, '%d/%m/%Y'),
+        'EndDate': datetime.strftime(group.end, '%d/%m/%Y'),
+        'TrainingPrices': group.training_prices.tolist()
+    } for group in groups]
 
     return pd.DataFrame(rows).drop_duplicates(subset=['Ticker', 'Label',
                                                       'CurrentPrice', 'StartDate',
                                                       'EndDate']).reset_index(drop=True)
 
 
-def training_output_to_convolution_config(dfs, min_x=-5.0, max_x=5.0, log_only=False,
-                                          pdf_pts=20001, dist=skewed_t):
+def training_output_to_csv(dfs: List[pd.DataFrame]):
     """
     Takes the DataFrames output from the training process and repackages the output
-    into the format needed for the convolution module
+    into the CSV format expected by the backtester and other areas of the tool
 
     Parameters
     ----------
     dfs : List[pandas.DataFrame]
         The List of DataFrames output by the training process which needs repackaging
+
+    Returns
+    -------
+    training_df : pandas.DataFrame
+        The DataFrame containing all of the information obtained from the training process
+    """
+    return training_groups_to_csv([TrainingGroup.from_frame(df) for df in dfs])
+
+
+def training_groups_to_convolution_config(groups: List[TrainingGroup], min_x=-5.0, max_x=5.0,
+                                          log_only=False, pdf_pts=20001, dist=skewed_t,
+                                          adaptive_grid=True, tail_mass=DEFAULT_TAIL_MASS):
+    """
+    Takes the TrainingGroups output from the training process and repackages the output
+    into the format needed for the convolution module
+
+    By default, the PDFs use an adaptive non-uniform grid sized and placed from the quantiles of
+    the trained distributions and the expirations (see potion.curve_gen.convolution.grid). The
+    grid is shared by every group so that the output PDFs have a single price column.
+
+    Parameters
+    ----------
+    groups : List[TrainingGroup]
+        The List of TrainingGroups output by the training process which needs repackaging
     min_x : float
         (Optional. Default: -5.0) The minimum value in the log return domain
     max_x : float
@@ -248,39 +278,100 @@ def training_output_to_convolution_config(dfs, min_x=-5.0, max_x=5.0, log_only=F
     log_only : bool
         (Optional. Default: False) Whether to only use the log return domain in convolution
     pdf_pts : int
-        (Optional. Default: 20001) The number of points in the convolution PDF
+        (Optional. Default: 20001) The number of points in the convolution PDF when the
+        adaptive grid is not used
     dist : scipy.stats.rv_continuous
         (Optional. Default: skewed_t) The probability distribution which is being fit to
         the training data returns
+    adaptive_grid : bool
+        (Optional. Default: True) Whether to use the adaptive non-uniform grid. If False, a
+        uniform grid of pdf_pts points between min_x and max_x is used
+    tail_mass : float
+        (Optional. Default: 1e-5) The probability mass allowed outside of each bound of the
+        adaptive grid
 
     Returns
     -------
     conv_cfgs : List[ConvolutionConfig]
         The List of ConvolutionConfigs used to configure the convolution module
     """
+    rvs = []
+    for group in groups:
+        params = group.dist_params
+        rvs.append(dist(*tuple(params[2:]), loc=params[0], scale=params[1]))
+
+    adaptive_grid = adaptive_grid and len(rvs) > 0
+    if adaptive_grid:
+        log_x, conv_log_x = adaptive_log_grid(rvs, [group.expirations for group in groups],
+                                              tail_mass=tail_mass, min_x=min_x, max_x=max_x)
+
     conv_cfgs = []
-    for df in dfs:
-        params = df['DistParams'].values[0]
-        args = tuple(params[2:])
+    for group, rv in zip(groups, rvs):
+        builder = ConvolutionConfigBuilder().set_num_times_to_convolve(
+            group.expirations.max()).set_min_x(min_x).set_max_x(max_x).set_log_only(
+            log_only).set_points_in_pdf(pdf_pts).set_distribution(rv.pdf).set_distribution_params(
+            group.dist_params)
 
-        conv_cfgs.append(ConvolutionConfigBuilder().set_num_times_to_convolve(
-            df['Expiration'].max()).set_min_x(min_x).set_max_x(max_x).set_log_only(
-            log_only).set_points_in_pdf(pdf_pts).set_distribution(
-            dist(*args, loc=params[0], scale=params[1]).pdf).set_distribution_params(
-            params).build_config())
+        if adaptive_grid:
+            builder.set_grid(log_x, conv_log_x)
+
+        conv_cfgs.append(builder.build_config())
 
     return conv_cfgs
 
 
-def training_output_to_payoff_config(dfs, conv_configs, payoff_dict=None):
+def training_output_to_convolution_config(dfs, min_x=-5.0, max_x=5.0, log_only=False,
+                                          pdf_pts=20001, dist=skewed_t, adaptive_grid=True,
+                                          tail_mass=DEFAULT_TAIL_MASS):
     """
     Takes the DataFrames output from the training process and repackages the output
-    into the format needed for configuring the payoff during curve generation.
+    into the format needed for the convolution module, see training_groups_to_convolution_config
 
     Parameters
     ----------
     dfs : List[pandas.DataFrame]
-        The List of DataFrames output by the training process which is used to configure the payoff
+        The List of DataFrames output by the training process which needs repackaging
+    min_x : float
+        (Optional. Default: -5.0) The minimum value in the log return domain
+    max_x : float
+        (Optional. Default: 5.0) The maximum value in the log return domain
+    log_only : bool
+        (Optional. Default: False) Whether to only use the log return domain in convolution
+    pdf_pts : int
+        (Optional. Default: 20001) The number of points in the convolution PDF when the
+        adaptive grid is not used
+    dist : scipy.stats.rv_continuous
+        (Optional. Default: skewed_t) The probability distribution which is being fit to
+        the training data returns
+    adaptive_grid : bool
+        (Optional. Default: True) Whether to use the adaptive non-uniform grid. If False, a
+        uniform grid of pdf_pts points between min_x and max_x is used
+    tail_mass : float
+        (Optional. Default: 1e-5) The probability mass allowed outside of each bound of the
+        adaptive grid
+
+    Returns
+    -------
+    conv_cfgs : List[ConvolutionConfig]
+        The List of ConvolutionConfigs used to configure the convolution module
+    """
+    return training_groups_to_convolution_config(
+        [TrainingGroup.from_frame(df) for df in dfs], min_x=min_x, max_x=max_x,
+        log_only=log_only, pdf_pts=pdf_pts, dist=dist, adaptive_grid=adaptive_grid,
+        tail_mass=tail_mass)
+
+
+def training_groups_to_payoff_config(groups: List[TrainingGroup], conv_configs,
+                                     payoff_dict=None):
+    """
+    Takes the TrainingGroups output from the training process and repackages the output
+    into the format needed for configuring the payoff during curve generation.
+
+    Parameters
+    ----------
+    groups : List[TrainingGroup]
+        The List of TrainingGroups output by the training process which is used to configure the
+        payoff
     conv_configs : List[ConvolutionConfig]
         The List of ConvolutionConfigs used to configure the convolution module
     payoff_dict : dict
@@ -298,7 +389,35 @@ def training_output_to_payoff_config(dfs, conv_configs, payoff_dict=None):
         payoff_dict = make_payoff_dict(call_or_put='put', direction='short')
 
     return [[make_payoff_cfg(conv_cfg.x, strike_pct, payoff_dict)
-             for strike_pct in df['StrikePct'].values] for df, conv_cfg in zip(dfs, conv_configs)]
+             for strike_pct in group.strike_pcts]
+            for group, conv_cfg in zip(groups, conv_configs)]
+
+
+def training_output_to_payoff_config(dfs, conv_configs, payoff_dict=None):
+    """
+    Takes the DataFrames output from the training process and repackages the output
+    into the format needed for configuring the payoff during curve generation, see
+    training_groups_to_payoff_config
+
+    Parameters
+    ----------
+    dfs : List[pandas.DataFrame]
+        The List of DataFrames output by the training process which is used to configure the payoff
+    conv_configs : List[ConvolutionConfig]
+        The List of ConvolutionConfigs used to configure the convolution module
+    payoff_dict : dict
+        (Optional) The payoff dict specifying the info used to calculate the curves. By default,
+        this specifies a short put. This can be used to specify other individual options or an
+        option spread. See make_payoff_dict for more info
+
+    Returns
+    -------
+    payoff_cfgs : List[List[PayoffConfig]]
+        The PayoffConfig objects which will be used in curve generation for each strike and
+        convolution group
+    """
+    return training_groups_to_payoff_config([TrainingGroup.from_frame(df) for df in dfs],
+                                            conv_configs, payoff_dict=payoff_dict)
 
 
 def add_pdf_csv_columns(exp_days: np.ndarray, column_names: List[str],
@@ -363,7 +482,8 @@ def add_curve_csv_rows(df: pd.DataFrame, outputs, dist_params,
     dist_params : List[float]
         The List of parameters for the PDF
     bet_fractions : numpy.ndarray
-        The X axis points for each curve
+        The X axis points for each curve, used when the output dict of a curve does not record
+        the bet fractions it was solved at
 
     Returns
     -------
@@ -391,7 +511,7 @@ def add_curve_csv_rows(df: pd.DataFrame, outputs, dist_params,
             'C': params[2],
             'D': params[3],
             't_params': dist_params,
-            'bet_fractions': bet_fractions,
+            'bet_fractions': out_dict.get('bet_fractions', bet_fractions),
             'curve_points': premium
         })
 
@@ -0,0 +1,350 @@
+"""
+This module records where time goes in the curve generator and the backtesters. The pipeline
+stages are wrapped in named timers and report counters of the work they do, so a profile of a
+run can be written next to its results without attaching an external profiler.
+
+The stages use the following names:
+
+    Timers
+        training, convolution, transform, premium_solving, fitting, path_generation, evaluation,
+        logging
+    Counters
+        premium_solves, brentq_iterations, bound_fallbacks, fit_nfev, rows_written,
+        ecme_iterations, path_store_hits, path_store_misses, pool_path_reuses, truncated_pdfs
+
+Timers may be nested, the time of a timer includes the time of the timers nested inside of it.
+A timer can also be used as a decorator, e.g. @timer('evaluation'), to time every call of a
+function.
+The resident memory of the process is sampled when a timer starts and stops, which gives the
+memory in use at the end of each stage and how much it grew during the stage. The current
+resident memory is read from /proc, so memory is only sampled on Linux. The peak reported by
+getrusage is not used, it is the peak over the life of the process and never goes down. Work
+done by the processes of a parallel backtest is not recorded, only the timers of the parent
+process.
+
+Like many python libraries, this module uses a global object with the methods prebound so that
+the same library can be used by object-oriented and functional programmers alike. Object-oriented
+users can use the Profiler class, and functional programmers can use the functions:
+
+    timer(str)
+        'Context manager timing the code inside of it'
+    record_time(str, float)
+        'Adds time measured by the caller to a timer'
+    count(str, int)
+        'Increments a counter'
+    reset_profile()
+        'Clears the recorded timers and counters'
+    get_profile()
+        'Gets the recorded profile as a dict'
+    write_profile(str)
+        'Writes the recorded profile to a JSON file'
+"""
+import datetime
+import json
+import mmap
+import time
+from contextlib import contextmanager
+from typing import Callable
+
+import pandas as pd
+
+PROFILE_FILENAME = 'profile.json'
+
+
+def current_memory_mb():
+    """
+    Gets the current resident memory of the current process
+
+    Returns
+    -------
+    memory : float
+        The resident memory in megabytes, None if it cannot be measured on this platform
+    """
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            # The second field is the number of resident pages
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+
+    return pages * mmap.PAGESIZE / 2.0 ** 20
+
+
+class Profiler:
+    """
+    This class accumulates the timers, counters and memory samples of the pipeline stages
+    """
+
+    def __init__(self, enabled=True):
+        """
+        Constructs the object with no recorded values
+
+        Parameters
+        ----------
+        enabled : bool
+            (Optional. Default: True) Whether the timers and counters are recorded
+        """
+        self.enabled = enabled
+        self.listeners = []
+        self.timers = {}
+        self.counters = {}
+        self.peak_memory = None
+        self.started = None
+        self.reset()
+
+    def reset(self):
+        """
+        Clears the recorded timers, counters and memory samples
+
+        Returns
+        -------
+        None
+        """
+        self.timers = {}
+        self.counters = {}
+        self.peak_memory = current_memory_mb()
+        self.started = datetime.datetime.now()
+
+    def set_enabled(self, enabled: bool):
+        """
+        Turns the recording on or off. When off the timers and counters cost a function call
+
+        Parameters
+        ----------
+        enabled : bool
+            Whether the timers and counters are recorded
+
+        Returns
+        -------
+        None
+        """
+        self.enabled = enabled
+
+    def add_listener(self, listener: Callable):
+        """
+        Adds a function which is called with the profile dict each time a timer is stopped, e.g.
+        to show a live view of the profile in the UI
+
+        Parameters
+        ----------
+        listener : Callable
+            The function to call
+
+        Returns
+        -------
+        None
+        """
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener: Callable):
+        """
+        Removes a function added with add_listener
+
+        Parameters
+        ----------
+        listener : Callable
+            The function to remove
+
+        Returns
+        -------
+        None
+        """
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def record_time(self, name: str, seconds: float, calls=1):
+        """
+        Adds time measured by the caller to a timer. Used in tight loops where a context
+        manager would add too much overhead.
+
+        Parameters
+        ----------
+        name : str
+            The name of the timer
+        seconds : float
+            The time to add in seconds
+        calls : int
+            (Optional. Default: 1) The number of calls the time was measured over
+
+        Returns
+        -------
+        None
+        """
+        if not self.enabled:
+            return
+
+        stats = self.timers.get(name)
+        if stats is None:
+            stats = self.timers[name] = {'total': 0.0, 'calls': 0, 'max': 0.0}
+
+        stats['total'] += seconds
+        stats['calls'] += calls
+        stats['max'] = max(stats['max'], seconds / max(calls, 1))
+
+    def sample_memory(self):
+        """
+        Samples the resident memory of the process, and keeps the highest sample since the
+        profile was reset
+
+        Returns
+        -------
+        memory : float
+            The resident memory in megabytes, None if it cannot be measured on this platform
+        """
+        memory = current_memory_mb()
+        if memory is not None:
+            self.peak_memory = max(self.peak_memory or 0.0, memory)
+        return memory
+
+    @contextmanager
+    def timer(self, name: str):
+        """
+        Context manager which times the code inside of it, samples the memory before and after
+        the code and notifies the listeners
+
+        Parameters
+        ----------
+        name : str
+            The name of the timer
+
+        Returns
+        -------
+        None
+        """
+        if not self.enabled:
+            yield
+            return
+
+        start_memory = current_memory_mb()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_time(name, time.perf_counter() - start)
+            memory = self.sample_memory()
+            if memory is not None and start_memory is not None:
+                stats = self.timers[name]
+                stats['memory_mb'] = max(stats.get('memory_mb', 0.0), memory)
+                stats['memory_growth_mb'] = max(stats.get('memory_growth_mb', 0.0),
+                                                memory - start_memory)
+
+            for listener in self.listeners:
+                listener(self.get_profile())
+
+    def count(self, name: str, value=1):
+        """
+        Increments a counter
+
+        Parameters
+        ----------
+        name : str
+            The name of the counter
+        value : int
+            (Optional. Default: 1) The amount to add
+
+        Returns
+        -------
+        None
+        """
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def get_profile(self):
+        """
+        Gets the recorded values
+
+        Returns
+        -------
+        profile : dict
+            A dict with the start time of the recording, the timers (total and max time in
+            seconds, number of calls, and the largest memory at the end of a call and growth of
+            the memory over a call in megabytes), the counters and the highest memory sampled
+            since the recording started in megabytes
+        """
+        return {
+            'started': self.started.isoformat(timespec='seconds'),
+            'timers': {name: dict(stats) for name, stats in self.timers.items()},
+            'counters': dict(self.counters),
+            'peak_memory_mb': self.peak_memory
+        }
+
+    def write_profile(self, filename: str):
+        """
+        Writes the recorded values to a JSON file
+
+        Parameters
+        ----------
+        filename : str
+            The name of the file to write
+
+        Returns
+        -------
+        None
+        """
+        with open(filename, 'w') as f:
+            json.dump(self.get_profile(), f, indent=2)
+
+
+def read_profile(filename: str):
+    """
+    Reads a profile written by write_profile
+
+    Parameters
+    ----------
+    filename : str
+        The name of the file to read
+
+    Returns
+    -------
+    profile : dict
+        The recorded values, see Profiler.get_profile
+    """
+    with open(filename, 'r') as f:
+        return json.load(f)
+
+
+def profile_to_dataframe(profile: dict):
+    """
+    Converts the timers of a profile to a table sorted by total time, for display
+
+    Parameters
+    ----------
+    profile : dict
+        The recorded values, see Profiler.get_profile
+
+    Returns
+    -------
+    timers_df : pandas.DataFrame
+        One row per timer with the total, mean and max time, the calls, the memory at the end
+        of the stage and the growth of the memory during the stage
+    """
+    rows = [{
+        'Stage': name,
+        'Total (s)': stats['total'],
+        'Calls': stats['calls'],
+        'Mean (s)': stats['total'] / max(stats['calls'], 1),
+        'Max (s)': stats['max'],
+        'Memory (MB)': stats.get('memory_mb'),
+        'Memory Growth (MB)': stats.get('memory_growth_mb')
+    } for name, stats in profile['timers'].items()]
+
+    columns = ['Stage', 'Total (s)', 'Calls', 'Mean (s)', 'Max (s)', 'Memory (MB)',
+               'Memory Growth (MB)']
+    return pd.DataFrame(rows, columns=columns).sort_values('Total (s)', ascending=False)
+
+
+# Define a Global object with default values to be used by the module user
+_profiler = Profiler()
+
+# Prebind the object's methods so the module can be used by object oriented and functional
+# programmers alike
+timer = _profiler.timer
+record_time = _profiler.record_time
+count = _profiler.count
+sample_memory = _profiler.sample_memory
+reset_profile = _profiler.reset
+get_profile = _profiler.get_profile
+write_profile = _profiler.write_profile
+set_profiling_enabled = _profiler.set_enabled
+add_profile_listener = _profiler.add_listener
+remove_profile_listener = _profiler.remove_listener
@@ -0,0 +1,247 @@
+"""
+This module manages the random number streams of the analytics package. The backtesters draw
+their random numbers from numpy Generators spawned from a numpy.random.SeedSequence of the seed
+of the run, instead of from the global numpy random state, so the results of a run only depend
+on its seed.
+
+A stream is addressed by a tuple of names, e.g. ('paths', 'BTC-full') for the paths of a training
+data set, or (key, duration, strike) for an evaluation task. The names are turned into the spawn
+key of the SeedSequence, the key SeedSequence.spawn gives to its children, so a stream does not
+depend on the streams used before it or on the process it is used in. A process forked by a pool
+draws the same numbers from a stream as the parent would, and sequential and parallel runs agree.
+
+Large sets of paths are drawn in chunks of PATH_CHUNK_SIZE paths, each chunk from its own child
+stream spawned with SeedSequence.spawn. A chunk can be drawn again on its own, e.g. to restart a
+failed chunk of a job, and the first chunks of a set do not depend on the number of paths.
+
+The seed and the streams used by a run are recorded in a JSON file next to its results, see
+RandomStreams.write_record, so every batch can be reproduced.
+"""
+import hashlib
+import json
+
+import numpy as np
+
+PATH_CHUNK_SIZE = 1024
+RNG_RECORD_SUFFIX = '.rng.json'
+
+
+def resolve_seed(seed=None):
+    """
+    Gets the seed of a run
+
+    Parameters
+    ----------
+    seed : int
+        (Optional. Default: None) The seed chosen by the user
+
+    Returns
+    -------
+    seed : int
+        The seed chosen by the user, or fresh entropy from the OS if None so the run can still be
+        reproduced from its recorded seed
+    """
+    if seed is None:
+        return int(np.random.SeedSequence().entropy % 2 ** 63)
+    return int(seed)
+
+
+def resolve_generator(rng=None):
+    """
+    Gets the random number generator to draw from
+
+    Parameters
+    ----------
+    rng : Union[int, numpy.random.Generator, numpy.random.RandomState]
+        (Optional. Default: None) The generator of the stream to draw from, or the seed of a new
+        generator
+
+    Returns
+    -------
+    rng : Union[numpy.random.Generator, numpy.random.RandomState]
+        The generator. If None a new generator is seeded from the global numpy random state, so
+        the callers which seed the global state with np.random.seed still get the same draws
+    """
+    if rng is None:
+        return np.random.default_rng(np.random.randint(2 ** 32, size=4, dtype=np.int64))
+    if isinstance(rng, (int, np.integer)):
+        return np.random.default_rng(int(rng))
+    return rng
+
+
+def random_integer(rng, high: int):
+    """
+    Draws a random integer with either a Generator or a RandomState
+
+    Parameters
+    ----------
+    rng : Union[numpy.random.Generator, numpy.random.RandomState]
+        The generator to draw from
+    high : int
+        The exclusive upper bound of the integer
+
+    Returns
+    -------
+    value : int
+        The integer, between 0 and high - 1
+    """
+    if isinstance(rng, np.random.Generator):
+        return int(rng.integers(high))
+    return int(rng.randint(high))
+
+
+def _name_word(name):
+    """
+    Converts the name of a stream to a word of its spawn key
+
+    Parameters
+    ----------
+    name : object
+        The name. Non-negative integers are used as they are, like the indices given by
+        SeedSequence.spawn, other names are hashed
+
+    Returns
+    -------
+    word : int
+        The word of the spawn key
+    """
+    if isinstance(name, (int, np.integer)) and not isinstance(name, bool) and name >= 0:
+        return int(name)
+    return int(hashlib.sha256(str(name).encode()).hexdigest()[:16], 16)
+
+
+class RandomStreams:
+    """
+    This class spawns the independent random number streams of one seed, and records which
+    streams a run used
+    """
+
+    def __init__(self, seed=None):
+        """
+        Constructs the streams of a seed
+
+        Parameters
+        ----------
+        seed : int
+            (Optional. Default: None) The seed of the run. If None fresh entropy is drawn from
+            the OS, see resolve_seed
+        """
+        self.seed = resolve_seed(seed)
+        self.streams = {}
+
+    def seed_sequence(self, *names):
+        """
+        Gets the SeedSequence of a stream
+
+        Parameters
+        ----------
+        names : object
+            The names addressing the stream
+
+        Returns
+        -------
+        seed_sequence : numpy.random.SeedSequence
+            The SeedSequence of the stream
+        """
+        spawn_key = tuple(_name_word(name) for name in names)
+        self.streams.setdefault(tuple(str(name) for name in names), 1)
+        return np.random.SeedSequence(self.seed, spawn_key=spawn_key)
+
+    def generator(self, *names):
+        """
+        Creates the generator of a stream. Each call starts the stream from its beginning
+
+        Parameters
+        ----------
+        names : object
+            The names addressing the stream
+
+        Returns
+        -------
+        rng : numpy.random.Generator
+            The generator of the stream
+        """
+        return np.random.default_rng(self.seed_sequence(*names))
+
+    def chunk_generators(self, num_paths: int, *names, chunk_size=PATH_CHUNK_SIZE):
+        """
+        Creates the generators of the chunks of a set of paths, spawned from the stream of the
+        set
+
+        Parameters
+        ----------
+        num_paths : int
+            The number of paths in the set
+        names : object
+            The names addressing the stream of the set
+        chunk_size : int
+            (Optional. Default: 1024) The number of paths in each chunk
+
+        Returns
+        -------
+        chunks : List[Tuple[slice, numpy.random.Generator]]
+            The paths of each chunk and its generator
+        """
+        num_chunks = max(1, -(-num_paths // chunk_size))
+        children = self.seed_sequence(*names).spawn(num_chunks)
+        self.streams[tuple(str(name) for name in names)] = num_chunks
+
+        return [(slice(i * chunk_size, min((i + 1) * chunk_size, num_paths)),
+                 np.random.default_rng(child)) for i, child in enumerate(children)]
+
+    def chunk_generator(self, chunk_index: int, *names):
+        """
+        Creates the generator of one chunk of a set of paths, the same generator as the one
+        created by chunk_generators for the chunk
+
+        Parameters
+        ----------
+        chunk_index : int
+            The index of the chunk
+        names : object
+            The names addressing the stream of the set
+
+        Returns
+        -------
+        rng : numpy.random.Generator
+            The generator of the chunk
+        """
+        spawn_key = tuple(_name_word(name) for name in names) + (int(chunk_index),)
+        return np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=spawn_key))
+
+    def record(self):
+        """
+        Gets the record of the seed and the streams used
+
+        Returns
+        -------
+        record : dict
+            The seed, the bit generator, the numpy version and the names and spawn key of each
+            stream used, with its number of chunks
+        """
+        return {
+            'seed': self.seed,
+            'bit_generator': 'PCG64',
+            'numpy_version': np.__version__,
+            'streams': [{
+                'names': list(names),
+                'spawn_key': [_name_word(name) for name in names],
+                'chunks': num_chunks
+            } for names, num_chunks in self.streams.items()]
+        }
+
+    def write_record(self, filename: str):
+        """
+        Writes the record of the seed and the streams used to a JSON file
+
+        Parameters
+        ----------
+        filename : str
+            The name of the file
+
+        Returns
+        -------
+        None
+        """
+        with open(filename, 'w') as f:
+            json.dump(self.record(), f, indent=2)
@@ -30,3 +30,19 @@ BT_UTIL_HElP_TEXT = 'Specifies the user\'s util (% of their bankroll in the bet)
                     'The backtesting will assume the utilization on the curve under test is held constant ' \
                     'over the life of the simulation to demonstrate the behavior from using the ' \
                     'Kelly Criterion to bet. '
+
+BT_SEED_HELP_TEXT = 'Chooses the seed of the random price paths. The paths are saved in the batch folder, so ' \
+                    'running again with the same seed, settings and curves reuses the same paths instead of ' \
+                    'simulating new ones. Change the seed to simulate a different set of paths.'
+
+BT_RESUME_HELP_TEXT = 'Resumes a backtest of this batch which was interrupted, e.g. by a restart of the ' \
+                      'computer, from the last checkpoint of its log. Only the paths which were not simulated ' \
+                      'yet are run. The settings and the seed must match the interrupted backtest, otherwise ' \
+                      'the backtest starts over.'
+
+BT_SAMPLER_HELP_TEXT = 'Chooses how the random draws behind the price paths are made. Pseudo-random draws are ' \
+                       'independent. Antithetic paths come in mirrored pairs, stratified sampling spreads the ' \
+                       'first return of the paths evenly over its distribution, and the Sobol and Halton ' \
+                       'quasi-random sequences fill the space of returns evenly. The variance reduced samplers ' \
+                       'give more stable percentile CAGRs for the same number of paths. The performance table ' \
+                       'reports the standard errors of the median and 5th percentile CAGRs (se_p50, se_p05).'
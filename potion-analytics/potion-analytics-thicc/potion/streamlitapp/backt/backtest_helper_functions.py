@@ -19,10 +19,14 @@ if module_path not in sys.path:
 # print('Current Module Path: {}'.format(module_path))
 
 from potion.backtest.batch_backtester import BatchBacktester, create_backtester_config
+from potion.backtest.path_gen import Sampler
+from potion.backtest.path_store import PATH_STORE_DIRNAME
+from potion.rng import resolve_seed
+from potion.instrumentation import reset_profile, write_profile, PROFILE_FILENAME
 
-from potion.streamlitapp.curvegen.cg_file_io import (read_pdfs_from_csv, read_curves_from_csv,
+from potion.streamlitapp.curvegen.cg_file_io import (read_pdfs, read_curves_from_csv,
                                                      read_training_data_from_csv)
-from potion.streamlitapp.backt.bt_plot import create_backtesting_plots
+from potion.streamlitapp.backt.bt_plot import create_backtesting_plots, plot_backtesting_paths
 
 
 def merge_performance_dfs(utils, res_dir):
@@ -59,7 +63,8 @@ def merge_performance_dfs(utils, res_dir):
 
 
 def do_backtest(log_file_name, curve_filename, training_filename, pdf_filename, util, method,
-                num_paths, path_length, initial_bankroll, progress_bar=None):
+                num_paths, path_length, initial_bankroll, progress_bar=None, seed=None,
+                path_store_directory=None, sampler=Sampler.PSEUDO_RANDOM, resume=False):
     """
     This function creates a batch backtester object and runs the full batch simulation.
     A dict containing results info is returned to the caller of the function.
@@ -86,6 +91,16 @@ def do_backtest(log_file_name, curve_filename, training_filename, pdf_filename,
         The initial starting bankroll at the beginning of the simulation
     progress_bar : streamlit.progress
         Specifies a streamlit progressbar to update the UI on progress
+    seed : int
+        (Optional. Default: None) The seed used to generate the backtesting paths
+    path_store_directory : str
+        (Optional. Default: None) The directory in which the backtesting paths are stored and
+        reused
+    sampler : Sampler
+        (Optional. Default: PSEUDO_RANDOM) How the draws behind the backtesting paths are made
+    resume : bool
+        (Optional. Default: False) Whether to resume an interrupted backtest with the same
+        settings and seed from its checkpoint, see potion.backtest.checkpoint
 
     Returns
     -------
@@ -96,9 +111,12 @@ def do_backtest(log_file_name, curve_filename, training_filename, pdf_filename,
 
     # Read the CSV output from the curve generator and initialize the batch backtesting object
     backtest_config = create_backtester_config(num_paths, path_length, util,
-                                               initial_bankroll, path_gen_method=method)
+                                               initial_bankroll, path_gen_method=method,
+                                               seed=seed,
+                                               path_store_directory=path_store_directory,
+                                               sampler=sampler)
 
-    pdf_df = read_pdfs_from_csv(pdf_filename)
+    pdf_df = read_pdfs(pdf_filename)
     curve_df = read_curves_from_csv(curve_filename)
     training_df = read_training_data_from_csv(training_filename)
 
@@ -115,7 +133,8 @@ def do_backtest(log_file_name, curve_filename, training_filename, pdf_filename,
 
     logging.debug('Running backtest')
 
-    backtester.evaluate_backtest_sequentially(log_file_name, progress_bar=progress_bar)
+    backtester.evaluate_backtest_sequentially(log_file_name, progress_bar=progress_bar,
+                                              resume=resume)
 
     bt_dict = {
         'sim_type': True,
@@ -130,10 +149,13 @@ def do_backtest(log_file_name, curve_filename, training_filename, pdf_filename,
 
 def run_backtesting_script(batch, curve_filename, training_filename, pdf_filename, utils, method,
                            num_paths, path_length, initial_bankroll, backtest_progress_bar=None,
-                           plot_progress_bar=None):
+                           plot_progress_bar=None, seed=None, sampler=Sampler.PSEUDO_RANDOM,
+                           resume=False):
     """
     Runs the full batch backtesting process and generates the results plots to return to the
-    function caller.
+    function caller. The timings of the stages are written to profile.json in the results
+    directory. The paths are stored in the paths directory of the batch, so every util of the
+    run, and later runs with the same seed, are simulated on the same paths.
 
     Parameters
     ----------
@@ -159,6 +181,14 @@ def run_backtesting_script(batch, curve_filename, training_filename, pdf_filenam
         Specifies a streamlit progressbar to update the UI on progress of the backtest
     plot_progress_bar : streamlit.progress
         Specifies a streamlit progressbar to update the UI on progress of the plot creation
+    seed : int
+        (Optional. Default: None) The seed used to generate the backtesting paths. If None, a
+        fresh seed is drawn and shared by every util of the run
+    sampler : Sampler
+        (Optional. Default: PSEUDO_RANDOM) How the draws behind the backtesting paths are made
+    resume : bool
+        (Optional. Default: False) Whether to resume the interrupted backtests of the utils
+        from their checkpoints, which requires the same seed
 
     Returns
     -------
@@ -172,6 +202,7 @@ def run_backtesting_script(batch, curve_filename, training_filename, pdf_filenam
         A List of dicts containing plotly figures
     """
     start = time.perf_counter()
+    reset_profile()
 
     num_paths = int(num_paths)
     path_length = int(path_length)
@@ -179,6 +210,9 @@ def run_backtesting_script(batch, curve_filename, training_filename, pdf_filenam
     res_dir = './batch_results/batch_{}/backtesting/'.format(batch)
     Path(res_dir).mkdir(parents=True, exist_ok=True)
 
+    path_store_dir = './batch_results/batch_{}/{}/'.format(batch, PATH_STORE_DIRNAME)
+    seed = resolve_seed(seed)
+
     backtester_map = {}
     log_file_names = []
     plot_dicts_list = []
@@ -187,7 +221,9 @@ def run_backtesting_script(batch, curve_filename, training_filename, pdf_filenam
 
         bt_dict = do_backtest(log_file_name, curve_filename, training_filename, pdf_filename, util,
                               method, num_paths, path_length, initial_bankroll,
-                              progress_bar=backtest_progress_bar)
+                              progress_bar=backtest_progress_bar, seed=seed,
+                              path_store_directory=path_store_dir, sampler=sampler,
+                              resume=resume)
 
         performace_df, plot_dicts = create_backtesting_plots(
             log_file_name, bt_dict, util, num_paths, plot_progress_bar=plot_progress_bar)
@@ -199,7 +235,82 @@ def run_backtesting_script(batch, curve_filename, training_filename, pdf_filenam
 
     # plot_performance_scatter_plot(batch, full_performance_df)
 
+    write_profile(res_dir + PROFILE_FILENAME)
+
     end = time.perf_counter()
     logging.debug('Time to complete: {} seconds'.format(end - start))
 
     return backtester_map, log_file_names, full_performance_df, plot_dicts_list
+
+
+def run_backtesting_job(batch, curve_filename, training_filename, pdf_filename, utils, method,
+                        num_paths, path_length, initial_bankroll, backtest_progress_bar=None,
+                        plot_progress_bar=None, seed=None, sampler=Sampler.PSEUDO_RANDOM,
+                        resume=False):
+    """
+    Runs the full batch backtesting process and creates the plots of the price paths, the target
+    of the backtesting jobs submitted by the GUI, see potion.streamlitapp.job_runner. The
+    returned dict is stored with the job so the GUI can load it once the job is done
+
+    Parameters
+    ----------
+    batch : int
+        An ID number uniquely specifying the batch of results files for this run
+    curve_filename : str
+        The name of the CSV file containing the curve info from the curve generation
+    training_filename : str
+        The name of the CSV file containing the training info from the curve generation
+    pdf_filename : str
+        The name of the CSV file containing the PDF info from the curve generation
+    utils : List[float]
+        A List of the utils to use with the batch of simulations
+    method : PathGenMethod
+        Enum specifies the statistical distribution used to generate backtesting paths
+    num_paths : int
+        The number of paths to simulate in the backtest
+    path_length : int
+        The length of the paths simulated
+    initial_bankroll : float
+        The initial starting bankroll at the beginning of the simulation
+    backtest_progress_bar : streamlit.progress
+        Specifies a streamlit progressbar to update the UI on progress of the backtest
+    plot_progress_bar : streamlit.progress
+        Specifies a streamlit progressbar to update the UI on progress of the plot creation
+    seed : int
+        (Optional. Default: None) The seed used to generate the backtesting paths
+    sampler : Sampler
+        (Optional. Default: PSEUDO_RANDOM) How the draws behind the backtesting paths are made
+    resume : bool
+        (Optional. Default: False) Whether to resume the interrupted backtests of the utils
+        from their checkpoints, which requires the same seed
+
+    Returns
+    -------
+    results : dict
+        The log_file_names, full_performance_df, plot_dicts and path_figs shown by the GUI, see
+        run_backtesting_script. The backtesters themselves are not returned, their logs are
+        named by log_file_names
+    """
+    backtester_map, log_file_names, full_performance_df, plot_dicts = run_backtesting_script(
+        batch, curve_filename, training_filename, pdf_filename, utils, method, num_paths,
+        path_length, initial_bankroll, backtest_progress_bar=backtest_progress_bar,
+        plot_progress_bar=plot_progress_bar, seed=seed, sampler=sampler, resume=resume)
+
+    # Map each path history to performance_df row
+    price_path_figs = []
+    for i, perf_row in full_performance_df.iterrows():
+
+        backtester = backtester_map[perf_row.util]
+
+        path_figs = plot_backtesting_paths(backtester, path_length)
+
+        for j, key in enumerate(backtester.keys):
+            if key == perf_row.key:
+                price_path_figs.append(path_figs[j])
+
+    return {
+        'log_file_names': log_file_names,
+        'full_performance_df': full_performance_df,
+        'plot_dicts': plot_dicts,
+        'path_figs': price_path_figs
+    }
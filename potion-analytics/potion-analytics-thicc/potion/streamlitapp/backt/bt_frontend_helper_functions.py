@@ -12,97 +12,42 @@ from st_aggrid.grid_options_builder import GridOptionsBuilder
 from st_aggrid.shared import GridUpdateMode
 
 from potion.backtest.batch_backtester import PathGenMethod
+from potion.backtest.path_gen import Sampler
 from potion.streamlitapp.backt import (
     BT_BATCH_NUMBER_HELP_TEXT, BT_INIT_BANKROLL_HELP_TEXT, BT_PATH_GEN_METHOD_HELP_TEXT,
-    BT_NUM_PATHS_HELP_TEXT, BT_PATH_LEN_HELP_TEXT, BT_UTIL_HElP_TEXT)
-from potion.streamlitapp.backt.backtest_helper_functions import run_backtesting_script
-from potion.streamlitapp.backt.bt_plot import plot_backtesting_paths, plot_performance_scatter_plot
-from potion.streamlitapp.curvegen.cg_file_io import save_plotly_fig_to_file, read_curves_from_csv
+    BT_NUM_PATHS_HELP_TEXT, BT_PATH_LEN_HELP_TEXT, BT_UTIL_HElP_TEXT, BT_SEED_HELP_TEXT,
+    BT_SAMPLER_HELP_TEXT, BT_RESUME_HELP_TEXT)
+from potion.streamlitapp.backt.backtest_helper_functions import run_backtesting_job
+from potion.streamlitapp.backt.bt_plot import plot_performance_scatter_plot
+from potion.streamlitapp.curvegen.cg_file_io import (save_plotly_fig_to_file, read_curves_from_csv,
+                                                     get_pdf_filename)
+from potion.streamlitapp.curvegen.cg_frontend_helper_functions import load_stage_timings_panel
+from potion.streamlitapp.curve_index import CurveIndex
+from potion.streamlitapp.job_panel import load_job_panel
+from potion.streamlitapp.job_runner import JobQueue
 from potion.streamlitapp.preference_saver import (
     preference_df_file_name, initialize_preference_df, save_curve_backtester_preferences,
     get_pref, CURVE_BACK_IB, CURVE_BACK_PG, CURVE_BACK_NP,
     CURVE_BACK_PL, CURVE_BACK_UT)
 
+BACKTEST_JOB_TOOL = 'backtesting'
 
-def _check_curve_rows_eq(row_1, row_2):
-    """
-    Checks whether two curve rows are equal
-
-    Parameters
-    ----------
-    row_1 : pandas.Series
-        The first row to compare
-    row_2 : pandas.Series
-        The second row to compare
-
-    Returns
-    -------
-    equal : bool
-        True if the rows are equal, False otherwise
-    """
-    return (row_1['Ticker'] == row_2['Ticker']) & (
-            row_1['Label'] == row_2['Label']) & (
-                   row_1['Expiration'] == row_2['Expiration']) & (
-                   row_1['StrikePercent'] == row_2['StrikePercent']) & (
-                   row_1['A'] == row_2['A']) & (
-                   row_1['B'] == row_2['B']) & (
-                   row_1['C'] == row_2['C']) & (
-                   row_1['D'] == row_2['D'])
-
-
-def _check_matching_curve_row(perf_row, curve_row):
-    """
-    Checks whether a performance_df row corresponds to the curve_df row
-
-    Parameters
-    ----------
-    perf_row : pandas.Series
-        The first row to compare
-    curve_row : pandas.Series
-        The second row to compare
 
-    Returns
-    -------
-    equal : bool
-        True if the rows are equal, False otherwise
+def _get_curve_index():
     """
-    key = perf_row['key']
-    ticker = key.split('-')[0]
-    label = key.split('-')[1]
-    return (ticker == curve_row['Ticker']) & (
-            label == curve_row['Label']) & (
-                   perf_row['duration'] == curve_row['Expiration']) & (
-                   perf_row['strike'] == curve_row['StrikePercent'])
-
-
-def _get_matching_curve(perf_row, curve_df):
-    """
-    Takes a row of backtest performance results and gets the matching curve row from the curve
-    DataFrame.
-
-    Parameters
-    ----------
-    perf_row : pandas.Series
-        The row of the performance DataFrame
-    curve_df : pandas.DataFrame
-        The DataFrame containing the curves being searched
+    Gets the index of the curves of the loaded batch, rebuilding it if the preview DataFrame was
+    replaced, e.g. by another page sharing the session
 
     Returns
     -------
-    curve_id : int
-        The row number in the curve DataFrame corresponding to this row of performance data
-    curve_row : pandas.Series
-        The row containing the curve information
+    curve_index : CurveIndex
+        The index of the preview DataFrame
     """
-    curve_id = -1
-    curve_row = None
-    for idx, row in curve_df.iterrows():
-        if _check_matching_curve_row(perf_row, row):
-            curve_id = idx
-            curve_row = row
-            break
-
-    return curve_id, curve_row
+    curve_index = st.session_state.bt_curve_index
+    if curve_index is None or curve_index.curve_df is not st.session_state.preview_df:
+        curve_index = CurveIndex(st.session_state.preview_df)
+        st.session_state.bt_curve_index = curve_index
+    return curve_index
 
 
 def get_batch_numbers(directory='./batch_results'):
@@ -157,6 +102,7 @@ def _load_curve_batch(batch_num: int):
 
     if os.path.exists(curve_filename):
         st.session_state.preview_df = read_curves_from_csv(curve_filename)
+        st.session_state.bt_curve_index = CurveIndex(st.session_state.preview_df)
 
 
 def initialize_backtester_session_state():
@@ -168,9 +114,6 @@ def initialize_backtester_session_state():
     -------
     None
     """
-    if 'backtesters' not in st.session_state:
-        st.session_state.backtesters = None
-
     if 'log_file_names' not in st.session_state:
         st.session_state.log_file_names = None
 
@@ -192,6 +135,9 @@ def initialize_backtester_session_state():
     if 'preview_df' not in st.session_state:
         st.session_state.preview_df = None
 
+    if 'bt_curve_index' not in st.session_state:
+        st.session_state.bt_curve_index = None
+
     if 'selected_indices' not in st.session_state:
         st.session_state.selected_indices = None
 
@@ -204,12 +150,34 @@ def initialize_backtester_session_state():
         st.session_state.pref_df = initialize_preference_df()
 
 
+def load_backtest_job_results(job: dict):
+    """
+    Loads the results of a finished backtesting job and saves them in the session_state for use
+    in other areas of the streamlit app
+
+    Parameters
+    ----------
+    job : dict
+        The finished backtesting job, see potion.streamlitapp.job_runner.JobQueue.get
+
+    Returns
+    -------
+    None
+    """
+    results = JobQueue().result(job['job_id'])
+
+    st.session_state.log_file_names = results['log_file_names']
+    st.session_state.full_performance_df = results['full_performance_df']
+    st.session_state.plot_dicts = results['plot_dicts']
+    st.session_state.path_figs = results['path_figs']
+
+
 def load_backtester_settings_panel():
     """
     Displays the backtester settings panel to the user. When the user clicks the start
-    button this function also kicks off the business logic of actually running the backtesting
-    simulation and stores the results in the session_state for use in other areas of the
-    streamlit app.
+    button this function also submits a background job which runs the backtesting simulation.
+    The progress of the jobs of the batch is displayed, and the results of a finished job are
+    stored in the session_state for use in other areas of the streamlit app.
 
     Returns
     -------
@@ -280,17 +248,8 @@ def load_backtester_settings_panel():
                 selected_rows = st.session_state.preview_df
 
             # No ability to get the row numbers from the AgGrid component unfortunately
-            selected_indices = []
-            for idx, row in selected_rows.iterrows():
-                row['StrikePercent'] = float(row['StrikePercent'])
-                row_pd = pd.Series(row)
-
-                for r_index, p_row in st.session_state.preview_df.iterrows():
-
-                    row_pd.name = p_row.name
-                    if _check_curve_rows_eq(row_pd, p_row):
-                        selected_indices.append(r_index)
-                        break
+            curve_ids = _get_curve_index().lookup(selected_rows)
+            selected_indices = [int(curve_id) for curve_id in curve_ids if curve_id != -1]
 
             st.text('Rows Selected for Plotting:')
             st.dataframe(selected_rows)
@@ -320,6 +279,18 @@ def load_backtester_settings_panel():
         help_panel = batch_backtest_form.expander('Need Help? Click to Expand', expanded=False)
         help_panel.markdown(BT_PATH_GEN_METHOD_HELP_TEXT)
 
+        samplers = {
+            'Pseudo-random': Sampler.PSEUDO_RANDOM,
+            'Antithetic': Sampler.ANTITHETIC,
+            'Stratified first return': Sampler.STRATIFIED,
+            'Sobol quasi-random': Sampler.SOBOL,
+            'Halton quasi-random': Sampler.HALTON
+        }
+        sampler_text = batch_backtest_form.selectbox('Select path sampler', list(samplers))
+
+        help_panel = batch_backtest_form.expander('Need Help? Click to Expand', expanded=False)
+        help_panel.markdown(BT_SAMPLER_HELP_TEXT)
+
         num_paths = batch_backtest_form.number_input('Number of paths', min_value=1, max_value=3000,
                                                      step=1,
                                                      value=get_pref(CURVE_BACK_NP))
@@ -341,10 +312,16 @@ def load_backtester_settings_panel():
         help_panel = batch_backtest_form.expander('Need Help? Click to Expand', expanded=False)
         help_panel.markdown(BT_UTIL_HElP_TEXT)
 
-        batch_backtest_form.text('Backtesting Progress:')
-        backtest_progress_bar = batch_backtest_form.progress(0.0)
-        batch_backtest_form.text('Plot Generation Progress')
-        plot_progress_bar = batch_backtest_form.progress(0.0)
+        seed = batch_backtest_form.number_input('Random seed for the price paths', min_value=0,
+                                                max_value=2 ** 31 - 1, step=1, value=0)
+
+        help_panel = batch_backtest_form.expander('Need Help? Click to Expand', expanded=False)
+        help_panel.markdown(BT_SEED_HELP_TEXT)
+
+        resume = batch_backtest_form.checkbox('Resume an interrupted backtest', value=False)
+
+        help_panel = batch_backtest_form.expander('Need Help? Click to Expand', expanded=False)
+        help_panel.markdown(BT_RESUME_HELP_TEXT)
 
         batch_backtest_button = batch_backtest_form.form_submit_button('Run Backtesting')
 
@@ -356,8 +333,8 @@ def load_backtester_settings_panel():
         else:
             path_gen_method = PathGenMethod.SKEWED_T
 
-        # If the button is pressed, run the backtesting, and save the results and plots in
-        # the session_state for use later
+        # If the button is pressed, submit the backtesting as a background job so it survives
+        # reruns and page reloads
         if batch_backtest_button:
 
             res_dir = './batch_results/batch_{}/curve_generation/'.format(batch_number)
@@ -374,39 +351,35 @@ def load_backtester_settings_panel():
 
             train_filename = res_dir + 'training.csv'
             curve_filename = res_dir + 'curves.csv'
-            pdf_filename = res_dir + 'pdfs.csv'
+            pdf_filename = get_pdf_filename(res_dir)
 
             # Run the backtesting and generate our results plots
-            backtester_map, log_file_names, full_performance_df, plot_dicts = \
-                run_backtesting_script(batch_number, curve_filename, train_filename, pdf_filename,
-                                       [util], path_gen_method,
-                                       num_paths, path_length, initial_bankroll,
-                                       backtest_progress_bar=backtest_progress_bar,
-                                       plot_progress_bar=plot_progress_bar)
-
-            # Map each path history to performance_df row
-            price_path_figs = []
-            for i, perf_row in full_performance_df.iterrows():
-
-                backtester = backtester_map[perf_row.util]
-
-                path_figs = plot_backtesting_paths(backtester, path_length)
-
-                for j, key in enumerate(backtester.keys):
-                    if key == perf_row.key:
-                        price_path_figs.append(path_figs[j])
-
-            # Save in the session state for later
-            st.session_state.backtesters = backtester_map
-            st.session_state.log_file_names = log_file_names
-            st.session_state.full_performance_df = full_performance_df
-            st.session_state.plot_dicts = plot_dicts
-            st.session_state.path_figs = price_path_figs
+            JobQueue().submit(run_backtesting_job, {
+                'batch': batch_number,
+                'curve_filename': curve_filename,
+                'training_filename': train_filename,
+                'pdf_filename': pdf_filename,
+                'utils': [util],
+                'method': path_gen_method,
+                'num_paths': num_paths,
+                'path_length': path_length,
+                'initial_bankroll': initial_bankroll,
+                'seed': int(seed),
+                'sampler': samplers[sampler_text],
+                'resume': resume
+            }, name='Backtest of batch {} with util {}'.format(batch_number, util), tags={
+                'tool': BACKTEST_JOB_TOOL,
+                'batch': int(batch_number)
+            }, progress_args=['backtest_progress_bar', 'plot_progress_bar'])
 
             save_curve_backtester_preferences(
                 batch_number, initial_bankroll, str(path_gen_method_text), num_paths,
                 path_length, util)
 
+        # Show the progress of the jobs of the batch, and load the results of the finished jobs
+        load_job_panel({'tool': BACKTEST_JOB_TOOL, 'batch': int(batch_number)},
+                       load_backtest_job_results, 'bt_{}'.format(batch_number))
+
         # Return the UI values to the caller of the function
         return batch_number, path_gen_method, num_paths, path_length, util
     else:
@@ -639,10 +612,14 @@ def load_backtester_results_panel(batch_number):
             load_performance_scatter_panel(
                 performance_df, batch_number,
                 directory='./batch_results/batch_{}/backtesting/plots/'.format(batch_number))
+            load_stage_timings_panel('./batch_results/batch_{}/backtesting/'.format(batch_number))
+
+            curve_index = _get_curve_index()
+            curve_ids = curve_index.match_performance(performance_df)
 
-            for perf_id, perf_row in performance_df.iterrows():
+            for (perf_id, perf_row), curve_id in zip(performance_df.iterrows(), curve_ids):
 
-                curve_id, curve_row = _get_matching_curve(perf_row, st.session_state.preview_df)
+                curve_row = curve_index.get_curve(curve_id)
 
                 if st.session_state.selected_indices is not None:
                     if curve_id in st.session_state.selected_indices:
@@ -15,6 +15,8 @@ from potion.curve_gen.payoff.payoff import (configure_payoff, get_payoff_odds)
 from potion.curve_gen.kelly import (kelly_formula, probability_from_density,
                                     kelly_value_to_growth_per_bet, growth_per_bet_to_cagr)
 from potion.streamlitapp.backt.bt_utils import calculate_max_drawdown
+from potion.backtest.path_gen import Sampler
+from potion.backtest.convergence import percentile_standard_errors, sampler_groups
 
 
 @st.cache
@@ -122,11 +124,14 @@ def create_backtesting_scenario_plots(results_df, key, util, training_key_index,
                                       strike_pct, num_paths, pdf_x, pdf_y, odds, current_price,
                                       num_hist_bins=200, num_paths_to_plot=300,
                                       plot_progress_bar=None, current_count=None, total_tasks=None,
-                                      plot_filename_dict=None):
+                                      plot_filename_dict=None, sampler=Sampler.PSEUDO_RANDOM):
     """
     This function filters the log file DF for the needed results of the backtesting
     simulation for a specific curve and generates 9 Plotly plots containing the results.
 
+    The performance statistics include the standard errors of the median and 5th percentile
+    CAGRs as a convergence diagnostic of the number of paths.
+
     Parameters
     ----------
     results_df : pandas.DataFrame
@@ -163,6 +168,9 @@ def create_backtesting_scenario_plots(results_df, key, util, training_key_index,
         The number of backtesting tasks which were simulated
     plot_filename_dict : dict
         The dict mapping each figure to its filename when saving plotly figs to file
+    sampler : Sampler
+        (Optional. Default: PSEUDO_RANDOM) The sampler which generated the paths, so the
+        standard errors resample antithetic pairs together
 
     Returns
     -------
@@ -280,6 +288,10 @@ def create_backtesting_scenario_plots(results_df, key, util, training_key_index,
     opt_maxdd_arr = np.asarray(opt_max_dd_per_path)
     # print('{} s: {} e: {}\ncagr: {}'.format(key, strike_pct, duration, user_cagr_arr))
 
+    groups = sampler_groups(len(user_cagr_arr), sampler)
+    user_cagr_errors = percentile_standard_errors(user_cagr_arr, groups=groups)
+    opt_cagr_errors = percentile_standard_errors(opt_cagr_arr, groups=groups)
+
     performance_dict = {
         'key': key,
         'util': util,
@@ -304,7 +316,13 @@ def create_backtesting_scenario_plots(results_df, key, util, training_key_index,
         'p25_opt_maxDD': np.percentile(opt_maxdd_arr, 25),
         'p50_opt_maxDD': np.percentile(opt_maxdd_arr, 50),
         'p75_opt_maxDD': np.percentile(opt_maxdd_arr, 75),
-        'p100_opt_maxDD': np.percentile(opt_maxdd_arr, 100)
+        'p100_opt_maxDD': np.percentile(opt_maxdd_arr, 100),
+        'p05_user_cagr': user_cagr_errors[5][0],
+        'p05_opt_cagr': opt_cagr_errors[5][0],
+        'se_p50_user_cagr': user_cagr_errors[50][1],
+        'se_p05_user_cagr': user_cagr_errors[5][1],
+        'se_p50_opt_cagr': opt_cagr_errors[50][1],
+        'se_p05_opt_cagr': opt_cagr_errors[5][1]
     }
 
     dff = results_df.filter(results_df.Timestamp == duration)
@@ -502,6 +520,7 @@ def create_backtesting_plots(log_file_name, bt_dict, util, num_paths, plot_progr
     pdf_df = bt_dict['pdf']
     curve_df = bt_dict['curves']
     training_df = bt_dict['training']
+    sampler = bt_dict['backtester'].sampler
 
     # Make unique
     exps = list(set(curve_df.Expiration.tolist()))
@@ -571,7 +590,8 @@ def create_backtesting_plots(log_file_name, bt_dict, util, num_paths, plot_progr
                     df, key, util, key_index, duration, strike_pct, num_paths,
                     pdf_x_vals, pdf_y_vals, odds, current_price,
                     plot_progress_bar=plot_progress_bar, current_count=current_count,
-                    total_tasks=total_num_tasks, plot_filename_dict=plot_filename_dict)
+                    total_tasks=total_num_tasks, plot_filename_dict=plot_filename_dict,
+                    sampler=sampler)
 
                 # Update for future loops
                 current_count = out_count
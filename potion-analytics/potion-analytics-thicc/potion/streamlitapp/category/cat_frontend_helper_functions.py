@@ -19,6 +19,7 @@ from potion.streamlitapp.category import (PC_BATCH_NUMBER_HELP_TEXT, PC_NUM_PER_
                                           PC_NUM_POOLS_HELP_TEXT)
 from potion.streamlitapp.category.categorizer import Categorizer
 from potion.streamlitapp.category.cat_plot import plot_curves_in_pool
+from potion.streamlitapp.curve_index import CurveIndex
 from potion.streamlitapp.preference_saver import (preference_df_file_name, initialize_preference_df,
                                                   save_pool_creator_preferences, get_pref,
                                                   POOL_CREATE_NG, POOL_CREATE_NP)
@@ -58,31 +59,6 @@ def get_batch_numbers(directory='./batch_results'):
     return batch_numbers
 
 
-def _check_curve_rows_eq(perf_row, curve_row):
-    """
-    Checks whether a performance_df row corresponds to the curve_df row
-
-    Parameters
-    ----------
-    perf_row : pandas.Series
-        The first row to compare
-    curve_row : pandas.Series
-        The second row to compare
-
-    Returns
-    -------
-    equal : bool
-        True if the rows are equal, False otherwise
-    """
-    key = perf_row['key']
-    ticker = key.split('-')[0]
-    label = key.split('-')[1]
-    return (ticker == curve_row['Ticker']) & (
-            label == curve_row['Label']) & (
-                   perf_row['duration'] == curve_row['Expiration']) & (
-                   perf_row['strike'] == curve_row['StrikePercent'])
-
-
 def initialize_categorization_session_state():
     """
     Initializes the session_state streamlit object so that we can have dynamic UI
@@ -230,16 +206,8 @@ def load_categorization_settings_panel():
                 selected_rows = pd.DataFrame(selected_rows)
 
                 # No ability to get the row numbers from the AgGrid component unfortunately
-                for idx, row in selected_rows.iterrows():
-                    row['strike'] = float(row['strike'])
-                    row_pd = pd.Series(row)
-
-                    for c_index, c_row in curves_df.iterrows():
-
-                        row_pd.name = c_row.name
-                        if _check_curve_rows_eq(row_pd, c_row):
-                            selected_curve_ids.append(c_index)
-                            break
+                curve_ids = CurveIndex(curves_df).match_performance(selected_rows)
+                selected_curve_ids = [int(curve_id) for curve_id in curve_ids if curve_id != -1]
 
                 st.text('Current Selection for Portfolio:')
                 st.dataframe(selected_rows)
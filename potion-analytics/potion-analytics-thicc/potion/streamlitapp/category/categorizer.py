@@ -7,7 +7,7 @@ import numpy as np
 import pandas as pd
 from scipy.stats import rankdata
 
-from potion.streamlitapp.category.curve_cluster import CurveCluster
+from potion.streamlitapp.category.curve_cluster import CurveCluster, common_bet_fractions
 from potion.curve_gen.kelly import evaluate_premium_curve
 
 
@@ -122,11 +122,12 @@ class Categorizer:
         category_map : dict
             The dict objects containing the cluster counts and id numbers
         """
-        # Calculates the premiums on the user's A, B, C, D curve at each bet fraction point so that
-        # we can cluster the curves based on similarity
+        # Calculates the premiums on the user's A, B, C, D curve at the same bet fraction points
+        # for every curve so that we can cluster the curves based on similarity
+        bet_fractions = common_bet_fractions(self.curves_df)
         user_premium_curves = [evaluate_premium_curve(
             [curve_row.A, curve_row.B, curve_row.C, curve_row.D],
-            curve_row.bet_fractions) for i, curve_row in self.curves_df.iterrows()]
+            bet_fractions) for i, curve_row in self.curves_df.iterrows()]
 
         # Create a list of lists containing the curve premium points in each category
         categories = [[user_premium_curves[curve_id]
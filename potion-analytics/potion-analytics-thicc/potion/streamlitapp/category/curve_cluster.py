@@ -22,6 +22,29 @@ class ClusteringMethod(Enum):
     """Cluster curves using the DBSCAN algorithm"""
 
 
+def common_bet_fractions(curves_df):
+    """
+    Gets the bet fractions every curve is evaluated at when comparing curves. Curves solved with
+    adaptive sampling are solved at different subsets of the bet fractions of the generator, so
+    their fits are evaluated at the union of the bet fractions of all of the curves
+
+    Parameters
+    ----------
+    curves_df : pandas.DataFrame
+        The curve DF containing all of the generated curve info
+
+    Returns
+    -------
+    bet_fractions : numpy.ndarray
+        The sorted bet fractions of all of the curves
+    """
+    if len(curves_df) == 0:
+        return np.empty(0)
+
+    return np.unique(np.concatenate([np.asarray(bet_fractions, dtype=float)
+                                     for bet_fractions in curves_df.bet_fractions]))
+
+
 def similarity_matrix(ys):
     """
     Helper function that converts a python list of curves into a similarity matrix and returns it
@@ -85,7 +108,8 @@ class CurveCluster:
         """
         Iterates over each backtesting result and stores the premium points of the
         curve in a flat mapping to feed into the clustering algorithm. The flat mapping
-        will be used to create the curve similarity matrix.
+        will be used to create the curve similarity matrix. Every curve is evaluated at the
+        same bet fractions, see common_bet_fractions
 
         Parameters
         ----------
@@ -96,8 +120,9 @@ class CurveCluster:
         -------
         None
         """
+        bet_fractions = common_bet_fractions(curves_df)
         self.curve_mapping_flat = [evaluate_premium_curve(
-            [row.A, row.B, row.C, row.D], row.bet_fractions)
+            [row.A, row.B, row.C, row.D], bet_fractions)
             for i, row in curves_df.iterrows()]
 
     def set_curve_mapping(self, mapping):
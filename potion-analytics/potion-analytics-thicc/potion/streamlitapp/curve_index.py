@@ -0,0 +1,181 @@
+"""
+This module provides an index of the rows of a curve DataFrame, so the rows selected in the UI
+tables and the rows of the backtest performance results can be matched to their curves with
+one vectorized lookup instead of comparing every pair of rows.
+
+The tools identify a curve with the following columns:
+
+    CURVE_KEY_COLUMNS
+        'The curves generated by the curve generator and read by the curve backtester'
+    POOL_KEY_COLUMNS
+        'The curves of the pools created by the pool creator and read by the pool backtester'
+    PERFORMANCE_KEY_COLUMNS
+        'The columns of a curve which identify the rows of the backtest performance results'
+
+The performance results store the ticker and label of a curve joined in their 'key' column, the
+expiration in their 'duration' column and the strike in their 'strike' column.
+"""
+import numpy as np
+import pandas as pd
+
+CURVE_KEY_COLUMNS = ['Ticker', 'Label', 'Expiration', 'StrikePercent', 'A', 'B', 'C', 'D']
+POOL_KEY_COLUMNS = ['Label', 'Backtest_ID', 'Curve_ID', 'Asset', 'Expiration', 'StrikePercent',
+                    'A', 'B', 'C', 'D']
+PERFORMANCE_KEY_COLUMNS = ['Ticker', 'Label', 'Expiration', 'StrikePercent']
+
+
+def performance_to_curve_keys(performance_df: pd.DataFrame):
+    """
+    Converts the identifying columns of backtest performance results to the curve key columns
+
+    Parameters
+    ----------
+    performance_df : pandas.DataFrame
+        The backtest performance results
+
+    Returns
+    -------
+    keys_df : pandas.DataFrame
+        The PERFORMANCE_KEY_COLUMNS of the curve of each row, with the same index
+    """
+    split_keys = performance_df['key'].astype(str).str.split('-')
+    return pd.DataFrame({
+        'Ticker': split_keys.str[0],
+        'Label': split_keys.str[1],
+        'Expiration': performance_df['duration'],
+        'StrikePercent': performance_df['strike']
+    }, index=performance_df.index)
+
+
+class CurveIndex:
+    """
+    This class maps the key columns of curve rows to their row ids in a curve DataFrame. The
+    lookup tables are built once for each set of key columns and reused by every lookup
+    """
+
+    def __init__(self, curve_df: pd.DataFrame, key_columns=None):
+        """
+        Constructs the index of a curve DataFrame
+
+        Parameters
+        ----------
+        curve_df : pandas.DataFrame
+            The DataFrame containing the curves
+        key_columns : List[str]
+            (Optional. Default: CURVE_KEY_COLUMNS) The columns used by lookup when no columns
+            are given
+        """
+        self.curve_df = curve_df
+        self.key_columns = CURVE_KEY_COLUMNS if key_columns is None else list(key_columns)
+        self._tables = {}
+
+    def _get_table(self, key_columns):
+        """
+        Gets the lookup table for a set of key columns, building it on first use. When several
+        curves share a key the first one is kept
+
+        Parameters
+        ----------
+        key_columns : List[str]
+            The key columns of the table
+
+        Returns
+        -------
+        key_index : pandas.MultiIndex
+            The unique keys of the curves
+        row_ids : pandas.Index
+            The row id of the curve of each key
+        """
+        table_key = tuple(key_columns)
+        if table_key not in self._tables:
+            keys_df = self.curve_df[list(key_columns)].drop_duplicates(keep='first')
+            self._tables[table_key] = (pd.MultiIndex.from_frame(keys_df), keys_df.index)
+        return self._tables[table_key]
+
+    def _normalize(self, rows_df: pd.DataFrame, key_columns):
+        """
+        Casts the key columns of the rows to the types of the curve columns, e.g. the strikes
+        which come back from the UI tables as strings
+
+        Parameters
+        ----------
+        rows_df : pandas.DataFrame
+            The rows being looked up
+        key_columns : List[str]
+            The key columns of the lookup
+
+        Returns
+        -------
+        keys_df : pandas.DataFrame
+            The key columns of the rows
+        """
+        keys_df = rows_df[list(key_columns)].copy()
+        for column in key_columns:
+            try:
+                keys_df[column] = keys_df[column].astype(self.curve_df[column].dtype)
+            except (TypeError, ValueError):
+                pass
+        return keys_df
+
+    def lookup(self, rows_df: pd.DataFrame, key_columns=None):
+        """
+        Finds the row id of the curve matching each row
+
+        Parameters
+        ----------
+        rows_df : pandas.DataFrame
+            The rows being looked up, containing the key columns
+        key_columns : List[str]
+            (Optional. Default: The key columns of the index) The columns which must match
+
+        Returns
+        -------
+        curve_ids : numpy.ndarray
+            The row id in the curve DataFrame matching each row, -1 when no curve matches
+        """
+        key_columns = self.key_columns if key_columns is None else list(key_columns)
+        if rows_df is None or rows_df.empty:
+            return np.empty(0, dtype=int)
+
+        key_index, row_ids = self._get_table(key_columns)
+        positions = key_index.get_indexer(
+            pd.MultiIndex.from_frame(self._normalize(rows_df, key_columns)))
+
+        return np.where(positions >= 0, np.asarray(row_ids)[positions], -1)
+
+    def match_performance(self, performance_df: pd.DataFrame):
+        """
+        Finds the row id of the curve of each row of backtest performance results
+
+        Parameters
+        ----------
+        performance_df : pandas.DataFrame
+            The backtest performance results
+
+        Returns
+        -------
+        curve_ids : numpy.ndarray
+            The row id in the curve DataFrame of each row, -1 when no curve matches
+        """
+        if performance_df is None or performance_df.empty:
+            return np.empty(0, dtype=int)
+
+        return self.lookup(performance_to_curve_keys(performance_df), PERFORMANCE_KEY_COLUMNS)
+
+    def get_curve(self, curve_id):
+        """
+        Gets a curve row by its id
+
+        Parameters
+        ----------
+        curve_id : int
+            The row id in the curve DataFrame
+
+        Returns
+        -------
+        curve_row : pandas.Series
+            The row containing the curve information, None if curve_id is -1
+        """
+        if curve_id == -1:
+            return None
+        return self.curve_df.loc[curve_id]
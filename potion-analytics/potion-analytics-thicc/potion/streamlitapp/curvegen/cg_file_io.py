@@ -10,6 +10,8 @@ import pandas as pd
 
 from plotly.graph_objects import Figure
 
+from potion.curve_gen.pdf_store import write_pdf_store, read_pdf_store, PDF_STORE_FILENAME
+
 
 def save_plotly_fig_to_file(dir_filepath: str, filename: str, fig: Figure):
     """
@@ -36,7 +38,8 @@ def save_plotly_fig_to_file(dir_filepath: str, filename: str, fig: Figure):
 def write_curve_gen_outputs(batch_num: int, curve_df: pd.DataFrame, pdf_df: pd.DataFrame,
                             training_df: pd.DataFrame):
     """
-    Writes the 3 output CSVs from the curve generation process
+    Writes the 3 outputs from the curve generation process. The curves and the training data are
+    written as CSVs, the PDFs are written to a binary PDF store (pdfs.h5)
 
     Parameters
     ----------
@@ -61,8 +64,8 @@ def write_curve_gen_outputs(batch_num: int, curve_df: pd.DataFrame, pdf_df: pd.D
 
     curve_df.to_csv('./batch_results/batch_{}/curve_generation/curves.csv'.format(batch_num),
                     index=False, quoting=csv.QUOTE_ALL)
-    pdf_df.to_csv('./batch_results/batch_{}/curve_generation/pdfs.csv'.format(batch_num),
-                  index=False, quoting=csv.QUOTE_ALL)
+    write_pdf_store('./batch_results/batch_{}/curve_generation/{}'.format(
+        batch_num, PDF_STORE_FILENAME), pdf_df)
     training_df.to_csv('./batch_results/batch_{}/curve_generation/training.csv'.format(batch_num),
                        index=False, quoting=csv.QUOTE_ALL)
 
@@ -122,6 +125,48 @@ def read_pdfs_from_csv(filename: str):
     return pd.read_csv(filename, sep=',')
 
 
+def get_pdf_filename(res_dir: str):
+    """
+    Gets the name of the PDF output file in a curve generation results directory. Results written
+    before the binary PDF store was introduced only contain pdfs.csv
+
+    Parameters
+    ----------
+    res_dir : str
+        The curve generation results directory, ending with a path separator
+
+    Returns
+    -------
+    filename : str
+        The path to pdfs.h5 if it exists, otherwise the path to pdfs.csv
+    """
+    if os.path.isfile(res_dir + PDF_STORE_FILENAME):
+        return res_dir + PDF_STORE_FILENAME
+    return res_dir + 'pdfs.csv'
+
+
+def read_pdfs(filename: str, max_points=None):
+    """
+    Reads the PDF output of the curve generator from either a binary PDF store or a CSV
+
+    Parameters
+    ----------
+    filename : str
+        The filename to read
+    max_points : int
+        (Optional. Default: None) Downsample the PDFs to at most this number of points for
+        display. Only supported by the binary PDF store
+
+    Returns
+    -------
+    pdfs : Union[PdfStore, pandas.DataFrame]
+        The lazy PdfStore for binary files, or the DataFrame containing the PDF data for CSVs
+    """
+    if filename.endswith('.csv'):
+        return read_pdfs_from_csv(filename)
+    return read_pdf_store(filename, max_points=max_points)
+
+
 def read_curves_from_csv(filename: str):
     """
     Imports a CSV of curve parameters as a DataFrame so that it can be used in python code
@@ -21,20 +21,27 @@ if module_path not in sys.path:
 from potion.curve_gen.curve_conversion import (convert_fully_normalized_to_strike_normalized_curve,
                                                convert_strike_normalized_to_absolute_curve)
 from potion.curve_gen.kelly import evaluate_premium_curve
-from potion.curve_gen.utils import build_generator_config
+from potion.curve_gen.pdf_store import DISPLAY_POINTS, PdfStore
+from potion.instrumentation import read_profile, profile_to_dataframe, PROFILE_FILENAME
 
 from potion.streamlitapp.curvegen import (
     CG_INPUT_FILE_HELP_TEXT, CG_PRICES_FILE_HELP_TEXT, CG_BATCH_NUMBER_HELP_TEXT,
     CG_INIT_BANKROLL_HELP_TEXT)
-from potion.streamlitapp.curvegen.curve_generation_helper_functions import (run_curve_generation)
+from potion.streamlitapp.curvegen.curve_generation_helper_functions import (
+    run_curve_generation_job)
 from potion.streamlitapp.curvegen.cg_file_io import (
-    read_pdfs_from_csv, read_training_data_from_csv, read_curves_from_csv, save_plotly_fig_to_file)
+    read_pdfs, get_pdf_filename, read_training_data_from_csv, read_curves_from_csv,
+    save_plotly_fig_to_file)
 from potion.streamlitapp.curvegen.cg_plot import (
     plot_curves_from_csv, plot_pdf_and_option_payout, plot_training_data_sets)
+from potion.streamlitapp.job_panel import load_job_panel
+from potion.streamlitapp.job_runner import JobQueue
 from potion.streamlitapp.preference_saver import (
     preference_df_file_name, initialize_preference_df, save_curve_gen_preferences,
     get_pref, CURVE_GEN_IF, CURVE_GEN_BN, CURVE_GEN_IB)
 
+CURVE_GEN_JOB_TOOL = 'curve_generation'
+
 
 def get_input_files(directory='inputs/*.csv'):
     """
@@ -141,12 +148,65 @@ def initialize_curve_gen_session_state():
         st.session_state.pref_df = initialize_preference_df()
 
 
+def load_curve_gen_job_results(job: dict):
+    """
+    Reads the results of a finished curve generation job from the batch results directory,
+    generates the results plots and saves them in the session_state for use in other areas of
+    the streamlit app
+
+    Parameters
+    ----------
+    job : dict
+        The finished curve generation job, see potion.streamlitapp.job_runner.JobQueue.get
+
+    Returns
+    -------
+    None
+    """
+    try:
+        price_history_csv = pd.read_csv(job['tags']['historical_file'])
+
+        res_dir = './batch_results/batch_{}/curve_generation/'.format(job['tags']['batch'])
+
+        # Read the results from CSVs
+        training_df = read_training_data_from_csv(res_dir + 'training.csv')
+        pdf_df = read_pdfs(get_pdf_filename(res_dir), max_points=DISPLAY_POINTS)
+        curve_df = read_curves_from_csv(res_dir + 'curves.csv')
+
+        # Generate our results plots
+        curve_figures = plot_curves_from_csv(curve_df)
+        pdf_figures = plot_pdf_and_option_payout(pdf_df, curve_df)
+
+        # Get the plots of the training data sets
+        training_data_plots = plot_training_data_sets(price_history_csv, training_df,
+                                                      log_plot=False)
+
+        st.session_state.training_plots = [
+            training_data_plots[train_row.Ticker + '-' + train_row.Label]
+            for i, train_row in curve_df.iterrows()]
+
+        # Save in the session state for later
+        st.session_state.curve_plots = curve_figures
+        st.session_state.curves_df = curve_df
+        st.session_state.training_df = training_df
+        st.session_state.pdf_df = pdf_df
+        st.session_state.pdf_plots = pdf_figures
+        st.session_state.curve_unit_radios = ['Relative'] * len(curve_figures)
+        st.session_state.curve_grid_radios = [True] * len(curve_figures)
+        st.session_state.training_log_radios = [False] * len(curve_figures)
+    except ValueError as e:
+        st.error(e)
+    except FileNotFoundError as e:
+        st.error(e)
+
+
 def load_curve_gen_settings_panel():
     """
     Displays the curve generation settings UI panel to the user. When the user clicks
-    the Generate Curves button, this function also kicks off the business logic of
-    actually calculating the curves using the library and stores the results in the session_state
-    for use in other areas of the streamlit app.
+    the Generate Curves button, this function also submits a background job which calculates
+    the curves using the library. The progress of the jobs of the batch is displayed, and the
+    results of a finished job are stored in the session_state for use in other areas of the
+    streamlit app.
 
     Returns
     --------
@@ -199,58 +259,38 @@ def load_curve_gen_settings_panel():
     help_panel = batch_curve_form.expander('Need Help? Click to Expand', expanded=False)
     help_panel.markdown(CG_INIT_BANKROLL_HELP_TEXT)
 
+    adaptive_sampling = batch_curve_form.checkbox(
+        'Solve each curve at adaptively chosen bet fractions', value=False)
+    resume_run = batch_curve_form.checkbox('Resume the interrupted run of this batch', value=False)
+
     batch_curve_button = batch_curve_form.form_submit_button('Generate Curves')
 
-    # If the button is pressed, run the curve generation, and save the results
-    # and plots in the session_state for use later
+    # If the button is pressed, submit the curve generation as a background job so it
+    # survives reruns and page reloads
     if batch_curve_button:
 
         full_input_path = 'inputs' + os.sep + str(input_file)
         full_historical_path = 'resources' + os.sep + str(historical_file)
 
-        try:
-            cfg = build_generator_config(full_input_path, full_historical_path)
-
-            # Run the curve generation
-            run_curve_generation(cfg, batch_number)
-
-            price_history_csv = pd.read_csv('resources' + os.sep + str(historical_file))
-
-            res_dir = './batch_results/batch_{}/curve_generation/'.format(batch_number)
-
-            # Read the results from CSVs
-            training_df = read_training_data_from_csv(res_dir + 'training.csv')
-            pdf_df = read_pdfs_from_csv(res_dir + 'pdfs.csv')
-            curve_df = read_curves_from_csv(res_dir + 'curves.csv')
-
-            # Generate our results plots
-            curve_figures = plot_curves_from_csv(curve_df)
-            pdf_figures = plot_pdf_and_option_payout(pdf_df, curve_df)
-
-            # Get the plots of the training data sets
-            training_data_plots = plot_training_data_sets(price_history_csv, training_df,
-                                                          log_plot=False)
-
-            st.session_state.training_plots = [
-                training_data_plots[train_row.Ticker + '-' + train_row.Label]
-                for i, train_row in curve_df.iterrows()]
-
-            # Save in the session state for later
-            st.session_state.curve_plots = curve_figures
-            st.session_state.curves_df = curve_df
-            st.session_state.training_df = training_df
-            st.session_state.pdf_df = pdf_df
-            st.session_state.pdf_plots = pdf_figures
-            st.session_state.curve_unit_radios = ['Relative'] * len(curve_figures)
-            st.session_state.curve_grid_radios = [True] * len(curve_figures)
-            st.session_state.training_log_radios = [False] * len(curve_figures)
-
-            save_curve_gen_preferences(str(input_file), str(historical_file), int(batch_number),
-                                       float(initial_bankroll))
-        except ValueError as e:
-            st.error(e)
-        except FileNotFoundError as e:
-            st.error(e)
+        JobQueue().submit(run_curve_generation_job, {
+            'input_file': full_input_path,
+            'historical_file': full_historical_path,
+            'batch_num': int(batch_number),
+            'adaptive_sampling': adaptive_sampling,
+            'resume': resume_run
+        }, name='Curve generation of batch {}'.format(batch_number), tags={
+            'tool': CURVE_GEN_JOB_TOOL,
+            'batch': int(batch_number),
+            'historical_file': full_historical_path
+        }, progress_args=['progress_bar'])
+
+        save_curve_gen_preferences(str(input_file), str(historical_file), int(batch_number),
+                                   float(initial_bankroll))
+
+    # Show the progress of the jobs of the batch, and load the results of the finished jobs
+    # from the batch results directory
+    load_job_panel({'tool': CURVE_GEN_JOB_TOOL, 'batch': int(batch_number)},
+                   load_curve_gen_job_results, 'cg_{}'.format(batch_number))
 
     # Return the UI values to the caller of the function
     return historical_file, input_file, batch_number, initial_bankroll
@@ -517,6 +557,33 @@ def load_edit_curve_panel(i: int, train_row: pd.Series, batch_number: int):
                                               index=False)
 
 
+def load_stage_timings_panel(directory: str):
+    """
+    This function displays the timings of the pipeline stages recorded in the profile.json file
+    of a results directory, if the file exists
+
+    Parameters
+    ----------
+    directory : str
+        The results directory containing the profile.json file
+
+    Returns
+    --------
+    None
+    """
+    profile_file = os.path.join(directory, PROFILE_FILENAME)
+    if not os.path.isfile(profile_file):
+        return
+
+    profile = read_profile(profile_file)
+    with st.expander('Show Stage Timings', expanded=False):
+        st.dataframe(profile_to_dataframe(profile))
+        st.subheader('Counters')
+        st.json(profile['counters'])
+        if profile['peak_memory_mb'] is not None:
+            st.write('Peak Sampled Memory: {:.1f} MB'.format(profile['peak_memory_mb']))
+
+
 def load_curve_gen_results_panel(batch_number: int, initial_bankroll_slider: float,
                                  directory='./batch_results'):
     """
@@ -579,4 +646,12 @@ def load_curve_gen_results_panel(batch_number: int, initial_bankroll_slider: flo
                 st.dataframe(st.session_state.training_df)
 
                 st.subheader('PDF CSV')
-                st.dataframe(st.session_state.pdf_df)
+                pdf_df = st.session_state.pdf_df
+                if isinstance(pdf_df, PdfStore):
+                    # The store is opened with the display downsampling, so only the displayed
+                    # points are read
+                    pdf_df = pdf_df.to_dataframe()
+                st.dataframe(pdf_df)
+
+            load_stage_timings_panel(directory + '/batch_{}/curve_generation/'.format(
+                batch_number))
@@ -1,15 +1,22 @@
 """
 This module provides the backend code for the curve generator tool
 """
-from potion.streamlitapp.curvegen.cg_file_io import write_curve_gen_outputs
+from pathlib import Path
 
+from potion.instrumentation import reset_profile, write_profile, PROFILE_FILENAME
+
+from potion.curve_gen.batch_output import CurveOutputWriter
 from potion.curve_gen.builder import GeneratorConfig
-from potion.curve_gen.gen import configure_curve_gen, generate_curves
+from potion.curve_gen.gen import configure_curve_gen, iter_curves
+from potion.curve_gen.utils import build_generator_config
 
 
-def run_curve_generation(config: GeneratorConfig, batch_num: int):
+def run_curve_generation(config: GeneratorConfig, batch_num: int, resume=False,
+                         curve_callback=None):
     """
-    Runs the curve generation and writes the output CSV files to a file
+    Runs the curve generation and writes the output files to the batch results directory. The
+    outputs are appended as each convolution group is completed, so an interrupted run can be
+    resumed. The timings of the stages are written to profile.json next to the outputs
 
     Parameters
     ----------
@@ -18,12 +25,65 @@ def run_curve_generation(config: GeneratorConfig, batch_num: int):
     batch_num : int
         The user specified batch number identifying this set of results from others in the
         log directory
+    resume : bool
+        (Optional. Default: False) Resume the last run written to the batch results directory
+        from its last completed convolution group
+    curve_callback : Callable
+        (Optional. Default: None) Called with each SolvedCurve as soon as it is solved, e.g. to
+        update the UI
 
     Returns
     -------
     None
     """
+    reset_profile()
+
+    res_dir = './batch_results/batch_{}/curve_generation/'.format(batch_num)
+    Path(res_dir + 'plots').mkdir(parents=True, exist_ok=True)
+
     configure_curve_gen(config)
-    curve_df, pdf_df, training_df = generate_curves()
+    for curve in iter_curves(writer=CurveOutputWriter(res_dir), resume=resume):
+        if curve_callback is not None:
+            curve_callback(curve)
+
+    write_profile(res_dir + PROFILE_FILENAME)
+
+
+def run_curve_generation_job(input_file: str, historical_file: str, batch_num: int,
+                             adaptive_sampling=False, resume=False, progress_bar=None):
+    """
+    Builds the configuration from the input files and runs the curve generation, the target of
+    the curve generation jobs submitted by the GUI, see potion.streamlitapp.job_runner. The
+    results are read from the batch results directory once the job is done
+
+    Parameters
+    ----------
+    input_file : str
+        The path of the input CSV specifying the curves to generate
+    historical_file : str
+        The path of the CSV containing the training data history
+    batch_num : int
+        The user specified batch number identifying this set of results from others in the
+        log directory
+    adaptive_sampling : bool
+        (Optional. Default: False) Solve each curve at adaptively chosen bet fractions
+    resume : bool
+        (Optional. Default: False) Resume the last run written to the batch results directory
+        from its last completed convolution group
+    progress_bar : streamlit.progress
+        (Optional. Default: None) Updated with the fraction of the convolution groups completed
+
+    Returns
+    -------
+    None
+    """
+    cfg = build_generator_config(input_file, historical_file, adaptive_sampling=adaptive_sampling)
+
+    def update_progress(curve):
+        if progress_bar is not None:
+            progress_bar.progress(curve.group / curve.num_groups)
+
+    run_curve_generation(cfg, batch_num, resume=resume, curve_callback=update_progress)
 
-    write_curve_gen_outputs(batch_num, curve_df, pdf_df, training_df)
+    if progress_bar is not None:
+        progress_bar.progress(1.0)
@@ -0,0 +1,97 @@
+"""
+This module provides the frontend helper code shared by the tools which run their long
+computations as background jobs, see potion.streamlitapp.job_runner
+"""
+import streamlit as st
+
+from potion.streamlitapp.job_runner import JobQueue, JobStatus, FINISHED_STATUSES
+
+MAX_JOBS_SHOWN = 5
+
+
+def _load_job_results(job: dict, load_results, loaded_key: str):
+    """
+    Loads the results of a finished job and remembers which job was loaded
+
+    Parameters
+    ----------
+    job : dict
+        The finished job, see JobQueue.get
+    load_results : Callable
+        Called with the job to load its results into the session state
+    loaded_key : str
+        The session state entry recording the ID of the loaded job
+
+    Returns
+    -------
+    None
+    """
+    st.session_state[loaded_key] = job['job_id']
+    load_results(job)
+
+
+def load_job_panel(tags: dict, load_results, key: str, job_queue=None):
+    """
+    Displays the background jobs of a tool with the progress of each stage, and lets the user
+    cancel them and load the results of the finished jobs. The results of the most recent
+    finished job are loaded once per session, so they are shown again after the page is reloaded
+
+    Parameters
+    ----------
+    tags : dict
+        The tags of the jobs to display, e.g. the tool and batch number
+    load_results : Callable
+        Called with a finished job to load its results into the session state
+    key : str
+        A prefix making the keys of the widgets and the session state entries of the panel
+        unique
+    job_queue : JobQueue
+        (Optional. Default: None) The queue of the jobs. If None the queue of the batch results
+        directory is used
+
+    Returns
+    -------
+    None
+    """
+    if job_queue is None:
+        job_queue = JobQueue()
+
+    loaded_key = key + '_loaded_job'
+    if loaded_key not in st.session_state:
+        st.session_state[loaded_key] = None
+
+    st.subheader('Background Jobs')
+
+    # Clicking the button reruns the script, which reads the jobs again
+    st.button('Refresh Job Status', key=key + '_refresh')
+
+    jobs = job_queue.list_jobs(tags)
+    if not jobs:
+        st.text('No jobs have been submitted for this batch yet.')
+        return
+
+    done_jobs = [job for job in jobs if job['status'] == JobStatus.DONE]
+    if done_jobs and st.session_state[loaded_key] is None:
+        _load_job_results(done_jobs[0], load_results, loaded_key)
+
+    for job in jobs[:MAX_JOBS_SHOWN]:
+        job_id = job['job_id']
+        panel = st.expander('{} (submitted {}): {}'.format(
+            job['name'], job['created'], job['status'].name.capitalize()),
+            expanded=job['status'] not in FINISHED_STATUSES)
+
+        for stage, value in job['progress'].items():
+            panel.text(stage.replace('_', ' ').capitalize())
+            panel.progress(min(max(value, 0.0), 1.0))
+
+        if job['status'] == JobStatus.FAILED:
+            panel.error(job['error'])
+
+        if job['status'] not in FINISHED_STATUSES:
+            if panel.button('Cancel Job', key=key + '_cancel_' + job_id):
+                job_queue.cancel(job_id)
+        elif job['status'] == JobStatus.DONE:
+            if job_id == st.session_state[loaded_key]:
+                panel.text('The results of this job are displayed.')
+            elif panel.button('Load Results', key=key + '_load_' + job_id):
+                _load_job_results(job, load_results, loaded_key)
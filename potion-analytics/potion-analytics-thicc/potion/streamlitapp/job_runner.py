@@ -0,0 +1,771 @@
+"""
+This module runs the long curve generation and backtesting runs of the Streamlit tools as
+background jobs, so reruns of the script, widget changes and closed browser tabs neither stop
+them nor start them again.
+
+Each job runs a module level function of the library in its own process, started with
+`python -m potion.streamlitapp.job_runner`, in its own session so it outlives the Streamlit
+script run which submitted it. The jobs are recorded in the jobs directory of the batch results:
+
+    <job_id>.job.json
+        'The record of the job: its target, tags, status, process ID and times. Only written by
+        the queue, under the dispatch lock'
+    <job_id>.status.json
+        'The progress of each stage of the job, and its outcome once it is finished. Only written
+        by the job process'
+    <job_id>.args.pkl
+        'The keyword arguments of the target function'
+    <job_id>.result.pkl
+        'The value returned by the target function, written when the job is done, with the file
+        name of each plotly figure in place of the figure'
+    <job_id>.figures/
+        'The plotly figures of the value returned by the target function, in JSON format'
+    <job_id>.log
+        'The output of the job process'
+
+Every session on the machine uses the same directory, so the limit on the number of running
+jobs applies to the machine. Queued jobs are started when a job finishes, when a job is submitted
+or cancelled, and whenever the UI refreshes the queue. A job which runs a pool of worker processes
+is given its share of the cores in its workers argument, see job_workers, so the running jobs
+together never start more workers than the machine has cores.
+
+The target function receives a JobProgress object for each of its progress arguments. The
+object has the progress method of a streamlit progress bar, so the library functions which
+update a progress bar report the progress of the job without any change.
+"""
+import argparse
+import glob
+import importlib
+import json
+import logging
+import os
+import pickle
+import signal
+import subprocess
+import sys
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from enum import Enum
+from multiprocessing import cpu_count
+from pathlib import Path
+from typing import NamedTuple
+
+import plotly.io
+from plotly.basedatatypes import BaseFigure
+
+JOB_DIRECTORY = './batch_results/jobs/'
+DEFAULT_MAX_RUNNING_JOBS = max(1, cpu_count() // 2)
+
+_RECORD_SUFFIX = '.job.json'
+_STATUS_SUFFIX = '.status.json'
+_ARGS_SUFFIX = '.args.pkl'
+_RESULT_SUFFIX = '.result.pkl'
+_FIGURES_SUFFIX = '.figures'
+_LOG_SUFFIX = '.log'
+_LOCK_FILENAME = 'dispatch.lock'
+_STALE_LOCK_SECONDS = 30.0
+
+# The processes of the jobs started by this process, polled so they are reaped when they exit
+_processes = {}
+
+
+class JobStatus(Enum):
+    """
+    Enum specifying the stage of the lifecycle a job is in
+    """
+    QUEUED = 0
+    RUNNING = 1
+    DONE = 2
+    FAILED = 3
+    CANCELLED = 4
+
+
+FINISHED_STATUSES = (JobStatus.DONE, JobStatus.FAILED, JobStatus.CANCELLED)
+
+
+def _now():
+    """
+    Gets the current time in the format of the job records
+
+    Returns
+    -------
+    now : str
+        The current time in ISO format
+    """
+    return datetime.now().isoformat(timespec='seconds')
+
+
+def _read_json(filename: str):
+    """
+    Reads a JSON file
+
+    Parameters
+    ----------
+    filename : str
+        The name of the file
+
+    Returns
+    -------
+    value : dict
+        The contents of the file, or None if the file does not exist
+    """
+    try:
+        with open(filename) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_atomic(filename: str, write, mode='w'):
+    """
+    Writes a file under a temporary name and renames it, so a reader never sees a partial file
+
+    Parameters
+    ----------
+    filename : str
+        The name of the file
+    write : Callable
+        Called with the open temporary file to write its contents
+    mode : str
+        (Optional. Default: 'w') The mode the temporary file is opened with
+
+    Returns
+    -------
+    None
+    """
+    tmp_filename = filename + '.tmp'
+    with open(tmp_filename, mode) as f:
+        write(f)
+    os.replace(tmp_filename, filename)
+
+
+def _is_alive(pid: int):
+    """
+    Checks whether a job process is still running
+
+    Parameters
+    ----------
+    pid : int
+        The ID of the process
+
+    Returns
+    -------
+    alive : bool
+        True if the process is running. Processes started by other sessions can not be checked
+        on Windows, so they are assumed to be running
+    """
+    process = _processes.get(pid)
+    if process is not None:
+        if process.poll() is None:
+            return True
+        del _processes[pid]
+        return False
+
+    if os.name == 'nt':
+        return True
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _terminate(pid: int):
+    """
+    Stops a job process. The job process leads its own session, so the worker processes it
+    started are stopped with it
+
+    Parameters
+    ----------
+    pid : int
+        The ID of the process
+
+    Returns
+    -------
+    None
+    """
+    try:
+        if hasattr(os, 'killpg'):
+            os.killpg(pid, signal.SIGTERM)
+        else:
+            os.kill(pid, signal.SIGTERM)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+    process = _processes.pop(pid, None)
+    if process is not None:
+        try:
+            process.wait(timeout=5.0)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def job_workers(max_running_jobs: int):
+    """
+    Gets the number of worker processes each job may start, so the jobs running at once leave
+    one core free and the user's computer doesn't freeze up
+
+    Parameters
+    ----------
+    max_running_jobs : int
+        The number of jobs which may run at once
+
+    Returns
+    -------
+    num_workers : int
+        The number of worker processes of each job, at least 1
+    """
+    return max(1, (cpu_count() - 1) // max_running_jobs)
+
+
+class _FigureFile(NamedTuple):
+    """
+    The file a plotly figure of the result of a job is stored in
+    """
+    filename: str
+
+
+def _store_figures(value, directory: str, filenames=None):
+    """
+    Writes the plotly figures of the result of a job to JSON files, so the pickled result only
+    holds their file names
+
+    Parameters
+    ----------
+    value : object
+        The result, or a value nested in its dicts, Lists and tuples
+    directory : str
+        The directory the figures are written to
+    filenames : List[str]
+        (Optional. Default: None) The file names written so far, used to number the files
+
+    Returns
+    -------
+    value : object
+        The value with a _FigureFile in place of each figure
+    """
+    if filenames is None:
+        filenames = []
+
+    if isinstance(value, BaseFigure):
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        filename = os.path.join(directory, 'figure_{}.json'.format(len(filenames)))
+        filenames.append(filename)
+        _write_atomic(filename, lambda f: f.write(value.to_json()))
+        return _FigureFile(filename)
+    if isinstance(value, dict):
+        return {key: _store_figures(item, directory, filenames) for key, item in value.items()}
+    if type(value) in (list, tuple):
+        return type(value)(_store_figures(item, directory, filenames) for item in value)
+    return value
+
+
+def _load_figures(value):
+    """
+    Reads the plotly figures of the result of a job, see _store_figures
+
+    Parameters
+    ----------
+    value : object
+        The result read from its pickle, or a value nested in its dicts, Lists and tuples
+
+    Returns
+    -------
+    value : object
+        The value with each _FigureFile replaced by its figure
+    """
+    if isinstance(value, _FigureFile):
+        return plotly.io.read_json(value.filename)
+    if isinstance(value, dict):
+        return {key: _load_figures(item) for key, item in value.items()}
+    if type(value) in (list, tuple):
+        return type(value)(_load_figures(item) for item in value)
+    return value
+
+
+def _target_name(target):
+    """
+    Gets the importable name of a target function
+
+    Parameters
+    ----------
+    target : Union[Callable, str]
+        The function, or its name in the "module:function" format
+
+    Returns
+    -------
+    target_name : str
+        The name of the function in the "module:function" format
+    """
+    if isinstance(target, str):
+        return target
+    return '{}:{}'.format(target.__module__, target.__qualname__)
+
+
+class JobProgress:
+    """
+    This class reports the progress of one stage of a job. It has the progress method of a
+    streamlit progress bar so it can be passed to the library functions in place of one
+    """
+
+    def __init__(self, queue, job_id: str, stage: str, state: dict):
+        """
+        Constructs the progress of a stage
+
+        Parameters
+        ----------
+        queue : JobQueue
+            The queue of the job
+        job_id : str
+            The ID of the job
+        stage : str
+            The name of the stage, the name of the progress argument of the target function
+        state : dict
+            The status of the job shared by all of its stages
+        """
+        self.queue = queue
+        self.job_id = job_id
+        self.stage = stage
+        self.state = state
+        self._percent = None
+
+    def progress(self, value):
+        """
+        Records the progress of the stage. The status file is only written when the progress
+        changes by at least one percent
+
+        Parameters
+        ----------
+        value : float
+            The progress between 0.0 and 1.0
+
+        Returns
+        -------
+        None
+        """
+        percent = int(round(100.0 * float(value)))
+        if percent == self._percent:
+            return
+
+        self._percent = percent
+        self.state['progress'][self.stage] = float(value)
+        self.queue.write_status(self.job_id, self.state)
+
+
+class JobQueue:
+    """
+    This class submits, dispatches, monitors and cancels the background jobs of a jobs directory
+    """
+
+    def __init__(self, directory=JOB_DIRECTORY, max_running_jobs=DEFAULT_MAX_RUNNING_JOBS):
+        """
+        Constructs the queue of a jobs directory
+
+        Parameters
+        ----------
+        directory : str
+            (Optional. Default: './batch_results/jobs/') The directory the jobs are recorded in
+        max_running_jobs : int
+            (Optional. Default: half of the cores) The number of jobs which may run at once
+        """
+        self.directory = directory
+        self.max_running_jobs = max_running_jobs
+
+    def _filename(self, job_id: str, suffix: str):
+        """
+        Gets the name of one of the files of a job
+
+        Parameters
+        ----------
+        job_id : str
+            The ID of the job
+        suffix : str
+            The suffix of the file
+
+        Returns
+        -------
+        filename : str
+            The name of the file
+        """
+        return os.path.join(self.directory, job_id + suffix)
+
+    @contextmanager
+    def _locked(self):
+        """
+        Context manager holding the dispatch lock of the directory, so the sessions and jobs of
+        the machine never start more jobs than the limit or start a job twice
+
+        Returns
+        -------
+        None
+        """
+        Path(self.directory).mkdir(parents=True, exist_ok=True)
+        lock_file = os.path.join(self.directory, _LOCK_FILENAME)
+        while True:
+            try:
+                fd = os.open(lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                # The lock of a process which died while holding it is taken over
+                try:
+                    if time.time() - os.path.getmtime(lock_file) > _STALE_LOCK_SECONDS:
+                        os.remove(lock_file)
+                except FileNotFoundError:
+                    pass
+                time.sleep(0.05)
+        try:
+            yield
+        finally:
+            os.close(fd)
+            os.remove(lock_file)
+
+    def _write_record(self, record: dict):
+        """
+        Writes the record of a job. Must be called while holding the dispatch lock
+
+        Parameters
+        ----------
+        record : dict
+            The record of the job
+
+        Returns
+        -------
+        None
+        """
+        _write_atomic(self._filename(record['job_id'], _RECORD_SUFFIX),
+                      lambda f: json.dump(record, f, indent=2))
+
+    def write_status(self, job_id: str, state: dict):
+        """
+        Writes the status of a job, only called by the job process
+
+        Parameters
+        ----------
+        job_id : str
+            The ID of the job
+        state : dict
+            The progress of each stage and the outcome of the job
+
+        Returns
+        -------
+        None
+        """
+        _write_atomic(self._filename(job_id, _STATUS_SUFFIX), lambda f: json.dump(state, f))
+
+    def _refresh(self, record: dict):
+        """
+        Combines the record of a job with its status, and fails running jobs whose process
+        exited without finishing. Must be called while holding the dispatch lock
+
+        Parameters
+        ----------
+        record : dict
+            The record of the job
+
+        Returns
+        -------
+        job : dict
+            The job, see get
+        """
+        state = _read_json(self._filename(record['job_id'], _STATUS_SUFFIX)) or {}
+        status = JobStatus[record['status']]
+
+        if status == JobStatus.RUNNING:
+            alive = record['pid'] is None or _is_alive(record['pid'])
+            if state.get('status') in (JobStatus.DONE.name, JobStatus.FAILED.name):
+                status = JobStatus[state['status']]
+            elif not alive:
+                status = JobStatus.FAILED
+                record.update(status=status.name, finished=_now(),
+                              error='The job process exited without finishing')
+                self._write_record(record)
+
+        job = dict(record, status=status, progress=state.get('progress', {}))
+        if status in (JobStatus.DONE, JobStatus.FAILED) and 'finished' in state:
+            job.update(finished=state['finished'], error=state.get('error', record['error']))
+        return job
+
+    def _read_jobs(self):
+        """
+        Reads every job of the directory. Must be called while holding the dispatch lock
+
+        Returns
+        -------
+        jobs : List[dict]
+            The jobs in the order they were submitted, see get
+        """
+        records = []
+        for filename in glob.glob(os.path.join(self.directory, '*' + _RECORD_SUFFIX)):
+            record = _read_json(filename)
+            if record is not None:
+                records.append(record)
+
+        records.sort(key=lambda record: (record['created'], record['job_id']))
+        return [self._refresh(record) for record in records]
+
+    def submit(self, target, kwargs=None, name='', tags=None, progress_args=(), workers_arg=None):
+        """
+        Submits a job, which is started as soon as the limit on running jobs allows it
+
+        Parameters
+        ----------
+        target : Union[Callable, str]
+            The module level function the job runs, or its name in the "module:function" format
+        kwargs : dict
+            (Optional. Default: None) The keyword arguments of the function. Must be picklable
+        name : str
+            (Optional. Default: '') The name of the job shown to the user
+        tags : dict
+            (Optional. Default: None) JSON serializable values used to find the job, e.g. the
+            tool and batch number which submitted it
+        progress_args : List[str]
+            (Optional. Default: ()) The names of the progress bar arguments of the function, each
+            is passed a JobProgress object
+        workers_arg : str
+            (Optional. Default: None) The name of the argument of the function giving the number
+            of worker processes it may start, passed the share of the cores of the job, see
+            job_workers
+
+        Returns
+        -------
+        job_id : str
+            The ID of the job
+        """
+        Path(self.directory).mkdir(parents=True, exist_ok=True)
+
+        job_id = '{:%Y%m%d%H%M%S}-{}'.format(datetime.now(), uuid.uuid4().hex[:8])
+        _write_atomic(self._filename(job_id, _ARGS_SUFFIX),
+                      lambda f: pickle.dump(dict(kwargs or {}), f), mode='wb')
+
+        record = {
+            'job_id': job_id,
+            'name': name,
+            'target': _target_name(target),
+            'tags': dict(tags or {}),
+            'progress_args': list(progress_args),
+            'workers_arg': workers_arg,
+            'num_workers': job_workers(self.max_running_jobs),
+            'cwd': os.getcwd(),
+            'max_running_jobs': self.max_running_jobs,
+            'status': JobStatus.QUEUED.name,
+            'created': _now(),
+            'started': None,
+            'finished': None,
+            'pid': None,
+            'error': None
+        }
+        with self._locked():
+            self._write_record(record)
+
+        self.dispatch()
+        return job_id
+
+    def _start(self, record: dict):
+        """
+        Starts the process of a queued job. Must be called while holding the dispatch lock
+
+        Parameters
+        ----------
+        record : dict
+            The record of the job
+
+        Returns
+        -------
+        None
+        """
+        with open(self._filename(record['job_id'], _LOG_SUFFIX), 'a') as log_file:
+            process = subprocess.Popen(
+                [sys.executable, '-m', 'potion.streamlitapp.job_runner',
+                 os.path.abspath(self.directory), record['job_id']],
+                cwd=record['cwd'], stdout=log_file, stderr=subprocess.STDOUT,
+                stdin=subprocess.DEVNULL, start_new_session=True)
+
+        _processes[process.pid] = process
+        record.update(status=JobStatus.RUNNING.name, started=_now(), pid=process.pid)
+        self._write_record(record)
+
+    def dispatch(self):
+        """
+        Starts the queued jobs, oldest first, while fewer jobs than the limit are running
+
+        Returns
+        -------
+        started : List[str]
+            The IDs of the jobs which were started
+        """
+        started = []
+        with self._locked():
+            jobs = self._read_jobs()
+            num_running = len([job for job in jobs if job['status'] == JobStatus.RUNNING])
+            for job in jobs:
+                if num_running >= self.max_running_jobs:
+                    break
+                if job['status'] != JobStatus.QUEUED:
+                    continue
+
+                record = _read_json(self._filename(job['job_id'], _RECORD_SUFFIX))
+                self._start(record)
+                started.append(job['job_id'])
+                num_running += 1
+
+        return started
+
+    def get(self, job_id: str):
+        """
+        Gets a job
+
+        Parameters
+        ----------
+        job_id : str
+            The ID of the job
+
+        Returns
+        -------
+        job : dict
+            The record of the job with its JobStatus, the progress of each stage between 0.0 and
+            1.0, and the error of a failed job. None if there is no such job
+        """
+        with self._locked():
+            record = _read_json(self._filename(job_id, _RECORD_SUFFIX))
+            return None if record is None else self._refresh(record)
+
+    def list_jobs(self, tags=None):
+        """
+        Gets the jobs of the directory, and starts the queued jobs the limit allows
+
+        Parameters
+        ----------
+        tags : dict
+            (Optional. Default: None) Only the jobs with these tags are listed
+
+        Returns
+        -------
+        jobs : List[dict]
+            The jobs, most recently submitted first, see get
+        """
+        self.dispatch()
+        with self._locked():
+            jobs = self._read_jobs()
+
+        tags = tags or {}
+        return [job for job in reversed(jobs)
+                if all(job['tags'].get(key) == value for key, value in tags.items())]
+
+    def cancel(self, job_id: str):
+        """
+        Cancels a queued or running job. The process of a running job is stopped
+
+        Parameters
+        ----------
+        job_id : str
+            The ID of the job
+
+        Returns
+        -------
+        cancelled : bool
+            True if the job was cancelled, False if it had already finished
+        """
+        with self._locked():
+            record = _read_json(self._filename(job_id, _RECORD_SUFFIX))
+            if record is None or self._refresh(record)['status'] in FINISHED_STATUSES:
+                return False
+
+            if record['pid'] is not None:
+                _terminate(record['pid'])
+
+            record.update(status=JobStatus.CANCELLED.name, finished=_now())
+            self._write_record(record)
+
+        self.dispatch()
+        return True
+
+    def result(self, job_id: str):
+        """
+        Reads the value returned by the target function of a finished job
+
+        Parameters
+        ----------
+        job_id : str
+            The ID of the job
+
+        Returns
+        -------
+        result : object
+            The value returned by the function with its plotly figures read from their files, or
+            None if the job is not done
+        """
+        job = self.get(job_id)
+        if job is None or job['status'] != JobStatus.DONE:
+            return None
+
+        with open(self._filename(job_id, _RESULT_SUFFIX), 'rb') as f:
+            return _load_figures(pickle.load(f))
+
+
+def run_job(directory: str, job_id: str):
+    """
+    Runs a job in the current process, called by the process started for the job. The queued
+    jobs are dispatched once the job is finished
+
+    Parameters
+    ----------
+    directory : str
+        The jobs directory
+    job_id : str
+        The ID of the job
+
+    Returns
+    -------
+    None
+    """
+    record = _read_json(os.path.join(directory, job_id + _RECORD_SUFFIX))
+    queue = JobQueue(directory, record['max_running_jobs'])
+
+    state = {'status': JobStatus.RUNNING.name, 'progress': {}}
+    queue.write_status(job_id, state)
+    try:
+        with open(queue._filename(job_id, _ARGS_SUFFIX), 'rb') as f:
+            kwargs = pickle.load(f)
+        for stage in record['progress_args']:
+            kwargs[stage] = JobProgress(queue, job_id, stage, state)
+        if record['workers_arg'] is not None:
+            kwargs[record['workers_arg']] = record['num_workers']
+
+        module_name, function_name = record['target'].split(':')
+        target = importlib.import_module(module_name)
+        for attribute in function_name.split('.'):
+            target = getattr(target, attribute)
+
+        result = _store_figures(target(**kwargs), queue._filename(job_id, _FIGURES_SUFFIX))
+
+        _write_atomic(queue._filename(job_id, _RESULT_SUFFIX),
+                      lambda f: pickle.dump(result, f), mode='wb')
+        state.update(status=JobStatus.DONE.name, finished=_now())
+    except Exception:
+        logging.exception('Job {} failed'.format(job_id))
+        state.update(status=JobStatus.FAILED.name, finished=_now(), error=traceback.format_exc())
+
+    queue.write_status(job_id, state)
+
+    # The job which finished hands its slot to the next queued job
+    queue.dispatch()
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(prog='job_runner', usage='%(prog)s directory job_id')
+    parser.add_argument('directory', help='The jobs directory')
+    parser.add_argument('job_id', help='The ID of the job to run')
+
+    args = parser.parse_args()
+
+    # Run the job with the imported module instead of __main__, so the _FigureFile objects of
+    # the pickled result can be read by the sessions
+    importlib.import_module('potion.streamlitapp.job_runner').run_job(args.directory,
+                                                                       args.job_id)
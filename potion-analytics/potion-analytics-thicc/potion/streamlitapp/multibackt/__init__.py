@@ -28,3 +28,12 @@ PB_INIT_BANKROLL_HELP_TEXT = 'This number spinner allows you to specify a hypoth
                              ' with. In the backtester, this number determines where the user\'s bankroll plot ' \
                              'begins. This plot graphs the amount of cash the user has over the duration of ' \
                              'the simulation'
+
+PB_SEED_HELP_TEXT = 'Chooses the seed of the random price paths. The paths are saved in the batch folder, so ' \
+                    'running again with the same seed, settings and pools reuses the same paths instead of ' \
+                    'simulating new ones. Change the seed to simulate a different set of paths.'
+
+PB_WEBGL_HELP_TEXT = 'The result plots show the percentiles of each value over all of the paths, with a small ' \
+                     'sample of representative paths from the worst to the best final bankroll drawn on top. ' \
+                     'Check this box to draw the sample paths with WebGL, which keeps the browser responsive ' \
+                     'on slower machines.'
@@ -0,0 +1,291 @@
+"""
+This module provides the aggregation of the portfolio backtesting logs which the result plots are
+built from. Instead of one trace per path, the plots show percentile fan charts, histograms of the
+final values and a small sample of representative paths, so the size of the figures does not grow
+with the number of paths.
+
+The log is read one column at a time as a grid of paths by days, and each grid is reduced to its
+aggregate before the next column is read, so the memory used does not grow with the number of
+curves either
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+FAN_PERCENTILES = (5, 25, 50, 75, 95)
+DEFAULT_NUM_SAMPLE_PATHS = 10
+DEFAULT_NUM_HIST_BINS = 50
+STRATEGIES = ('User', 'Opt')
+
+
+class MetricAggregate(NamedTuple):
+    """
+    The aggregate of one value logged along all of the paths of a backtest
+    """
+    days: np.ndarray
+    """The days of the paths at which the value is logged"""
+    percentiles: np.ndarray
+    """The FAN_PERCENTILES of the value across the paths at each day"""
+    sample_path_ids: np.ndarray
+    """The IDs of the representative paths, see sample_path_ids"""
+    samples: np.ndarray
+    """The value along each representative path at each day, NaN where it is not logged"""
+    initial: np.ndarray
+    """The first logged value of each path"""
+    final: np.ndarray
+    """The last logged value of each path"""
+    histogram: tuple
+    """The counts and the bin edges of the histogram of the final values"""
+
+
+class StrategyAggregate(NamedTuple):
+    """
+    The aggregates of the results of one curve strategy of a backtest, the user's ABCD curves or
+    the minimum optimal curves
+    """
+    bankroll: MetricAggregate
+    cagr: MetricAggregate
+    utils: dict
+    """The aggregate of the util used of each curve, keyed by curve ID"""
+    amounts: dict
+    """The aggregate of the amount of contracts traded of each curve, keyed by curve ID"""
+    max_drawdowns: np.ndarray
+    """The maximum drawdown of the bankroll along each path as a percentage"""
+
+
+def read_log_grid(results_df, column: str, num_paths: int):
+    """
+    Reads one column of a backtesting log as a grid of paths by days. The rows of each path are
+    contiguous in the log, see potion.backtest.multi_asset_backtester.calculate_row_slices
+
+    Parameters
+    ----------
+    results_df : vaex.dataframe.DataFrame
+        The log of the backtest
+    column : str
+        The name of the column
+    num_paths : int
+        The number of paths in the backtest
+
+    Returns
+    -------
+    grid : numpy.ndarray
+        The values of the column with shape (num_paths, path_length)
+    """
+    values = results_df[column].to_numpy()
+    return values[:num_paths * (len(values) // num_paths)].reshape(num_paths, -1)
+
+
+def logged_rows(results_df, num_paths: int):
+    """
+    Finds the rows of a backtesting log which were written. Rows are only written on the days a
+    curve expires, the other rows are left at zero
+
+    Parameters
+    ----------
+    results_df : vaex.dataframe.DataFrame
+        The log of the backtest
+    num_paths : int
+        The number of paths in the backtest
+
+    Returns
+    -------
+    logged : numpy.ndarray
+        Boolean grid with shape (num_paths, path_length), True for the written rows
+    """
+    timestamps = read_log_grid(results_df, 'Timestamp', num_paths)
+    # Only the rows of day 0 have a zero timestamp once written
+    return timestamps == np.arange(timestamps.shape[1])
+
+
+def read_metric_grid(results_df, column: str, logged: np.ndarray, skip_first=False):
+    """
+    Reads a logged value of a backtest as a grid of paths by days, with NaN wherever the value is
+    not logged. As in the per path plots, zero and infinite values are not plotted
+
+    Parameters
+    ----------
+    results_df : vaex.dataframe.DataFrame
+        The log of the backtest
+    column : str
+        The name of the column of the value
+    logged : numpy.ndarray
+        The written rows of the log, see logged_rows
+    skip_first : bool
+        (Optional. Default: False) Whether to leave out the first day of the paths
+
+    Returns
+    -------
+    grid : numpy.ndarray
+        The values with shape (num_paths, path_length)
+    """
+    values = read_log_grid(results_df, column, logged.shape[0]).astype(np.float64)
+    values[~logged | (values == 0.0) | ~np.isfinite(values)] = np.nan
+    if skip_first:
+        values[:, 0] = np.nan
+    return values
+
+
+def _first_and_last(values: np.ndarray):
+    """
+    Gets the first and last value of each path which is not NaN
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        The grid of values with shape (num_paths, num_days)
+
+    Returns
+    -------
+    first : numpy.ndarray
+        The first value of each path, NaN if the path has no values
+    last : numpy.ndarray
+        The last value of each path, NaN if the path has no values
+    """
+    if values.shape[1] == 0:
+        missing = np.full(values.shape[0], np.nan)
+        return missing, missing
+
+    is_valid = ~np.isnan(values)
+    rows = np.arange(values.shape[0])
+    first = np.argmax(is_valid, axis=1)
+    last = values.shape[1] - 1 - np.argmax(is_valid[:, ::-1], axis=1)
+    return values[rows, first], values[rows, last]
+
+
+def sample_path_ids(final_values: np.ndarray, num_sample_paths=DEFAULT_NUM_SAMPLE_PATHS):
+    """
+    Picks a small sample of representative paths, at evenly spaced ranks of their final values
+    from the worst path to the best
+
+    Parameters
+    ----------
+    final_values : numpy.ndarray
+        The final value of each path, e.g. its final bankroll
+    num_sample_paths : int
+        (Optional. Default: 10) The number of paths to pick
+
+    Returns
+    -------
+    path_ids : numpy.ndarray
+        The IDs of the picked paths, in ascending order of their final values
+    """
+    order = np.argsort(final_values, kind='stable')
+    num_sample_paths = min(num_sample_paths, order.size)
+    ranks = np.unique(np.linspace(0, order.size - 1, num_sample_paths).round().astype(int))
+    return order[ranks]
+
+
+def aggregate_metric(values: np.ndarray, path_ids: np.ndarray,
+                     num_hist_bins=DEFAULT_NUM_HIST_BINS):
+    """
+    Reduces the grid of a value along all of the paths to its aggregate
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        The grid of values with shape (num_paths, num_days), NaN where the value is not logged
+    path_ids : numpy.ndarray
+        The IDs of the representative paths, see sample_path_ids
+    num_hist_bins : int
+        (Optional. Default: 50) The number of bins of the histogram of the final values
+
+    Returns
+    -------
+    aggregate : MetricAggregate
+        The aggregate of the value
+    """
+    days = np.flatnonzero(~np.all(np.isnan(values), axis=0))
+    logged_values = values[:, days]
+    initial, final = _first_and_last(logged_values)
+
+    percentiles = np.empty((len(FAN_PERCENTILES), 0))
+    if days.size > 0:
+        percentiles = np.nanpercentile(logged_values, FAN_PERCENTILES, axis=0)
+
+    return MetricAggregate(
+        days=days,
+        percentiles=percentiles,
+        sample_path_ids=path_ids,
+        samples=logged_values[path_ids],
+        initial=initial,
+        final=final,
+        histogram=np.histogram(final[~np.isnan(final)], bins=num_hist_bins))
+
+
+def max_drawdowns(bankrolls: np.ndarray):
+    """
+    Calculates the maximum drawdown along each path, see
+    potion.streamlitapp.backt.bt_utils.calculate_max_drawdown
+
+    Parameters
+    ----------
+    bankrolls : numpy.ndarray
+        The grid of bankrolls with shape (num_paths, num_days), NaN where it is not logged
+
+    Returns
+    -------
+    max_dd : numpy.ndarray
+        The maximum drawdown of each path as a percentage
+    """
+    peaks = np.fmax.accumulate(bankrolls, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drawdowns = (bankrolls - peaks) / peaks
+    return np.fmin.reduce(drawdowns, axis=1, initial=0.0) * 100.0
+
+
+def aggregate_strategy(results_df, strategy: str, curve_ids, num_paths: int, logged=None,
+                       num_sample_paths=DEFAULT_NUM_SAMPLE_PATHS,
+                       num_hist_bins=DEFAULT_NUM_HIST_BINS):
+    """
+    Aggregates the results of one curve strategy of a backtest in a single pass over its
+    columns of the log. The representative paths are picked by their final bankroll and shared
+    by all of the aggregates, so the sampled util and amounts match the sampled bankrolls
+
+    Parameters
+    ----------
+    results_df : vaex.dataframe.DataFrame
+        The log of the backtest
+    strategy : str
+        The prefix of the columns of the strategy, one of STRATEGIES
+    curve_ids : List[int]
+        The ID numbers of the curves tested in the backtest
+    num_paths : int
+        The number of paths in the backtest
+    logged : numpy.ndarray
+        (Optional. Default: None) The written rows of the log, see logged_rows. If None they
+        are read from the log
+    num_sample_paths : int
+        (Optional. Default: 10) The number of representative paths
+    num_hist_bins : int
+        (Optional. Default: 50) The number of bins of the histograms of the final values
+
+    Returns
+    -------
+    aggregate : StrategyAggregate
+        The aggregates of the strategy
+    """
+    if logged is None:
+        logged = logged_rows(results_df, num_paths)
+
+    bankrolls = read_metric_grid(results_df, '{}_Bankroll'.format(strategy), logged)
+    path_ids = sample_path_ids(_first_and_last(bankrolls)[1], num_sample_paths)
+    bankroll = aggregate_metric(bankrolls, path_ids, num_hist_bins)
+    drawdowns = max_drawdowns(bankrolls)
+    del bankrolls
+
+    cagr = aggregate_metric(read_metric_grid(results_df, '{}_CAGR'.format(strategy), logged),
+                            path_ids, num_hist_bins)
+
+    utils = {}
+    amounts = {}
+    for curve_id in curve_ids:
+        utils[curve_id] = aggregate_metric(read_metric_grid(
+            results_df, '{}_{}_Util'.format(curve_id, strategy), logged, skip_first=True),
+            path_ids, num_hist_bins)
+        amounts[curve_id] = aggregate_metric(read_metric_grid(
+            results_df, '{}_{}_Amount'.format(curve_id, strategy), logged, skip_first=True),
+            path_ids, num_hist_bins)
+
+    return StrategyAggregate(bankroll=bankroll, cagr=cagr, utils=utils, amounts=amounts,
+                             max_drawdowns=drawdowns)
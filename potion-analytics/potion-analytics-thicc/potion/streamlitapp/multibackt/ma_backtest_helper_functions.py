@@ -6,9 +6,17 @@ in the format the GUI expects.
 """
 import logging
 import time
+from multiprocessing import cpu_count
+
+import pandas as pd
 
 from potion.backtest.multi_asset_backtester import (
     create_ma_backtester_config, MultiAssetBacktester)
+from potion.backtest.pool_runner import PoolResultStore, run_pool_scenarios
+from potion.instrumentation import reset_profile, write_profile, PROFILE_FILENAME
+from potion.rng import resolve_seed
+from potion.streamlitapp.multibackt.ma_plot import (
+    plot_multi_asset_paths, create_backtesting_plots, calc_total_num_plot_tasks)
 
 
 def calculate_max_drawdown(bankroll):
@@ -43,7 +51,7 @@ def calculate_max_drawdown(bankroll):
 
 def do_backtest(backtest_id, total_num_backtests, log_file_name, util_map, gen_method,
                 num_paths, path_length, initial_bankroll, training_df, curve_df, user_alpha,
-                cov_df=None, progress_bar=None):
+                cov_df=None, progress_bar=None, seed=None, path_store_directory=None):
     """
     This function creates a batch backtester object and runs the full batch simulation. A dict
     containing results info is returned to the caller of the function.
@@ -78,13 +86,18 @@ def do_backtest(backtest_id, total_num_backtests, log_file_name, util_map, gen_m
         path generation
     progress_bar : streamlit.progress
         (Optional) Specifies a streamlit progressbar to update the UI on progress
+    seed : int
+        (Optional) The seed used to generate the backtesting paths
+    path_store_directory : str
+        (Optional) The directory in which the backtesting paths are stored and reused
 
     Returns
     -------
     backtester : backtester object that was used in the simulation
     """
     config = create_ma_backtester_config(gen_method, num_paths, path_length, util_map,
-                                         initial_bankroll)
+                                         initial_bankroll, seed=seed,
+                                         path_store_directory=path_store_directory)
 
     result_df = curve_df.query('Backtest_ID == {}'.format(backtest_id))
 
@@ -108,9 +121,13 @@ def do_backtest(backtest_id, total_num_backtests, log_file_name, util_map, gen_m
 
 def run_backtesting_script(log_dir, ma_curve_df, training_df, gen_method, num_paths,
                            path_length, initial_bankroll, backtest_util_list, tail_alpha_list,
-                           progress_bar=None):
+                           progress_bar=None, seed=None, path_store_directory=None,
+                           num_workers=None):
     """
-    Runs a full set of backtesting simulations for the specified input parameters
+    Runs a full set of backtesting simulations for the specified input parameters. The timings
+    of the stages are written to profile.json in the log directory. The covariance of each set of
+    assets is fitted once and the pools on the same assets are simulated on the same paths, see
+    run_pool_scenarios. The pools are evaluated in parallel when more than one worker is allowed
 
     Parameters
     ----------
@@ -135,6 +152,15 @@ def run_backtesting_script(log_dir, ma_curve_df, training_df, gen_method, num_pa
         A List containing each user specified custom tail alpha
     progress_bar : streamlit.progress
         A progress bar used to update the UI on the progress of the script
+    seed : int
+        (Optional. Default: None) The seed used to generate the backtesting paths. If None, a
+        fresh seed is drawn and shared by every pool of the run
+    path_store_directory : str
+        (Optional. Default: None) The directory in which the backtesting paths are stored and
+        reused. If None the paths are only kept in memory
+    num_workers : int
+        (Optional. Default: None) The number of worker processes evaluating the pools. If None,
+        one less than the number of cores so the user's computer doesn't freeze up
 
     Returns
     -------
@@ -143,28 +169,138 @@ def run_backtesting_script(log_dir, ma_curve_df, training_df, gen_method, num_pa
         the simulation
     """
     start = time.perf_counter()
+    reset_profile()
 
     num_paths = int(num_paths)
     path_length = int(path_length)
-    num_ma_backtests = len(backtest_util_list)
-
-    backtester_map = {}
-
-    for backtest_id, util_map in enumerate(backtest_util_list):
+    seed = resolve_seed(seed)
 
-        log_file_name = log_dir + 'ma_backtest_pool_{}'.format(backtest_id)
+    config = create_ma_backtester_config(gen_method, num_paths, path_length, {},
+                                         initial_bankroll, seed=seed,
+                                         path_store_directory=path_store_directory)
 
-        user_alpha = tail_alpha_list[backtest_id]
-        backtester = do_backtest(backtest_id, num_ma_backtests, log_file_name, util_map,
-                                 gen_method, num_paths, path_length, initial_bankroll,
-                                 training_df, ma_curve_df, user_alpha, progress_bar=progress_bar)
+    if num_workers is None:
+        num_workers = max(1, cpu_count() - 1)
 
-        backtester_map[backtest_id] = backtester
+    backtester_map = run_pool_scenarios(config, ma_curve_df, training_df, backtest_util_list,
+                                        PoolResultStore(log_dir), tail_alpha_list=tail_alpha_list,
+                                        progress_bar=progress_bar, num_workers=num_workers)
 
     if progress_bar is not None:
         progress_bar.progress(1.0)
 
+    write_profile(log_dir + PROFILE_FILENAME)
+
     end = time.perf_counter()
     logging.debug('Time to complete: {} seconds'.format(end - start))
 
     return backtester_map
+
+
+def run_pool_backtesting_job(log_dir, ma_curve_df, training_df, pdf_df, gen_method, num_paths,
+                             path_length, initial_bankroll, backtest_util_list, tail_alpha_list,
+                             progress_bar=None, plot_progress_bar=None, seed=None,
+                             path_store_directory=None, use_webgl=False, num_workers=1):
+    """
+    Runs a full set of backtesting simulations and creates the plots of their results, the
+    target of the pool backtesting jobs submitted by the GUI, see
+    potion.streamlitapp.job_runner. The performance statistics are written to
+    ma_backtest_performance.csv in the log directory, and the returned dict is stored with the
+    job so the GUI can load it once the job is done
+
+    Parameters
+    ----------
+    log_dir : str
+        The directory in which the log files will be stored
+    ma_curve_df : pandas.DataFrame
+        The input DataFrame containing the curve info
+    training_df : pandas.DataFrame
+        The input DataFrame containing the asset training window info
+    pdf_df : pandas.DataFrame
+        The DataFrame containing the PDFs of the curves
+    gen_method : PathGenMethod
+        Enum corresponding to the distribution to use to generate backtesting paths
+    num_paths : int
+        The number of paths to generate in the backtesting simulation
+    path_length : int
+        The length of each path in the backtesting simulation
+    initial_bankroll : float
+        The amount of money the user starts with in the simulation
+    backtest_util_list : List[dict]
+        A List containing each util_map (mapping of asset and util) for each backtesting
+        simulation which will be run by this function
+    tail_alpha_list : List[float]
+        A List containing each user specified custom tail alpha
+    progress_bar : streamlit.progress
+        (Optional. Default: None) A progress bar updated on the progress of the backtests
+    plot_progress_bar : streamlit.progress
+        (Optional. Default: None) A progress bar updated on the progress of the plot creation
+    seed : int
+        (Optional. Default: None) The seed used to generate the backtesting paths
+    path_store_directory : str
+        (Optional. Default: None) The directory in which the backtesting paths are stored and
+        reused
+    use_webgl : bool
+        (Optional. Default: False) Whether to draw the representative paths of the plots with
+        WebGL
+    num_workers : int
+        (Optional. Default: 1) The number of worker processes evaluating the pools, the share
+        of the cores given to the job, see potion.streamlitapp.job_runner.job_workers
+
+    Returns
+    -------
+    results : dict
+        The curves of each pool, plots and performance DataFrame shown by the GUI, keyed by the
+        name of their session state entry. The backtesters themselves are not returned, their
+        logs are in the log directory
+    """
+    backtester_map = run_backtesting_script(
+        log_dir, ma_curve_df, training_df, gen_method, num_paths, path_length, initial_bankroll,
+        backtest_util_list, tail_alpha_list, progress_bar=progress_bar, seed=seed,
+        path_store_directory=path_store_directory, num_workers=num_workers)
+
+    return_dist_map = {}
+    marginal_dist_map = {}
+    path_plot_map = {}
+    pdf_and_pay_map = {}
+    performance_dict_list = []
+    performance_plot_list = []
+
+    progress_bar_count = 0
+    total_num_plot_tasks = calc_total_num_plot_tasks(backtester_map)
+    for backtest_id, backtester in backtester_map.items():
+
+        (marginal_dist_dict, two_d_fig_map, path_figure_map,
+         progress_bar_count) = plot_multi_asset_paths(
+            backtester, path_length, progress_bar_count, use_webgl=use_webgl)
+
+        log_file_name = PoolResultStore(log_dir).log_file_name(backtest_id)
+        (performance_dict, plot_dicts, pdf_payout_figs,
+         progress_bar_count) = create_backtesting_plots(
+            backtest_id, backtester, log_file_name, pdf_df, marginal_dist_dict,
+            num_paths, progress_bar_count, total_num_plot_tasks,
+            plot_progress_bar=plot_progress_bar, use_webgl=use_webgl)
+
+        return_dist_map[backtest_id] = two_d_fig_map
+        marginal_dist_map[backtest_id] = marginal_dist_dict
+        path_plot_map[backtest_id] = path_figure_map
+        pdf_and_pay_map[backtest_id] = pdf_payout_figs
+        performance_dict_list.append(performance_dict)
+        performance_plot_list.append(plot_dicts)
+
+    if plot_progress_bar is not None:
+        plot_progress_bar.progress(1.0)
+
+    performace_df = pd.DataFrame(performance_dict_list)
+    performace_df.to_csv(log_dir + 'ma_backtest_performance.csv', index=False)
+
+    return {
+        'multi_asset_return_dists': return_dist_map,
+        'ma_curve_df_map': {backtest_id: backtester.curve_df
+                            for backtest_id, backtester in backtester_map.items()},
+        'marginal_dists': marginal_dist_map,
+        'ma_path_plot_map': path_plot_map,
+        'ma_pdf_and_payout_fig_map': pdf_and_pay_map,
+        'ma_performance_df': performace_df,
+        'ma_performance_plot_list': performance_plot_list
+    }
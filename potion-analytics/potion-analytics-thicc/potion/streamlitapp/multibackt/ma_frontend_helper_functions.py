@@ -14,44 +14,22 @@ from st_aggrid.shared import GridUpdateMode
 from potion.backtest.multi_asset_backtester import PathGenMethod
 from potion.streamlitapp.multibackt import (
     PB_BATCH_NUMBER_HELP_TEXT, PB_PATH_GEN_HELP_TEXT, PB_NUM_PATHS_HELP_TEXT,
-    PB_PATH_LENGTH_HELP_TEXT, PB_INIT_BANKROLL_HELP_TEXT)
-from potion.streamlitapp.multibackt.ma_backtest_helper_functions import run_backtesting_script
-from potion.streamlitapp.multibackt.ma_plot import (
-    plot_multi_asset_paths, create_backtesting_plots, calc_total_num_plot_tasks)
+    PB_PATH_LENGTH_HELP_TEXT, PB_INIT_BANKROLL_HELP_TEXT, PB_SEED_HELP_TEXT,
+    PB_WEBGL_HELP_TEXT)
+from potion.backtest.path_store import PATH_STORE_DIRNAME
+from potion.streamlitapp.multibackt.ma_backtest_helper_functions import run_pool_backtesting_job
 from potion.streamlitapp.curvegen.cg_file_io import save_plotly_fig_to_file
-from potion.streamlitapp.curvegen.cg_file_io import read_pdfs_from_csv, read_training_data_from_csv
+from potion.streamlitapp.curvegen.cg_file_io import (read_pdfs, get_pdf_filename,
+                                                     read_training_data_from_csv)
 from potion.streamlitapp.multibackt.ma_file_io import read_multi_asset_curves_from_csv
+from potion.streamlitapp.curve_index import CurveIndex, POOL_KEY_COLUMNS
+from potion.streamlitapp.job_panel import load_job_panel
+from potion.streamlitapp.job_runner import JobQueue
 from potion.streamlitapp.preference_saver import (
     preference_df_file_name, initialize_preference_df, save_pool_backtester_preferences,
     get_pref, POOL_BACK_PG, POOL_BACK_NP, POOL_BACK_PL, POOL_BACK_IB)
 
-
-def _check_curve_rows_eq(row_1, row_2):
-    """
-    Checks whether two curve rows are equal
-
-    Parameters
-    ----------
-    row_1 : pandas.Series
-        The first row to compare
-    row_2 : pandas.Series
-        The second row to compare
-
-    Returns
-    -------
-    equal : bool
-        True if the rows are equal, False otherwise
-    """
-    return (row_1['Label'] == row_2['Label']) & (
-            row_1['Backtest_ID'] == row_2['Backtest_ID']) & (
-                   row_1['Curve_ID'] == row_2['Curve_ID']) & (
-                   row_1['Asset'] == row_2['Asset']) & (
-                   row_1['Expiration'] == row_2['Expiration']) & (
-                   row_1['StrikePercent'] == row_2['StrikePercent']) & (
-                   row_1['A'] == row_2['A']) & (
-                   row_1['B'] == row_2['B']) & (
-                   row_1['C'] == row_2['C']) & (
-                   row_1['D'] == row_2['D'])
+POOL_BACKTEST_JOB_TOOL = 'pool_backtesting'
 
 
 def get_batch_numbers(directory='./batch_results'):
@@ -106,8 +84,8 @@ def initialize_multi_asset_backtester_session_state():
     if 'ma_path_plot_map' not in st.session_state:
         st.session_state.ma_path_plot_map = None
 
-    if 'ma_backtester_map' not in st.session_state:
-        st.session_state.ma_backtester_map = None
+    if 'ma_curve_df_map' not in st.session_state:
+        st.session_state.ma_curve_df_map = None
 
     if 'ma_pdf_and_payout_fig_map' not in st.session_state:
         st.session_state.ma_pdf_and_payout_fig_map = None
@@ -127,6 +105,9 @@ def initialize_multi_asset_backtester_session_state():
     if 'preview_df' not in st.session_state:
         st.session_state.preview_df = None
 
+    if 'ma_curve_index' not in st.session_state:
+        st.session_state.ma_curve_index = None
+
     if 'selected_indices' not in st.session_state:
         st.session_state.selected_indices = None
 
@@ -139,12 +120,30 @@ def initialize_multi_asset_backtester_session_state():
         st.session_state.pref_df = initialize_preference_df()
 
 
+def load_pool_backtest_job_results(job: dict):
+    """
+    Loads the results of a finished pool backtesting job and saves them in the session_state for
+    use in other areas of the streamlit app
+
+    Parameters
+    ----------
+    job : dict
+        The finished pool backtesting job, see potion.streamlitapp.job_runner.JobQueue.get
+
+    Returns
+    -------
+    None
+    """
+    for key, value in JobQueue().result(job['job_id']).items():
+        st.session_state[key] = value
+
+
 def load_multi_asset_settings_panel():
     """
     Displays the multi asset backtester settings panel to the user. When the user clicks the
-    start button this function also kicks off the business logic of actually running the
-    backtesting simulation and stores the results in the session_state for use in other
-    areas of the streamlit app.
+    start button this function also submits a background job which runs the backtesting
+    simulation. The progress of the jobs of the batch is displayed, and the results of a
+    finished job are stored in the session_state for use in other areas of the streamlit app.
 
     Returns
     -------
@@ -195,8 +194,8 @@ def load_multi_asset_settings_panel():
         ma_input_file = res_dir + 'multi_asset_input.csv'
         train_filename = './batch_results/batch_{}/curve_generation/training.csv'.format(
             st.session_state.batch_number)
-        pdf_filename = './batch_results/batch_{}/curve_generation/pdfs.csv'.format(
-            st.session_state.batch_number)
+        pdf_filename = get_pdf_filename('./batch_results/batch_{}/curve_generation/'.format(
+            st.session_state.batch_number))
 
         if not os.path.isfile(train_filename):
             st.error('Missing curve generation results.')
@@ -236,8 +235,9 @@ def load_multi_asset_settings_panel():
 
         ma_curve_df = read_multi_asset_curves_from_csv(ma_input_file)
         training_df = read_training_data_from_csv(train_filename)
-        pdf_df = read_pdfs_from_csv(pdf_filename)
+        pdf_df = read_pdfs(pdf_filename)
         st.session_state.preview_df = ma_curve_df
+        st.session_state.ma_curve_index = CurveIndex(ma_curve_df, POOL_KEY_COLUMNS)
 
         gb = GridOptionsBuilder.from_dataframe(st.session_state.preview_df)
         gb.configure_pagination()
@@ -261,28 +261,15 @@ def load_multi_asset_settings_panel():
                 selected_rows = st.session_state.preview_df
 
             # No ability to get the row numbers from the AgGrid component unfortunately
-            selected_indices = []
-            for idx, row in selected_rows.iterrows():
-                row['StrikePercent'] = float(row['StrikePercent'])
-                row_pd = pd.Series(row)
-
-                for r_index, p_row in st.session_state.preview_df.iterrows():
-
-                    row_pd.name = p_row.name
-                    if _check_curve_rows_eq(row_pd, p_row):
-                        selected_indices.append(r_index)
-                        break
+            curve_ids = st.session_state.ma_curve_index.lookup(selected_rows)
+            selected_indices = [int(curve_id) for curve_id in curve_ids if curve_id != -1]
 
             # Get all of the backtest IDs of the rows selected so we can grab rows with
             # the same backtest ID too
-            selected_backtest_ids = []
-            for index in selected_indices:
-                bt_id = int(st.session_state.preview_df.iloc[index]['Backtest_ID'])
-                if bt_id not in selected_backtest_ids:
-                    selected_backtest_ids.append(bt_id)
+            backtest_ids = st.session_state.preview_df['Backtest_ID'].astype(int)
+            selected_backtest_ids = backtest_ids.loc[selected_indices].unique()
 
-            included_indices = [idx for idx, row in st.session_state.preview_df.iterrows()
-                                if int(row['Backtest_ID']) in selected_backtest_ids]
+            included_indices = list(backtest_ids.index[backtest_ids.isin(selected_backtest_ids)])
 
             included_rows = st.session_state.preview_df[st.session_state.preview_df.index.isin(
                 included_indices)]
@@ -335,6 +322,17 @@ def load_multi_asset_settings_panel():
         help_panel = ma_backtest_form.expander('Need Help? Click to Expand', expanded=False)
         help_panel.markdown(PB_INIT_BANKROLL_HELP_TEXT)
 
+        seed = ma_backtest_form.number_input(
+            'Random Seed for the Price Paths', min_value=0, max_value=2 ** 31 - 1, value=0, step=1)
+
+        help_panel = ma_backtest_form.expander('Need Help? Click to Expand', expanded=False)
+        help_panel.markdown(PB_SEED_HELP_TEXT)
+
+        use_webgl = ma_backtest_form.checkbox('Draw Sample Paths with WebGL', value=False)
+
+        help_panel = ma_backtest_form.expander('Need Help? Click to Expand', expanded=False)
+        help_panel.markdown(PB_WEBGL_HELP_TEXT)
+
         backtest_util_list = []
         _cov_matrix_list = []
         tail_alpha_list = []
@@ -377,16 +375,10 @@ def load_multi_asset_settings_panel():
             backtest_util_list.append(util_map)
             tail_alpha_list.append(user_alpha)
 
-        ma_backtest_form.text('Backtesting Progress:')
-        backtest_progress_bar = ma_backtest_form.progress(0.0)
-
-        ma_backtest_form.text('Plot Generation Progress')
-        plot_progress_bar = ma_backtest_form.progress(0.0)
-
         ma_backtest_button = ma_backtest_form.form_submit_button('Run Backtesting')
 
-        # If the button is pressed, run the backtesting, and save the results and
-        # plots in the session_state for use later
+        # If the button is pressed, submit the backtesting as a background job so it survives
+        # reruns and page reloads
         if ma_backtest_button:
 
             if backtest_util_list:
@@ -407,57 +399,37 @@ def load_multi_asset_settings_panel():
                     st.session_state.batch_number)
                 Path(log_dir).mkdir(parents=True, exist_ok=True)
 
-                backtester_map = run_backtesting_script(
-                    log_dir, ma_curve_df, training_df, gen_method, num_paths_slider,
-                    path_length_slider, initial_bankroll, backtest_util_list,
-                    tail_alpha_list, progress_bar=backtest_progress_bar)
-
-                return_dist_map = {}
-                marginal_dist_map = {}
-                path_plot_map = {}
-                pdf_and_pay_map = {}
-                performance_dict_list = []
-                performance_plot_list = []
-
-                progress_bar_count = 0
-                total_num_plot_tasks = calc_total_num_plot_tasks(backtester_map)
-                for backtest_id, backtester in backtester_map.items():
-
-                    (marginal_dist_dict, two_d_fig_map, path_figure_map,
-                     progress_bar_count) = plot_multi_asset_paths(
-                        backtester, path_length_slider, progress_bar_count)
-
-                    log_file_name = log_dir + 'ma_backtest_pool_{}'.format(backtest_id)
-                    (performance_dict, plot_dicts, pdf_payout_figs,
-                     progress_bar_count) = create_backtesting_plots(
-                        backtest_id, backtester, log_file_name, pdf_df, marginal_dist_dict,
-                        num_paths_slider, progress_bar_count, total_num_plot_tasks,
-                        plot_progress_bar=plot_progress_bar)
-
-                    return_dist_map[backtest_id] = two_d_fig_map
-                    marginal_dist_map[backtest_id] = marginal_dist_dict
-                    path_plot_map[backtest_id] = path_figure_map
-                    pdf_and_pay_map[backtest_id] = pdf_payout_figs
-                    performance_dict_list.append(performance_dict)
-                    performance_plot_list.append(plot_dicts)
-
-                plot_progress_bar.progress(1.0)
-
-                performace_df = pd.DataFrame(performance_dict_list)
-                performace_df.to_csv(log_dir + 'ma_backtest_performance.csv', index=False)
-
-                st.session_state.multi_asset_return_dists = return_dist_map
-                st.session_state.ma_backtester_map = backtester_map
-                st.session_state.marginal_dists = marginal_dist_map
-                st.session_state.ma_path_plot_map = path_plot_map
-                st.session_state.ma_pdf_and_payout_fig_map = pdf_and_pay_map
-                st.session_state.ma_performance_df = performace_df
-                st.session_state.ma_performance_plot_list = performance_plot_list
+                JobQueue().submit(run_pool_backtesting_job, {
+                    'log_dir': log_dir,
+                    'ma_curve_df': ma_curve_df,
+                    'training_df': training_df,
+                    'pdf_df': pdf_df,
+                    'gen_method': gen_method,
+                    'num_paths': num_paths_slider,
+                    'path_length': path_length_slider,
+                    'initial_bankroll': initial_bankroll,
+                    'backtest_util_list': backtest_util_list,
+                    'tail_alpha_list': tail_alpha_list,
+                    'seed': int(seed),
+                    'use_webgl': bool(use_webgl),
+                    'path_store_directory': './batch_results/batch_{}/{}/'.format(
+                        st.session_state.batch_number, PATH_STORE_DIRNAME)
+                }, name='Pool backtest of batch {}'.format(st.session_state.batch_number), tags={
+                    'tool': POOL_BACKTEST_JOB_TOOL,
+                    'batch': int(st.session_state.batch_number)
+                }, progress_args=['progress_bar', 'plot_progress_bar'],
+                   workers_arg='num_workers')
 
                 save_pool_backtester_preferences(
                     int(batch_number), str(gen_method), int(num_paths_slider),
                     int(path_length_slider), float(initial_bankroll))
 
+        # Show the progress of the jobs of the batch, and load the results of the finished jobs
+        load_job_panel({'tool': POOL_BACKTEST_JOB_TOOL,
+                        'batch': int(st.session_state.batch_number)},
+                       load_pool_backtest_job_results,
+                       'pb_{}'.format(st.session_state.batch_number))
+
         return batch_number
 
 
@@ -565,8 +537,9 @@ def load_pdf_payout_and_histogram_panel(backtest_id, curve_df, directory='./batc
                     fig_pdf_pay)
 
 
-def load_user_curve_plot_panel(col, fig_user_br, fig_user_cagr, fig_user_utils, fig_user_amts,
-                               curve_df, directory='./batch_results', save_file=True):
+def load_user_curve_plot_panel(col, fig_user_br, fig_user_cagr, fig_user_hist, fig_user_utils,
+                               fig_user_amts, curve_df, directory='./batch_results',
+                               save_file=True):
     """
     Displays the expandable panels to the user which contain the backtesting results
     for the user's ABCD curve. The panels are bankrolls, CAGRs, Util, and Amounts of contracts
@@ -580,6 +553,8 @@ def load_user_curve_plot_panel(col, fig_user_br, fig_user_cagr, fig_user_utils,
         The user bankroll plot
     fig_user_cagr : plotly.graph_object.Figure
         The user cagr plot
+    fig_user_hist : plotly.graph_object.Figure
+        The histograms of the user final bankroll and cagr
     fig_user_utils : List[plotly.graph_object.Figure]
         The user util plots
     fig_user_amts: List[plotly.graph_object.Figure]
@@ -607,6 +582,12 @@ def load_user_curve_plot_panel(col, fig_user_br, fig_user_cagr, fig_user_utils,
             if save_file:
                 save_plotly_fig_to_file(directory, 'user_cagr.svg', fig_user_cagr)
 
+        with st.expander('Show Final Bankroll and CAGR Histograms for User ABCD Curve',
+                         expanded=False):
+            st.plotly_chart(fig_user_hist, use_container_width=True)
+            if save_file:
+                save_plotly_fig_to_file(directory, 'user_final_histograms.svg', fig_user_hist)
+
         for index, row in curve_df.iterrows():
             fig_user_utils[row.Curve_ID].update_layout(
                 title_text='Util Used for Curve {}'.format(row.Curve_ID)
@@ -636,8 +617,9 @@ def load_user_curve_plot_panel(col, fig_user_br, fig_user_cagr, fig_user_utils,
                                             fig_user_amts[row.Curve_ID]['f'])
 
 
-def load_opt_curve_plot_panel(col, fig_opt_br, fig_opt_cagr, fig_opt_utils, fig_opt_amts,
-                              curve_df, directory='./batch_results', save_file=True):
+def load_opt_curve_plot_panel(col, fig_opt_br, fig_opt_cagr, fig_opt_hist, fig_opt_utils,
+                              fig_opt_amts, curve_df, directory='./batch_results',
+                              save_file=True):
     """
     Displays the four expandable panels to the user which contain the backtesting results
     for the calculated optimum curve. The panels are bankrolls, CAGRs, Util, and Amounts
@@ -651,6 +633,8 @@ def load_opt_curve_plot_panel(col, fig_opt_br, fig_opt_cagr, fig_opt_utils, fig_
         The optimal curve bankroll plot
     fig_opt_cagr : plotly.graph_object.Figure
         The optimal curve cagr plot
+    fig_opt_hist : plotly.graph_object.Figure
+        The histograms of the optimal curve final bankroll and cagr
     fig_opt_utils : List[plotly.graph_object.Figure]
         The optimal curve util plots
     fig_opt_amts : List[plotly.graph_object.Figure]
@@ -678,6 +662,13 @@ def load_opt_curve_plot_panel(col, fig_opt_br, fig_opt_cagr, fig_opt_utils, fig_
             if save_file:
                 save_plotly_fig_to_file(directory, 'minimum_curve_cagr.svg', fig_opt_cagr)
 
+        with st.expander('Show Final Bankroll and CAGR Histograms for Minimum Optimal Curve',
+                         expanded=False):
+            st.plotly_chart(fig_opt_hist, use_container_width=True)
+            if save_file:
+                save_plotly_fig_to_file(directory, 'minimum_curve_final_histograms.svg',
+                                        fig_opt_hist)
+
         for index, row in curve_df.iterrows():
             fig_opt_utils[row.Curve_ID].update_layout(
                 title_text='Util Used for Curve {}'.format(row.Curve_ID)
@@ -726,7 +717,7 @@ def load_multi_asset_results_panel(batch_number):
 
             st.subheader('Backtester Results')
 
-            for backtest_id, backtester in st.session_state.ma_backtester_map.items():
+            for backtest_id, curve_df in st.session_state.ma_curve_df_map.items():
 
                 if st.session_state.selected_indices is not None:
                     if backtest_id in st.session_state.selected_indices:
@@ -744,7 +735,7 @@ def load_multi_asset_results_panel(batch_number):
                             load_multi_asset_return_pdf_panel(
                                 backtest_id, res_dir, st.session_state.write_plots_to_file)
                             load_pdf_payout_and_histogram_panel(
-                                backtest_id, backtester.curve_df, res_dir,
+                                backtest_id, curve_df, res_dir,
                                 st.session_state.write_plots_to_file)
 
                             plot_list = st.session_state.ma_performance_plot_list[backtest_id]
@@ -757,12 +748,15 @@ def load_multi_asset_results_panel(batch_number):
                             opt_util_figs = plot_list[5]
                             user_amt_figs = plot_list[6]
                             opt_amt_figs = plot_list[7]
+                            user_hist_fig = plot_list[8]
+                            opt_hist_fig = plot_list[9]
 
                             col1, col2 = st.columns(2)
                             load_user_curve_plot_panel(
-                                col1, user_bankroll_fig, user_cagr_fig, user_util_figs,
-                                user_amt_figs, backtester.curve_df, res_dir,
+                                col1, user_bankroll_fig, user_cagr_fig, user_hist_fig,
+                                user_util_figs, user_amt_figs, curve_df, res_dir,
                                 st.session_state.write_plots_to_file)
                             load_opt_curve_plot_panel(
-                                col2, opt_bankroll_fig, opt_cagr_fig, opt_util_figs, opt_amt_figs,
-                                backtester.curve_df, res_dir, st.session_state.write_plots_to_file)
+                                col2, opt_bankroll_fig, opt_cagr_fig, opt_hist_fig, opt_util_figs,
+                                opt_amt_figs, curve_df, res_dir,
+                                st.session_state.write_plots_to_file)
@@ -9,11 +9,16 @@ import vaex
 from scipy.stats import multivariate_normal
 
 from itertools import combinations
-from potion.streamlitapp.backt.bt_utils import calculate_max_drawdown
 from potion.curve_gen.training.distributions.multivariate_students_t import MultiVarStudentT
+from potion.curve_gen.training.distributions.marginals import grid_marginal_pdf, marginal_pdf
 from potion.curve_gen.payoff.builder import PayoffConfigBuilder
 from potion.curve_gen.payoff.payoff import (configure_payoff, get_payoff_odds)
 from potion.backtest.multi_asset_backtester import PathGenMethod
+from potion.backtest.path_gen import Sampler
+from potion.backtest.convergence import percentile_standard_errors, sampler_groups
+from potion.streamlitapp.multibackt.ma_aggregate import (
+    FAN_PERCENTILES, DEFAULT_NUM_SAMPLE_PATHS, STRATEGIES, aggregate_metric, aggregate_strategy,
+    logged_rows, sample_path_ids)
 
 
 def calculate_marginal_pdf(deltas, axes, marginal_axis_index, probs):
@@ -38,50 +43,15 @@ def calculate_marginal_pdf(deltas, axes, marginal_axis_index, probs):
         plot(axes[marginal_axis_index], marginal_values) would plot the marginal PDF at
         each point along the axis
     """
-    # Calculate the area of one element in the N-dimensional grid
-    area_of_one_element = 1.0
-    for delta in deltas:
-        area_of_one_element *= delta
-
-    # Calculate the area of a row in the N-dimensional grid and the
-    # slices we need to calculate the marginal PDF
-    area_of_row = area_of_one_element
-    slice_list = []
-    axes_lens = []
-    for i, axis in enumerate(axes):
-
-        axes_lens.append(len(axis))
-        if i != marginal_axis_index:
-            area_of_row *= len(axis)
-            slice_list.append(slice(-1))
-        else:
-            # To be replaced in next loop
-            slice_list.append(0)
-
-    # Calculate the marginal PDF values
-    marginal_values = []
-    probs_reshaped = probs.reshape(tuple(axes_lens))
-    for j, value in enumerate(axes[marginal_axis_index]):
-
-        marginal_sum = 0.0
-
-        # Replace the index with the axis we are calculating the marginal distribution for
-        slice_list[marginal_axis_index] = j
+    return list(grid_marginal_pdf(deltas, axes, marginal_axis_index, probs))
 
-        # Create the multidimensional index slice from the list of slices
-        prob_index = tuple(s for s in slice_list)
 
-        # Sum to get the marginal probability and divide by the area of a 'row' to get the density
-        marginal_sum += np.sum(probs_reshaped[prob_index] * area_of_one_element)
-        marginal_values.append(marginal_sum / area_of_row)
-    return marginal_values
-
-
-def plot_multi_asset_paths(backtester, path_length, progress_bar_count, paths_to_plot=300):
+def plot_multi_asset_paths(backtester, path_length, progress_bar_count,
+                           paths_to_plot=DEFAULT_NUM_SAMPLE_PATHS, use_webgl=False):
     """
     Generates all of the output plots related to the multiple asset backtesting.
     These plots include the 2-D marginal return distributions and the simulated
-    path plots for each asset
+    path plots for each asset, which show the percentiles of the price over a sample of paths
 
     Parameters
     ----------
@@ -92,7 +62,9 @@ def plot_multi_asset_paths(backtester, path_length, progress_bar_count, paths_to
     progress_bar_count : int
         The current count for the progress bar
     paths_to_plot : int
-        The number of paths to include in the image
+        The number of representative paths to include in the image
+    use_webgl : bool
+        (Optional. Default: False) Whether to draw the representative paths with WebGL
 
     Returns
     -------
@@ -135,27 +107,13 @@ def plot_multi_asset_paths(backtester, path_length, progress_bar_count, paths_to
     delta = 0.001
     ax_limits = [-0.2, 0.2]
 
-    slice_list = []
-    axes_deltas = []
-    axes = []
-    for i in range(num_dimensions):
-        slice_list.append(slice(ax_limits[0], ax_limits[1], delta))
-        axes_deltas.append(delta)
-        axes.append(np.arange(ax_limits[0], ax_limits[1], delta))
-
-    mgrid_index = tuple(s for s in slice_list)
-
-    grid = np.mgrid[mgrid_index]
-
-    pos = grid.reshape((num_dimensions, -1)).T
-
-    probs = rv.pdf(pos)
-
+    # The marginals are calculated per axis, the N-dimensional grid grows
+    # exponentially with the number of assets
     marginal_dist_dict = {}
     for i in range(num_dimensions):
-        marginal_values = calculate_marginal_pdf(axes_deltas, axes, i, probs)
-        marginal_dist_dict[i] = axes[i]
-        marginal_dist_dict['m{}'.format(i)] = marginal_values
+        axis = np.arange(ax_limits[0], ax_limits[1], delta)
+        marginal_dist_dict[i] = axis
+        marginal_dist_dict['m{}'.format(i)] = list(marginal_pdf(rv, i, axis))
 
     # print('Asset combos:')
 
@@ -235,9 +193,6 @@ def plot_multi_asset_paths(backtester, path_length, progress_bar_count, paths_to
         fig.update_traces(showscale=False)
         two_d_fig_map[combo] = fig
 
-    # Number of days along the path for plotting
-    days = np.linspace(0, path_length - 1, path_length)
-
     # Loop over all the training data scenarios
     path_figure_map = {}
     marginal_distributions_by_curve = {}
@@ -262,33 +217,15 @@ def plot_multi_asset_paths(backtester, path_length, progress_bar_count, paths_to
             continue
 
         # Create a figure for each separate asset
-        fig = go.Figure()
-
-        # Plot each path
-        final_price = []
-        for i, path in enumerate(paths_for_asset):
-            if i < paths_to_plot:
-
-                fig.add_trace(go.Scatter(x=days, y=path,
-                                         mode='lines',
-                                         name='Price Path #{}'.format(i)))
-                final_price.append(path[-1])
-                progress_bar_count += 1
+        paths_for_asset = np.asarray(paths_for_asset, dtype=np.float64)
+        aggregate = aggregate_metric(
+            paths_for_asset, sample_path_ids(paths_for_asset[:, -1], paths_to_plot))
+        fig = create_path_fan_plot(aggregate, 'Price', 'Price', use_webgl)
+        fig.update_layout(title='{} Simulated Backtesting Paths'.format(asset))
+        progress_bar_count += 1
 
-        fig.update_layout(
-            title='{} Simulated Backtesting Paths'.format(asset),
-            plot_bgcolor='rgb(230,230,230)',
-            xaxis_title='Number of Days',
-            yaxis_title='Price',
-            showlegend=False
-        ).update_xaxes(showgrid=True).update_yaxes(showgrid=True)
-
-        median_price = np.median(final_price)
-        # sigma = np.std(final_price)
-        # low_bound = median_price - 3.0 * sigma
-        # up_bound = median_price + 3.0 * sigma
         low_bound = 0.0
-        up_bound = median_price * 3.0
+        up_bound = np.median(aggregate.final) * 3.0
 
         fig.update_yaxes(range=[low_bound, up_bound])
 
@@ -297,13 +234,124 @@ def plot_multi_asset_paths(backtester, path_length, progress_bar_count, paths_to
     return marginal_distributions_by_curve, two_d_fig_map, path_figure_map, progress_bar_count
 
 
+def _update_path_layout(fig, y_title):
+    """
+    Applies the layout shared by the plots of values along the paths
+
+    Parameters
+    ----------
+    fig : plotly.graph_object.Figure
+        The figure to update
+    y_title : str
+        The title of the Y axis
+
+    Returns
+    -------
+    fig : plotly.graph_object.Figure
+        The updated figure
+    """
+    return fig.update_layout(
+        plot_bgcolor='rgb(230,230,230)',
+        xaxis_title='Number of Days',
+        yaxis_title=y_title,
+        showlegend=False
+    ).update_xaxes(showgrid=True).update_yaxes(showgrid=True)
+
+
+def create_path_fan_plot(aggregate, y_title, path_name, use_webgl=False):
+    """
+    Creates the plot of a value along all of the paths from its aggregate. The plot shows the
+    percentile bands and the median of the value at each day, over the representative paths
+
+    Parameters
+    ----------
+    aggregate : MetricAggregate
+        The aggregate of the value, see potion.streamlitapp.multibackt.ma_aggregate
+    y_title : str
+        The title of the Y axis
+    path_name : str
+        The name of the value in the hover labels of the representative paths
+    use_webgl : bool
+        (Optional. Default: False) Whether to draw the representative paths with WebGL, which
+        keeps the browser responsive when many paths are sampled
+
+    Returns
+    -------
+    fig : plotly.graph_object.Figure
+        The plotly Figure of the value
+    """
+    fig = go.Figure()
+
+    days = aggregate.days
+    num_percentiles = len(FAN_PERCENTILES)
+
+    # The outer bands are drawn first so the inner bands are drawn over them
+    for i in range(num_percentiles // 2):
+        fig.add_trace(go.Scatter(x=days, y=aggregate.percentiles[i], mode='lines',
+                                 line=dict(width=0), hoverinfo='skip'))
+        fig.add_trace(go.Scatter(
+            x=days, y=aggregate.percentiles[num_percentiles - 1 - i], mode='lines',
+            line=dict(width=0), fill='tonexty', fillcolor='rgba(31,119,180,{})'.format(
+                0.2 * (i + 1)),
+            name='{}th-{}th Percentile'.format(FAN_PERCENTILES[i],
+                                               FAN_PERCENTILES[num_percentiles - 1 - i])))
+
+    scatter = go.Scattergl if use_webgl else go.Scatter
+    for path_id, values in zip(aggregate.sample_path_ids, aggregate.samples):
+        fig.add_trace(scatter(x=days, y=values, mode='lines', connectgaps=True,
+                              line=dict(width=1), opacity=0.6,
+                              name='{} Path #{}'.format(path_name, path_id)))
+
+    fig.add_trace(go.Scatter(x=days, y=aggregate.percentiles[num_percentiles // 2],
+                             mode='lines', line=dict(color='black', width=2), name='Median'))
+
+    return _update_path_layout(fig, y_title)
+
+
+def create_final_value_histograms(strategy_aggregate):
+    """
+    Creates the histograms of the final bankroll and the final CAGR of the paths of a backtest
+
+    Parameters
+    ----------
+    strategy_aggregate : StrategyAggregate
+        The aggregates of one curve strategy, see potion.streamlitapp.multibackt.ma_aggregate
+
+    Returns
+    -------
+    fig : plotly.graph_object.Figure
+        The plotly Figure with the two histograms side by side
+    """
+    fig = make_subplots(rows=1, cols=2, subplot_titles=('Final Bankroll', 'Final CAGR (%)'))
+
+    for col, aggregate in enumerate([strategy_aggregate.bankroll, strategy_aggregate.cagr], 1):
+        counts, edges = aggregate.histogram
+        fig.add_trace(go.Bar(x=(edges[:-1] + edges[1:]) / 2.0, y=counts, width=np.diff(edges)),
+                      row=1, col=col)
+
+    fig.update_layout(
+        plot_bgcolor='rgb(230,230,230)',
+        yaxis_title='Number of Paths',
+        bargap=0.0,
+        showlegend=False
+    ).update_xaxes(showgrid=True).update_yaxes(showgrid=True)
+
+    return fig
+
+
 def create_backtesting_performance_plots(results_df, backtest_id, num_paths, curve_ids,
-                                         num_paths_to_plot=300, plot_progress_bar=None,
-                                         progress_bar_count=None, total_num_plot_tasks=None):
+                                         num_paths_to_plot=DEFAULT_NUM_SAMPLE_PATHS,
+                                         plot_progress_bar=None, progress_bar_count=None,
+                                         total_num_plot_tasks=None,
+                                         sampler=Sampler.PSEUDO_RANDOM, use_webgl=False):
     """
     Generates the performance plots for multi asset backtesting from the backtesting results.
     This includes the bankroll, CAGR plots, amounts, and util plots for the curve tested
-    in the simulation
+    in the simulation, and the histograms of the final bankroll and CAGR. The plots are built
+    from the aggregates of the log, see potion.streamlitapp.multibackt.ma_aggregate, so their
+    size does not depend on the number of paths. The performance results include the standard
+    errors of the median and 5th percentile CAGRs as a convergence diagnostic of the number of
+    paths
 
     Parameters
     ----------
@@ -316,13 +364,18 @@ def create_backtesting_performance_plots(results_df, backtest_id, num_paths, cur
     curve_ids : List[int]
         The ID numbers for the curves being tested in the backtesting simulation
     num_paths_to_plot : int
-        The number of paths to include in the plots
+        The number of representative paths to include in the plots
     plot_progress_bar : streamlit.progress
         The progress bar on the streamlit UI which is updated as progress is made
     progress_bar_count : int
         The count tracking plot_progress_bar progress between calls of this function
     total_num_plot_tasks: int
         The total number of calls to this function which will be made by the main plotting function
+    sampler : Sampler
+        (Optional. Default: PSEUDO_RANDOM) The sampler which generated the paths, so the
+        standard errors resample antithetic pairs together
+    use_webgl : bool
+        (Optional. Default: False) Whether to draw the representative paths with WebGL
 
     Returns
     -------
@@ -344,138 +397,39 @@ def create_backtesting_performance_plots(results_df, backtest_id, num_paths, cur
         Dict containing amounts for each asset for the user
     opt_amt_figs : dict
         Dict containing amounts for each asset for minimum curve
+    user_hist_fig : plotly.graph_object.Figure
+        The plotly Figure containing the histograms of the user's final bankroll and CAGR
+    opt_hist_fig : plotly.graph_object.Figure
+        The plotly Figure containing the histograms of the minimum curve final bankroll and CAGR
     progress_bar_count : int
         An updated count for the progress bar
     """
-    user_bankroll_fig = go.Figure()
-    opt_bankroll_fig = go.Figure()
-    user_cagr_fig = go.Figure()
-    opt_cagr_fig = go.Figure()
+    logged = logged_rows(results_df, num_paths)
 
-    user_util_figs = {}
-    opt_util_figs = {}
-    user_amt_figs = {}
-    opt_amt_figs = {}
-
-    for curve_id in curve_ids:
-        user_util_fig = go.Figure()
-        opt_util_fig = go.Figure()
-        user_amt_fig = go.Figure()
-        opt_amt_fig = go.Figure()
-
-        start_user_amts = []
-        start_opt_amts = []
-        final_user_amts = []
-        final_opt_amts = []
-
-        user_util_figs[curve_id] = user_util_fig
-        opt_util_figs[curve_id] = opt_util_fig
-        user_amt_figs[curve_id] = {
-            'f': user_amt_fig,
-            's': start_user_amts,
-            'e': final_user_amts
-        }
-        opt_amt_figs[curve_id] = {
-            'f': opt_amt_fig,
-            's': start_opt_amts,
-            'e': final_opt_amts
-        }
-
-    start_user_cagrs = []
-    start_opt_cagrs = []
-    final_user_cagrs = []
-    final_opt_cagrs = []
-
-    user_max_dd_per_path = []
-    opt_max_dd_per_path = []
-
-    # rdff = results_df.filter(getattr(results_df, '{}_Training_Key'.format(curve_id)) == curve_id)
-    # rdff = rdff.filter(getattr(rdff, '{}_Exp_Duration'.format(curve_id)) == duration)
-    # rdff = rdff.filter(getattr(rdff, '{}_Strike_Pct'.format(curve_id)) == strike_pct)
-
-    for path_id in range(num_paths):
-
-        rdff = results_df.filter(results_df.Path_ID == path_id)
-
-        results = rdff.extract()
+    aggregates = {}
+    for strategy in STRATEGIES:
+        aggregates[strategy] = aggregate_strategy(results_df, strategy, curve_ids, num_paths,
+                                                  logged=logged,
+                                                  num_sample_paths=num_paths_to_plot)
 
         if plot_progress_bar is not None and progress_bar_count is not None and \
                 total_num_plot_tasks is not None:
 
-            val = progress_bar_count / float(total_num_plot_tasks)
-            plot_progress_bar.progress(val)
-            # Add the number of plots created for this path
+            # Add the number of columns aggregated for this strategy
             progress_bar_count += 2 + 2 * len(curve_ids)
+            plot_progress_bar.progress(min(progress_bar_count / float(total_num_plot_tasks), 1.0))
+
+    user = aggregates['User']
+    opt = aggregates['Opt']
 
-        days = np.unique(results['Timestamp'].to_numpy())
-
-        user_bankroll = results['User_Bankroll'].to_numpy()
-        user_bankroll = user_bankroll[user_bankroll != 0]
-
-        opt_bankroll = results['Opt_Bankroll'].to_numpy()
-        opt_bankroll = opt_bankroll[opt_bankroll != 0]
-
-        user_cagr = results['User_CAGR'].to_numpy()
-        user_cagr = user_cagr[user_cagr != 0]
-        user_cagr = user_cagr[user_cagr != np.inf]
-
-        opt_cagr = results['Opt_CAGR'].to_numpy()
-        opt_cagr = opt_cagr[opt_cagr != 0]
-        opt_cagr = opt_cagr[opt_cagr != np.inf]
-
-        start_user_cagrs.append(user_cagr[0])
-        start_opt_cagrs.append(opt_cagr[0])
-        final_user_cagrs.append(user_cagr[-1])
-        final_opt_cagrs.append(opt_cagr[-1])
-
-        user_maxdd = calculate_max_drawdown(user_bankroll)
-        opt_maxdd = calculate_max_drawdown(opt_bankroll)
-
-        user_max_dd_per_path.append(user_maxdd)
-        opt_max_dd_per_path.append(opt_maxdd)
-
-        if path_id < num_paths_to_plot:
-            user_bankroll_fig.add_trace(go.Scatter(x=days, y=user_bankroll, mode='lines',
-                                                   name='Bankroll Path #{}'.format(path_id)))
-            opt_bankroll_fig.add_trace(go.Scatter(x=days, y=opt_bankroll, mode='lines',
-                                                  name='Bankroll Path #{}'.format(path_id)))
-            user_cagr_fig.add_trace(go.Scatter(x=days[1:], y=user_cagr[1:], mode='lines',
-                                               name='CAGR Path #{}'.format(path_id)))
-            opt_cagr_fig.add_trace(go.Scatter(x=days[1:], y=opt_cagr[1:], mode='lines',
-                                              name='CAGR Path #{}'.format(path_id)))
-
-        for curve_id in curve_ids:
-            user_util = results['{}_User_Util'.format(curve_id)].to_numpy()[1:]
-            opt_util = results['{}_Opt_Util'.format(curve_id)].to_numpy()[1:]
-            user_util = user_util[user_util != 0]
-            opt_util = opt_util[opt_util != 0]
-
-            user_amts = results['{}_User_Amount'.format(curve_id)].to_numpy()[1:]
-            opt_amts = results['{}_Opt_Amount'.format(curve_id)].to_numpy()[1:]
-            user_amts = user_amts[user_amts != 0]
-            opt_amts = opt_amts[opt_amts != 0]
-
-            user_amt_figs[curve_id]['s'].append(user_amts[0])
-            opt_amt_figs[curve_id]['s'].append(opt_amts[0])
-            user_amt_figs[curve_id]['e'].append(user_amts[-1])
-            opt_amt_figs[curve_id]['e'].append(opt_amts[-1])
-
-            if path_id < num_paths_to_plot:
-                user_util_figs[curve_id].add_trace(go.Scatter(
-                    x=days[1:], y=user_util, mode='lines', name='Util Path #{}'.format(path_id)))
-                opt_util_figs[curve_id].add_trace(go.Scatter(
-                    x=days[1:], y=opt_util, mode='lines', name='Util Path #{}'.format(path_id)))
-                user_amt_figs[curve_id]['f'].add_trace(go.Scatter(
-                    x=days[1:], y=user_amts, mode='lines', name='Amount Path #{}'.format(path_id)))
-                opt_amt_figs[curve_id]['f'].add_trace(go.Scatter(
-                    x=days[1:], y=opt_amts, mode='lines', name='Amount Path #{}'.format(path_id)))
-
-    # start_user_cagr_arr = np.asarray(start_user_cagrs)
-    # start_opt_cagr_arr = np.asarray(start_opt_cagrs)
-    user_cagr_arr = np.asarray(final_user_cagrs)
-    opt_cagr_arr = np.asarray(final_opt_cagrs)
-    user_maxdd_arr = np.asarray(user_max_dd_per_path)
-    opt_maxdd_arr = np.asarray(opt_max_dd_per_path)
+    user_cagr_arr = user.cagr.final
+    opt_cagr_arr = opt.cagr.final
+    user_maxdd_arr = user.max_drawdowns
+    opt_maxdd_arr = opt.max_drawdowns
+
+    groups = sampler_groups(len(user_cagr_arr), sampler)
+    user_cagr_errors = percentile_standard_errors(user_cagr_arr, groups=groups)
+    opt_cagr_errors = percentile_standard_errors(opt_cagr_arr, groups=groups)
 
     performance_dict = {
         'backtest_id': backtest_id,
@@ -498,94 +452,60 @@ def create_backtesting_performance_plots(results_df, backtest_id, num_paths, cur
         'p25_opt_maxDD': np.percentile(opt_maxdd_arr, 25),
         'p50_opt_maxDD': np.percentile(opt_maxdd_arr, 50),
         'p75_opt_maxDD': np.percentile(opt_maxdd_arr, 75),
-        'p100_opt_maxDD': np.percentile(opt_maxdd_arr, 100)
+        'p100_opt_maxDD': np.percentile(opt_maxdd_arr, 100),
+        'p05_user_cagr': user_cagr_errors[5][0],
+        'p05_opt_cagr': opt_cagr_errors[5][0],
+        'se_p50_user_cagr': user_cagr_errors[50][1],
+        'se_p05_user_cagr': user_cagr_errors[5][1],
+        'se_p50_opt_cagr': opt_cagr_errors[50][1],
+        'se_p05_opt_cagr': opt_cagr_errors[5][1]
     }
 
-    user_bankroll_fig.update_layout(
-        plot_bgcolor='rgb(230,230,230)',
-        xaxis_title='Number of Days',
-        yaxis_title='Bankroll Amount',
-        showlegend=False
-    ).update_xaxes(showgrid=True).update_yaxes(showgrid=True)
-
-    opt_bankroll_fig.update_layout(
-        plot_bgcolor='rgb(230,230,230)',
-        xaxis_title='Number of Days',
-        yaxis_title='Bankroll Amount',
-        showlegend=False
-    ).update_xaxes(showgrid=True).update_yaxes(showgrid=True)
-
-    user_cagr_fig.update_layout(
-        plot_bgcolor='rgb(230,230,230)',
-        xaxis_title='Number of Days',
-        yaxis_title='CAGR (%)',
-        showlegend=False
-    ).update_xaxes(showgrid=True).update_yaxes(showgrid=True)
-
-    opt_cagr_fig.update_layout(
-        plot_bgcolor='rgb(230,230,230)',
-        xaxis_title='Number of Days',
-        yaxis_title='CAGR (%)',
-        showlegend=False
-    ).update_xaxes(showgrid=True).update_yaxes(showgrid=True)
+    user_bankroll_fig = create_path_fan_plot(user.bankroll, 'Bankroll Amount', 'Bankroll',
+                                             use_webgl)
+    opt_bankroll_fig = create_path_fan_plot(opt.bankroll, 'Bankroll Amount', 'Bankroll',
+                                            use_webgl)
+    user_cagr_fig = create_path_fan_plot(user.cagr, 'CAGR (%)', 'CAGR', use_webgl)
+    opt_cagr_fig = create_path_fan_plot(opt.cagr, 'CAGR (%)', 'CAGR', use_webgl)
 
-    # median_start_user_cagrs = np.median(start_user_cagr_arr)
-    # median_start_opt_cagrs = np.median(start_opt_cagr_arr)
-    median_final_user_cagrs = np.median(user_cagr_arr)
-    median_final_opt_cagrs = np.median(opt_cagr_arr)
-    # user_up_bound = np.max([median_final_user_cagrs * 3.0, median_start_user_cagrs * 3.0])
-    # opt_up_bound = np.max([median_final_opt_cagrs * 3.0, median_start_opt_cagrs * 3.0])
-    user_up_bound = median_final_user_cagrs * 3.0
-    opt_up_bound = median_final_opt_cagrs * 3.0
+    user_up_bound = np.median(user_cagr_arr) * 3.0
+    opt_up_bound = np.median(opt_cagr_arr) * 3.0
 
     user_cagr_fig.update_yaxes(range=[-100.0, user_up_bound])
     opt_cagr_fig.update_yaxes(range=[-100.0, opt_up_bound])
 
+    user_util_figs = {}
+    opt_util_figs = {}
+    user_amt_figs = {}
+    opt_amt_figs = {}
+
     for curve_id in curve_ids:
+        user_util_figs[curve_id] = create_path_fan_plot(
+            user.utils[curve_id], 'Util Used', 'Util', use_webgl)
+        opt_util_figs[curve_id] = create_path_fan_plot(
+            opt.utils[curve_id], 'Util Used', 'Util', use_webgl)
+
+        for amt_figs, strategy_aggregate in [(user_amt_figs, user), (opt_amt_figs, opt)]:
+            amounts = strategy_aggregate.amounts[curve_id]
+            amt_fig = create_path_fan_plot(amounts, 'Amount of Contracts Traded', 'Amount',
+                                           use_webgl)
 
-        user_util_figs[curve_id].update_layout(
-            plot_bgcolor='rgb(230,230,230)',
-            xaxis_title='Number of Days',
-            yaxis_title='Util Used',
-            showlegend=False
-        ).update_xaxes(showgrid=True).update_yaxes(showgrid=True)
-
-        opt_util_figs[curve_id].update_layout(
-            plot_bgcolor='rgb(230,230,230)',
-            xaxis_title='Number of Days',
-            yaxis_title='Util Used',
-            showlegend=False
-        ).update_xaxes(showgrid=True).update_yaxes(showgrid=True)
-
-        user_amt_figs[curve_id]['f'].update_layout(
-            plot_bgcolor='rgb(230,230,230)',
-            xaxis_title='Number of Days',
-            yaxis_title='Amount of Contracts Traded',
-            showlegend=False
-        ).update_xaxes(showgrid=True).update_yaxes(showgrid=True)
-
-        opt_amt_figs[curve_id]['f'].update_layout(
-            plot_bgcolor='rgb(230,230,230)',
-            xaxis_title='Number of Days',
-            yaxis_title='Amount of Contracts Traded',
-            showlegend=False
-        ).update_xaxes(showgrid=True).update_yaxes(showgrid=True)
-
-        median_start_user_amts = np.median(user_amt_figs[curve_id]['s'])
-        median_start_opt_amts = np.median(opt_amt_figs[curve_id]['s'])
-        median_final_user_amts = np.median(user_amt_figs[curve_id]['e'])
-        median_final_opt_amts = np.median(opt_amt_figs[curve_id]['e'])
-        user_low_bound = 0.0
-        user_up_bound = np.max([median_final_user_amts * 3.0, median_start_user_amts * 3.0])
-        opt_low_bound = 0.0
-        opt_up_bound = np.max([median_final_opt_amts * 3.0, median_start_opt_amts * 3.0])
-
-        user_amt_figs[curve_id]['f'].update_yaxes(range=[user_low_bound, user_up_bound])
-        opt_amt_figs[curve_id]['f'].update_yaxes(range=[opt_low_bound, opt_up_bound])
+            up_bound = np.max([np.nanmedian(amounts.final) * 3.0,
+                               np.nanmedian(amounts.initial) * 3.0])
+            amt_fig.update_yaxes(range=[0.0, up_bound])
+
+            amt_figs[curve_id] = {
+                'f': amt_fig,
+                's': amounts.initial,
+                'e': amounts.final
+            }
+
+    user_hist_fig = create_final_value_histograms(user)
+    opt_hist_fig = create_final_value_histograms(opt)
 
     return (performance_dict, user_bankroll_fig, opt_bankroll_fig, user_cagr_fig,
             opt_cagr_fig, user_util_figs, opt_util_figs, user_amt_figs, opt_amt_figs,
-            progress_bar_count)
+            user_hist_fig, opt_hist_fig, progress_bar_count)
 
 
 def create_pdf_and_payout_plots(results_df, curve_id, strike_pct, duration,
@@ -611,7 +531,7 @@ def create_pdf_and_payout_plots(results_df, curve_id, strike_pct, duration,
         The array of bet fractions containing sample points on the x axis of the curve
     curve_points : numpy.ndarray
         The array containing the curve values (y axis) at the sample points bet_fractions
-    pdf_df : pandas.DataFrame
+    pdf_df : Union[pandas.DataFrame, PdfStore]
         Dataframe containing the distributions which were used to generate the curves in
         the curve generator
     current_price : float
@@ -711,7 +631,7 @@ def create_pdf_and_payout_plots(results_df, curve_id, strike_pct, duration,
 
 def create_backtesting_plots(backtester_id, backtester, log_file_name, pdf_df, marginal_dist_list,
                              num_paths, progress_bar_count, total_num_plot_tasks,
-                             plot_progress_bar=None):
+                             plot_progress_bar=None, use_webgl=False):
     """
     Opens the backtesting log file and iterates over all of the backtesting scenarios which
     were simulated, and generates plots for each to be displayed on the UI
@@ -736,6 +656,8 @@ def create_backtesting_plots(backtester_id, backtester, log_file_name, pdf_df, m
         The total number of plots to create
     plot_progress_bar : streamlit.progress
         A progress bar to update the UI on plot generation status
+    use_webgl : bool
+        (Optional. Default: False) Whether to draw the representative paths with WebGL
 
     Returns
     -------
@@ -755,7 +677,6 @@ def create_backtesting_plots(backtester_id, backtester, log_file_name, pdf_df, m
     # print('Opening: {}'.format(log_file_name + '.hdf5'))
 
     num_hist_bins = 200
-    num_paths_to_plot = 300
 
     # Loop over all the contracts
     pdf_payout_figs = {}
@@ -780,13 +701,14 @@ def create_backtesting_plots(backtester_id, backtester, log_file_name, pdf_df, m
 
     (performance_dict, user_bankroll_fig, opt_bankroll_fig, user_cagr_fig,
      opt_cagr_fig, user_util_figs, opt_util_figs, user_amt_figs, opt_amt_figs,
-     progress_bar_count) = create_backtesting_performance_plots(
-        df, backtester_id, num_paths, curve_ids, num_paths_to_plot,
-        plot_progress_bar, progress_bar_count, total_num_plot_tasks)
+     user_hist_fig, opt_hist_fig, progress_bar_count) = create_backtesting_performance_plots(
+        df, backtester_id, num_paths, curve_ids, DEFAULT_NUM_SAMPLE_PATHS,
+        plot_progress_bar, progress_bar_count, total_num_plot_tasks, backtester.sampler,
+        use_webgl)
 
     plot_dicts = [
         user_bankroll_fig, opt_bankroll_fig, user_cagr_fig, opt_cagr_fig, user_util_figs,
-        opt_util_figs, user_amt_figs, opt_amt_figs
+        opt_util_figs, user_amt_figs, opt_amt_figs, user_hist_fig, opt_hist_fig
     ]
 
     return performance_dict, plot_dicts, pdf_payout_figs, progress_bar_count
@@ -814,16 +736,15 @@ def calc_total_num_plot_tasks(backtester_map):
 
         num_curves = len(backtester.curve_df)
         num_assets = len(asset_list)
-        num_paths = backtester.num_paths
         num_2d_return_pdfs = len(list(combinations(asset_list, 2)))
 
+        # The performance plots aggregate one column of the log per plot and curve strategy
         num_backtester_tasks = (num_2d_return_pdfs +  # the 2d return distributions
                                 num_curves +  # the PDF and payout plots
-                                num_assets * num_paths +  # the backtester paths
-                                num_paths +  # the bankroll plot
-                                num_paths +  # the cagr plot
-                                num_curves * num_paths +  # the util plots
-                                num_curves * num_paths)  # the amount plots
+                                num_assets +  # the backtester paths
+                                len(STRATEGIES) * (2 +  # the bankroll and cagr plots
+                                                   num_curves +  # the util plots
+                                                   num_curves))  # the amount plots
         total_tasks += num_backtester_tasks
 
     return total_tasks
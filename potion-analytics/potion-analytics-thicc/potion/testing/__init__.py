@@ -0,0 +1,4 @@
+"""
+A module containing deterministic synthetic inputs shared by the unit tests and the benchmark
+suite
+"""
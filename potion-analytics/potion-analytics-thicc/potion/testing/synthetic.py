@@ -0,0 +1,175 @@
+"""
+This module creates deterministic synthetic inputs for the unit tests and the benchmarks, so that
+results and timings do not depend on the price history files available on the machine running
+them.
+
+The synthetic price histories use the same layout as resources/webapp-coins.csv (a 'Master
+calendar' column of dd/mm/yyyy dates followed by one column of prices per asset), and the
+curve generator input files use the layout of the inputs/Example*.csv files. Every value is
+generated from a seeded random number generator, so the same arguments always produce
+identical files.
+"""
+import datetime
+import os
+
+import numpy as np
+import pandas as pd
+from scipy.stats import t
+
+from potion.curve_gen.training.train import COL_KEY_PRICE_HIST_DATES
+
+DATE_FORMAT = '%d/%m/%Y'
+DEFAULT_SEED = 1234
+DEFAULT_START_DATE = datetime.date(2015, 8, 8)
+DEFAULT_END_DATE = datetime.date(2021, 12, 31)
+INPUTS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'inputs'))
+"""The directory containing the example input CSV files"""
+
+
+def synthetic_price_history(assets, start_date=DEFAULT_START_DATE, end_date=DEFAULT_END_DATE,
+                            seed=DEFAULT_SEED, df=3.0, daily_vol=0.04, drift=0.0005,
+                            initial_price=100.0):
+    """
+    Creates a deterministic price history with heavy tailed daily log returns for each asset
+
+    Parameters
+    ----------
+    assets : List[str]
+        The names of the assets, used as the column names
+    start_date : datetime.date
+        (Optional. Default: 08/08/2015) The first date of the history
+    end_date : datetime.date
+        (Optional. Default: 31/12/2021) The last date of the history
+    seed : int
+        (Optional. Default: 1234) The seed of the random number generator
+    df : float
+        (Optional. Default: 3.0) The degrees of freedom of the Student's t log returns
+    daily_vol : float
+        (Optional. Default: 0.04) The standard deviation of the daily log returns
+    drift : float
+        (Optional. Default: 0.0005) The mean of the daily log returns
+    initial_price : float
+        (Optional. Default: 100.0) The price of each asset on the first date
+
+    Returns
+    -------
+    history_df : pandas.DataFrame
+        The DataFrame with the Master calendar column and one column of prices per asset
+    """
+    rng = np.random.default_rng(seed)
+    num_days = (end_date - start_date).days + 1
+    dates = [(start_date + datetime.timedelta(days=day)).strftime(DATE_FORMAT)
+             for day in range(num_days)]
+
+    # Scale the t samples so the returns have the requested standard deviation
+    scale = daily_vol * np.sqrt((df - 2.0) / df)
+    columns = {COL_KEY_PRICE_HIST_DATES: dates}
+    for asset in assets:
+        log_returns = drift + scale * t.rvs(df, size=num_days - 1, random_state=rng)
+        log_prices = np.log(initial_price) + np.concatenate(([0.0], np.cumsum(log_returns)))
+        columns[asset] = np.exp(log_prices)
+
+    return pd.DataFrame(columns)
+
+
+def read_example_input(name: str):
+    """
+    Reads one of the example curve generator input files from the inputs directory
+
+    Parameters
+    ----------
+    name : str
+        The file name, e.g. 'ExampleCurveGenInputMulti.csv'
+
+    Returns
+    -------
+    input_df : pandas.DataFrame
+        The DataFrame containing the Kelly curves to generate
+    """
+    return pd.read_csv(os.path.join(INPUTS_DIR, name))
+
+
+def synthetic_curve_gen_input(template_df: pd.DataFrame, num_assets=None, strikes=None,
+                              expirations=None):
+    """
+    Scales an example input file up or down by replacing its assets, strikes and expirations.
+    The training windows and labels of the template are kept.
+
+    Parameters
+    ----------
+    template_df : pandas.DataFrame
+        The example input DataFrame used as the template
+    num_assets : int
+        (Optional. Default: None) The number of assets. Assets beyond the ones in the template
+        are named 'synthetic-<n>' and reuse the first row of the template. None keeps the
+        assets of the template
+    strikes : List[float]
+        (Optional. Default: None) The strike percentages for each asset. None keeps the strikes
+        of the template
+    expirations : List[int]
+        (Optional. Default: None) The expirations in days for each asset. None keeps the
+        expirations of the template
+
+    Returns
+    -------
+    input_df : pandas.DataFrame
+        The DataFrame containing the Kelly curves to generate
+    """
+    template_assets = list(dict.fromkeys(template_df['Asset']))
+    if num_assets is None:
+        assets = template_assets
+    else:
+        assets = (template_assets + ['synthetic-{}'.format(i) for i in range(num_assets)])[
+                 :num_assets]
+
+    rows = []
+    for asset in assets:
+        asset_df = template_df[template_df['Asset'] == asset]
+        first_row = (asset_df if len(asset_df) else template_df).iloc[0]
+
+        asset_strikes = strikes if strikes is not None else list(
+            dict.fromkeys(asset_df['StrikePct'])) or [first_row.StrikePct]
+        asset_exps = expirations if expirations is not None else list(
+            dict.fromkeys(asset_df['Expiration'])) or [first_row.Expiration]
+
+        rows.extend([{
+            'Asset': asset,
+            'TrainingLabel': first_row.TrainingLabel,
+            'TrainingStart': first_row.TrainingStart,
+            'TrainingEnd': first_row.TrainingEnd,
+            'StrikePct': strike,
+            'Expiration': exp,
+            'CurrentPrice': first_row.CurrentPrice
+        } for exp in asset_exps for strike in asset_strikes])
+
+    return pd.DataFrame(rows)
+
+
+def write_synthetic_inputs(directory: str, input_df: pd.DataFrame, seed=DEFAULT_SEED):
+    """
+    Writes a curve generator input file and a matching synthetic price history file
+
+    Parameters
+    ----------
+    directory : str
+        The directory the files are written to
+    input_df : pandas.DataFrame
+        The DataFrame containing the Kelly curves to generate
+    seed : int
+        (Optional. Default: 1234) The seed of the random number generator
+
+    Returns
+    -------
+    input_file : str
+        The name of the curve generator input file
+    history_file : str
+        The name of the price history file
+    """
+    input_file = os.path.join(directory, 'input.csv')
+    history_file = os.path.join(directory, 'history.csv')
+
+    input_df.to_csv(input_file, index=False)
+    synthetic_price_history(list(dict.fromkeys(input_df['Asset'])), seed=seed).to_csv(
+        history_file, index=False)
+
+    return input_file, history_file
@@ -251,6 +251,11 @@ The output log file is a binary log file stored as a .hdf5 using the Vaex librar
 can be easily converted to a CSV file for convenient importing into other programs by using
 the Log Widget [here](http://localhost:8080/potion/user_guides/log_archive_user_guide.html).
 
+Next to each log file, a .checkpoint.json file records which paths of the backtest were
+simulated, and a .rng.json file records the seed of the paths. If a backtest is interrupted,
+e.g. by a restart of the computer, tick 'Resume an interrupted backtest' and run it again with
+the same settings and seed to only simulate the remaining paths.
+
 The format of the output log file is as follows:
 
 ![output](http://localhost:8000/resources/user_guides/backtester/output.png)
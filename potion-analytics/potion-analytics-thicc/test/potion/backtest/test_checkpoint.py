@@ -0,0 +1,201 @@
+import json
+import os
+import signal
+import tempfile
+import unittest
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+import vaex
+
+from potion.backtest import batch_backtester as batch_backtester_module
+from potion.backtest.batch_backtester import BatchBacktester, create_backtester_config
+from potion.backtest.checkpoint import (EvaluationCheckpoint, evaluation_chunks,
+                                        CHECKPOINT_SUFFIX)
+
+NUM_PATHS = 10
+CHUNK_SIZE = 4
+
+
+class _InterruptingProgressBar:
+    """
+    Progress bar which stops the backtest once it reaches a fraction of the tasks, like a
+    process killed part of the way through
+    """
+
+    def __init__(self, stop_at):
+        self.stop_at = stop_at
+
+    def progress(self, value):
+        if value >= self.stop_at:
+            raise KeyboardInterrupt
+
+
+# The marker files of _killing_eval_work, set before the worker processes are forked
+_kill_marker = None
+_kill_always = False
+_eval_work = batch_backtester_module._eval_work
+
+
+def _killing_eval_work(*args):
+    # Kills its worker process, like the OS does when it runs out of memory. Only the first task
+    # is killed unless _kill_always is set
+    if _kill_always or not os.path.exists(_kill_marker):
+        open(_kill_marker, 'w').close()
+        os.kill(os.getpid(), signal.SIGKILL)
+    return _eval_work(*args)
+
+
+def _backtester(seed=3):
+    training_df = pd.DataFrame([{
+        'Ticker': ticker, 'Label': 'full', 'CurrentPrice': price, 'StartDate': '2021-01-01',
+        'EndDate': '2021-06-01', 'TrainingPrices': list(price * np.exp(
+            np.cumsum(np.random.RandomState(i).normal(0.0, 0.03, 200))))
+    } for i, (ticker, price) in enumerate([('BTC', 40000.0), ('ETH', 3000.0)])])
+
+    curve_df = pd.DataFrame([{
+        'Ticker': ticker, 'Label': 'full', 'Expiration': expiration, 'StrikePercent': 0.9,
+        'A': 0.1, 'B': 1.0, 'C': 0.5, 'D': 0.0, 'bet_fractions': np.array([0.0, 0.1]),
+        'curve_points': np.array([0.0, 0.01]), 't_params': [0.0, 0.03, 0.1, 3.0]
+    } for ticker in ['BTC', 'ETH'] for expiration in [2, 5]])
+
+    config = create_backtester_config(NUM_PATHS, 12, 0.1, 1000.0, seed=seed)
+    backtester = BatchBacktester(config=config, curve_df=curve_df, training_df=training_df)
+    backtester.generate_backtesting_paths()
+    return backtester
+
+
+def _read_log(log_file_name):
+    df = vaex.open(log_file_name + '.hdf5')
+    values = {column: df[column].to_numpy().copy() for column in df.get_column_names()}
+    df.close()
+    return values
+
+
+class CheckpointTestCase(unittest.TestCase):
+
+    def test_evaluation_chunks(self):
+        chunks = evaluation_chunks(['BTC-full', 'ETH-full'], [2, 5], [0.9], NUM_PATHS,
+                                   CHUNK_SIZE)
+
+        self.assertEqual(12, len(chunks))
+        self.assertEqual(list(range(12)), [chunk.chunk_id for chunk in chunks])
+        self.assertEqual(range(8, 10), chunks[5].paths)
+        self.assertEqual(('ETH-full', 1, 2), (chunks[6].key, chunks[6].key_index,
+                                              chunks[6].duration))
+
+        # The tasks of the chunks cover every task once, in order
+        task_ids = [task_id for chunk in chunks for task_id in chunk.task_ids()]
+        self.assertEqual(list(range(2 * 2 * NUM_PATHS)), task_ids)
+
+    def test_checkpoint(self):
+        with tempfile.TemporaryDirectory() as directory:
+            log_file_name = os.path.join(directory, 'backtest')
+
+            checkpoint = EvaluationCheckpoint(log_file_name, {'seed': 1, 'keys': ['BTC']})
+            self.assertFalse(checkpoint.resume())
+            checkpoint.start()
+            checkpoint.mark_complete(3)
+            checkpoint.mark_complete(1)
+
+            resumed = EvaluationCheckpoint(log_file_name, {'seed': 1, 'keys': ['BTC']})
+            self.assertTrue(resumed.resume())
+            self.assertTrue(resumed.is_complete(1))
+            self.assertFalse(resumed.is_complete(2))
+
+            with open(log_file_name + CHECKPOINT_SUFFIX) as f:
+                self.assertEqual([1, 3], json.load(f)['completed'])
+
+            # A different backtest starts over
+            self.assertFalse(EvaluationCheckpoint(log_file_name, {'seed': 2, 'keys': ['BTC']})
+                             .resume())
+
+    def test_resume(self):
+        with tempfile.TemporaryDirectory() as directory:
+            full_log = os.path.join(directory, 'full')
+            _backtester().evaluate_backtest_sequentially(full_log, chunk_size=CHUNK_SIZE)
+
+            resumed_log = os.path.join(directory, 'resumed')
+            with self.assertRaises(KeyboardInterrupt):
+                _backtester().evaluate_backtest_sequentially(
+                    resumed_log, progress_bar=_InterruptingProgressBar(0.6),
+                    chunk_size=CHUNK_SIZE)
+
+            # The chunks before the interrupted task are complete
+            with open(resumed_log + CHECKPOINT_SUFFIX) as f:
+                self.assertEqual(list(range(7)), json.load(f)['completed'])
+
+            # Resuming only evaluates the missing chunks, and gives the same log
+            _backtester().evaluate_backtest_sequentially(
+                resumed_log, progress_bar=_InterruptingProgressBar(1.1), resume=True,
+                chunk_size=CHUNK_SIZE)
+
+            full = _read_log(full_log)
+            resumed = _read_log(resumed_log)
+            for column, values in full.items():
+                np.testing.assert_array_equal(values, resumed[column], err_msg=column)
+
+            with open(resumed_log + CHECKPOINT_SUFFIX) as f:
+                self.assertEqual(list(range(12)), json.load(f)['completed'])
+
+            # Without the same seed the paths differ, so the backtest starts over
+            with self.assertRaises(KeyboardInterrupt):
+                _backtester(seed=4).evaluate_backtest_sequentially(
+                    resumed_log, progress_bar=_InterruptingProgressBar(0.0), resume=True,
+                    chunk_size=CHUNK_SIZE)
+            with open(resumed_log + CHECKPOINT_SUFFIX) as f:
+                self.assertEqual([], json.load(f)['completed'])
+
+    def test_parallel(self):
+        with tempfile.TemporaryDirectory() as directory:
+            sequential_log = os.path.join(directory, 'sequential')
+            _backtester().evaluate_backtest_sequentially(sequential_log, chunk_size=CHUNK_SIZE)
+
+            parallel_log = os.path.join(directory, 'parallel')
+            _backtester().evaluate_backtest_parallel(parallel_log, chunk_size=CHUNK_SIZE)
+
+            sequential = _read_log(sequential_log)
+            parallel = _read_log(parallel_log)
+            for column, values in sequential.items():
+                np.testing.assert_array_equal(values, parallel[column], err_msg=column)
+
+            with open(parallel_log + CHECKPOINT_SUFFIX) as f:
+                self.assertEqual(list(range(12)), json.load(f)['completed'])
+
+    def test_parallel_dead_worker(self):
+        global _kill_marker, _kill_always
+
+        with tempfile.TemporaryDirectory() as directory:
+            sequential_log = os.path.join(directory, 'sequential')
+            _backtester().evaluate_backtest_sequentially(sequential_log, chunk_size=CHUNK_SIZE)
+
+            _kill_marker = os.path.join(directory, 'killed')
+            parallel_log = os.path.join(directory, 'parallel')
+            try:
+                batch_backtester_module._eval_work = _killing_eval_work
+
+                # The tasks of the dead worker are launched again in a new pool
+                _backtester().evaluate_backtest_parallel(parallel_log, chunk_size=CHUNK_SIZE)
+                self.assertTrue(os.path.exists(_kill_marker))
+
+                sequential = _read_log(sequential_log)
+                parallel = _read_log(parallel_log)
+                for column, values in sequential.items():
+                    np.testing.assert_array_equal(values, parallel[column], err_msg=column)
+
+                # A task which always kills its worker stops the backtest
+                _kill_always = True
+                with self.assertRaises(BrokenProcessPool):
+                    _backtester().evaluate_backtest_parallel(
+                        os.path.join(directory, 'broken'), chunk_size=CHUNK_SIZE, max_retries=1)
+            finally:
+                batch_backtester_module._eval_work = _eval_work
+                _kill_always = False
+
+            with open(parallel_log + CHECKPOINT_SUFFIX) as f:
+                self.assertEqual(list(range(12)), json.load(f)['completed'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+import numpy as np
+from scipy.stats import norm
+
+from potion.backtest.convergence import percentile_standard_errors, sampler_groups
+from potion.backtest.path_gen import Sampler
+
+
+class ConvergenceTestCase(unittest.TestCase):
+
+    def test_sampler_groups(self):
+        np.testing.assert_array_equal([0, 1, 2, 0, 1], sampler_groups(5, Sampler.ANTITHETIC))
+        np.testing.assert_array_equal(np.arange(4), sampler_groups(4, Sampler.SOBOL))
+
+    def test_percentile_standard_errors(self):
+        values = np.random.RandomState(2).normal(size=4000)
+
+        estimates = percentile_standard_errors(values, percentiles=(50, 5))
+
+        self.assertEqual(np.percentile(values, 5), estimates[5][0])
+
+        # The asymptotic standard errors of the normal quantiles
+        for percentile, (estimate, standard_error) in estimates.items():
+            q = percentile / 100.0
+            expected = np.sqrt(q * (1.0 - q) / values.size) / norm.pdf(norm.ppf(q))
+            self.assertAlmostEqual(expected, standard_error, delta=0.3 * expected)
+
+        # The bootstrap does not touch the global random state
+        state = np.random.get_state()
+        self.assertEqual(estimates[50], percentile_standard_errors(values)[50])
+        np.testing.assert_array_equal(state[1], np.random.get_state()[1])
+
+    def test_antithetic_pairs(self):
+        # Mirrored pairs of a symmetric distribution have a known median, resampling the pairs
+        # together gives a much smaller standard error than treating the paths as independent
+        half = np.random.RandomState(4).normal(size=500)
+        values = np.concatenate([half, -half])
+
+        paired = percentile_standard_errors(values, groups=sampler_groups(1000, Sampler.ANTITHETIC))
+        independent = percentile_standard_errors(values)
+
+        self.assertLess(paired[50][1], independent[50][1] / 5.0)
+
+    def test_degenerate(self):
+        self.assertTrue(np.isnan(percentile_standard_errors([1.0])[50][1]))
+        self.assertTrue(np.isnan(percentile_standard_errors([])[5][0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
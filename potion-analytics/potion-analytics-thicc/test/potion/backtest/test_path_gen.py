@@ -2,9 +2,12 @@ import unittest
 import yfinance as yf
 import numpy as np
 import matplotlib.pyplot as plt
+import pandas as pd
 
 from potion.backtest.path_gen import (
-    prices_to_sample_covariance_matrix, multivariate_normal_path_sampling)
+    prices_to_sample_covariance_matrix, multivariate_normal_path_sampling,
+    multivariate_t_path_sampling, t_path_sampling, path_sampling, uniform_samples, Sampler,
+    prices_to_t_covariance_matrix, _cached_t_parameters)
 
 
 class PathGenTestCase(unittest.TestCase):
@@ -79,6 +82,90 @@ class PathGenTestCase(unittest.TestCase):
 
         self.assertEqual(True, True)
 
+    def test_uniform_samples(self):
+        for sampler in Sampler:
+            np.random.seed(3)
+            uniforms = uniform_samples(64, 5, sampler)
+            self.assertEqual((64, 5), uniforms.shape)
+            self.assertTrue(np.all((uniforms > 0.0) & (uniforms < 1.0)))
+
+            # The global random state reproduces every sampler
+            np.random.seed(3)
+            np.testing.assert_array_equal(uniforms, uniform_samples(64, 5, sampler))
+
+        antithetic = uniform_samples(7, 3, Sampler.ANTITHETIC)
+        np.testing.assert_allclose(antithetic[4:], 1.0 - antithetic[:3])
+
+        stratified = uniform_samples(50, 2, Sampler.STRATIFIED)
+        np.testing.assert_array_equal(np.arange(50), np.sort(np.floor(stratified[:, 0] * 50)))
+
+    def test_t_path_sampling_samplers(self):
+        t_fit_params = [0.001, 0.03, 1.1, 4.0]
+
+        def mean_final_log_price(sampler, seed):
+            np.random.seed(seed)
+            paths = np.asarray(t_path_sampling(t_fit_params, 128, 6, 100.0, sampler=sampler))
+            self.assertEqual((128, 6), paths.shape)
+            np.testing.assert_array_equal(100.0, paths[:, 0])
+            return np.mean(np.log(paths[:, -1]))
+
+        pseudo_spread = np.std([mean_final_log_price(Sampler.PSEUDO_RANDOM, s) for s in range(10)])
+        for sampler in [Sampler.ANTITHETIC, Sampler.SOBOL, Sampler.HALTON]:
+            spread = np.std([mean_final_log_price(sampler, s) for s in range(10)])
+            self.assertLess(spread, pseudo_spread / 2.0)
+
+    def test_histogram_path_sampling_samplers(self):
+        prices = pd.DataFrame(100.0 * np.exp(np.cumsum(
+            np.random.RandomState(0).normal(0.0, 0.02, 500))))
+
+        for sampler in Sampler:
+            paths = np.asarray(path_sampling(prices, 40, 10, current_price=50.0, sampler=sampler))
+            self.assertEqual((40, 10), paths.shape)
+            np.testing.assert_array_equal(50.0, paths[:, 0])
+            self.assertTrue(np.all(paths > 0.0))
+
+    def test_multivariate_samplers(self):
+        cov = pd.DataFrame([[0.0004, 0.0002], [0.0002, 0.0009]], columns=['A', 'B'],
+                           index=['A', 'B'])
+        current_prices = {'A': 10.0, 'B': 20.0}
+
+        np.random.seed(1)
+        path_dict, log_delta_list = multivariate_t_path_sampling(
+            512, 9, cov, 5.0, current_prices, sampler=Sampler.SOBOL)
+
+        self.assertEqual((512, 9), np.asarray(path_dict['A']).shape)
+        np.testing.assert_array_equal(20.0, np.asarray(path_dict['B'])[:, 0])
+        log_deltas = pd.concat(log_delta_list)
+        np.testing.assert_allclose(np.cov(log_deltas.T), cov * 5.0 / 3.0, rtol=0.15)
+        np.testing.assert_allclose(np.log(path_dict['A'][3][-1] / 10.0),
+                                   log_delta_list[3]['A'].sum())
+
+        path_dict, log_delta_list = multivariate_normal_path_sampling(
+            16, 5, cov, current_prices, sampler=Sampler.ANTITHETIC)
+        self.assertEqual((16, 5), np.asarray(path_dict['B']).shape)
+        np.testing.assert_allclose(log_delta_list[8], -log_delta_list[0], atol=1e-9)
+
+    def test_t_covariance_cache(self):
+        rng = np.random.default_rng(0)
+        history = {asset: list(100.0 * np.exp(np.cumsum(0.02 * rng.standard_t(4.0, 3000))))
+                   for asset in ['A', 'B']}
+
+        _cached_t_parameters.cache_clear()
+        cov_df, asset_params, nu = prices_to_t_covariance_matrix(history)
+        expected = cov_df.copy()
+
+        # Changing the returned matrix does not change the cached estimate
+        cov_df.iloc[0, 0] = 1.0
+        cached_df, _, cached_nu = prices_to_t_covariance_matrix(history)
+        pd.testing.assert_frame_equal(expected, cached_df)
+        self.assertEqual(nu, cached_nu)
+        self.assertEqual(1, _cached_t_parameters.cache_info().hits)
+
+        # Estimating nu jointly is opt in, and is cached separately
+        _, _, joint_nu = prices_to_t_covariance_matrix(history, estimate_nu=True)
+        self.assertNotEqual(nu, joint_nu)
+        self.assertEqual(2, _cached_t_parameters.cache_info().currsize)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,143 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from potion.backtest.batch_backtester import (BatchBacktester, create_backtester_config,
+                                              PathGenMethod)
+from potion.backtest.path_gen import Sampler
+from potion.backtest.path_store import PathStore, path_key
+from potion.instrumentation import reset_profile, get_profile
+
+
+def _backtester(num_paths=20, path_length=15, seed=None, path_store_directory=None,
+                method=PathGenMethod.SKEWED_T, sampler=Sampler.PSEUDO_RANDOM):
+    training_df = pd.DataFrame([{
+        'Ticker': ticker, 'Label': 'full', 'CurrentPrice': price, 'StartDate': '2021-01-01',
+        'EndDate': '2021-06-01', 'TrainingPrices': list(price * np.exp(
+            np.cumsum(np.random.RandomState(i).normal(0.0, 0.03, 200))))
+    } for i, (ticker, price) in enumerate([('BTC', 40000.0), ('ETH', 3000.0)])])
+
+    curve_df = pd.DataFrame([{
+        'Ticker': ticker, 'Label': 'full', 'Expiration': 7, 'StrikePercent': 0.9,
+        'A': 0.1, 'B': 1.0, 'C': 0.5, 'D': 0.0, 'bet_fractions': [0.0, 0.1],
+        'curve_points': [0.0, 0.01], 't_params': [0.0, 0.03, 0.1, 3.0]
+    } for ticker in ['BTC', 'ETH']])
+
+    config = create_backtester_config(num_paths, path_length, 0.1, 1000.0,
+                                      path_gen_method=method, seed=seed,
+                                      path_store_directory=path_store_directory,
+                                      sampler=sampler)
+    return BatchBacktester(config=config, curve_df=curve_df, training_df=training_df)
+
+
+class PathStoreTestCase(unittest.TestCase):
+
+    def test_path_key(self):
+        params = {'dist': [0.0, 0.03, 0.1, 3.0], 'current_price': 100.0}
+
+        key = path_key(PathGenMethod.SKEWED_T, params, 10, 20, 1)
+
+        self.assertEqual(key, path_key(PathGenMethod.SKEWED_T, dict(params), 10, 20, 1))
+        self.assertEqual(key, path_key(PathGenMethod.SKEWED_T, {
+            'current_price': 100.0, 'dist': np.asarray([0.0, 0.03, 0.1, 3.0])}, 10, 20, 1))
+        self.assertNotEqual(key, path_key(PathGenMethod.HISTOGRAM, params, 10, 20, 1))
+        self.assertNotEqual(key, path_key(PathGenMethod.SKEWED_T, params, 11, 20, 1))
+        self.assertNotEqual(key, path_key(PathGenMethod.SKEWED_T, params, 10, 20, 2))
+        self.assertNotEqual(key, path_key(PathGenMethod.SKEWED_T, {
+            'dist': [0.0, 0.03, 0.1, 3.5], 'current_price': 100.0}, 10, 20, 1))
+
+        cov = pd.DataFrame([[1.0, 0.2], [0.2, 2.0]], columns=['A', 'B'])
+        self.assertNotEqual(path_key(PathGenMethod.SKEWED_T, {'cov': cov}, 10, 20, 1),
+                            path_key(PathGenMethod.SKEWED_T, {'cov': cov[['B', 'A']]}, 10, 20, 1))
+
+    def test_get_or_generate(self):
+        calls = []
+
+        def generate():
+            calls.append(1)
+            return np.random.default_rng(1).random((4, 5))
+
+        with tempfile.TemporaryDirectory() as directory:
+            store = PathStore(directory)
+
+            paths = store.get_or_generate('abc123', generate, {'seed': 1})
+            self.assertIsInstance(paths, np.memmap)
+            self.assertEqual(np.float32, paths.dtype)
+            self.assertEqual((4, 5), paths.shape)
+            self.assertFalse(paths.flags.writeable)
+
+            reused = store.get_or_generate('abc123', generate)
+            np.testing.assert_array_equal(paths, reused)
+            self.assertEqual(1, len(calls))
+            self.assertTrue(os.path.isfile(os.path.join(directory, 'abc123.json')))
+
+            # A store without the paths generates them again
+            other = PathStore(os.path.join(directory, 'other'))
+            np.testing.assert_array_equal(paths, other.get_or_generate('abc123', generate))
+            self.assertEqual(2, len(calls))
+            del paths, reused
+
+    def test_backtester_reuses_paths(self):
+        with tempfile.TemporaryDirectory() as directory:
+            reset_profile()
+
+            first = _backtester(seed=5, path_store_directory=directory)
+            first.generate_backtesting_paths()
+
+            second = _backtester(seed=5, path_store_directory=directory)
+            second.generate_backtesting_paths()
+
+            counters = get_profile()['counters']
+            self.assertEqual(2, counters['path_store_misses'])
+            self.assertEqual(2, counters['path_store_hits'])
+
+            for key in first.keys:
+                paths = second.path_mapping[key]
+                self.assertEqual((20, 15), paths.shape)
+                np.testing.assert_array_equal(first.path_mapping[key], paths)
+                np.testing.assert_allclose(first.current_price_map[key], paths[:, 0], rtol=1e-6)
+
+            other_seed = _backtester(seed=6, path_store_directory=directory)
+            other_seed.generate_backtesting_paths()
+            self.assertFalse(np.array_equal(first.path_mapping['BTC-full'],
+                                            other_seed.path_mapping['BTC-full']))
+
+            # The paths without a store match the stored paths of the same seed
+            in_memory = _backtester(seed=5)
+            in_memory.generate_backtesting_paths()
+            np.testing.assert_allclose(first.path_mapping['ETH-full'],
+                                       np.asarray(in_memory.path_mapping['ETH-full']), rtol=1e-6)
+
+            del first, second, other_seed
+
+    def test_histogram_paths(self):
+        with tempfile.TemporaryDirectory() as directory:
+            backtester = _backtester(path_store_directory=directory,
+                                     method=PathGenMethod.HISTOGRAM)
+            self.assertIsNotNone(backtester.seed)
+
+            backtester.generate_backtesting_paths()
+
+            self.assertEqual((20, 15), backtester.path_mapping['BTC-full'].shape)
+            self.assertEqual(2, len([f for f in os.listdir(directory) if f.endswith('.npy')]))
+            del backtester
+
+    def test_sampler_paths(self):
+        with tempfile.TemporaryDirectory() as directory:
+            pseudo_random = _backtester(seed=5, path_store_directory=directory)
+            pseudo_random.generate_backtesting_paths()
+            sobol = _backtester(seed=5, path_store_directory=directory, sampler=Sampler.SOBOL)
+            sobol.generate_backtesting_paths()
+
+            # The sampler is part of the key, so the paths are stored separately
+            self.assertEqual(4, len([f for f in os.listdir(directory) if f.endswith('.npy')]))
+            self.assertFalse(np.array_equal(pseudo_random.path_mapping['BTC-full'],
+                                            sobol.path_mapping['BTC-full']))
+            del pseudo_random, sobol
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import json
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from potion.backtest.multi_asset_backtester import (create_ma_backtester_config, PathGenMethod,
+                                                    MultiAssetBacktester)
+from potion.backtest.pool_runner import PoolResultStore, run_pool_scenarios
+from potion.instrumentation import reset_profile, get_profile
+
+
+def _training_df():
+    return pd.DataFrame([{
+        'Ticker': ticker, 'Label': 'full', 'CurrentPrice': price, 'StartDate': '2021-01-01',
+        'EndDate': '2021-06-01', 'TrainingPrices': list(price * np.exp(
+            np.cumsum(np.random.RandomState(i).normal(0.0, 0.03, 300))))
+    } for i, (ticker, price) in enumerate([('BTC', 40000.0), ('ETH', 3000.0), ('SOL', 40.0)])])
+
+
+def _pool_curve_df(pools):
+    rows = []
+    for backtest_id, assets in enumerate(pools):
+        for asset in assets:
+            rows.append({
+                'Label': asset + '-full', 'Backtest_ID': backtest_id, 'Curve_ID': len(rows),
+                'Asset': asset, 'Expiration': 3, 'StrikePercent': 0.9, 'A': 0.1, 'B': 1.0,
+                'C': 0.5, 'D': 0.0, 'bet_fractions': np.array([0.0, 0.1, 0.2]),
+                'curve_points': np.array([0.0, 0.01, 0.02])
+            })
+    return pd.DataFrame(rows)
+
+
+class PoolRunnerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.training_df = _training_df()
+        # The first two pools hold the same assets in a different order
+        self.curve_df = _pool_curve_df([['BTC', 'ETH'], ['ETH', 'BTC'], ['BTC', 'SOL']])
+        self.util_list = [{0: 0.1, 1: 0.1}, {2: 0.3, 3: 0.05}, {4: 0.1, 5: 0.2}]
+        self.config = create_ma_backtester_config(PathGenMethod.MV_NORMAL, 12, 10, {}, 1000.0,
+                                                  seed=3)
+
+    def test_run_pool_scenarios(self):
+        with tempfile.TemporaryDirectory() as directory:
+            reset_profile()
+            store = PoolResultStore(directory)
+
+            backtester_map = run_pool_scenarios(self.config, self.curve_df, self.training_df,
+                                                self.util_list, store)
+
+            self.assertEqual(1, get_profile()['counters']['pool_path_reuses'])
+            self.assertIs(backtester_map[0].covariance_matrix,
+                          backtester_map[1].covariance_matrix)
+            self.assertIs(backtester_map[0].path_mapping[0], backtester_map[1].path_mapping[3])
+            self.assertEqual({0.3, 0.05}, set(backtester_map[1].util_map.values()))
+            self.assertEqual(['BTC', 'SOL'], list(backtester_map[2].covariance_matrix.columns))
+
+            manifest_df = store.read_manifest()
+            self.assertEqual([0, 0, 1], manifest_df.Path_Group.tolist())
+            self.assertEqual(['BTC', 'ETH'], json.loads(manifest_df.Assets[1]))
+
+            # Each pool is evaluated into its own partition of the store
+            for backtest_id in range(3):
+                df = store.open(backtest_id)
+                self.assertEqual(12 * 10, len(df))
+                df.close()
+
+    def test_matches_separate_backtests(self):
+        with tempfile.TemporaryDirectory() as directory:
+            backtester_map = run_pool_scenarios(self.config, self.curve_df, self.training_df,
+                                                self.util_list, PoolResultStore(directory))
+
+            # A pool backtested on its own with the same seed is simulated on the same paths
+            separate = MultiAssetBacktester(
+                config=dict(self.config), curve_df=self.curve_df.query('Backtest_ID == 2'),
+                training_df=self.training_df)
+            separate.generate_backtesting_paths()
+
+            for curve_id in [4, 5]:
+                np.testing.assert_allclose(separate.path_mapping[curve_id],
+                                           backtester_map[2].path_mapping[curve_id])
+
+    def test_share_paths_mismatch(self):
+        source = MultiAssetBacktester(config=self.config,
+                                      curve_df=self.curve_df.query('Backtest_ID == 0'),
+                                      training_df=self.training_df)
+        source.generate_backtesting_paths()
+
+        other = MultiAssetBacktester(config=self.config,
+                                     curve_df=self.curve_df.query('Backtest_ID == 2'),
+                                     training_df=self.training_df)
+        with self.assertRaises(ValueError):
+            other.share_paths(source)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+
+from potion.benchmark.harness import (Benchmark, BenchmarkResult, time_callable, run_benchmarks,
+                                      write_results, read_results, compare_results)
+
+
+class HarnessTestCase(unittest.TestCase):
+
+    def test_time_callable(self):
+        calls = []
+
+        times, value = time_callable(lambda x: calls.append(x) or x, 3, repeats=4, warmup=2)
+
+        self.assertEqual(4, len(times))
+        self.assertEqual(6, len(calls))
+        self.assertEqual(3, value)
+
+    def test_run_benchmarks(self):
+
+        benchmarks = [
+            Benchmark('first', 'micro', lambda x: {'value': x}, setup=lambda: 2, repeats=2),
+            Benchmark('second', 'micro', lambda: None, repeats=1),
+            Benchmark('skipped', 'micro', lambda: None, requires_cpus=10 ** 6)
+        ]
+
+        results = run_benchmarks(benchmarks, 'small', log=None)
+        self.assertListEqual(['first', 'second'], [result.name for result in results])
+        self.assertDictEqual({'value': 2}, results[0].info)
+        self.assertEqual(2, len(results[0].times))
+
+        results = run_benchmarks(benchmarks, 'small', names=['sec'], log=None)
+        self.assertListEqual(['second'], [result.name for result in results])
+
+    def test_write_and_compare(self):
+        baseline = [BenchmarkResult('slower', 'micro', 'small', [1.0, 1.0, 1.0]),
+                    BenchmarkResult('faster', 'micro', 'small', [1.0, 1.0]),
+                    BenchmarkResult('same', 'micro', 'small', [1.0]),
+                    BenchmarkResult('tiny', 'micro', 'small', [1e-5])]
+        current = [BenchmarkResult('slower', 'micro', 'small', [1.5, 1.4, 2.0]),
+                   BenchmarkResult('faster', 'micro', 'small', [0.5, 0.6]),
+                   BenchmarkResult('same', 'micro', 'small', [1.1]),
+                   BenchmarkResult('tiny', 'micro', 'small', [1e-4]),
+                   BenchmarkResult('same', 'micro', 'large', [1.0])]
+
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'baseline.json')
+            write_results(filename, baseline, metadata={'created': 'today'})
+            baseline_dicts, metadata = read_results(filename)
+
+        self.assertEqual('today', metadata['created'])
+        self.assertEqual(1.0, baseline_dicts[0]['median'])
+
+        comparison_df = compare_results(current, baseline_dicts, threshold=0.25)
+        self.assertListEqual(['regression', 'improvement', 'ok', 'ok', 'new'],
+                             comparison_df['status'].tolist())
+        self.assertAlmostEqual(1.5, comparison_df['ratio'].values[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,12 @@
 import unittest
+import numpy as np
 
 from potion.curve_gen.constraints.builder import ConstraintsConfigBuilder
 from potion.curve_gen.constraints.bounds import BoundaryConstraints
+from potion.curve_gen.constraints.puts_no_arb_constraints import (monotonic_lb, monotonic_ub,
+                                                                  convex_lb, zero_bound,
+                                                                  call_zero_bound_by_pcp,
+                                                                  calendar_ub)
 
 
 class BoundaryConstraintsTestCase(unittest.TestCase):
@@ -65,6 +70,81 @@ class BoundaryConstraintsTestCase(unittest.TestCase):
         self.assertEqual(config, bounds.config)
         self.assertEqual(0.5, bounds.get_upper_bound({}))
 
+    def test_get_bounds_vector(self):
+
+        config = ConstraintsConfigBuilder().add_lower_bound(
+            monotonic_lb).add_lower_bound(
+            convex_lb).add_lower_bound(
+            zero_bound).add_lower_bound(
+            call_zero_bound_by_pcp).add_upper_bound(
+            monotonic_ub).add_upper_bound(
+            calendar_ub).add_upper_bound(
+            lambda a: 1.0).build_config()
+
+        bounds = BoundaryConstraints(config)
+
+        bet_fractions = np.linspace(0.0, 0.9999, 20)
+        boundary_dict = {
+            'p_ii': 0.02 + 0.05 * bet_fractions,
+            'p_iii': 0.01 + 0.04 * bet_fractions,
+            'p_mm': np.where(bet_fractions < 0.5, 0.04 + 0.05 * bet_fractions, np.nan),
+            'k_i': 0.9,
+            'k_ii': 0.85,
+            'k_iii': 0.8,
+            's': 1.0,
+            'r': 0.01,
+            'q': 0.0,
+            'tau': 7.0 / 365.0,
+            'exp_tau': 7.0 / 365.0
+        }
+
+        lower_bounds, upper_bounds = bounds.get_bounds_vector(boundary_dict)
+
+        self.assertEqual(bet_fractions.shape, lower_bounds.shape)
+        self.assertEqual(bet_fractions.shape, upper_bounds.shape)
+        for util in range(bet_fractions.size):
+            self.assertAlmostEqual(bounds.get_lower_bound(boundary_dict, util),
+                                   lower_bounds[util])
+            self.assertAlmostEqual(bounds.get_upper_bound(boundary_dict, util),
+                                   upper_bounds[util])
+
+        # Missing neighboring curves are ignored
+        boundary_dict['p_ii'] = np.full_like(bet_fractions, np.nan)
+        boundary_dict['p_mm'] = np.full_like(bet_fractions, np.nan)
+        lower_bounds, upper_bounds = bounds.get_bounds_vector(boundary_dict)
+        np.testing.assert_array_equal(np.zeros_like(bet_fractions), lower_bounds)
+        np.testing.assert_array_equal(np.ones_like(bet_fractions), upper_bounds)
+
+    def test_get_bounds_vector_scalar_functions(self):
+
+        config = ConstraintsConfigBuilder().add_lower_bound(
+            lambda a: 0.1).add_lower_bound(
+            lambda a: 0.2).add_upper_bound(
+            lambda a: 0.5).build_config()
+
+        lower_bounds, upper_bounds = BoundaryConstraints(config).get_bounds_vector({}, 5)
+
+        np.testing.assert_array_equal(np.full(5, 0.2), lower_bounds)
+        np.testing.assert_array_equal(np.full(5, 0.5), upper_bounds)
+
+    def test_get_bounds_vector_all_nan(self):
+
+        config = ConstraintsConfigBuilder().add_lower_bound(
+            lambda a: a['p_ii']).add_upper_bound(
+            lambda a: 0.5).build_config()
+        bounds = BoundaryConstraints(config)
+        boundary_dict = {'p_ii': np.array([0.1, np.nan, 0.2]), 'p_iii': np.full(3, np.nan)}
+
+        # Like the scalar bounds, a bet fraction where every bound is NaN is an error
+        with self.assertRaises(ValueError):
+            bounds.get_lower_bound(boundary_dict, 1)
+        with self.assertRaises(ValueError):
+            bounds.get_bounds_vector(boundary_dict)
+
+        boundary_dict['p_ii'][1] = 0.15
+        lower_bounds, upper_bounds = bounds.get_bounds_vector(boundary_dict)
+        np.testing.assert_array_equal([0.1, 0.15, 0.2], lower_bounds)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -6,7 +6,9 @@ from scipy.stats import norm
 from potion.curve_gen.domain_transformation import transform_pdf_using_optimize, transform_pdf_rough
 from potion.curve_gen.convolution.builder import ConvolutionConfigBuilder
 from potion.curve_gen.convolution.convolution import (LogDomainConvolver, configure_convolution,
-                                                      run_convolution, get_pdf_arrays)
+                                                      run_convolution, get_pdf_arrays,
+                                                      MAX_TRUNCATION_MASS)
+from potion.instrumentation import reset_profile, get_profile
 
 
 class ConvolutionTestCase(unittest.TestCase):
@@ -72,6 +74,36 @@ class ConvolutionTestCase(unittest.TestCase):
         self.assertEqual(20001, len(conv.log_pdf_list[1]))
         self.assertEqual(20001, len(conv.log_pdf_list[2]))
 
+    def test_truncation_mass_log_domain_convolver(self):
+
+        builder = ConvolutionConfigBuilder()
+
+        builder.set_num_times_to_convolve(2).set_min_x(-5.0).set_max_x(5.0).set_distribution_params(
+            [0, 1]).set_distribution(norm.pdf).set_points_in_pdf(20001)
+
+        conv = LogDomainConvolver(builder.build_config())
+
+        reset_profile()
+        with self.assertLogs('potion.curve_gen.convolution.convolution', 'WARNING') as logs:
+            conv._create_log_pdfs()
+
+        # Only the PDF of day 3, with a standard deviation of sqrt(3), loses more than the maximum
+        mass = conv.get_truncation_mass()
+        self.assertEqual(3, len(mass))
+        self.assertLess(np.max(mass[:2]), MAX_TRUNCATION_MASS)
+        self.assertGreater(mass[2], MAX_TRUNCATION_MASS)
+        self.assertEqual(1, get_profile()['counters']['truncated_pdfs'])
+        self.assertIn('on day 3', logs.output[0])
+
+        builder.set_min_x(-2.0).set_max_x(2.0).set_points_in_pdf(8001)
+        conv.configure(builder.build_config())
+
+        reset_profile()
+        with self.assertLogs('potion.curve_gen.convolution.convolution', 'WARNING'):
+            conv._create_log_pdfs()
+
+        self.assertEqual(3, get_profile()['counters']['truncated_pdfs'])
+
     def test_create_price_pdfs_log_domain_convolver(self):
 
         builder = ConvolutionConfigBuilder()
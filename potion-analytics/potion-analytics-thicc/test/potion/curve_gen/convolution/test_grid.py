@@ -0,0 +1,72 @@
+import unittest
+
+import numpy as np
+from scipy.stats import norm, t
+
+from potion.curve_gen.convolution.builder import ConvolutionConfigBuilder
+from potion.curve_gen.convolution.convolution import LogDomainConvolver
+from potion.curve_gen.convolution.grid import (log_return_bounds, adaptive_log_grid,
+                                               resample_pdf, truncated_mass)
+
+
+class GridTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.rv = norm(loc=0.0, scale=0.02)
+        self.expirations = [1, 7, 30]
+
+    def test_log_return_bounds(self):
+        lower, upper = log_return_bounds(self.rv, 30, tail_mass=1e-5)
+
+        self.assertAlmostEqual(self.rv.ppf(1e-5) * np.sqrt(30), lower)
+        self.assertAlmostEqual(-self.rv.ppf(1e-5) * np.sqrt(30), upper)
+
+        # Heavy tails are dominated by a single large jump
+        heavy = t(2.5, loc=0.0, scale=0.02)
+        heavy_lower, heavy_upper = log_return_bounds(heavy, 30, tail_mass=1e-5)
+        self.assertLessEqual(heavy_lower, heavy.ppf(1e-5 / 30))
+        self.assertGreaterEqual(heavy_upper, heavy.ppf(1.0 - 1e-5 / 30))
+
+    def test_adaptive_log_grid(self):
+        log_x, conv_log_x = adaptive_log_grid([self.rv], [self.expirations])
+
+        self.assertEqual(1, conv_log_x.size % 2)
+        self.assertEqual(0.0, conv_log_x[conv_log_x.size // 2])
+        np.testing.assert_allclose(np.diff(conv_log_x), conv_log_x[1] - conv_log_x[0])
+        self.assertTrue(np.all(np.diff(log_x) > 0.0))
+        self.assertAlmostEqual(conv_log_x[0], log_x[0])
+        self.assertAlmostEqual(conv_log_x[-1], log_x[-1])
+        self.assertLess(log_x.size, 20001)
+
+        # The points are denser near the center than in the tails
+        spacing = np.diff(log_x)
+        self.assertLess(spacing[spacing.size // 2], spacing[0])
+
+    def test_adaptive_grid_convolution(self):
+        log_x, conv_log_x = adaptive_log_grid([self.rv], [self.expirations])
+        config = ConvolutionConfigBuilder().set_num_times_to_convolve(30).set_distribution(
+            self.rv.pdf).set_grid(log_x, conv_log_x).set_log_only(True).build_config()
+
+        self.assertEqual(log_x.size, config.points_in_pdf)
+
+        conv = LogDomainConvolver(config)
+        conv.run_convolution()
+        x, pdfs = conv.get_pdf_arrays()
+
+        for day in self.expirations:
+            expected = norm(scale=0.02 * np.sqrt(day)).pdf(x)
+            np.testing.assert_allclose(pdfs[day - 1], expected, atol=1e-3 * np.max(expected))
+
+        self.assertTrue(np.all(np.abs(conv.get_truncation_mass()) < 1e-4))
+
+    def test_resample_and_truncated_mass(self):
+        x = np.linspace(-0.05, 0.05, 1001)
+        pdf = self.rv.pdf(x)
+        new_x = np.sort(np.concatenate((x[::10], [0.00123])))
+
+        np.testing.assert_allclose(resample_pdf(x, pdf, new_x), self.rv.pdf(new_x), rtol=1e-4)
+        self.assertAlmostEqual(2.0 * self.rv.cdf(-0.05), truncated_mass(x, pdf), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -26,6 +26,29 @@ class KellyFitBuilderTestCase(unittest.TestCase):
         config = builder.build_config()
 
         self.assertEqual('COSH', config.fit_type)
+        self.assertTrue(config.warm_start)
+        self.assertFalse(config.adaptive_sampling)
+
+    def test_set_warm_start(self):
+
+        builder = FitConfigBuilder()
+
+        config = builder.set_warm_start(False).build_config()
+
+        self.assertFalse(config.warm_start)
+        self.assertNotEqual(builder.set_warm_start(True).build_config(), config)
+
+    def test_set_adaptive_sampling(self):
+
+        builder = FitConfigBuilder()
+
+        config = builder.set_adaptive_sampling(True, initial_points=5,
+                                               sampling_tolerance=1e-2).build_config()
+
+        self.assertTrue(config.adaptive_sampling)
+        self.assertEqual(5, config.initial_points)
+        self.assertEqual(1e-2, config.sampling_tolerance)
+        self.assertNotEqual(builder.set_adaptive_sampling(False).build_config(), config)
 
 
 if __name__ == '__main__':
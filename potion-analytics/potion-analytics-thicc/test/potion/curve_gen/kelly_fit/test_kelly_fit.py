@@ -2,7 +2,9 @@ import unittest
 import numpy as np
 
 from potion.curve_gen.kelly_fit.builder import FitConfigBuilder
-from potion.curve_gen.kelly_fit.kelly_fit import (_fit_cosh, _fit_exp, KellyFit)
+from potion.curve_gen.kelly_fit.kelly_fit import (_fit_batch, _fit_cosh, _fit_exp, _cosh_model,
+                                                  _cosh_jacobian, _identity_bounds, KellyFit,
+                                                  MAX_FIT_STATS)
 
 
 class KellyFitTestCase(unittest.TestCase):
@@ -45,6 +47,119 @@ class KellyFitTestCase(unittest.TestCase):
         self.assertEqual(4, len(params))
         self.assertAlmostEqual(0.1, params[3], 5)
 
+    def test_cosh_jacobian(self):
+
+        t = np.linspace(0.0, 1.0, 50)
+        params = np.array([0.02, 2.5, 3.0, 0.004])
+
+        jac = _cosh_jacobian(t, *params)
+        step = 1e-7
+        for i in range(params.size):
+            shifted = params.copy()
+            shifted[i] += step
+            numeric = (_cosh_model(t, *shifted) - _cosh_model(t, *params)) / step
+            np.testing.assert_allclose(numeric, jac[:, i], rtol=1e-4, atol=1e-6)
+
+    def test_warm_start(self):
+
+        bet_fractions = np.linspace(0.0, 1.0, 50)
+        premiums_list = [_cosh_model(bet_fractions, 0.02 * k, 2.0 + 0.1 * k, 3.0, 0.004 * k)
+                         for k in range(1, 4)]
+
+        cold = KellyFit(FitConfigBuilder().set_warm_start(False).build_config())
+        warm = KellyFit(FitConfigBuilder().build_config())
+        cold_params = warm_params = None
+        for premiums in premiums_list:
+            cold_params = cold.fit_kelly_curve(bet_fractions, premiums,
+                                               warm_start_params=cold_params)
+            warm_params = warm.fit_kelly_curve(bet_fractions, premiums,
+                                               warm_start_params=warm_params)
+            np.testing.assert_allclose(_cosh_model(bet_fractions, *cold_params),
+                                       _cosh_model(bet_fractions, *warm_params), atol=1e-4)
+
+        cold_stats = cold.get_fit_stats()
+        warm_stats = warm.get_fit_stats()
+        self.assertEqual(3, len(warm_stats))
+        self.assertFalse(cold_stats['warm_start'].any())
+        self.assertTrue(warm_stats['warm_start'].iloc[1:].all())
+        self.assertLess(warm_stats['nfev'].iloc[1:].sum(), cold_stats['nfev'].iloc[1:].sum())
+
+        # A fit only starts from the parameters given by the caller, so it does not depend on
+        # the fits before it
+        params = warm.fit_kelly_curve(bet_fractions, premiums_list[0])
+        warm_stats = warm.get_fit_stats()
+        self.assertEqual(4, len(warm_stats))
+        self.assertFalse(warm_stats['warm_start'].iloc[-1])
+        np.testing.assert_array_equal(params, KellyFit(FitConfigBuilder().build_config())
+                                      .fit_kelly_curve(bet_fractions, premiums_list[0]))
+
+        self.assertEqual(MAX_FIT_STATS, warm.fit_stats.maxlen)
+        warm.clear_fit_stats()
+        self.assertEqual(0, len(warm.get_fit_stats()))
+
+    def test_fit_kelly_curves(self):
+
+        bet_fractions = np.linspace(0.0, 1.0, 50)
+        premiums_list = [_cosh_model(bet_fractions, 0.02 * k, 2.0 + 0.1 * k, 3.0, 0.004 * k)
+                         for k in range(1, 6)]
+
+        fit = KellyFit(FitConfigBuilder().build_config())
+        params_list = fit.fit_kelly_curves(bet_fractions, premiums_list)
+
+        self.assertEqual(len(premiums_list), len(params_list))
+        for params, premiums in zip(params_list, premiums_list):
+            self.assertEqual(4, len(params))
+            np.testing.assert_allclose(premiums, _cosh_model(bet_fractions, *params), atol=1e-3)
+
+    def test_fit_batch_failure(self):
+
+        bet_fractions = np.linspace(0.0, 1.0, 50)
+        premiums = _cosh_model(bet_fractions, 0.02, 2.0, 3.0, 0.004)
+
+        _, fit_info = _fit_batch(_cosh_model, _cosh_jacobian, _identity_bounds, [bet_fractions],
+                                 [premiums], 1, (0.0, 0.0, 0.0, 0.0), (100.0, 100.0, 100.0, 100.0))
+        self.assertFalse(fit_info['success'][0])
+
+        # The curves which do not converge in lockstep are fit on their own, which raises
+        fit = KellyFit(FitConfigBuilder().build_config())
+        with self.assertRaises(RuntimeError):
+            fit.fit_kelly_curves(bet_fractions, [premiums], maxfev=1,
+                                 initial_guesses=[[1.0, 1.0, 1.0, 1.0]])
+
+    def test_fit_sampled_kelly_curve(self):
+
+        bet_fractions = np.linspace(0.0, 0.9999, 50)
+        solved = []
+
+        def solve_premiums(points):
+            solved.extend(points)
+            return _cosh_model(points, 0.02, 2.0, 6.0, 0.004)
+
+        fit = KellyFit(FitConfigBuilder().build_config())
+        points, premiums, params = fit.fit_sampled_kelly_curve(bet_fractions, solve_premiums)
+        np.testing.assert_array_equal(bet_fractions, points)
+        self.assertEqual(50, len(solved))
+
+        solved.clear()
+        fit = KellyFit(FitConfigBuilder().set_adaptive_sampling(True).build_config())
+        points, premiums, params = fit.fit_sampled_kelly_curve(bet_fractions, solve_premiums)
+
+        # Fewer solves, each point solved once, and the points concentrate where the curve bends
+        self.assertLess(len(solved), 25)
+        self.assertEqual(len(solved), len(points))
+        self.assertTrue(np.all(np.diff(points) > 0.0))
+        self.assertEqual(bet_fractions[0], points[0])
+        self.assertEqual(bet_fractions[-1], points[-1])
+        self.assertGreater(np.sum(points > 0.5), np.sum(points <= 0.5))
+
+        np.testing.assert_allclose(solve_premiums(points), premiums)
+        # Only the final fit of the refinement is recorded
+        self.assertEqual(1, len(fit.get_fit_stats()))
+        self.assertEqual(len(points), fit.get_fit_stats()['points'].iloc[0])
+        np.testing.assert_allclose(solve_premiums(bet_fractions),
+                                   fit.predict_kelly_curve(bet_fractions, params),
+                                   atol=5e-3 * np.max(premiums))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -95,6 +95,29 @@ class PayoffBuilderTestCase(unittest.TestCase):
         self.assertAlmostEqual(0.01, config.option_legs[0]['r'], 5)
         self.assertAlmostEqual(0.01, config.option_legs[0]['q'], 5)
 
+    def test_structural_identity(self):
+
+        def build(strike, payoff_function=black_scholes_payoff):
+            return PayoffConfigBuilder().set_x_points(np.linspace(0.0, 2.0, 20001)).add_option_leg(
+                'put', 'short', 1.0, strike, 0.0, 0.0, 0.0, 0.0
+            ).set_payoff_function(payoff_function).build_config()
+
+        config = build(0.9)
+
+        self.assertIsNotNone(config.identity)
+        self.assertEqual(config.identity, build(0.9).identity)
+        self.assertNotEqual(config.identity, build(0.95).identity)
+        self.assertNotEqual(config.identity, build(0.9, expiration_only).identity)
+
+        self.assertEqual(config, build(0.9))
+        self.assertNotEqual(config, build(0.95))
+        self.assertEqual(2, len(dict.fromkeys([config, build(0.9), build(0.95)])))
+
+        # Configs created without the builder fall back to a digest of the arrays
+        unbuilt = config._replace(identity=None)
+        self.assertEqual(unbuilt, unbuilt._replace(option_legs=list(config.option_legs)))
+        self.assertEqual(hash(unbuilt), hash(config._replace(identity=None)))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,13 +1,32 @@
+import datetime
+import json
+import os
+import tempfile
 import unittest
 
+import numpy as np
+import pandas as pd
+from scipy.stats import lognorm
+
+from potion.testing.synthetic import (read_example_input, synthetic_curve_gen_input,
+                                      write_synthetic_inputs)
+from potion.curve_gen.batch_output import CurveOutputWriter
 from potion.curve_gen.builder import GeneratorConfigBuilder
+from potion.curve_gen.pdf_store import read_pdf_store
+from potion.curve_gen.utils import (build_generator_config as build_example_config,
+                                    make_payoff_cfg, make_payoff_dict)
+from potion.instrumentation import reset_profile, get_profile
 
 from potion.curve_gen.analysis.plot import show, plot_convolutions, plot_curve
 from potion.streamlitapp.curvegen.cg_file_io import write_curve_gen_outputs
+from potion.curve_gen import gen as gen_module
 from potion.curve_gen.gen import Generator
 from potion.curve_gen.training.builder import TrainingConfigBuilder
 from potion.curve_gen.constraints.builder import ConstraintsConfigBuilder
 from potion.curve_gen.kelly_fit.builder import FitConfigBuilder
+from potion.curve_gen.payoff.payoff import Payoff
+from potion.curve_gen.pipeline import TrainingGroup
+from potion.curve_gen.strike_sweep import StrikeSweep
 
 
 def build_generator_config(input_file: str, training_history_file: str):
@@ -46,6 +65,173 @@ class GenTestCase(unittest.TestCase):
 
         self.assertEqual(True, True)
 
+    def test_iter_curves(self):
+        bet_fractions = np.linspace(0.0, 0.9999, 10)
+
+        with tempfile.TemporaryDirectory() as directory:
+            input_df = synthetic_curve_gen_input(
+                read_example_input('ExampleCurveGenInputMulti.csv'), num_assets=2,
+                strikes=[0.9, 1.0], expirations=[1, 3])
+            input_file, history_file = write_synthetic_inputs(directory, input_df)
+
+            gen = Generator()
+            gen.configure_curve_gen(build_generator_config(input_file, history_file))
+            curves_df, pdf_df, training_df = gen.generate_curves(bet_fractions=bet_fractions)
+
+            # Each curve is yielded with the key of its PDF, and is written once its group is done
+            out_dir = os.path.join(directory, 'out')
+            writer = CurveOutputWriter(out_dir)
+            curves = gen.iter_curves(bet_fractions=bet_fractions, writer=writer)
+
+            first = next(curves)
+            self.assertEqual(0, first.group)
+            self.assertEqual(2, first.num_groups)
+            self.assertEqual('ethereum-full|3', first.pdf_key)
+            self.assertEqual(0, writer.read_progress()['completed_groups'])
+
+            solved = [first]
+            for curve in curves:
+                if curve.group == 1 and solved[-1].group == 0:
+                    group_progress = writer.read_progress()
+                solved.append(curve)
+            self.assertEqual(len(curves_df), len(solved))
+            self.assertEqual(1, group_progress['completed_groups'])
+            self.assertEqual(2, writer.read_progress()['completed_groups'])
+
+            streamed_df = pd.read_csv(writer.curves_file)
+            expected_df = pd.read_csv(pd.io.common.StringIO(curves_df.to_csv(index=False)))
+            pd.testing.assert_frame_equal(expected_df, streamed_df)
+
+            store = read_pdf_store(writer.pdf_file)
+            self.assertListEqual([str(name[0]) for name in pdf_df.columns[1:]], store.keys())
+            np.testing.assert_allclose(pdf_df.iloc[:, -1].values,
+                                       store.read_pdf(store.keys()[-1]), rtol=1e-6)
+
+            # Simulate a crash while the outputs of the second group were being written
+            with open(writer.progress_file, 'w') as f:
+                json.dump(group_progress, f)
+            os.truncate(writer.curves_file, os.path.getsize(writer.curves_file) - 10)
+
+            resumed = list(gen.iter_curves(bet_fractions=bet_fractions,
+                                           writer=CurveOutputWriter(out_dir), resume=True))
+            self.assertSetEqual({1}, {curve.group for curve in resumed})
+            self.assertEqual(len(curves_df) // 2, len(resumed))
+
+            pd.testing.assert_frame_equal(expected_df, pd.read_csv(writer.curves_file))
+            self.assertEqual(len(pdf_df.columns) - 1, len(read_pdf_store(writer.pdf_file).keys()))
+
+    def test_adaptive_sampling(self):
+        bet_fractions = np.linspace(0.0, 0.9999, 50)
+
+        with tempfile.TemporaryDirectory() as directory:
+            input_df = synthetic_curve_gen_input(
+                read_example_input('ExampleCurveGenInputSingle.csv'), strikes=[0.9, 1.0],
+                expirations=[1, 7])
+            input_file, history_file = write_synthetic_inputs(directory, input_df)
+
+            gen = Generator()
+            gen.configure_curve_gen(build_example_config(input_file, history_file,
+                                                         adaptive_sampling=True))
+            reset_profile()
+            curves_df, pdf_df, training_df = gen.generate_curves(bet_fractions=bet_fractions)
+
+        # Each row records the bet fractions its premiums were solved at
+        num_points = [len(row.bet_fractions) for _, row in curves_df.iterrows()]
+        self.assertEqual(get_profile()['counters']['premium_solves'], sum(num_points))
+        self.assertLess(sum(num_points), 50 * len(curves_df))
+        for _, row in curves_df.iterrows():
+            self.assertEqual(len(row.bet_fractions), len(row.curve_points))
+            self.assertTrue(set(row.bet_fractions).issubset(bet_fractions))
+
+    def test_replaced_fit_curve(self):
+        # The fit function replaced by a caller fits the premiums of every bet fraction
+        bet_fractions = np.linspace(0.0, 0.9999, 10)
+        fits = []
+
+        def fit_curve(points, premiums, lower_bounds, upper_bounds):
+            fits.append((points, premiums))
+            return [1.0, 2.0, 3.0, 4.0]
+
+        with tempfile.TemporaryDirectory() as directory:
+            input_df = synthetic_curve_gen_input(
+                read_example_input('ExampleCurveGenInputSingle.csv'), strikes=[0.9, 1.0],
+                expirations=[1])
+            input_file, history_file = write_synthetic_inputs(directory, input_df)
+
+            gen = Generator()
+            gen.configure_curve_gen(build_example_config(input_file, history_file,
+                                                         adaptive_sampling=True))
+            try:
+                gen_module._fit_curve = fit_curve
+                curves_df, _, _ = gen.generate_curves(bet_fractions=bet_fractions)
+            finally:
+                gen_module._fit_curve = gen_module.fit_kelly_curve
+
+        self.assertEqual(len(curves_df), len(fits))
+        for points, premiums in fits:
+            np.testing.assert_array_equal(bet_fractions, points)
+            self.assertEqual(len(bet_fractions), len(premiums))
+        np.testing.assert_array_equal([1.0, 2.0, 3.0, 4.0], curves_df[['A', 'B', 'C', 'D']]
+                                      .to_numpy()[0])
+
+    def test_replaced_scalar_bounds(self):
+        # The scalar bound functions replaced by a caller are used instead of the vector one
+        try:
+            gen_module._bounds_get_low = lambda bounds_dict, util: 0.1 * util
+            gen_module._bounds_get_up = lambda bounds_dict, util: 1.0
+            lower_bounds, upper_bounds = gen_module._get_bounds({}, 3)
+        finally:
+            gen_module._bounds_get_low = gen_module.get_lower_bound
+            gen_module._bounds_get_up = gen_module.get_upper_bound
+
+        np.testing.assert_allclose([0.0, 0.1, 0.2], lower_bounds)
+        np.testing.assert_array_equal(np.ones(3), upper_bounds)
+
+    def test_replaced_train(self):
+        # The DataFrame training function replaced by a caller is adapted to TrainingGroups
+        group = TrainingGroup(asset='BTC', label='full', start=datetime.date(2021, 1, 1),
+                              end=datetime.date(2021, 6, 1), current_price=100.0,
+                              dist_params=[0.0, 0.03, 0.1, 3.0],
+                              training_prices=np.linspace(90.0, 110.0, 30),
+                              strike_pcts=np.asarray([0.9, 1.0]), expirations=np.asarray([1, 3]))
+        try:
+            gen_module._train_train = lambda *args, dist: [group.to_frame()]
+            groups, conv_configs, payoff_configs = gen_module._perform_training(0.0, 0.03)
+        finally:
+            gen_module._train_train = gen_module.train
+
+        self.assertEqual(1, len(groups))
+        self.assertEqual(('BTC', 'full', 100.0), (groups[0].asset, groups[0].label,
+                                                 groups[0].current_price))
+        np.testing.assert_array_equal(group.training_prices, groups[0].training_prices)
+        np.testing.assert_array_equal([1, 3], groups[0].expirations)
+        self.assertEqual(1, len(conv_configs))
+        self.assertEqual(1, len(payoff_configs))
+
+    def test_kelly_derivative(self):
+        x = np.linspace(0.01, 3.0, 2000)
+        sweep = StrikeSweep(x, lognorm.pdf(x, 0.3))
+        payoff = Payoff(make_payoff_cfg(x, 1.0, make_payoff_dict(call_or_put='put',
+                                                                 direction='short')))
+        sweep.set_payoff(payoff.config.total_payoff)
+
+        # A replaced odds function is evaluated over the whole grid
+        try:
+            gen_module._payoff_get_odds = payoff.get_payoff_odds
+            expected = gen_module._kelly_derivative(0.05, 0.3, sweep)
+        finally:
+            gen_module._payoff_get_odds = gen_module.get_payoff_odds
+
+        try:
+            gen_module._payoff_get_max_loss = payoff.get_position_max_loss
+            self.assertAlmostEqual(expected, gen_module._kelly_derivative(0.05, 0.3, sweep))
+
+            # The optimizer falls back to a bound when the position cannot lose
+            with self.assertRaises(ValueError):
+                gen_module._kelly_derivative(-payoff.min_payoff, 0.3, sweep)
+        finally:
+            gen_module._payoff_get_max_loss = gen_module.get_position_max_loss
+
 
 if __name__ == '__main__':
     unittest.main()
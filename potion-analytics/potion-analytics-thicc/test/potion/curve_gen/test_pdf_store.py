@@ -0,0 +1,91 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+from potion.curve_gen.pdf_store import (write_pdf_store, read_pdf_store, append_pdf_store,
+                                        truncate_pdf_store, PRICES_KEY)
+
+
+class PdfStoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.tmp_dir.name, 'pdfs.h5')
+
+        # Same layout as the DataFrame output by the generator
+        self.prices = np.exp(np.linspace(-1.0, 1.0, 1001))
+        self.pdfs = {
+            'BTC-bull|1': norm.pdf(self.prices, 1.0, 0.05),
+            'BTC-bull|7': norm.pdf(self.prices, 1.0, 0.1),
+            'ETH-bear|7': norm.pdf(self.prices, 0.9, 0.2)
+        }
+        column_data = [pd.Series(self.prices)] + [pd.DataFrame(pdf) for pdf in self.pdfs.values()]
+        self.pdf_df = pd.concat(column_data, axis=1, keys=[PRICES_KEY] + list(self.pdfs))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_write_and_read(self):
+        write_pdf_store(self.filename, self.pdf_df)
+        store = read_pdf_store(self.filename)
+
+        self.assertListEqual([PRICES_KEY] + list(self.pdfs), store.columns)
+        self.assertListEqual(list(self.pdfs), store.keys())
+        self.assertIn('ETH-bear|7', store)
+        self.assertNotIn('ETH-bear|1', store)
+
+        np.testing.assert_array_equal(self.prices, store[PRICES_KEY].to_numpy())
+        for key, pdf in self.pdfs.items():
+            np.testing.assert_allclose(pdf, store[key].to_numpy(), rtol=1e-6, atol=1e-6)
+            self.assertEqual(np.float64, store.read_pdf(key).dtype)
+
+        with self.assertRaises(KeyError):
+            store.read_pdf('ETH-bear|1')
+
+    def test_downsample(self):
+        write_pdf_store(self.filename, self.pdf_df, dtype=np.float64)
+        store = read_pdf_store(self.filename, max_points=100)
+
+        prices = store.read_prices()
+        self.assertLessEqual(prices.size, 100)
+        np.testing.assert_array_equal(self.prices[::11], prices)
+        np.testing.assert_array_equal(self.pdfs['BTC-bull|7'][::11], store['BTC-bull|7'])
+
+        # Per call override of the downsampling
+        self.assertEqual(1001, store.read_pdf('BTC-bull|7', max_points=5000).size)
+        self.assertEqual(1001, store.read_pdf('BTC-bull|7', max_points=0).size)
+        self.assertEqual(1001, len(store.to_dataframe(max_points=0)))
+
+    def test_to_dataframe(self):
+        write_pdf_store(self.filename, self.pdf_df)
+        df = read_pdf_store(self.filename).to_dataframe(keys=['BTC-bull|1'])
+
+        self.assertListEqual([PRICES_KEY, 'BTC-bull|1'], df.columns.tolist())
+        np.testing.assert_allclose(self.pdfs['BTC-bull|1'], df['BTC-bull|1'], rtol=1e-6,
+                                   atol=1e-6)
+
+    def test_append_and_truncate(self):
+        keys = list(self.pdfs)
+        self.assertEqual(2, append_pdf_store(self.filename, self.prices,
+                                             {key: self.pdfs[key] for key in keys[:2]}))
+        self.assertEqual(3, append_pdf_store(self.filename, self.prices,
+                                             {keys[2]: self.pdfs[keys[2]]}))
+
+        store = read_pdf_store(self.filename)
+        self.assertListEqual(keys, store.keys())
+        for key, pdf in self.pdfs.items():
+            np.testing.assert_allclose(pdf, store.read_pdf(key), rtol=1e-6, atol=1e-6)
+
+        with self.assertRaises(ValueError):
+            append_pdf_store(self.filename, self.prices[:-1], {'BTC-bear|1': self.prices[:-1]})
+
+        truncate_pdf_store(self.filename, 1)
+        self.assertListEqual(keys[:1], read_pdf_store(self.filename).keys())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import datetime
+import unittest
+
+import numpy as np
+
+from potion.curve_gen.pipeline import TrainingGroup, CurveTable, PdfTable
+from potion.curve_gen.utils import (make_payoff_cfg, make_payoff_dict, training_groups_to_csv,
+                                    training_output_to_csv)
+
+
+def _group(asset='BTC', label='full', strikes=(0.9, 1.0, 0.9, 1.0), expirations=(1, 1, 3, 3)):
+    return TrainingGroup(asset=asset, label=label, start=datetime.date(2021, 1, 1),
+                         end=datetime.date(2021, 6, 1), current_price=100.0,
+                         dist_params=[0.0, 0.03, 0.1, 3.0],
+                         training_prices=np.linspace(90.0, 110.0, 30),
+                         strike_pcts=np.asarray(strikes), expirations=np.asarray(expirations))
+
+
+def _outputs(x, strikes, expirations, bet_fractions):
+    payoff_dict = make_payoff_dict(call_or_put='put', direction='short')
+    return [{
+        'payoff': make_payoff_cfg(x, strike, payoff_dict),
+        'exp': exp,
+        'params': [0.1 * i, 1.0, 0.5, -0.1 * i],
+        'prem': list(0.01 * i * bet_fractions),
+        'bet_fractions': bet_fractions
+    } for i, (exp, strike) in enumerate(zip(expirations, strikes))]
+
+
+class PipelineTestCase(unittest.TestCase):
+
+    def test_training_group_frame(self):
+        group = _group()
+
+        conv_df = group.to_frame()
+
+        self.assertEqual(4, len(conv_df))
+        self.assertEqual([0.9, 1.0, 0.9, 1.0], conv_df['StrikePct'].tolist())
+        self.assertEqual(group.training_prices.tolist(), conv_df['TrainingPrices'].values[2])
+
+        # The group only holds the training prices once, whatever the number of curves
+        round_trip = TrainingGroup.from_frame(conv_df)
+        self.assertEqual(group.training_prices.shape, round_trip.training_prices.shape)
+        np.testing.assert_array_equal(group.expirations, round_trip.expirations)
+        self.assertEqual(group.dist_params, round_trip.dist_params)
+        self.assertFalse(hasattr(round_trip, '__dict__'))
+
+    def test_training_csv(self):
+        groups = [_group(), _group(), _group(asset='ETH')]
+
+        training_df = training_groups_to_csv(groups)
+
+        self.assertEqual(['BTC', 'ETH'], training_df['Ticker'].tolist())
+        self.assertEqual('01/01/2021', training_df['StartDate'].values[0])
+        self.assertEqual(30, len(training_df['TrainingPrices'].values[1]))
+        self.assertTrue(training_df.equals(training_output_to_csv(
+            [group.to_frame() for group in groups])))
+
+    def test_curve_table(self):
+        bet_fractions = np.linspace(0.0, 0.9, 4)
+        x = np.linspace(0.01, 3.0, 50)
+        btc, eth = _group(), _group(asset='ETH', strikes=(1.0,), expirations=(7,))
+
+        table = CurveTable(bet_fractions)
+        self.assertEqual(0, table.add_group(btc, _outputs(x, btc.strike_pcts, btc.expirations,
+                                                          bet_fractions)))
+        self.assertEqual(1, table.add_group(eth, _outputs(x, eth.strike_pcts, eth.expirations,
+                                                          bet_fractions)))
+
+        self.assertEqual(5, len(table))
+        self.assertEqual([slice(0, 4), slice(4, 5)], table.group_slices)
+        self.assertEqual((5, 4), table.params.shape)
+
+        # The rows of each group are in the order the curves were solved, the reverse of the
+        # outputs
+        curves_df = table.to_frame()
+        self.assertEqual(['BTC'] * 4 + ['ETH'], curves_df['Ticker'].tolist())
+        self.assertEqual([3, 3, 1, 1, 7], curves_df['Expiration'].tolist())
+        self.assertEqual([1.0, 0.9, 1.0, 0.9, 1.0], curves_df['StrikePercent'].tolist())
+        np.testing.assert_allclose([0.3, 0.2, 0.1, 0.0, 0.0], curves_df['A'].values)
+        self.assertEqual(['Ticker', 'Label', 'Expiration', 'StrikePercent', 'A', 'B', 'C', 'D',
+                          't_params', 'bet_fractions', 'curve_points'], list(curves_df.columns))
+
+        row = table.row(4)
+        self.assertEqual('ETH', row['Ticker'])
+        self.assertEqual(7, row['Expiration'])
+        self.assertEqual(eth.dist_params, row['t_params'])
+        self.assertEqual(curves_df['D'].values[1], table.row(1)['D'])
+
+    def test_pdf_table(self):
+        pdf_x = np.linspace(0.5, 1.5, 5)
+        table = PdfTable()
+        table.add_group(_group(), np.asarray([1, 1, 3, 3]), pdf_x, [np.ones(5), np.zeros(5)])
+        table.add_group(_group(asset='ETH'), np.asarray([7]), pdf_x * 2.0, [np.full(5, 2.0)])
+
+        pdf_df = table.to_frame()
+
+        self.assertEqual(['Prices', 'BTC-full|1', 'BTC-full|3', 'ETH-full|7'],
+                         pdf_df.columns.get_level_values(0).tolist())
+        np.testing.assert_array_equal(pdf_x, pdf_df['Prices'].values.ravel())
+        np.testing.assert_array_equal(np.full(5, 2.0), table.to_dict()['ETH-full|7'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+
+import numpy as np
+from scipy.stats import lognorm
+
+from potion.curve_gen.kelly import kelly_formula_derivative, probability_from_density
+from potion.curve_gen.payoff.payoff import Payoff
+from potion.curve_gen.strike_sweep import StrikeSweep
+from potion.curve_gen.utils import make_payoff_cfg, make_payoff_dict
+
+
+class StrikeSweepTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.x = np.linspace(0.01, 3.0, 2000)
+        self.pdf = lognorm.pdf(self.x, 0.3)
+        self.sweep = StrikeSweep(self.x, self.pdf)
+
+    def _assert_matches_kelly(self, payoff_dict, strike, premium, bet_fractions):
+        payoff = Payoff(make_payoff_cfg(self.x, strike, payoff_dict))
+        max_loss = payoff.get_position_max_loss(premium)
+        expected = kelly_formula_derivative(probability_from_density(self.x, self.pdf),
+                                            payoff.get_payoff_odds(premium), bet_fractions)
+
+        self.sweep.set_payoff(payoff.config.total_payoff)
+        derivative = self.sweep.kelly_derivative(premium, bet_fractions, max_loss)
+
+        np.testing.assert_allclose(derivative, expected, rtol=1e-9, atol=1e-12)
+
+    def test_short_put(self):
+        payoff_dict = make_payoff_dict(call_or_put='put', direction='short')
+        for strike in [0.5, 1.0, 1.5]:
+            self._assert_matches_kelly(payoff_dict, strike, 0.05, 0.1)
+            self._assert_matches_kelly(payoff_dict, strike, 0.05, np.linspace(0.01, 0.9, 20))
+
+        # Only the prices below the strike are evaluated one by one
+        self.sweep.set_payoff(Payoff(make_payoff_cfg(self.x, 1.0, payoff_dict)).config
+                              .total_payoff)
+        self.assertLessEqual(self.sweep.varying_payoff.size, np.count_nonzero(self.x < 1.0) + 1)
+
+    def test_short_call(self):
+        payoff_dict = make_payoff_dict(call_or_put='call', direction='short')
+        self._assert_matches_kelly(payoff_dict, 1.2, 0.02, np.linspace(0.01, 0.5, 10))
+
+    def test_not_flat(self):
+        # Before expiration the payoff varies over the whole grid
+        payoff_dict = make_payoff_dict(call_or_put='put', direction='short', time_to_exp=0.1,
+                                       sigma=0.5)
+        self._assert_matches_kelly(payoff_dict, 1.0, 0.05, np.linspace(0.01, 0.9, 20))
+
+    def test_constant_payoff(self):
+        self.sweep.set_payoff(np.full_like(self.x, -0.5))
+        derivative = self.sweep.kelly_derivative(0.25, np.array([0.1, 0.2]), 0.25)
+
+        odds = np.full_like(self.x, -1.0)
+        expected = kelly_formula_derivative(probability_from_density(self.x, self.pdf), odds,
+                                            np.array([0.1, 0.2]))
+        np.testing.assert_allclose(derivative, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+import numpy as np
+import pandas as pd
+from scipy.stats import multivariate_normal
+
+from potion.curve_gen.training.distributions.multivariate_students_t import MultiVarStudentT
+from potion.curve_gen.training.distributions.marginals import (analytic_marginal,
+                                                               sample_marginal_pdf,
+                                                               grid_marginal_pdf, marginal_pdf)
+
+
+class MarginalsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.mu = [0.0, 0.01]
+        self.cov = pd.DataFrame([
+            [0.0009, 0.0003],
+            [0.0003, 0.0016]
+        ])
+        self.nu = 2.5
+        self.delta = 0.001
+        self.axis = np.arange(-0.2, 0.2, self.delta)
+
+    def test_grid_marginal_matches_analytic(self):
+        """
+        Integrating out the other axis of the 2-D grid must recover the univariate t marginal
+        """
+        rv = MultiVarStudentT(self.mu, self.cov, self.nu)
+        positions, _ = rv.get_positions_for_pdf([-0.2, -0.2], [0.2, 0.2],
+                                                [self.delta, self.delta])
+        probs = rv.pdf(positions)
+
+        axes = [self.axis, self.axis]
+        for i in range(2):
+            grid_values = grid_marginal_pdf([self.delta, self.delta], axes, i, probs)
+            analytic_values = analytic_marginal(rv, i).pdf(self.axis)
+
+            # Mass outside of the grid is lost in the numeric version
+            np.testing.assert_allclose(grid_values, analytic_values, atol=0.5)
+            self.assertAlmostEqual(np.sum(analytic_values) * self.delta,
+                                   np.sum(grid_values) * self.delta, 1)
+
+    def test_positions_for_three_dimensions(self):
+        mu = [0.0, 0.0, 0.0]
+        rv = MultiVarStudentT(mu, np.eye(3) * 0.001, self.nu)
+        positions, grid = rv.get_positions_for_pdf([-0.1] * 3, [0.1] * 3, [0.05] * 3)
+
+        self.assertEqual(positions.shape, grid.shape[1:] + (3,))
+        self.assertEqual(rv.pdf(positions).shape, grid.shape[1:])
+
+    def test_marginal_pdf_dispatch(self):
+        t_rv = MultiVarStudentT(self.mu, self.cov, self.nu)
+        normal_rv = multivariate_normal(self.mu, self.cov)
+
+        t_values = marginal_pdf(t_rv, 1, self.axis)
+        normal_values = marginal_pdf(normal_rv, 1, self.axis)
+
+        self.assertAlmostEqual(self.axis[np.argmax(t_values)], self.mu[1], 2)
+        self.assertAlmostEqual(self.axis[np.argmax(normal_values)], self.mu[1], 2)
+        self.assertAlmostEqual(np.sum(normal_values) * self.delta, 1.0, 3)
+
+    def test_sample_marginal_pdf(self):
+        np.random.seed(7)
+        rv = multivariate_normal(self.mu, self.cov)
+
+        kde_values = sample_marginal_pdf(rv, 0, self.axis, num_samples=20000)
+        analytic_values = analytic_marginal(rv, 0).pdf(self.axis)
+
+        np.testing.assert_allclose(kde_values, analytic_values, atol=0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,8 +4,11 @@ from matplotlib import cm
 import numpy as np
 import pandas as pd
 
+from lib.t import t
 from potion.curve_gen.training.distributions.multivariate_students_t import (MultiVarStudentT,
-                                                                             mle_multi_var_t)
+                                                                             mle_multi_var_t,
+                                                                             fit_multi_var_t,
+                                                                             RollingMultiVarT)
 
 
 class MultivariateStudentTMLETestCase(unittest.TestCase):
@@ -67,6 +70,66 @@ class MultivariateStudentTMLETestCase(unittest.TestCase):
         plt.show()
         self.assertTrue(True)
 
+    def _samples(self, num_samples, nu=4.0):
+        cov = np.asarray([
+            [2.1, 0.3, -0.4],
+            [0.3, 1.5, 0.2],
+            [-0.4, 0.2, 1.0]
+        ])
+        mvst = MultiVarStudentT([0.0, 0.5, -0.2], cov, nu)
+        return mvst.t.rvs(num_samples, random_state=7), cov
+
+    def test_fit_estimates_nu(self):
+        samples, cov = self._samples(20000)
+
+        estimate = fit_multi_var_t(samples)
+
+        self.assertAlmostEqual(4.0, estimate.nu, delta=0.4)
+        np.testing.assert_allclose(cov, estimate.cov, atol=0.15)
+        np.testing.assert_allclose([0.0, 0.5, -0.2], estimate.mu, atol=0.05)
+
+        # The ECME iterations never decrease the likelihood
+        self.assertTrue(np.all(np.diff(estimate.log_likelihoods) > -1e-6))
+
+    def test_fit_fixed_nu_matches_em(self):
+        samples, _ = self._samples(2000)
+
+        estimate = fit_multi_var_t(samples, nu=4.0, tol=1e-12)
+        cov_em, mu_em, _ = t(samples, dof=4.0, iter=1000, eps=1e-12)
+
+        self.assertEqual(4.0, estimate.nu)
+        np.testing.assert_allclose(cov_em, estimate.cov, rtol=1e-5)
+        np.testing.assert_allclose(mu_em, estimate.mu, atol=1e-6)
+
+    def test_fit_weights(self):
+        samples, _ = self._samples(2000)
+
+        # Repeating every sample is the same as doubling its weight
+        weights = np.where(np.arange(2000) < 1000, 2.0, 1.0)
+        weighted = fit_multi_var_t(samples, weights=weights, tol=1e-12)
+        repeated = fit_multi_var_t(np.concatenate((samples[:1000], samples)), tol=1e-12)
+
+        np.testing.assert_allclose(repeated.cov, weighted.cov, rtol=1e-4)
+        self.assertAlmostEqual(repeated.nu, weighted.nu, delta=1e-2)
+
+    def test_rolling(self):
+        samples, _ = self._samples(3000)
+
+        rolling = RollingMultiVarT(2000)
+        first = rolling.update(samples[:2000])
+        second = rolling.update(samples[2000:2050])
+
+        self.assertEqual(2000, rolling.samples.shape[0])
+        self.assertLess(second.iterations, first.iterations)
+
+        refit = fit_multi_var_t(samples[50:2050])
+        np.testing.assert_allclose(refit.cov, second.cov, rtol=1e-3)
+        self.assertAlmostEqual(refit.nu, second.nu, delta=1e-2)
+
+        decayed = RollingMultiVarT(2000, halflife=500)
+        decayed.update(samples[:2000])
+        self.assertAlmostEqual(0.5, decayed.weights()[-501] / decayed.weights()[-1])
+
 
 if __name__ == '__main__':
     unittest.main()
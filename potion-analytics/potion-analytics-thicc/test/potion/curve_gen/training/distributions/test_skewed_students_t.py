@@ -146,6 +146,15 @@ class SkewedTTestCase(unittest.TestCase):
 
         self.assertTrue(True)
 
+    def test_ppf(self):
+        skewed_t = SkewedT()
+        x = np.linspace(-0.2, 0.2, 41)
+
+        for skew, nu in [(0.7, 3.5), (1.0, 10.0), (1.4, 2.5)]:
+            q = skewed_t.cdf(x, skew, nu, loc=0.01, scale=0.03)
+            np.testing.assert_allclose(skewed_t.ppf(q, skew, nu, loc=0.01, scale=0.03), x,
+                                       atol=1e-9)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,8 +1,10 @@
 import unittest
 
 import numpy as np
+import pandas as pd
 
-from potion.streamlitapp.category.curve_cluster import CurveCluster, ClusteringMethod
+from potion.streamlitapp.category.curve_cluster import (CurveCluster, ClusteringMethod,
+                                                        common_bet_fractions)
 
 
 class CurveClusterTestCase(unittest.TestCase):
@@ -25,6 +27,21 @@ class CurveClusterTestCase(unittest.TestCase):
 
         self.assertEqual((12, 10), np.shape(clusterer.curve_mapping_flat))
 
+    def test_ragged_curves(self):
+        # Curves solved with adaptive sampling have different numbers of points
+        bet_fractions = np.linspace(0.0, 0.9, 10)
+        curves_df = pd.DataFrame({
+            'A': [0.1, 0.2], 'B': [1.0, 1.1], 'C': [0.5, 0.4], 'D': [0.0, 0.1],
+            'bet_fractions': [bet_fractions[[0, 3, 9]], bet_fractions[[0, 1, 5, 7, 9]]]
+        })
+
+        np.testing.assert_array_equal(bet_fractions[[0, 1, 3, 5, 7, 9]],
+                                      common_bet_fractions(curves_df))
+
+        clusterer = CurveCluster(2)
+        clusterer.create_curve_mapping(curves_df)
+        self.assertEqual((2, 6), np.shape(clusterer.curve_mapping_flat))
+
     def test_perform_clustering(self):
 
         clusterer = CurveCluster(2)
@@ -0,0 +1,116 @@
+import unittest
+
+import numpy as np
+import vaex
+
+from potion.streamlitapp.backt.bt_utils import calculate_max_drawdown
+from potion.streamlitapp.multibackt.ma_aggregate import (FAN_PERCENTILES, aggregate_strategy,
+                                                         logged_rows, sample_path_ids)
+from potion.streamlitapp.multibackt.ma_plot import create_backtesting_performance_plots
+
+NUM_PATHS = 40
+PATH_LENGTH = 10
+DURATION = 3
+
+
+def _make_log(curve_ids):
+    """
+    Builds a log in the layout written by the multi asset backtester, where rows are only
+    written on the expiration days
+    """
+    rng = np.random.default_rng(7)
+    days = np.tile(np.arange(PATH_LENGTH), NUM_PATHS)
+    written = days % DURATION == 0
+
+    columns = {
+        'Timestamp': np.where(written, days, 0).astype('i4'),
+        'Path_ID': np.where(written, np.repeat(np.arange(NUM_PATHS), PATH_LENGTH), 0).astype('i4')
+    }
+    for strategy in ['User', 'Opt']:
+        returns = rng.normal(0.0, 0.1, NUM_PATHS * PATH_LENGTH).reshape(NUM_PATHS, -1)
+        bankroll = 100.0 * np.exp(np.cumsum(returns, axis=1)).ravel()
+        cagr = np.where(days == 0, 0.0, rng.normal(5.0, 20.0, days.size))
+        columns[strategy + '_Bankroll'] = np.where(written, bankroll, 0.0).astype('f4')
+        columns[strategy + '_CAGR'] = np.where(written, cagr, 0.0).astype('f4')
+        for curve_id in curve_ids:
+            columns['{}_{}_Util'.format(curve_id, strategy)] = np.where(
+                written, rng.uniform(0.1, 0.2, days.size), 0.0).astype('f4')
+            columns['{}_{}_Amount'.format(curve_id, strategy)] = np.where(
+                written, rng.uniform(1.0, 5.0, days.size), 0.0).astype('f4')
+
+    return vaex.from_arrays(**columns)
+
+
+class AggregateTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.curve_ids = [0, 1]
+        self.results_df = _make_log(self.curve_ids)
+
+    def _path_values(self, column, path_id):
+        # The values of one path as read by the per path plots
+        rdff = self.results_df.filter(self.results_df.Path_ID == path_id).extract()
+        values = rdff[column].to_numpy()
+        return values[values != 0].astype(np.float64)
+
+    def test_logged_rows(self):
+        logged = logged_rows(self.results_df, NUM_PATHS)
+
+        self.assertEqual((NUM_PATHS, PATH_LENGTH), logged.shape)
+        np.testing.assert_array_equal(np.arange(PATH_LENGTH) % DURATION == 0, logged[5])
+
+    def test_aggregate_strategy(self):
+        user = aggregate_strategy(self.results_df, 'User', self.curve_ids, NUM_PATHS,
+                                  num_sample_paths=5)
+
+        np.testing.assert_array_equal([0, 3, 6, 9], user.bankroll.days)
+        np.testing.assert_array_equal([3, 6, 9], user.cagr.days)
+        np.testing.assert_array_equal([3, 6, 9], user.utils[1].days)
+        self.assertEqual((len(FAN_PERCENTILES), 4), user.bankroll.percentiles.shape)
+        self.assertEqual((5, 4), user.bankroll.samples.shape)
+
+        for path_id in [1, 17, 39]:
+            bankroll = self._path_values('User_Bankroll', path_id)
+            cagr = self._path_values('User_CAGR', path_id)
+            amounts = self._path_values('1_User_Amount', path_id)
+
+            self.assertAlmostEqual(calculate_max_drawdown(bankroll),
+                                   user.max_drawdowns[path_id], places=4)
+            self.assertAlmostEqual(cagr[-1], user.cagr.final[path_id], places=4)
+            self.assertAlmostEqual(amounts[1], user.amounts[1].initial[path_id], places=4)
+
+        # The sample spans the paths from the worst final bankroll to the best
+        final_bankrolls = user.bankroll.final
+        self.assertEqual(np.argmin(final_bankrolls), user.bankroll.sample_path_ids[0])
+        self.assertEqual(np.argmax(final_bankrolls), user.bankroll.sample_path_ids[-1])
+        np.testing.assert_array_equal(user.bankroll.sample_path_ids, user.utils[0].sample_path_ids)
+
+        counts, edges = user.cagr.histogram
+        self.assertEqual(NUM_PATHS, counts.sum())
+
+    def test_sample_path_ids(self):
+        final_values = np.array([3.0, 1.0, 2.0])
+
+        np.testing.assert_array_equal([1, 0], sample_path_ids(final_values, 2))
+        np.testing.assert_array_equal([1, 2, 0], sample_path_ids(final_values, 10))
+
+    def test_performance_plots(self):
+        results = create_backtesting_performance_plots(
+            self.results_df, 0, NUM_PATHS, self.curve_ids, num_paths_to_plot=5, use_webgl=True)
+        performance_dict = results[0]
+        user_bankroll_fig = results[1]
+        user_hist_fig = results[9]
+
+        final_cagrs = [self._path_values('Opt_CAGR', path_id)[-1] for path_id in range(NUM_PATHS)]
+        self.assertAlmostEqual(np.percentile(final_cagrs, 50), performance_dict['p50_opt_cagr'],
+                               places=4)
+
+        # Two traces per percentile band, the sampled paths and the median
+        self.assertEqual(2 * (len(FAN_PERCENTILES) // 2) + 5 + 1, len(user_bankroll_fig.data))
+        self.assertEqual(5, len([trace for trace in user_bankroll_fig.data
+                                 if trace.type == 'scattergl']))
+        self.assertEqual(2, len(user_hist_fig.data))
+
+
+if __name__ == '__main__':
+    unittest.main()
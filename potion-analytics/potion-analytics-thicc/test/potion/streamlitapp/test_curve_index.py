@@ -0,0 +1,61 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from potion.streamlitapp.curve_index import CurveIndex, POOL_KEY_COLUMNS
+
+
+class CurveIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.curve_df = pd.DataFrame({
+            'Ticker': ['BTC', 'BTC', 'ETH', 'ETH', 'BTC'],
+            'Label': ['Label1', 'Label1', 'Label1', 'Label2', 'Label1'],
+            'Expiration': [7, 7, 14, 14, 7],
+            'StrikePercent': [0.9, 1.0, 0.9, 0.9, 0.9],
+            'A': [0.1, 0.2, 0.3, 0.4, 0.1],
+            'B': [1.0, 2.0, 3.0, 4.0, 1.0],
+            'C': [0.5, 0.5, 0.5, 0.5, 0.5],
+            'D': [0.0, 0.1, 0.2, 0.3, 0.0]
+        })
+        self.curve_index = CurveIndex(self.curve_df)
+
+    def test_lookup(self):
+        # Rows selected in the UI tables come back with the strikes as strings
+        selected_rows = self.curve_df.iloc[[3, 1, 4]].astype({'StrikePercent': str})
+        selected_rows = pd.concat([selected_rows, pd.DataFrame([{
+            'Ticker': 'SOL', 'Label': 'Label1', 'Expiration': 7, 'StrikePercent': '0.9',
+            'A': 0.1, 'B': 1.0, 'C': 0.5, 'D': 0.0}])])
+
+        # The first of the duplicate curves is matched
+        np.testing.assert_array_equal([3, 1, 0, -1], self.curve_index.lookup(selected_rows))
+        self.assertEqual(0, self.curve_index.lookup(pd.DataFrame()).size)
+
+    def test_match_performance(self):
+        performance_df = pd.DataFrame({
+            'key': ['ETH-Label2', 'BTC-Label1', 'ETH-Label1', 'BTC-Label3'],
+            'duration': [14, 7, 14, 7],
+            'strike': ['0.9', 1.0, 0.9, 0.9],
+            'util': ['kelly'] * 4
+        })
+
+        curve_ids = self.curve_index.match_performance(performance_df)
+
+        np.testing.assert_array_equal([3, 1, 2, -1], curve_ids)
+        self.assertEqual('ETH', self.curve_index.get_curve(curve_ids[0]).Ticker)
+        self.assertIsNone(self.curve_index.get_curve(curve_ids[-1]))
+
+    def test_pool_columns(self):
+        pool_df = self.curve_df.rename(columns={'Ticker': 'Asset'})
+        pool_df['Label'] = pool_df['Asset'] + '-' + pool_df['Label']
+        pool_df['Backtest_ID'] = [0, 0, 1, 1, 2]
+        pool_df['Curve_ID'] = [0, 1, 2, 3, 4]
+
+        curve_index = CurveIndex(pool_df, POOL_KEY_COLUMNS)
+
+        np.testing.assert_array_equal([4, 2], curve_index.lookup(pool_df.iloc[[4, 2]]))
+
+
+if __name__ == '__main__':
+    unittest.main()
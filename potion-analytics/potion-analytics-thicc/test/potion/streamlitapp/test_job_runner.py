@@ -0,0 +1,130 @@
+import os
+import signal
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+import plotly.graph_objects as go
+
+from potion.streamlitapp.job_runner import JobQueue, JobStatus, FINISHED_STATUSES, job_workers
+
+ROOT_DIRECTORY = str(Path(__file__).resolve().parents[3])
+
+
+def add_numbers(a, b, progress_bar=None):
+    for i in range(4):
+        progress_bar.progress((i + 1) / 4.0)
+    return {'sum': a + b}
+
+
+def plot_line(values, num_workers=None):
+    return {'figs': [go.Figure(go.Scatter(y=values))], 'num_workers': num_workers}
+
+
+def fail(message):
+    raise ValueError(message)
+
+
+def wait(seconds):
+    time.sleep(seconds)
+
+
+class JobRunnerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        # The job processes import the targets of this module from the working directory
+        self.cwd = os.getcwd()
+        os.chdir(ROOT_DIRECTORY)
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.queue = JobQueue(self.tmp_dir.name, max_running_jobs=1)
+
+    def tearDown(self):
+        for job in self.queue.list_jobs():
+            self.queue.cancel(job['job_id'])
+        os.chdir(self.cwd)
+        self.tmp_dir.cleanup()
+
+    def _wait_for(self, job_id, statuses=FINISHED_STATUSES, timeout=60.0):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            job = self.queue.get(job_id)
+            if job['status'] in statuses:
+                return job
+            time.sleep(0.1)
+        self.fail('Job {} did not reach {}'.format(job_id, statuses))
+
+    def test_run_job(self):
+        job_id = self.queue.submit(add_numbers, {'a': 1, 'b': 2}, name='Add',
+                                   tags={'tool': 'test', 'batch': 3},
+                                   progress_args=['progress_bar'])
+
+        job = self._wait_for(job_id)
+
+        self.assertEqual(JobStatus.DONE, job['status'])
+        self.assertEqual({'progress_bar': 1.0}, job['progress'])
+        self.assertEqual({'sum': 3}, self.queue.result(job_id))
+        self.assertIsNotNone(job['finished'])
+
+        self.assertEqual([job_id], [job['job_id'] for job in self.queue.list_jobs({'batch': 3})])
+        self.assertEqual([], self.queue.list_jobs({'tool': 'other'}))
+
+        # A new queue on the same directory picks up the finished job from disk
+        self.assertEqual({'sum': 3}, JobQueue(self.tmp_dir.name).result(job_id))
+
+    def test_figures_and_workers(self):
+        job_id = self.queue.submit(plot_line, {'values': [1.0, 3.0, 2.0]},
+                                   workers_arg='num_workers')
+
+        self.assertEqual(JobStatus.DONE, self._wait_for(job_id)['status'])
+        result = self.queue.result(job_id)
+
+        # The figures are read back from their own files instead of the pickled result
+        self.assertEqual((1.0, 3.0, 2.0), tuple(result['figs'][0].data[0].y))
+        self.assertEqual(1, len(os.listdir(os.path.join(self.tmp_dir.name,
+                                                        job_id + '.figures'))))
+
+        # The job is given its share of the cores
+        self.assertEqual(job_workers(1), result['num_workers'])
+        self.assertEqual(1, job_workers(os.cpu_count()))
+
+    def test_failed_job(self):
+        job_id = self.queue.submit(fail, {'message': 'bad input file'})
+
+        job = self._wait_for(job_id)
+
+        self.assertEqual(JobStatus.FAILED, job['status'])
+        self.assertIn('bad input file', job['error'])
+        self.assertIsNone(self.queue.result(job_id))
+
+    def test_limit_and_cancel(self):
+        first = self.queue.submit(wait, {'seconds': 60.0})
+        second = self.queue.submit('{}:add_numbers'.format(__name__), {'a': 2, 'b': 2},
+                                   progress_args=['progress_bar'])
+
+        # Only one job may run at once, the second waits for the first
+        self.assertEqual(JobStatus.RUNNING, self.queue.get(first)['status'])
+        self.assertEqual(JobStatus.QUEUED, self.queue.get(second)['status'])
+
+        self.assertTrue(self.queue.cancel(first))
+        self.assertEqual(JobStatus.CANCELLED, self.queue.get(first)['status'])
+        self.assertFalse(self.queue.cancel(first))
+
+        # Cancelling the first job starts the second
+        self.assertEqual(JobStatus.DONE, self._wait_for(second)['status'])
+        self.assertEqual({'sum': 4}, self.queue.result(second))
+
+    @unittest.skipIf(os.name == 'nt', 'Processes are stopped with signals')
+    def test_dead_process(self):
+        job_id = self.queue.submit(wait, {'seconds': 60.0})
+        pid = self.queue.get(job_id)['pid']
+
+        os.kill(pid, signal.SIGKILL)
+
+        job = self._wait_for(job_id)
+        self.assertEqual(JobStatus.FAILED, job['status'])
+        self.assertIn('exited without finishing', job['error'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from potion.instrumentation import (Profiler, current_memory_mb, read_profile,
+                                    profile_to_dataframe)
+
+
+class InstrumentationTestCase(unittest.TestCase):
+
+    def test_timer(self):
+        profiler = Profiler()
+        profiles = []
+        profiler.add_listener(profiles.append)
+
+        with profiler.timer('outer'):
+            with profiler.timer('inner'):
+                pass
+        with profiler.timer('inner'):
+            pass
+
+        timers = profiler.get_profile()['timers']
+        self.assertEqual(1, timers['outer']['calls'])
+        self.assertEqual(2, timers['inner']['calls'])
+        self.assertGreaterEqual(timers['outer']['total'], timers['inner']['max'])
+        self.assertEqual(3, len(profiles))
+
+        profiler.remove_listener(profiles.append)
+        with profiler.timer('outer'):
+            pass
+        self.assertEqual(3, len(profiles))
+
+    def test_timer_decorator(self):
+        profiler = Profiler()
+
+        @profiler.timer('decorated')
+        def add(a, b):
+            return a + b
+
+        self.assertEqual(3, add(1, 2))
+        self.assertEqual(5, add(2, 3))
+        self.assertEqual(2, profiler.get_profile()['timers']['decorated']['calls'])
+
+    def test_record_time_and_count(self):
+        profiler = Profiler()
+
+        profiler.record_time('logging', 2.0, calls=4)
+        profiler.record_time('logging', 1.0)
+        profiler.count('rows_written', 4)
+        profiler.count('rows_written')
+
+        profile = profiler.get_profile()
+        self.assertDictEqual({'total': 3.0, 'calls': 5, 'max': 1.0},
+                             profile['timers']['logging'])
+        self.assertDictEqual({'rows_written': 5}, profile['counters'])
+
+        profiler.reset()
+        profile = profiler.get_profile()
+        self.assertDictEqual({}, profile['timers'])
+        self.assertDictEqual({}, profile['counters'])
+
+    def test_disabled(self):
+        profiler = Profiler(enabled=False)
+
+        with profiler.timer('training'):
+            profiler.count('fit_nfev', 10)
+        profiler.record_time('logging', 1.0)
+
+        profile = profiler.get_profile()
+        self.assertDictEqual({}, profile['timers'])
+        self.assertDictEqual({}, profile['counters'])
+
+        profiler.set_enabled(True)
+        profiler.count('fit_nfev', 10)
+        self.assertDictEqual({'fit_nfev': 10}, profiler.get_profile()['counters'])
+
+    def test_memory(self):
+        if current_memory_mb() is None:
+            self.skipTest('The resident memory cannot be measured on this platform')
+
+        profiler = Profiler()
+        with profiler.timer('allocate'):
+            data = np.ones(2 ** 23)
+            data[::512] = 2.0
+
+        # The 64 MB array is still resident at the end of the stage
+        stats = profiler.get_profile()['timers']['allocate']
+        self.assertGreater(stats['memory_growth_mb'], 48.0)
+        self.assertGreaterEqual(profiler.get_profile()['peak_memory_mb'], stats['memory_mb'])
+
+    def test_write_profile(self):
+        profiler = Profiler()
+        profiler.record_time('fitting', 2.0, calls=2)
+        profiler.record_time('training', 4.0)
+        profiler.count('brentq_iterations', 7)
+
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, 'profile.json')
+            profiler.write_profile(filename)
+            profile = read_profile(filename)
+
+        self.assertDictEqual(profiler.get_profile(), profile)
+
+        timers_df = profile_to_dataframe(profile)
+        self.assertListEqual(['training', 'fitting'], list(timers_df['Stage']))
+        self.assertListEqual([4.0, 1.0], list(timers_df['Mean (s)']))
+
+
+if __name__ == '__main__':
+    unittest.main()
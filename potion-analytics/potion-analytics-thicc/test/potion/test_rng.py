@@ -0,0 +1,149 @@
+import json
+import os
+import tempfile
+import unittest
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+
+from potion.backtest.batch_backtester import BatchBacktester, create_backtester_config
+from potion.backtest.path_gen import (chunked_path_sampling, multivariate_normal_path_sampling,
+                                      t_path_sampling)
+from potion.curve_gen.training.distributions.skewed_students_t import SkewedT
+from potion.rng import RandomStreams, RNG_RECORD_SUFFIX, resolve_generator
+
+T_FIT_PARAMS = [0.0, 0.03, 1.1, 4.0]
+
+
+def _draw_chunk(seed, chunk_index):
+    # Draws one chunk of paths from the stream of a seed in a worker process
+    rng = RandomStreams(seed).chunk_generator(chunk_index, 'paths', 'BTC')
+    return np.asarray(t_path_sampling(T_FIT_PARAMS, 4, 6, 100.0, rng=rng))
+
+
+def _backtester(seed, num_paths=10):
+    training_df = pd.DataFrame([{
+        'Ticker': 'BTC', 'Label': 'full', 'CurrentPrice': 40000.0, 'StartDate': '2021-01-01',
+        'EndDate': '2021-06-01', 'TrainingPrices': list(40000.0 * np.exp(
+            np.cumsum(np.random.RandomState(0).normal(0.0, 0.03, 200))))
+    }])
+    curve_df = pd.DataFrame([{
+        'Ticker': 'BTC', 'Label': 'full', 'Expiration': 7, 'StrikePercent': 0.9,
+        'A': 0.1, 'B': 1.0, 'C': 0.5, 'D': 0.0, 'bet_fractions': np.array([0.0, 0.1]),
+        'curve_points': np.array([0.0, 0.01]), 't_params': T_FIT_PARAMS
+    }])
+    config = create_backtester_config(num_paths, 15, 0.1, 1000.0, seed=seed)
+    return BatchBacktester(config=config, curve_df=curve_df, training_df=training_df)
+
+
+class RandomStreamsTestCase(unittest.TestCase):
+
+    def test_streams(self):
+        streams = RandomStreams(11)
+        draws = streams.generator('paths', 'BTC').random(5)
+
+        # A stream does not depend on the streams used before it or on the global state
+        other = RandomStreams(11)
+        other.generator('paths', 'ETH').random(100)
+        np.random.seed(0)
+        np.testing.assert_array_equal(draws, other.generator('paths', 'BTC').random(5))
+
+        self.assertFalse(np.array_equal(draws, streams.generator('paths', 'ETH').random(5)))
+        self.assertFalse(np.array_equal(draws, RandomStreams(12).generator('paths', 'BTC')
+                                        .random(5)))
+
+        # The seed is drawn and kept if none is given
+        self.assertIsInstance(RandomStreams().seed, int)
+
+    def test_resolve_generator(self):
+        rng = np.random.default_rng(2)
+        self.assertIs(rng, resolve_generator(rng))
+        np.testing.assert_array_equal(np.random.default_rng(2).random(3),
+                                      resolve_generator(2).random(3))
+
+        # Without a generator the draws follow the seed of the global state
+        np.random.seed(5)
+        draws = resolve_generator().random(3)
+        np.random.seed(5)
+        np.testing.assert_array_equal(draws, resolve_generator().random(3))
+        self.assertFalse(np.array_equal(draws, resolve_generator().random(3)))
+
+    def test_chunks(self):
+        streams = RandomStreams(3)
+        chunks = streams.chunk_generators(10, 'paths', 'BTC', chunk_size=4)
+
+        self.assertEqual([slice(0, 4), slice(4, 8), slice(8, 10)],
+                         [chunk for chunk, _ in chunks])
+        # A chunk drawn again on its own matches the chunk drawn with the others
+        np.testing.assert_array_equal(chunks[1][1].random(3),
+                                      streams.chunk_generator(1, 'paths', 'BTC').random(3))
+
+        record = streams.record()
+        self.assertEqual(3, record['seed'])
+        self.assertEqual([{'names': ['paths', 'BTC'], 'spawn_key': record['streams'][0]
+                          ['spawn_key'], 'chunks': 3}], record['streams'])
+
+    def test_chunked_path_sampling(self):
+        def sample(n_paths, rng):
+            return t_path_sampling(T_FIT_PARAMS, n_paths, 6, 100.0, rng=rng)
+
+        paths = np.asarray(chunked_path_sampling(sample, 10, RandomStreams(5), 'paths', 'BTC',
+                                                 chunk_size=4))
+        self.assertEqual((10, 6), paths.shape)
+        np.testing.assert_array_equal(paths, chunked_path_sampling(
+            sample, 10, RandomStreams(5), 'paths', 'BTC', chunk_size=4))
+
+        # The first chunks do not depend on the number of paths
+        np.testing.assert_array_equal(paths[:8], chunked_path_sampling(
+            sample, 8, RandomStreams(5), 'paths', 'BTC', chunk_size=4))
+
+        cov = pd.DataFrame([[0.0004, 0.0002], [0.0002, 0.0009]], columns=['A', 'B'],
+                           index=['A', 'B'])
+
+        def sample_assets(n_paths, rng):
+            return multivariate_normal_path_sampling(n_paths, 5, cov, {'A': 1.0, 'B': 2.0},
+                                                     rng=rng)
+
+        path_dict, log_delta_list = chunked_path_sampling(sample_assets, 6, RandomStreams(5),
+                                                          'paths', 'A', 'B', chunk_size=4)
+        self.assertEqual((6, 5), np.asarray(path_dict['B']).shape)
+        self.assertEqual(6, len(log_delta_list))
+
+    def test_forked_pool(self):
+        sequential = [_draw_chunk(9, i) for i in range(3)]
+
+        with get_context('fork').Pool(2) as pool:
+            parallel = pool.starmap(_draw_chunk, [(9, i) for i in range(3)])
+
+        for expected, paths in zip(sequential, parallel):
+            np.testing.assert_array_equal(expected, paths)
+
+    def test_skewed_t_random_state(self):
+        samples = SkewedT().rvs(1.1, 4.0, size=20, random_state=np.random.default_rng(4))
+        np.testing.assert_array_equal(samples, SkewedT().rvs(
+            1.1, 4.0, size=20, random_state=np.random.default_rng(4)))
+
+    def test_backtester_paths(self):
+        first = _backtester(seed=21)
+        first.generate_backtesting_paths()
+        np.random.seed(1)
+        second = _backtester(seed=21)
+        second.generate_backtesting_paths()
+
+        np.testing.assert_array_equal(np.asarray(first.path_mapping['BTC-full']),
+                                      np.asarray(second.path_mapping['BTC-full']))
+
+        with tempfile.TemporaryDirectory() as directory:
+            log_file_name = os.path.join(directory, 'backtest')
+            first.evaluate_backtest_sequentially(log_file_name)
+
+            with open(log_file_name + RNG_RECORD_SUFFIX) as f:
+                record = json.load(f)
+            self.assertEqual(21, record['seed'])
+            self.assertEqual([['paths', 'BTC-full']],
+                             [stream['names'] for stream in record['streams']])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from potion.testing.synthetic import (synthetic_price_history, synthetic_curve_gen_input,
+                                      read_example_input)
+from potion.curve_gen.training.train import COL_KEY_PRICE_HIST_DATES
+
+
+class SyntheticTestCase(unittest.TestCase):
+
+    def test_synthetic_price_history(self):
+        history_df = synthetic_price_history(['ethereum', 'bitcoin'])
+
+        self.assertListEqual([COL_KEY_PRICE_HIST_DATES, 'ethereum', 'bitcoin'],
+                             history_df.columns.tolist())
+        self.assertEqual('08/08/2015', history_df[COL_KEY_PRICE_HIST_DATES].values[0])
+        self.assertTrue(np.all(history_df['bitcoin'].values > 0.0))
+
+        # The same seed always creates the same history
+        pd.testing.assert_frame_equal(history_df, synthetic_price_history(['ethereum', 'bitcoin']))
+        self.assertFalse(history_df.equals(synthetic_price_history(['ethereum', 'bitcoin'],
+                                                                   seed=1)))
+
+    def test_synthetic_curve_gen_input(self):
+        template_df = read_example_input('ExampleCurveGenInputMulti.csv')
+
+        input_df = synthetic_curve_gen_input(template_df)
+        self.assertEqual(len(template_df), len(input_df))
+
+        input_df = synthetic_curve_gen_input(template_df, num_assets=3, strikes=[1.0],
+                                             expirations=[1, 7])
+        self.assertEqual(6, len(input_df))
+        self.assertListEqual(['ethereum', 'bitcoin', 'synthetic-0'],
+                             list(dict.fromkeys(input_df['Asset'])))
+        self.assertListEqual(template_df.columns.tolist(), input_df.columns.tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()